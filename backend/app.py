@@ -1,67 +1,221 @@
 # main.py
-from typing import Any
 import re
 from fastapi import FastAPI, UploadFile, File, Request, HTTPException
-from pydantic import BaseModel
-from rdflib import Graph, Namespace, Literal, URIRef
-from rdflib.namespace import RDF, RDFS, XSD
-from SPARQLWrapper import SPARQLWrapper, JSON, POST
-import requests
-from owlrl import DeductiveClosure, OWLRL_Semantics
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from rdflib import Namespace, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, OWL, XSD
+from rdflib.exceptions import ParserError
+from xml.sax import SAXParseException
 import os
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 import json
+from journal import ChangeJournal, JournaledGraph
+from sqlite_store import SQLiteStore, StoreTransactions
+from fuseki_client import FusekiClient
+from ollama_client import OllamaClient, OllamaUnavailable
+from llm_session import LLMSession, parse_keep_alive
+from translation_cache import TranslationCache, prompt_fingerprint
+from result_cache import ResultCache
+from single_flight import SingleFlight
+from outbox import FusekiOutbox
+from bulk_upload import UploadFormatError, bulk_load, detect_format
+from reasoner import IncrementalReasoner, to_ntriples
+from class_hierarchy import ClassHierarchy
+from search_index import SearchIndex
+from local_query import BACKENDS, LocalQueryEngine, compare_results
+from delta_sync import ChangeRecorder, DeltaSync, changelog_update, reset_update
+from pagination import CursorError, ListQuery, page_subjects
+from observability import CONTENT_TYPE, REGISTRY, configure_logging
+from workload import WorkloadRecorder, measure
+from sparql_detector import SparqlQueryDetector
+from sparql_prompt import PROMPT_PREFIX, PROMPT_QUESTION, build_prompt
+from ontology_schema import SCHEMA_QUERY, OntologySchema, collect_schema
+from question_rules import QuestionCompiler
+from sparql_normalizer import InvalidSparql, SparqlNormalizer
+from contextlib import aclosing
+from fastapi.routing import APIRoute
+import functools
+import inspect
+from collections import OrderedDict
+import uuid
+import asyncio
+import logging
+import threading
+import time
 
 # ======================
 # 🔧 CONFIGURATION
 # ======================
 load_dotenv()
 
+# Journalisation : niveau (DEBUG, INFO, WARNING, ERROR) et format (text ou json)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = logging.getLogger("mobilite.app")
+
 # Configuration Ollama
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "codellama:7b"  # ← CHANGÉ ICI
 
+# Délais par étape du pipeline /ask/ (en secondes)
+ASK_GENERATION_TIMEOUT = float(os.getenv("ASK_GENERATION_TIMEOUT", "120"))
+ASK_QUERY_TIMEOUT = float(os.getenv("ASK_QUERY_TIMEOUT", "30"))
+ASK_DISCONNECT_POLL = 0.5
+# Génération en streaming, arrêtée dès que la requête SPARQL est complète
+# (sinon : réponse entière attendue, texte superflu compris)
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "1") == "1"
+# Modèle gardé chargé (keep_alive envoyé à chaque appel, ping périodique en s ;
+# 0 : pas de ping) et préchauffé au démarrage sur le prompt complet
+OLLAMA_KEEP_ALIVE = parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+OLLAMA_KEEP_WARM_INTERVAL = float(os.getenv("OLLAMA_KEEP_WARM_INTERVAL", "300"))
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+OLLAMA_WARMUP_QUESTION = "Liste toutes les personnes"
+# Contexte ontologique du prompt : termes utiles à la question (1) ou schéma complet (0)
+OLLAMA_SCHEMA_RETRIEVAL = os.getenv("OLLAMA_SCHEMA_RETRIEVAL", "1") == "1"
+# Questions courantes (liste, comptage, filtre simple) traduites par règles, sans LLM
+ASK_RULES = os.getenv("ASK_RULES", "1") == "1"
+# Requêtes du LLM déjà analysées gardées en cache (validation sans réanalyse)
+SPARQL_PARSE_CACHE_SIZE = int(os.getenv("SPARQL_PARSE_CACHE_SIZE", "512"))
+# Opérations au plus par requête /batch/
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "20"))
+# Nombre maximal de lignes renvoyées par /ask/ (la requête Fuseki est plafonnée d'autant)
+ASK_MAX_ROWS = int(os.getenv("ASK_MAX_ROWS", "10000"))
+
+# Cache des traductions question → SPARQL
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "translation_cache.sqlite")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "1000"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSLATION_SIMILARITY_THRESHOLD = float(os.getenv("TRANSLATION_SIMILARITY_THRESHOLD", "0.9"))
+
+ollama = OllamaClient(OLLAMA_BASE_URL, OLLAMA_MODEL)
+
 FUSEKI_BASE = "http://localhost:3030"
 FUSEKI_QUERY_URL = f"{FUSEKI_BASE}/smartcity/sparql"
 FUSEKI_UPDATE_URL = f"{FUSEKI_BASE}/smartcity/update"
 FUSEKI_DATA_ENDPOINT = f"{FUSEKI_BASE}/smartcity/data"
+FUSEKI_POOL_SIZE = int(os.getenv("FUSEKI_POOL_SIZE", "20"))
+FUSEKI_TIMEOUT = float(os.getenv("FUSEKI_TIMEOUT", "30"))
+FUSEKI_CONNECT_TIMEOUT = float(os.getenv("FUSEKI_CONNECT_TIMEOUT", "5"))
+
+# Cache des résultats SPARQL (invalidé à chaque mise à jour envoyée à Fuseki)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("RESULT_CACHE_MAX_ROWS", "200000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_REFRESH_AHEAD = int(os.getenv("RESULT_CACHE_REFRESH_AHEAD", "4"))
+# Requêtes identiques concurrentes partagées (une seule exécution en vol par requête et génération)
+SPARQL_SINGLE_FLIGHT = os.getenv("SPARQL_SINGLE_FLIGHT", "1") == "1"
+
+# Outbox des mises à jour Fuseki (acquittées une fois durables, envoyées par lots)
+OUTBOX_PATH = os.getenv("FUSEKI_OUTBOX_PATH", "fuseki_outbox.jsonl")
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("FUSEKI_OUTBOX_INTERVAL_MS", "50")) / 1000
+OUTBOX_BATCH_SIZE = int(os.getenv("FUSEKI_OUTBOX_BATCH", "200"))
+
+# Import en masse : taille des lots envoyés à Fuseki et nombre d'envois simultanés
+UPLOAD_CHUNK_TRIPLES = int(os.getenv("UPLOAD_CHUNK_TRIPLES", "10000"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+# Matérialisation OWL-RL (processus séparé) : délai de regroupement des modifications
+REASONING_ENABLED = os.getenv("REASONING_ENABLED", "1") == "1"
+REASONING_INTERVAL = float(os.getenv("REASONING_INTERVAL", "2"))
+REASONING_BATCH = 10000
+
+# Synchronisation incrémentale Fuseki → graphe local (0 : uniquement au démarrage)
+SYNC_INTERVAL = float(os.getenv("FUSEKI_SYNC_INTERVAL", "30"))
+SYNC_STATE_PATH = os.getenv("FUSEKI_SYNC_STATE_PATH", "mobilite_sync.json")
+SYNC_DUMP_PATH = os.getenv("FUSEKI_SYNC_DUMP_PATH", "mobilite_updated.nt")
+SYNC_DELTA_PATH = os.getenv("FUSEKI_SYNC_DELTA_PATH", "mobilite_sync_delta.nt")
+SYNC_CHANGELOG_RETENTION = int(os.getenv("FUSEKI_SYNC_RETENTION", "10000"))
+# Identifie les changesets publiés par ce processus (ignorés à la synchronisation)
+SYNC_ORIGIN = uuid.uuid4().hex
+
+# Listes paginées : taille maximale d'une page (?limit=)
+LIST_PAGE_MAX = int(os.getenv("LIST_PAGE_MAX", "1000"))
+
+# Moteur des lectures : "fuseki", "local" (graphe en mémoire) ou "local-with-fallback"
+# (graphe en mémoire, Fuseki pour les requêtes que rdflib ne sait pas évaluer)
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "fuseki")
+if QUERY_BACKEND not in BACKENDS:
+    log.warning("⚠️ QUERY_BACKEND inconnu (%s), utilisation de Fuseki", QUERY_BACKEND)
+    QUERY_BACKEND = "fuseki"
+LOCAL_QUERY_CACHE_SIZE = int(os.getenv("LOCAL_QUERY_CACHE_SIZE", "256"))
+
+# Client Fuseki partagé (connexions keep-alive réutilisées entre les requêtes)
+fuseki = FusekiClient(
+    FUSEKI_QUERY_URL,
+    FUSEKI_UPDATE_URL,
+    FUSEKI_DATA_ENDPOINT,
+    pool_size=FUSEKI_POOL_SIZE,
+    timeout=FUSEKI_TIMEOUT,
+    connect_timeout=FUSEKI_CONNECT_TIMEOUT,
+)
+
+# Enregistrement de la charge (requêtes SPARQL et questions /ask/), rejouable avec
+# benchmarks/replay.py ; désactivé si WORKLOAD_LOG_PATH est vide
+WORKLOAD_LOG_PATH = os.getenv("WORKLOAD_LOG_PATH", "")
+WORKLOAD_LOG_MAX_BYTES = int(os.getenv("WORKLOAD_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+WORKLOAD_LOG_BACKUPS = int(os.getenv("WORKLOAD_LOG_BACKUPS", "5"))
+workload_recorder = None
+if WORKLOAD_LOG_PATH:
+    workload_recorder = WorkloadRecorder(WORKLOAD_LOG_PATH, WORKLOAD_LOG_MAX_BYTES, WORKLOAD_LOG_BACKUPS)
+    log.info("🎥 Enregistrement de la charge dans %s", WORKLOAD_LOG_PATH)
+fuseki.recorder = workload_recorder
 
 # Namespace de votre ontologie
 MOBILITE = Namespace("http://www.semanticweb.org/smartcity/ontologies/mobilite#")
 INFERRED_GRAPH_URI = "http://example.org/inferred"
+CHANGELOG_GRAPH_URI = "http://example.org/changelog"
+
+# Stockage du graphe local : "memory" (store rdflib + journal/snapshot, fichier RDF
+# chargé au démarrage) ou "sqlite" (store persistant ouvert sans rien parser, voir
+# migrate_store.py pour convertir les fichiers .rdf existants)
+LOCAL_STORE = os.getenv("MOBILITE_LOCAL_STORE", "memory")
+LOCAL_STORE_PATH = os.getenv("MOBILITE_STORE_PATH", "mobilite.sqlite")
+MOBILITE_RDF_PATH = os.getenv("MOBILITE_RDF_PATH", "mobilite.rdf")
+
+# Journal des modifications du graphe local (remplace la réécriture complète du RDF/XML)
+JOURNAL_PATH = os.getenv("MOBILITE_JOURNAL_PATH", "mobilite_journal.nt")
+SNAPSHOT_PATH = os.getenv("MOBILITE_SNAPSHOT_PATH", "mobilite_snapshot.nt")
+JOURNAL_COMPACTION_THRESHOLD = int(os.getenv("MOBILITE_JOURNAL_COMPACTION", "50000"))
+# Index plein texte de /search/ et /avis/recherche/, sauvegardé à côté du journal
+SEARCH_INDEX_PATH = os.getenv("MOBILITE_SEARCH_INDEX_PATH", "mobilite_search_index.pickle")
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_MAX_ROWS, RESULT_CACHE_TTL)
+single_flight = SingleFlight()
+
+if LOCAL_STORE == "sqlite":
+    # Store persistant : chaque g.commit() est une transaction SQLite
+    store = SQLiteStore()
+    store.open(LOCAL_STORE_PATH, create=True)
+    g = JournaledGraph(store=store)
+    journal = StoreTransactions(store)
+    log.info("🗄️ Store SQLite ouvert : %s (%d triples)", LOCAL_STORE_PATH, len(g))
+else:
+    g = JournaledGraph()
+
+    def load_base_rdf(graph):
+        """Graphe RDF local initial (seulement sans snapshot : celui-ci le contient déjà)"""
+        if os.path.exists(MOBILITE_RDF_PATH):
+            try:
+                graph.parse(MOBILITE_RDF_PATH)
+            except Exception as e:
+                log.warning("⚠️ Impossible de charger %s : %s", MOBILITE_RDF_PATH, e)
+        else:
+            log.warning("⚠️ Fichier RDF local introuvable : %s", os.path.abspath(MOBILITE_RDF_PATH))
 
-# Charger le graphe RDF local
-g = Graph()
-try:
-    g.parse("mobilite.rdf")
-except Exception:
-    pass
+    # Snapshot (ou RDF initial) + rejeu du journal, puis journalisation des écritures suivantes
+    journal = ChangeJournal(JOURNAL_PATH, SNAPSHOT_PATH, compaction_threshold=JOURNAL_COMPACTION_THRESHOLD)
+    replayed = journal.restore(g, load_base_rdf)
+    log.info("📒 Journal rejoué : %d opérations (%d triples en local)", replayed, len(g))
+    journal.open()
 g.bind("mobilite", MOBILITE)
+g.attach_journal(journal)
 
-# ======================
-# 🔁 SYNCHRONISATION FUSEKI → FICHIER LOCAL
-# ======================
-
-def sync_from_fuseki_to_local():
-    """
-    Télécharge tous les triples de Fuseki et les enregistre localement
-    """
-    try:
-        print("🔄 Synchronisation Fuseki → mobilite_updated.rdf ...")
-        url = f"{FUSEKI_DATA_ENDPOINT}?graph=default"
-        response = requests.get(url, headers={"Accept": "application/rdf+xml"})
-        if response.status_code == 200 and response.text.strip():
-            with open("mobilite_updated.rdf", "w", encoding="utf-8") as f:
-                f.write(response.text)
-            print("✅ Synchronisation réussie : fichier local mis à jour.")
-        else:
-            print(f"⚠️ Aucun contenu RDF récupéré (code {response.status_code}).")
-    except Exception as e:
-        print(f"⚠️ Erreur de synchronisation Fuseki → local : {e}")
-
-# Exécuter la synchro au démarrage
-sync_from_fuseki_to_local()
+# Triples modifiés par chaque écriture, publiés dans le journal des modifications Fuseki
+change_recorder = ChangeRecorder()
+g.add_listener(change_recorder.on_change)
 
 # ======================
 # 🚀 APPLICATION FASTAPI
@@ -74,218 +228,525 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Durée de chaque requête par route (gabarit, ex. /avis/{utilisateur_id}) : pour une
+# réponse en flux, la mesure s'arrête à l'envoi des en-têtes
+HTTP_LATENCY = REGISTRY.histogram(
+    "mobilite_http_request_duration_seconds", "Durée des requêtes HTTP par route", ("method", "route", "status")
+)
+# Origine des traductions /ask/ : rules, cache_exact, cache_similaire, ollama
+ASK_TRANSLATIONS = REGISTRY.counter("mobilite_ask_translations_total", "Traductions question → SPARQL par origine", ("source",))
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            # Chemins inconnus regroupés : le nombre de séries reste borné
+            route=route.path if route is not None else "non_routée",
+            status=str(status),
+        )
+
+# Boucle d'événements du serveur (pour planifier des tâches depuis le threadpool)
+event_loop = None
+
+@app.on_event("startup")
+async def capture_event_loop():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+
+@app.on_event("startup")
+def start_delta_sync():
+    """Synchronisation incrémentale depuis Fuseki (ne bloque pas le démarrage)"""
+    delta_sync.start()
+
+@app.on_event("shutdown")
+def close_local_stores():
+    """Vide le journal sur disque et ferme les caches locaux à l'arrêt du serveur"""
+    delta_sync.close()
+    outbox.close()
+    reasoner.close()
+    journal.close()
+    save_search_index()
+    translation_cache.close()
+    if workload_recorder is not None:
+        workload_recorder.close()
+
+@app.on_event("startup")
+async def start_llm_session():
+    """Préchauffage du modèle et keep-alive en arrière-plan (ne bloque pas le démarrage)"""
+    if OLLAMA_WARMUP:
+        llm_session.start()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Ferme les pools de connexions Fuseki et Ollama"""
+    await llm_session.close()
+    await fuseki.aclose()
+    await ollama.aclose()
+
 # ======================
 # ⚙️ FONCTIONS UTILITAIRES
 # ======================
 
+def invalidate_results():
+    """Nouvelle génération du dataset : invalide le cache et rafraîchit les requêtes chaudes"""
+    hottest = result_cache.bump(RESULT_CACHE_REFRESH_AHEAD)
+    if hottest and event_loop is not None:
+        asyncio.run_coroutine_threadsafe(refresh_results(hottest), event_loop)
+
+async def refresh_results(queries):
+    """Ré-exécute en arrière-plan les requêtes les plus demandées après une écriture"""
+    for query in queries:
+        try:
+            await execute_sparql_query(query)
+        except Exception as e:
+            log.warning("⚠️ Rafraîchissement du cache impossible : %s", e)
+
+outbox = FusekiOutbox(
+    OUTBOX_PATH,
+    send=fuseki.update_sync,
+    on_flushed=invalidate_results,
+    flush_interval=OUTBOX_FLUSH_INTERVAL,
+    batch_size=OUTBOX_BATCH_SIZE,
+    changelog=lambda changes: changelog_update(CHANGELOG_GRAPH_URI, SYNC_ORIGIN, "".join(changes)),
+)
+outbox.start()
+
+# Synchronisation Fuseki → graphe local : démarrée avec l'application, en arrière-plan
+delta_sync = DeltaSync(
+    fuseki,
+    g,
+    journal.lock,
+    change_recorder,
+    CHANGELOG_GRAPH_URI,
+    SYNC_ORIGIN,
+    SYNC_STATE_PATH,
+    SYNC_DUMP_PATH,
+    SYNC_DELTA_PATH,
+    interval=SYNC_INTERVAL,
+    retention=SYNC_CHANGELOG_RETENTION,
+    can_reset=lambda: outbox.stats()["pending"] == 0,
+    on_applied=invalidate_results,
+)
+g.add_listener(delta_sync.on_change)
+
+def write_transaction(endpoint):
+    """
+    Endpoint d'écriture dans une transaction du graphe local (journal.transaction).
+    En store SQLite, la connexion est partagée : l'endpoint s'exécute en entier sous
+    le verrou et ses écritures, g.commit() compris, sont annulées s'il lève une
+    exception. En mémoire, pas d'annulation : les modifications déjà faites dans `g`
+    restent, et celles déjà validées restent dans le journal. Dans les deux modes, les
+    modifications non encore publiées du thread de l'endpoint sont écartées de
+    l'outbox. Un endpoint qui échoue doit donc lever une exception (HTTPException
+    comprise), pas retourner une erreur.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        try:
+            with journal.transaction():
+                return endpoint(*args, **kwargs)
+        except BaseException:
+            change_recorder.take()
+            raise
+    return wrapper
+
 def send_to_fuseki(update_query: str):
-    """Envoie une requête SPARQL UPDATE à Fuseki"""
-    sparql = SPARQLWrapper(FUSEKI_UPDATE_URL)
-    sparql.setMethod(POST)
-    sparql.setQuery(update_query)
+    """
+    Ajoute une requête SPARQL UPDATE à l'outbox (envoyée à Fuseki en arrière-plan).
+    Une erreur d'enregistrement est propagée : l'écriture n'est pas acquittée.
+    """
     try:
-        sparql.query()
-        return True
+        outbox.enqueue(update_query, change_recorder.take())
     except Exception as e:
-        print(f"❌ Erreur lors de l'envoi à Fuseki: {e}")
-        return False
+        log.error("❌ Erreur lors de l'enregistrement dans l'outbox : %s", e)
+        raise
 
-def execute_sparql_query(query: str):
+# Moteur local : évalue les lectures sur le graphe `g` quand QUERY_BACKEND le demande
+local_engine = LocalQueryEngine(g, journal.lock, LOCAL_QUERY_CACHE_SIZE)
+local_engine.recorder = workload_recorder
+g.add_listener(local_engine.on_change)
+
+def sync_local_generation():
+    """En lecture locale, une écriture du graphe invalide immédiatement les résultats en cache"""
+    if QUERY_BACKEND != "fuseki" and local_engine.consume_change():
+        invalidate_results()
+
+async def run_select(query: str) -> dict:
+    """Exécute un SELECT/ASK sur le moteur configuré (JSON SPARQL)"""
+    if QUERY_BACKEND != "fuseki":
+        try:
+            return await asyncio.to_thread(local_engine.select, query)
+        except Exception as e:
+            if QUERY_BACKEND == "local":
+                raise
+            local_engine.fallbacks += 1
+            log.info("↪️ Requête renvoyée à Fuseki : %s", e)
+    return await fuseki.select(query)
+
+async def select_rows(query: str):
+    """Lignes d'un SELECT sur le moteur configuré (flux TSV depuis Fuseki)"""
+    if QUERY_BACKEND != "fuseki":
+        try:
+            results = await asyncio.to_thread(local_engine.select, query)
+        except Exception as e:
+            if QUERY_BACKEND == "local":
+                raise
+            local_engine.fallbacks += 1
+            log.info("↪️ Requête renvoyée à Fuseki : %s", e)
+        else:
+            for binding in results["results"]["bindings"]:
+                yield binding
+            return
+    async for binding in fuseki.select_rows(query):
+        yield binding
+
+async def execute_sparql_query(query: str):
     """Exécute une requête SPARQL SELECT et retourne les résultats"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(query)
+    sync_local_generation()
+    generation, cached = result_cache.get(query)
+    if cached is not None:
+        return cached
+    if not SPARQL_SINGLE_FLIGHT:
+        return await fetch_sparql_results(query, generation)
+    # Appels concurrents identiques (même génération) : une seule exécution, résultat partagé
+    return await single_flight.do((query, generation), lambda: fetch_sparql_results(query, generation))
+
+async def fetch_sparql_results(query: str, generation: int):
+    """Exécute la requête sur le moteur configuré et mémorise le résultat pour sa génération"""
     try:
-        print(f"🔍 Exécution de la requête SPARQL...")
-        results = sparql.query().convert()
-        print(f"✅ Requête exécutée avec succès")
+        log.debug("🔍 Exécution de la requête SPARQL :\n%s", query)
+        results = await run_select(query)
+        result_cache.put(query, generation, results)
         return results
     except Exception as e:
-        print(f"❌ Erreur SPARQL détaillée: {str(e)}")
-        try:
-            sparql.setReturnFormat(JSON)
-            sparql.setQuery("SELECT * WHERE { ?s ?p ?o } LIMIT 1")
-            test_result = sparql.query().convert()
-            print("✅ Connexion Fuseki fonctionnelle")
-        except Exception as conn_error:
-            print(f"❌ Problème de connexion Fuseki: {conn_error}")
-        
+        log.error("❌ Erreur SPARQL détaillée : %s", e)
         raise Exception(f"Erreur SPARQL: {str(e)}")
 
 def push_data_to_graph(turtle_data: bytes, graph_uri: str):
     """Pousse du TTL vers l'endpoint /data de Fuseki"""
-    url = f"{FUSEKI_DATA_ENDPOINT}?graph={graph_uri}"
-    headers = {"Content-Type": "text/turtle"}
-    r = requests.post(url, data=turtle_data, headers=headers)
-    r.raise_for_status()
+    r = fuseki.post_graph_sync(turtle_data, graph_uri)
+    invalidate_results()
     return r
 
-def clean_sparql_query(query: str) -> str:
-    """Nettoie la requête SPARQL générée par l'IA pour être compatible avec Fuseki."""
-    query = query.strip()
+# ======================
+# 🧠 RAISONNEMENT OWL-RL (GRAPHE DES INFÉRENCES)
+# ======================
 
-    # Supprimer tout le texte avant la première requête SPARQL
-    lines = query.split('\n')
-    sparql_lines = []
-    in_sparql = False
-    
-    for line in lines:
-        if any(keyword in line.upper() for keyword in ['SELECT', 'ASK', 'CONSTRUCT', 'DESCRIBE', 'INSERT', 'DELETE', 'CREATE', 'DROP']):
-            in_sparql = True
-        
-        if in_sparql:
-            sparql_lines.append(line)
-    
-    if sparql_lines:
-        query = '\n'.join(sparql_lines)
+def snapshot_graph():
+    """Copie cohérente des triples du graphe local"""
+    with journal.lock:
+        return list(g)
+
+def publish_inferred(added, removed, replace: bool):
+    """Met à jour le graphe nommé des inférences dans Fuseki"""
+    if replace:
+        fuseki.update_sync(f"CLEAR SILENT GRAPH <{INFERRED_GRAPH_URI}>")
+    removed = list(removed)
+    for i in range(0, len(removed), REASONING_BATCH):
+        data = to_ntriples(removed[i:i + REASONING_BATCH]).decode("utf-8")
+        fuseki.update_sync(f"DELETE DATA {{ GRAPH <{INFERRED_GRAPH_URI}> {{\n{data}}} }}")
+    added = list(added)
+    for i in range(0, len(added), REASONING_BATCH):
+        push_data_to_graph(to_ntriples(added[i:i + REASONING_BATCH]), INFERRED_GRAPH_URI)
+    if (removed or replace) and not added:
+        invalidate_results()
+
+reasoner = IncrementalReasoner(snapshot_graph, publish_inferred, interval=REASONING_INTERVAL)
+g.add_listener(reasoner.notify)
+if REASONING_ENABLED:
+    reasoner.start()
 
-    # Supprimer les balises Markdown
-    query = re.sub(r"```[a-zA-Z]*", "", query)
-    query = query.replace("```", "").strip()
-    query = query.replace("\\n", "\n")
-    query = query.replace("mobilitemobilite:", "mobilite:")
+# ======================
+# 🌳 HIÉRARCHIE DES CLASSES (REMPLACE rdfs:subClassOf*)
+# ======================
 
-    # Supprimer les notes et commentaires textuels
-    query = re.sub(r"Notez que.*$", "", query, flags=re.IGNORECASE | re.MULTILINE)
-    query = re.sub(r"Note:.*$", "", query, flags=re.IGNORECASE | re.MULTILINE)
-    query = re.sub(r"La requête SPARQL.*est :", "", query, flags=re.IGNORECASE)
-    query = re.sub(r"SPARQL:?", "", query, flags=re.IGNORECASE)
+def load_subclass_axioms():
+    """
+    Axiomes de sous-classe du graphe local, ou de Fuseki si l'ontologie n'est pas
+    chargée (appelé au démarrage puis dans le thread de recalcul de la hiérarchie)
+    """
+    # Lecture cohérente avec les écritures concurrentes ; Fuseki est interrogé hors du verrou
+    with journal.lock.shared():
+        pairs = list(g.subject_objects(RDFS.subClassOf))
+        equivalents = list(g.subject_objects(OWL.equivalentClass))
+    if not pairs and not equivalents:
+        try:
+            results = fuseki.select_sync("""
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            SELECT ?sub ?super WHERE { ?sub rdfs:subClassOf ?super . FILTER(isIRI(?sub) && isIRI(?super)) }
+            """)
+            pairs = [(URIRef(r["sub"]["value"]), URIRef(r["super"]["value"])) for r in results["results"]["bindings"]]
+        except Exception as e:
+            log.warning("⚠️ Hiérarchie des classes indisponible : %s", e)
+    return pairs + equivalents + [(b, a) for a, b in equivalents]
+
+class_hierarchy = ClassHierarchy(load_subclass_axioms)
+g.add_listener(class_hierarchy.on_change)
+class_hierarchy.refresh()
 
-    # Corriger le préfixe mal formé
-    query = re.sub(r"PREFIX\s*:\s*<[^>]+>", f"PREFIX mobilite: <{MOBILITE}>", query)
-    query = re.sub(r"PREFIX\s+mobilite:\s*<http://example\.org/?.*?>", f"PREFIX mobilite: <{MOBILITE}>", query)
+# ======================
+# 🗺️ SCHÉMA DE L'ONTOLOGIE POUR LE PROMPT
+# ======================
 
-    # Si aucun PREFIX mobilite, on l'ajoute
-    if "PREFIX mobilite:" not in query:
-        query = f"PREFIX mobilite: <{MOBILITE}>\n" + query
+def load_ontology_schema():
+    """Schéma et usage des propriétés du graphe local, ou schéma de Fuseki si l'ontologie n'est pas chargée"""
+    with journal.lock:
+        triples, usage = collect_schema(g)
+    if triples:
+        return triples, usage
+    try:
+        results = fuseki.select_sync(SCHEMA_QUERY)
+    except Exception as e:
+        log.warning("⚠️ Schéma de l'ontologie indisponible : %s", e)
+        return [], {}
+    for r in results["results"]["bindings"]:
+        o = r["o"]
+        value = URIRef(o["value"]) if o["type"] == "uri" else Literal(o["value"], lang=o.get("xml:lang"))
+        triples.append((URIRef(r["s"]["value"]), URIRef(r["p"]["value"]), value))
+    return triples, {}
+
+# Chargé à la première question (le graphe local peut encore se synchroniser)
+ontology_schema = OntologySchema(MOBILITE, load_ontology_schema)
+g.add_listener(ontology_schema.on_change)
+question_compiler = QuestionCompiler(ontology_schema, class_hierarchy)
+# Sortie du LLM analysée par le parseur SPARQL, préfixes réparés ; résultats par texte en cache
+sparql_normalizer = SparqlNormalizer(MOBILITE, cache_size=SPARQL_PARSE_CACHE_SIZE)
 
-    # Corriger les notations sans préfixe
-    query = re.sub(r"(?<!\w):(\w+)", r"mobilite:\1", query)
+# ======================
+# 🔎 INDEX PLEIN TEXTE (REMPLACE FILTER(CONTAINS(LCASE(...))))
+# ======================
 
-    # Ajouter PREFIX rdfs si nécessaire
-    if "rdfs:subClassOf" in query and "PREFIX rdfs:" not in query:
-        query = f"PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>\n" + query
+def local_graph_stamp():
+    """Empreinte du graphe local : l'index sauvegardé n'est valide que pour elle"""
+    if LOCAL_STORE == "sqlite":
+        # Compteur de transactions de la base : taille et date du fichier principal
+        # ne changent pas tant que les écritures restent dans le WAL
+        return [(LOCAL_STORE_PATH, store.generation())]
+    stamp = []
+    for path in [MOBILITE_RDF_PATH] + journal.files():
+        try:
+            st = os.stat(path)
+            stamp.append((path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            stamp.append((path, None, None))
+    return stamp
+
+def load_indexed_triples():
+    """Types et libellés indexés du graphe local, ou de Fuseki si le graphe local ne les contient pas"""
+    with journal.lock:
+        triples = list(g.triples((None, RDF.type, None)))
+        for predicate in search_index.predicates:
+            triples.extend(g.triples((None, predicate, None)))
+    if any(p != RDF.type for _, p, _ in triples):
+        return triples
+    try:
+        results = fuseki.select_sync(f"""
+        PREFIX mobilite: <{MOBILITE}>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        SELECT ?s ?p ?o WHERE {{
+            VALUES ?p {{ rdf:type mobilite:nom mobilite:prenom mobilite:commentaire mobilite:adresse }}
+            ?s ?p ?o .
+            FILTER(isIRI(?s))
+        }}
+        """)
+    except Exception as e:
+        log.warning("⚠️ Libellés Fuseki indisponibles pour l'index plein texte : %s", e)
+        return triples
+    triples = []
+    for r in results["results"]["bindings"]:
+        o = r["o"]
+        value = URIRef(o["value"]) if o["type"] == "uri" else Literal(o["value"])
+        triples.append((URIRef(r["s"]["value"]), URIRef(r["p"]["value"]), value))
+    return triples
 
-    # Ajouter PREFIX rdf si nécessaire
-    if "rdf:type" in query and "PREFIX rdf:" not in query:
-        query = f"PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n" + query
+def rebuild_search_index():
+    search_index.build(load_indexed_triples())
 
-    # Nettoyer les espaces multiples
-    query = re.sub(r'\n\s*\n', '\n', query)
-    query = re.sub(r'[ ]+', ' ', query)
+def save_search_index():
+    try:
+        search_index.save(local_graph_stamp())
+    except Exception as e:
+        log.error("⚠️ Erreur lors de la sauvegarde de l'index plein texte : %s", e)
+
+search_index = SearchIndex(MOBILITE, SEARCH_INDEX_PATH)
+with journal.lock:
+    if not search_index.load(local_graph_stamp()):
+        rebuild_search_index()
+    g.add_listener(search_index.on_change)
+
+# ======================
+# 📄 LISTES : PAGINATION PAR CURSEUR ET STREAMING NDJSON
+# ======================
 
-    return query.strip()
+NDJSON = "application/x-ndjson"
+LIST_PREFIXES = f"PREFIX mobilite: <{MOBILITE}>"
+
+def wants_ndjson(request: Request, format: str = None) -> bool:
+    return format == "ndjson" or NDJSON in request.headers.get("accept", "")
+
+async def stream_items(query: str, subject: str, item, dedupe: bool):
+    """Lignes NDJSON émises au fur et à mesure du décodage de la réponse Fuseki"""
+    previous = None
+    async for r in select_rows(query):
+        if dedupe:
+            # Lignes triées par sujet : seul le précédent est à comparer
+            uid = r[subject]["value"]
+            if uid == previous:
+                continue
+            previous = uid
+        yield json.dumps(item(r), ensure_ascii=False) + "\n"
+
+async def serve_list(request: Request, list_query: ListQuery, item, limit: int = None,
+                     cursor: str = None, format: str = None, dedupe: bool = False):
+    """
+    Liste complète (sans `limit`), ou page suivant `cursor` ; le curseur de la page
+    suivante est renvoyé dans l'en-tête X-Next-Cursor. NDJSON si Accept: application/x-ndjson
+    ou ?format=ndjson.
+    """
+    headers = {}
+    subjects = None
+    if limit is not None:
+        if not 1 <= limit <= LIST_PAGE_MAX:
+            raise HTTPException(status_code=400, detail=f"limit doit être compris entre 1 et {LIST_PAGE_MAX}")
+        try:
+            page_query = list_query.page_query(cursor, limit)
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        subjects, next_cursor = page_subjects(await execute_sparql_query(page_query), list_query.subject, limit)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+
+    ndjson = wants_ndjson(request, format)
+    if subjects == []:
+        if ndjson:
+            return StreamingResponse(iter(()), media_type=NDJSON, headers=headers)
+        return JSONResponse([], headers=headers)
+
+    query = list_query.rows_query(subjects, ordered=ndjson and dedupe)
+    if ndjson:
+        return StreamingResponse(stream_items(query, list_query.subject, item, dedupe), media_type=NDJSON, headers=headers)
+
+    results = await execute_sparql_query(query)
+    items = []
+    seen = set()
+    for r in results["results"]["bindings"]:
+        if dedupe:
+            uid = r[list_query.subject]["value"]
+            if uid in seen:
+                continue
+            seen.add(uid)
+        items.append(item(r))
+    if limit is None:
+        return items
+    return JSONResponse(items, headers=headers)
 
 # ======================
 # 🧠 INTELLIGENCE ARTIFICIELLE AVEC OLLAMA
 # ======================
 
-def generate_sparql_with_ollama(user_question: str) -> str:
+def sparql_prompt(user_question: str) -> str:
+    """Prompt complet : contexte limité aux termes de l'ontologie utiles à la question"""
+    if OLLAMA_SCHEMA_RETRIEVAL:
+        schema = ontology_schema.context(user_question)
+    else:
+        schema = ontology_schema.full_context()
+    return build_prompt(user_question, schema)
+
+translation_cache = TranslationCache(
+    TRANSLATION_CACHE_PATH,
+    prompt_fingerprint(OLLAMA_MODEL, PROMPT_PREFIX, PROMPT_QUESTION, str(OLLAMA_SCHEMA_RETRIEVAL)),
+    max_entries=TRANSLATION_CACHE_SIZE,
+    ttl=TRANSLATION_CACHE_TTL,
+    similarity_threshold=TRANSLATION_SIMILARITY_THRESHOLD,
+)
+
+def cached_translation(user_question: str):
+    """Traduction en cache ; les traductions d'un autre schéma de l'ontologie sont d'abord écartées"""
+    # Schéma encore indisponible (synchronisation en cours) : pas de comparaison
+    context = ontology_schema.full_context()
+    if context:
+        translation_cache.set_schema(prompt_fingerprint(context))
+    return translation_cache.get(user_question)
+
+OLLAMA_OPTIONS = {
+    "temperature": 0.1,
+    "top_p": 0.9,
+    "num_predict": 1000  # Plafond ; en streaming, la génération s'arrête avant
+}
+
+# Modèle gardé chargé et préfixe du prompt pré-évalué (voir llm_session.py)
+llm_session = LLMSession(
+    ollama,
+    lambda: sparql_prompt(OLLAMA_WARMUP_QUESTION),
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    keep_warm_interval=OLLAMA_KEEP_WARM_INTERVAL,
+    options=OLLAMA_OPTIONS,
+)
+
+async def stream_sparql_generation(prompt: str, on_partial=None):
+    """
+    Génère en streaming et s'arrête dès que le détecteur voit une requête complète :
+    le texte d'explication qui suivrait n'est jamais généré. on_partial(requête
+    partielle) est appelé à chaque fragment reçu (SSE).
+
+    Retourne (texte, durée d'évaluation du prompt en s, tokens du prompt évalués) :
+    sans le bilan final d'Ollama (flux interrompu), la durée est le délai avant
+    le premier fragment et le nombre de tokens est inconnu.
+    """
+    detector = SparqlQueryDetector()
+    start = time.perf_counter()
+    prompt_eval, prompt_tokens = None, None
+    async with aclosing(ollama.generate_stream(prompt, options=OLLAMA_OPTIONS, **llm_session.params)) as chunks:
+        async for chunk in chunks:
+            if prompt_eval is None:
+                prompt_eval = time.perf_counter() - start
+            if chunk.get("done"):
+                prompt_eval = chunk.get("prompt_eval_duration", 0) / 1e9
+                prompt_tokens = chunk.get("prompt_eval_count")
+            query = detector.feed(chunk.get("response", ""))
+            if on_partial is not None and detector.partial:
+                await on_partial(detector.partial)
+            if query is not None:
+                # La sortie du bloc ferme le flux : Ollama arrête la génération
+                log.debug("✂️ Requête complète après %d caractères générés", len(detector.text))
+                return query, prompt_eval, prompt_tokens
+    return detector.finish() or detector.text, prompt_eval or 0.0, prompt_tokens
+
+async def generate_sparql_with_ollama(user_question: str, on_partial=None):
     """
-    Génère une requête SPARQL en utilisant Ollama avec Codellama:7b
+    Génère une requête SPARQL en utilisant Ollama avec Codellama:7b ; retourne
+    (requête, bilan de l'évaluation du prompt et temps économisé)
     """
-    prompt = f"""
-Tu es un expert en RDF et SPARQL. Ta mission est de convertir des questions en français en requêtes SPARQL valides.
-
-CONTEXTE ONTOLOGIE MOBILITÉ :
-- Namespace : PREFIX mobilite: <http://www.semanticweb.org/smartcity/ontologies/mobilite#>
-- Classes principales : 
-  Personne, Conducteur, Piéton, Voyageur
-  ReseauTransport, TransportPublic, TransportPrive, MobiliteDouce
-  Bus, Metro, Voiture, Velo, Trottinette
-  Infrastructure, Route, StationsBus, StationsMetro, Parking, Batiment
-  Trajet, TrajetOptimal, TrajetCourt, TrajetRecommandé
-  Avis, AvisPositif, AvisNegatif
-  Ticket, TicketBus, TicketMetro, TicketParking
-  StationRecharge, RechargeElectrique, RechargeGaz
-  Trafic, Accident, Embouteillage, Radar
-  Statistiques, StatistiquesAccidents, StatistiquesPollution, StatistiquesUtilisation
-  SmartCity
-
-- Propriétés de données :
-  nom, prenom, age, email, telephone, dateNaissance, genre, nationalite, languePreferee
-  dateInscription, statutCompte, niveauAbonnement, scoreFidelite, preferencesAccessibilite
-  numeroPermis, dateObtentionPermis, categoriePermis, pointsPermis, experienceConduite
-  distance, duree, scoreOptimisation, niveauTrafic, heureDepart, heureArrivee
-  vitesseMoyenne, consommationEnergie, emissionsCO2, nombreArrets, conditionsMeteo
-  temperature, scoreSecurite, scoreConfort
-  marque, modele, anneeFabrication, immatriculation, couleur, kilometrage
-  niveauCarburant, consommationMoyenne
-  commentaire, note, dateAvis, langueAvis, categorieAvis, scoreUtilite, verifie, nombreSignalements
-  numeroTicket, prix, dateAchat, dateExpiration, typeTicket, classeTicket, zoneValidite
-  statutTicket, methodePaiement, nombreValidations
-  adresse, coordonneesGPS, dateConstruction, etatMaintenance, capaciteAccueil
-  niveauAccessibilite, horairesOuverture, superficie
-  capacite, prixKwh, disponible, typeConnecteur, puissanceMax, tempsRechargeMoyen
-  heureOuverture, heureFermeture, operateur
-  intensite, dureeIncident, causeIncident, gravite, nombreVehiculesImpliques
-  vitesseMoyenneTrafic, niveauService
-  vitesseMaximale, typeRadar, dateInstallation, etatFonctionnement, nombreInfractions
-  valeur, dateMesure, unite, periodeMesure, margeErreur, niveauConfiance, tendance, sourceDonnees
-
-- Propriétés objet :
-  effectueTrajet, utiliseReseauTransport, donneAvis, possedeTicket, habiteA, travailleA
-  prefereMoyenTransport, frequenteZone, commenceA, terminaA, utiliseMoyenTransport
-  proposePar, appartientA, circuleSur, conduitPar, utiliseStationRecharge
-  concerneTransport, concerneInfrastructure, valablePour, acheteA, donneAccesA
-  estConnecteA, disposeDe, accueilleStation, contient, estSurveillePar, alimentePar
-  maintenuPar, seProduitSur, affecteTrajet, genereAlerte, mesureSur, generePar
-
-QUESTION À TRADUIRE : "{user_question}"
-
-INSTRUCTIONS STRICTES :
-1. Génère UNIQUEMENT la requête SPARQL complète et valide
-2. Pas de texte explicatif, pas de commentaires, pas de notes
-3. Pas de "SPARQL:" ou autres préfixes textuels
-4. Pas de backticks Markdown
-5. Utilise obligatoirement le préfixe mobilite:
-6. Pour les hiérarchies, utilise rdfs:subClassOf*
-7. Sois précis dans les relations
-8. Pour les requêtes SELECT, retourne des variables significatives
-9. Pour les requêtes de comptage, utilise COUNT()
-10. Pour les filtres textuels, utilise FILTER(CONTAINS(LCASE(?var), LCASE("term")))
-
-EXEMPLES :
-Question: "Liste toutes les personnes"
-Réponse: PREFIX mobilite: <http://www.semanticweb.org/smartcity/ontologies/mobilite#> SELECT ?personne WHERE {{ ?personne a mobilite:Personne . }}
-
-Question: "Trouve les conducteurs avec un permis de catégorie B"
-Réponse: PREFIX mobilite: <http://www.semanticweb.org/smartcity/ontologies/mobilite#> SELECT ?conducteur ?nom ?prenom WHERE {{ ?conducteur a mobilite:Conducteur ; mobilite:nom ?nom ; mobilite:prenom ?prenom ; mobilite:categoriePermis "B" . }}
-
-Question: "Combien d'avis positifs y a-t-il ?"
-Réponse: PREFIX mobilite: <http://www.semanticweb.org/smartcity/ontologies/mobilite#> SELECT (COUNT(?avis) as ?nombre_avis) WHERE {{ ?avis a mobilite:AvisPositif . }}
-"""
+    # Hors de la boucle : le premier appel charge le schéma de l'ontologie
+    prompt = await asyncio.to_thread(sparql_prompt, user_question)
 
     try:
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "top_p": 0.9,
-                    "num_predict": 1000  # Augmenté pour Codellama
-                }
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        sparql_query = result["response"].strip()
-        
-        print(f"📝 Réponse brute d'Ollama:\n{sparql_query}")
-        
-        cleaned_query = clean_sparql_query(sparql_query)
-        print(f"🧹 Requête nettoyée:\n{cleaned_query}")
+        if OLLAMA_STREAM:
+            sparql_query, prompt_eval, prompt_tokens = await stream_sparql_generation(prompt, on_partial)
+            sparql_query = sparql_query.strip()
+        else:
+            result = await ollama.generate(prompt, options=OLLAMA_OPTIONS, **llm_session.params)
+            sparql_query = result["response"].strip()
+            prompt_eval = result.get("prompt_eval_duration", 0) / 1e9
+            prompt_tokens = result.get("prompt_eval_count")
         
-        return cleaned_query
+        log.debug("📝 Réponse brute d'Ollama :\n%s", sparql_query)
+        # Extraction, analyse et réparation des préfixes : translate_question
+        return sparql_query, llm_session.observe(prompt_eval, len(prompt), prompt_tokens)
         
-    except requests.exceptions.ConnectionError:
+    except OllamaUnavailable:
         raise Exception("❌ Ollama n'est pas démarré. Lancez 'ollama serve'")
     except Exception as e:
         raise Exception(f"❌ Erreur Ollama : {str(e)}")
@@ -379,50 +840,316 @@ class PossedeTicket(BaseModel):
 # 🎯 ENDPOINT PRINCIPAL IA - GÉNÉRATION ET EXÉCUTION SPARQL
 # ======================
 
+async def run_until_disconnect(request: Request, coro):
+    """Exécute coro et l'annule si le client HTTP se déconnecte entre-temps"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=ASK_DISCONNECT_POLL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                log.info("🔌 Client déconnecté, annulation de la requête /ask/")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client déconnecté")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def translate_question(user_question: str, on_partial=None):
+    """
+    Étapes 1-2 : requête SPARQL (règles, cache ou Ollama) validée ; retourne (requête,
+    source, détails ajoutés à la réponse : règle appliquée ou bilan de la génération,
+    clé de l'entrée du cache servie ou None)
+    """
+    details = {}
+    cache_key = None
+    compiled = await asyncio.to_thread(question_compiler.compile, user_question) if ASK_RULES else None
+    # Recherche par similarité (parcours des entrées) et écriture SQLite : hors de la boucle
+    cached = await asyncio.to_thread(cached_translation, user_question) if compiled is None else None
+    if compiled is not None:
+        sparql_query, details["rule"] = compiled
+        source = "rules"
+        log.info("⚡ Requête SPARQL compilée (règle %s) :\n%s", details["rule"], sparql_query)
+    elif cached is not None:
+        sparql_query, tier, cache_key = cached
+        source = f"cache_{tier}"
+        log.debug("🗃️ Traduction trouvée dans le cache (%s)", tier)
+    else:
+        log.debug("🔄 Génération de la requête SPARQL avec Ollama...")
+        try:
+            sparql_query, details["llm"] = await asyncio.wait_for(
+                generate_sparql_with_ollama(user_question, on_partial), ASK_GENERATION_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Génération SPARQL trop longue (> {ASK_GENERATION_TIMEOUT:g} s)")
+        source = "ollama"
+
+    # Requête analysée localement : une requête invalide n'atteint pas Fuseki
+    # (les règles produisent directement une requête complète et bien formée)
+    if source != "rules":
+        try:
+            sparql_query, _ = await asyncio.to_thread(sparql_normalizer.normalize, sparql_query)
+        except InvalidSparql as e:
+            if cache_key is not None:
+                await asyncio.to_thread(translation_cache.discard_key, cache_key)
+            raise HTTPException(status_code=400, detail=f"La requête SPARQL générée n'est pas valide ({e})")
+    if source == "ollama":
+        log.info("📝 Requête SPARQL générée :\n%s", sparql_query)
+    ASK_TRANSLATIONS.inc(source=source)
+    return sparql_query, source, details, cache_key
+
+_SELECT_QUERY = re.compile(r"^\s*(?:(?:PREFIX\s+[\w-]*:|BASE)\s*<[^>]*>\s*)*SELECT\b", re.I)
+_FINAL_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$", re.I)
+
+def cap_query(query: str, max_rows: int) -> str:
+    """Plafonne un SELECT à max_rows + 1 lignes (la ligne de plus signale la troncature)"""
+    m = _FINAL_LIMIT.search(query)
+    if m:
+        if int(m.group(1)) <= max_rows + 1:
+            return query
+        return query[:m.start(1)] + str(max_rows + 1) + query[m.end(1):]
+    if re.search(r"\bOFFSET\s+\d+\s*(LIMIT\s+\d+\s*)?$", query, re.I):
+        # OFFSET ... LIMIT : le plafond est appliqué à la lecture du flux
+        return query
+    return f"{query}\nLIMIT {max_rows + 1}"
+
+async def iter_query_rows(query: str):
+    """
+    Lignes (URI raccourcies) d'une requête /ask/, décodées au fil de la réponse Fuseki.
+    Le flux HTTP n'est lu qu'au rythme du consommateur ; le fermer interrompt Fuseki.
+    """
+    sync_local_generation()
+    generation, cached = result_cache.get(query)
+    if cached is not None:
+        for binding in cached.get("results", {}).get("bindings", []):
+            yield format_sparql_row(binding)
+        return
+    if not _SELECT_QUERY.match(query):
+        # ASK / CONSTRUCT / DESCRIBE : réponse courte, format JSON habituel
+        for row in format_sparql_results(await execute_sparql_query(query)):
+            yield row
+        return
+
+    # Copie brute conservée pour le cache tant qu'elle reste dans sa limite de taille
+    raw = []
+    async for binding in select_rows(query):
+        if raw is not None:
+            raw.append(binding)
+            if len(raw) > result_cache.max_rows:
+                raw = None
+        yield format_sparql_row(binding)
+    if raw is not None:
+        result_cache.put(query, generation, {"results": {"bindings": raw}})
+
+class AskRows:
+    """Curseur sur les lignes d'une réponse /ask/ : plafond, délai entre deux lignes"""
+
+    def __init__(self, query: str, max_rows: int):
+        self.max_rows = max_rows
+        self.count = 0
+        self.truncated = False
+        self._rows = iter_query_rows(query)
+
+    async def next(self):
+        """Ligne suivante, ou None à la fin (ou au plafond, qui interrompt la requête)"""
+        if self.count >= self.max_rows:
+            row = await self._next_upstream()
+            if row is not None:
+                self.truncated = True
+            await self.close()
+            return None
+        row = await self._next_upstream()
+        if row is None:
+            await self.close()
+            return None
+        self.count += 1
+        return row
+
+    async def _next_upstream(self):
+        try:
+            return await asyncio.wait_for(self._rows.__anext__(), ASK_QUERY_TIMEOUT)
+        except StopAsyncIteration:
+            return None
+        except asyncio.TimeoutError:
+            await self.close()
+            raise HTTPException(status_code=504, detail=f"Exécution SPARQL trop longue (> {ASK_QUERY_TIMEOUT:g} s)")
+
+    async def close(self):
+        await self._rows.aclose()
+
+async def answer_question(user_question: str, max_rows: int = None, stream: bool = False, on_partial=None):
+    """
+    Pipeline /ask/ : génération Ollama puis exécution Fuseki, chaque étape avec son délai.
+    En mode stream, retourne (métadonnées, première ligne, curseur) sans lire la suite.
+    """
+    max_rows = min(max_rows or ASK_MAX_ROWS, ASK_MAX_ROWS)
+    start = time.perf_counter()
+    sparql_query, source, details, cache_key = await translate_question(user_question, on_partial)
+    translation_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    # 3. Exécution sur Fuseki : la première ligne valide la requête
+    rows = AskRows(cap_query(sparql_query, max_rows), max_rows)
+    try:
+        first = await rows.next()
+    except HTTPException:
+        raise
+    except Exception as e:
+        if cache_key is not None:
+            # Entrée réellement servie (pour un niveau « similaire », celle d'une autre question)
+            await asyncio.to_thread(translation_cache.discard_key, cache_key)
+        raise Exception(f"Erreur SPARQL: {str(e)}")
+
+    # Seules les traductions validées par Fuseki sont mémorisées (les règles se recompilent)
+    if source not in ("cache_exact", "rules"):
+        await asyncio.to_thread(translation_cache.put, user_question, sparql_query)
+
+    # details : règle appliquée, ou évaluation du prompt et temps économisé par le préfixe en cache
+    meta = {"question": user_question, "sparql_query": sparql_query, "source": source,
+            "translation_ms": translation_ms, **details}
+    if stream:
+        return meta, first, rows
+
+    # 4. Résultats formatés ligne à ligne (une seule copie, plafonnée)
+    formatted_results = []
+    row = first
+    while row is not None:
+        formatted_results.append(row)
+        row = await rows.next()
+
+    return {
+        **meta,
+        "results": formatted_results,
+        "count": len(formatted_results),
+        "truncated": rows.truncated,
+    }
+
+async def stream_answer(meta: dict, first, rows: AskRows):
+    """Réponse NDJSON : métadonnées, une ligne par résultat, puis le bilan"""
+    try:
+        yield json.dumps({"type": "meta", **meta}, ensure_ascii=False) + "\n"
+        row = first
+        while row is not None:
+            yield json.dumps({"type": "row", "data": row}, ensure_ascii=False) + "\n"
+            row = await rows.next()
+        yield json.dumps({"type": "end", "count": rows.count, "truncated": rows.truncated}) + "\n"
+    except HTTPException as e:
+        yield json.dumps({"type": "error", "detail": e.detail}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": f"Erreur SPARQL: {str(e)}"}, ensure_ascii=False) + "\n"
+    finally:
+        # Client parti ou plafond atteint : la requête Fuseki est interrompue
+        await rows.close()
+
 @app.post("/ask/")
-async def ask_question(question_data: dict):
+async def ask_question(question_data: dict, request: Request):
     """
     Endpoint principal : Reçoit une question en français, génère la requête SPARQL avec Ollama,
-    l'exécute sur Fuseki et retourne les résultats.
+    l'exécute sur Fuseki et retourne les résultats (en NDJSON si Accept: application/x-ndjson
+    ou "format": "ndjson").
     """
     try:
         user_question = question_data.get("question", "").strip()
         if not user_question:
             raise HTTPException(status_code=400, detail="La question est requise")
 
-        print(f"🧠 Question reçue: {user_question}")
+        log.info("🧠 Question reçue : %s", user_question)
 
-        # 1. Génération de la requête SPARQL avec Ollama
-        print("🔄 Génération de la requête SPARQL avec Ollama...")
-        sparql_query = generate_sparql_with_ollama(user_question)
-        print(f"📝 Requête SPARQL générée:\n{sparql_query}")
-
-        # 2. Validation de la requête
-        if not validate_sparql_query(sparql_query):
-            raise HTTPException(status_code=400, detail="La requête SPARQL générée n'est pas valide")
-
-        # 3. Exécution de la requête sur Fuseki
-        print("🚀 Exécution de la requête sur Fuseki...")
-        results = execute_sparql_query(sparql_query)
-        
-        if results is None:
-            raise HTTPException(status_code=500, detail="Erreur lors de l'exécution de la requête SPARQL")
-
-        # 4. Formatage des résultats
-        formatted_results = format_sparql_results(results)
-        
-        return {
-            "question": user_question,
-            "sparql_query": sparql_query,
-            "results": formatted_results,
-            "count": len(formatted_results)
-        }
+        stream = wants_ndjson(request, question_data.get("format"))
+        with measure(workload_recorder, "ask", user_question) as probe:
+            answer = await run_until_disconnect(
+                request, answer_question(user_question, question_data.get("max_rows"), stream)
+            )
+            probe["src"] = answer[0]["source"] if stream else answer["source"]
+            if not stream:
+                probe["size"] = answer["count"]
+        if stream:
+            return StreamingResponse(stream_answer(*answer), media_type=NDJSON)
+        return answer
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/ask/stream/")
+async def ask_question_sse(question: str, max_rows: int = None):
+    """
+    /ask/ en Server-Sent Events (EventSource) : la requête SPARQL est envoyée au fil
+    de sa génération (événements « partial », champ delta), puis « result » (même
+    contenu que /ask/) ou « error ». Fermer la connexion arrête la génération.
+    """
+    user_question = question.strip()
+    if not user_question:
+        raise HTTPException(status_code=400, detail="La question est requise")
+    log.info("🧠 Question reçue (SSE) : %s", user_question)
+
+    events = asyncio.Queue()
+    sent = 0
+
+    async def on_partial(partial: str):
+        nonlocal sent
+        if len(partial) > sent:
+            await events.put(("partial", {"delta": partial[sent:]}))
+            sent = len(partial)
+
+    async def produce():
+        try:
+            with measure(workload_recorder, "ask", user_question) as probe:
+                answer = await answer_question(user_question, max_rows, on_partial=on_partial)
+                probe["src"] = answer["source"]
+                probe["size"] = answer["count"]
+            await events.put(("result", answer))
+        except HTTPException as e:
+            await events.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            await events.put(("error", {"status_code": 500, "detail": f"Erreur: {str(e)}"}))
+        await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(produce())
+        try:
+            while (event := await events.get()) is not None:
+                yield sse_event(*event)
+        finally:
+            # Client déconnecté : la génération Ollama et la requête Fuseki sont annulées
+            task.cancel()
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/ask/cache/")
+def get_translation_cache_stats():
+    """Statistiques du cache des traductions question → SPARQL et des requêtes analysées"""
+    return {**translation_cache.stats(), "sparql_validation": sparql_normalizer.stats()}
+
+@app.delete("/ask/cache/")
+def clear_translation_cache():
+    """Vide le cache des traductions"""
+    translation_cache.clear()
+    return {"message": "🗑️ Cache des traductions vidé."}
+
+@app.get("/ask/schema/")
+def get_prompt_schema(question: str = ""):
+    """Contexte ontologique envoyé à Ollama pour une question (schéma complet sans question)"""
+    context = ontology_schema.context(question) if question.strip() else ontology_schema.full_context()
+    return {
+        **ontology_schema.stats(),
+        "retrieval": OLLAMA_SCHEMA_RETRIEVAL,
+        "rules": question_compiler.stats(),
+        "context_chars": len(context),
+        "context": context,
+    }
+
+@app.get("/llm/")
+def get_llm_session_stats():
+    """Modèle chargé, coût du prompt à froid et temps d'évaluation économisé"""
+    return llm_session.stats()
+
 def format_sparql_results(results):
     """
     Formate les résultats SPARQL en un format plus lisible
@@ -430,44 +1157,25 @@ def format_sparql_results(results):
     if "results" not in results or "bindings" not in results["results"]:
         return []
 
-    formatted = []
-    for binding in results["results"]["bindings"]:
-        item = {}
-        for key, value in binding.items():
-            # Extraire le nom court après le # pour les URIs
-            if value["type"] == "uri" and "#" in value["value"]:
-                item[key] = value["value"].split("#")[-1]
-            else:
-                item[key] = value["value"]
-        formatted.append(item)
-    
-    return formatted
+    return [format_sparql_row(binding) for binding in results["results"]["bindings"]]
+
+def format_sparql_row(binding: dict) -> dict:
+    """Une ligne de résultat SPARQL, URI raccourcies"""
+    item = {}
+    for key, value in binding.items():
+        # Extraire le nom court après le # pour les URIs
+        if value["type"] == "uri" and "#" in value["value"]:
+            item[key] = value["value"].split("#")[-1]
+        else:
+            item[key] = value["value"]
+    return item
 
-def validate_sparql_query(query: str) -> bool:
-    """Valide la syntaxe basique d'une requête SPARQL"""
-    if not query:
-        return False
-    
-    # Vérifier les mots-clés SPARQL essentiels
-    essential_keywords = ['SELECT', 'ASK', 'CONSTRUCT', 'DESCRIBE', 'INSERT', 'DELETE', 'CREATE', 'DROP']
-    if not any(keyword in query.upper() for keyword in essential_keywords):
-        return False
-    
-    # Vérifier la présence des accolades pour les patterns
-    if any(keyword in query.upper() for keyword in ['SELECT', 'ASK', 'CONSTRUCT', 'DESCRIBE']):
-        if '{' not in query or '}' not in query:
-            return False
-    
-    # Vérifier que le préfixe mobilite est présent
-    if "PREFIX mobilite:" not in query and "mobilite:" in query:
-        return False
-    
-    return True
 # ======================
 # 👤 PERSONNES - ENDPOINTS
 # ======================
 
 @app.post("/add_personne/")
+@write_transaction
 def add_personne(personne: Personne):
     classe_type = personne.type_personne.capitalize()
     if classe_type not in ["Conducteur", "Pieton", "Voyageur"]:
@@ -479,7 +1187,7 @@ def add_personne(personne: Personne):
     g.add((personne_uri, MOBILITE.prenom, Literal(personne.prenom, datatype=XSD.string)))
     g.add((personne_uri, MOBILITE.age, Literal(personne.age, datatype=XSD.integer)))
     g.add((personne_uri, MOBILITE.email, Literal(personne.email, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -496,6 +1204,7 @@ def add_personne(personne: Personne):
     return {"message": f"✅ {classe_type} '{personne.prenom} {personne.nom}' ajouté."}
 
 @app.post("/add_conducteur/")
+@write_transaction
 def add_conducteur(conducteur: Conducteur):
     conducteur_uri = MOBILITE[conducteur.id]
     g.add((conducteur_uri, RDF.type, MOBILITE.Conducteur))
@@ -505,7 +1214,7 @@ def add_conducteur(conducteur: Conducteur):
     g.add((conducteur_uri, MOBILITE.email, Literal(conducteur.email, datatype=XSD.string)))
     g.add((conducteur_uri, MOBILITE.numeroPermis, Literal(conducteur.numeroPermis, datatype=XSD.string)))
     g.add((conducteur_uri, MOBILITE.categoriePermis, Literal(conducteur.categoriePermis, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -524,45 +1233,40 @@ def add_conducteur(conducteur: Conducteur):
     return {"message": f"✅ Conducteur '{conducteur.prenom} {conducteur.nom}' ajouté."}
 
 @app.get("/personnes/")
-def get_all_personnes():
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT DISTINCT ?id ?type ?nom ?prenom ?age ?email WHERE {{
+async def get_all_personnes(request: Request, limit: int = None, cursor: str = None, format: str = None):
+    query = ListQuery(
+        LIST_PREFIXES,
+        "DISTINCT ?id ?type ?nom ?prenom ?age ?email",
+        "id",
+        f"""
+        {class_hierarchy.values("?type", MOBILITE.Personne)}
         ?id a ?type .
-        OPTIONAL {{ ?id mobilite:nom ?nom . }}
-        OPTIONAL {{ ?id mobilite:prenom ?prenom . }}
-        OPTIONAL {{ ?id mobilite:age ?age . }}
-        OPTIONAL {{ ?id mobilite:email ?email . }}
-        ?type rdfs:subClassOf* mobilite:Personne .
-    }}
-    """)
-    results = sparql.query().convert()
-
-    personnes = []
-    seen = set()
-
-    for r in results["results"]["bindings"]:
-        uid = r["id"]["value"]
-        if uid not in seen:
-            seen.add(uid)
-            personnes.append({
-                "id": uid.split("#")[-1],
-                "type": r["type"]["value"].split("#")[-1],
-                "nom": r["nom"]["value"] if "nom" in r else None,
-                "prenom": r["prenom"]["value"] if "prenom" in r else None,
-                "age": int(r["age"]["value"]) if "age" in r else None,
-                "email": r["email"]["value"] if "email" in r else None
-            })
-    return personnes
+        """,
+        """
+        OPTIONAL { ?id mobilite:nom ?nom . }
+        OPTIONAL { ?id mobilite:prenom ?prenom . }
+        OPTIONAL { ?id mobilite:age ?age . }
+        OPTIONAL { ?id mobilite:email ?email . }
+        """,
+    )
+    return await serve_list(request, query, personne_item, limit, cursor, format, dedupe=True)
+
+def personne_item(r):
+    return {
+        "id": r["id"]["value"].split("#")[-1],
+        "type": r["type"]["value"].split("#")[-1],
+        "nom": r["nom"]["value"] if "nom" in r else None,
+        "prenom": r["prenom"]["value"] if "prenom" in r else None,
+        "age": int(r["age"]["value"]) if "age" in r else None,
+        "email": r["email"]["value"] if "email" in r else None
+    }
 
 # ======================
 # 🛣️ TRAJETS - ENDPOINTS
 # ======================
 
 @app.post("/add_trajet/")
+@write_transaction
 def add_trajet(trajet: Trajet):
     trajet_uri = MOBILITE[trajet.id]
     g.add((trajet_uri, RDF.type, MOBILITE.Trajet))
@@ -570,7 +1274,7 @@ def add_trajet(trajet: Trajet):
     g.add((trajet_uri, MOBILITE.duree, Literal(trajet.duree, datatype=XSD.float)))
     g.add((trajet_uri, MOBILITE.heureDepart, Literal(trajet.heureDepart, datatype=XSD.string)))
     g.add((trajet_uri, MOBILITE.heureArrivee, Literal(trajet.heureArrivee, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -587,11 +1291,12 @@ def add_trajet(trajet: Trajet):
     return {"message": f"🛣️ Trajet '{trajet.id}' ajouté avec succès."}
 
 @app.post("/personne/effectue_trajet/")
+@write_transaction
 def add_effectue_trajet(link: EffectueTrajet):
     personne_uri = MOBILITE[link.personne_id]
     trajet_uri = MOBILITE[link.trajet_id]
     g.add((personne_uri, MOBILITE.effectueTrajet, trajet_uri))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -607,6 +1312,7 @@ def add_effectue_trajet(link: EffectueTrajet):
 # ======================
 
 @app.post("/add_vehicule/")
+@write_transaction
 def add_vehicule(vehicule: Vehicule):
     type_clean = vehicule.type_vehicule.capitalize()
     valid_types = ["Voiture", "Bus", "Metro", "Velo", "Trottinette"]
@@ -619,7 +1325,7 @@ def add_vehicule(vehicule: Vehicule):
     g.add((vehicule_uri, MOBILITE.marque, Literal(vehicule.marque, datatype=XSD.string)))
     g.add((vehicule_uri, MOBILITE.modele, Literal(vehicule.modele, datatype=XSD.string)))
     g.add((vehicule_uri, MOBILITE.immatriculation, Literal(vehicule.immatriculation, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -636,39 +1342,39 @@ def add_vehicule(vehicule: Vehicule):
     return {"message": f"🚗 Véhicule de type '{type_clean}' ajouté : '{vehicule.marque} {vehicule.modele}'."}
 
 @app.get("/vehicules/")
-def get_all_vehicules():
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?id ?type ?marque ?modele ?immatriculation WHERE {{
+async def get_all_vehicules(request: Request, limit: int = None, cursor: str = None, format: str = None):
+    query = ListQuery(
+        LIST_PREFIXES,
+        "?id ?type ?marque ?modele ?immatriculation",
+        "id",
+        f"""
+        {class_hierarchy.values("?type", MOBILITE.ReseauTransport)}
         ?id a ?type .
-        ?type rdfs:subClassOf* mobilite:ReseauTransport .
-        OPTIONAL {{ ?id mobilite:marque ?marque . }}
-        OPTIONAL {{ ?id mobilite:modele ?modele . }}
-        OPTIONAL {{ ?id mobilite:immatriculation ?immatriculation . }}
-    }}
-    """)
-    results = sparql.query().convert()
-
-    data = []
-    for r in results["results"]["bindings"]:
-        data.append({
-            "id": r["id"]["value"].split("#")[-1],
-            "type": r["type"]["value"].split("#")[-1],
-            "marque": r["marque"]["value"] if "marque" in r else None,
-            "modele": r["modele"]["value"] if "modele" in r else None,
-            "immatriculation": r["immatriculation"]["value"] if "immatriculation" in r else None
-        })
-    return data
+        """,
+        """
+        OPTIONAL { ?id mobilite:marque ?marque . }
+        OPTIONAL { ?id mobilite:modele ?modele . }
+        OPTIONAL { ?id mobilite:immatriculation ?immatriculation . }
+        """,
+    )
+    return await serve_list(request, query, vehicule_item, limit, cursor, format)
+
+def vehicule_item(r):
+    return {
+        "id": r["id"]["value"].split("#")[-1],
+        "type": r["type"]["value"].split("#")[-1],
+        "marque": r["marque"]["value"] if "marque" in r else None,
+        "modele": r["modele"]["value"] if "modele" in r else None,
+        "immatriculation": r["immatriculation"]["value"] if "immatriculation" in r else None
+    }
 
 @app.post("/personne/utilise_transport/")
+@write_transaction
 def add_utilise_transport(link: UtiliseTransport):
     personne_uri = MOBILITE[link.personne_id]
     transport_uri = MOBILITE[link.transport_id]
     g.add((personne_uri, MOBILITE.utiliseReseauTransport, transport_uri))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -684,6 +1390,7 @@ def add_utilise_transport(link: UtiliseTransport):
 # ======================
 
 @app.post("/add_avis/")
+@write_transaction
 def add_avis(avis: Avis):
     type_clean = "AvisPositif" if avis.note >= 3 else "AvisNegatif"
     if avis.type_avis:
@@ -693,7 +1400,7 @@ def add_avis(avis: Avis):
     g.add((avis_uri, RDF.type, MOBILITE[type_clean]))
     g.add((avis_uri, MOBILITE.commentaire, Literal(avis.commentaire, datatype=XSD.string)))
     g.add((avis_uri, MOBILITE.note, Literal(avis.note, datatype=XSD.integer)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -708,11 +1415,12 @@ def add_avis(avis: Avis):
     return {"message": f"✅ Avis '{avis.id}' ajouté (type: {type_clean})."}
 
 @app.post("/personne/donne_avis/")
+@write_transaction
 def add_donne_avis(link: DonneAvis):
     personne_uri = MOBILITE[link.personne_id]
     avis_uri = MOBILITE[link.avis_id]
     g.add((personne_uri, MOBILITE.donneAvis, avis_uri))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -728,6 +1436,7 @@ def add_donne_avis(link: DonneAvis):
 # ======================
 
 @app.post("/add_ticket/")
+@write_transaction
 def add_ticket(ticket: Ticket):
     type_clean = ticket.type_ticket.capitalize()
     valid_types = ["TicketBus", "TicketMetro", "TicketParking"]
@@ -739,7 +1448,7 @@ def add_ticket(ticket: Ticket):
     g.add((ticket_uri, RDF.type, MOBILITE[type_clean]))
     g.add((ticket_uri, MOBILITE.prix, Literal(ticket.prix, datatype=XSD.float)))
     g.add((ticket_uri, MOBILITE.statutTicket, Literal(ticket.statutTicket, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -754,11 +1463,12 @@ def add_ticket(ticket: Ticket):
     return {"message": f"🎫 Ticket '{ticket.id}' ajouté (type: {type_clean})."}
 
 @app.post("/personne/possede_ticket/")
+@write_transaction
 def add_possede_ticket(link: PossedeTicket):
     personne_uri = MOBILITE[link.personne_id]
     ticket_uri = MOBILITE[link.ticket_id]
     g.add((personne_uri, MOBILITE.possedeTicket, ticket_uri))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -774,6 +1484,7 @@ def add_possede_ticket(link: PossedeTicket):
 # ======================
 
 @app.post("/add_infrastructure/")
+@write_transaction
 def add_infrastructure(infra: Infrastructure):
     type_clean = infra.type_infrastructure.capitalize()
     valid_types = ["Route", "Parking", "StationsBus", "StationsMetro", "Batiment"]
@@ -786,7 +1497,7 @@ def add_infrastructure(infra: Infrastructure):
     g.add((infra_uri, MOBILITE.adresse, Literal(infra.adresse, datatype=XSD.string)))
     if infra.nom:
         g.add((infra_uri, MOBILITE.nom, Literal(infra.nom, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     nom_part = f' ; mobilite:nom "{infra.nom}"^^xsd:string' if infra.nom else ""
     
@@ -806,6 +1517,7 @@ def add_infrastructure(infra: Infrastructure):
 # ======================
 
 @app.post("/add_station_recharge/")
+@write_transaction
 def add_station_recharge(station: StationRecharge):
     type_clean = "RechargeElectrique"  # Par défaut électrique
 
@@ -814,7 +1526,7 @@ def add_station_recharge(station: StationRecharge):
     g.add((station_uri, MOBILITE.typeConnecteur, Literal(station.type_connecteur, datatype=XSD.string)))
     g.add((station_uri, MOBILITE.puissanceMax, Literal(station.puissanceMax, datatype=XSD.float)))
     g.add((station_uri, MOBILITE.disponible, Literal(station.disponible, datatype=XSD.boolean)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -834,6 +1546,7 @@ def add_station_recharge(station: StationRecharge):
 # ======================
 
 @app.post("/add_statistique/")
+@write_transaction
 def add_statistique(stat: Statistique):
     type_clean = stat.type_statistique.capitalize()
     valid_types = ["StatistiquesAccidents", "StatistiquesPollution", "StatistiquesUtilisation"]
@@ -845,7 +1558,7 @@ def add_statistique(stat: Statistique):
     g.add((stat_uri, RDF.type, MOBILITE[type_clean]))
     g.add((stat_uri, MOBILITE.valeur, Literal(stat.valeur, datatype=XSD.float)))
     g.add((stat_uri, MOBILITE.unite, Literal(stat.unite, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -864,11 +1577,12 @@ def add_statistique(stat: Statistique):
 # ======================
 
 @app.post("/add_smartcity/")
+@write_transaction
 def add_smartcity(city: SmartCity):
     city_uri = MOBILITE[city.id]
     g.add((city_uri, RDF.type, MOBILITE.SmartCity))
     g.add((city_uri, MOBILITE.nom, Literal(city.nom, datatype=XSD.string)))
-    g.serialize("mobilite_updated.rdf", format="xml")
+    g.commit()
 
     insert_query = f"""
     PREFIX mobilite: <{MOBILITE}>
@@ -886,10 +1600,11 @@ def add_smartcity(city: SmartCity):
 # ======================
 
 @app.delete("/delete/{instance_id}")
+@write_transaction
 def delete_instance(instance_id: str):
     try:
         g.remove((MOBILITE[instance_id], None, None))
-        g.serialize("mobilite_updated.rdf", format="xml")
+        g.commit()
 
         delete_query = f"""
         PREFIX mobilite: <{MOBILITE}>
@@ -901,17 +1616,90 @@ def delete_instance(instance_id: str):
 
         return {"message": f"🗑️ Instance '{instance_id}' supprimée avec succès."}
     except Exception as e:
-        return {"error": str(e)}
+        # Levée (et non retournée) : write_transaction annule la suppression
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ======================
+# 📦 IMPORT RDF EN MASSE
+# ======================
+
+# Progression des derniers imports (consultable pendant le chargement)
+uploads = OrderedDict()
+MAX_UPLOADS_TRACKED = 20
+
+@app.post("/upload/")
+async def upload_rdf(file: UploadFile = File(...), format: str = None, graph: str = "default"):
+    """Charge un fichier RDF volumineux (Turtle, N-Triples, N-Quads, RDF/XML) en streaming"""
+    try:
+        fmt = detect_format(file.filename, file.content_type, format)
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload_id = uuid.uuid4().hex[:12]
+    progress = {"id": upload_id, "filename": file.filename, "format": fmt, "size": file.size, "graph": graph}
+    uploads[upload_id] = progress
+    while len(uploads) > MAX_UPLOADS_TRACKED:
+        uploads.popitem(last=False)
+
+    # Au moins un lot du graphe par défaut acquitté par Fuseki et appliqué localement
+    imported_default = threading.Event()
+
+    async def post_chunk(graph_name, payload):
+        target = graph if graph_name == "default" else graph_name
+        await fuseki.post_graph(payload, target, content_type="application/n-triples")
+
+    def apply_local(graph_name, triples):
+        # Le graphe local est la copie du graphe par défaut : les quads d'un graphe
+        # nommé (N-Quads, ?graph=) ne vont que dans Fuseki
+        target = graph if graph_name == "default" else graph_name
+        if target != "default":
+            return
+        # Déjà envoyés à Fuseki par lots : pas de publication par l'outbox
+        with journal.transaction(), change_recorder.suspended():
+            g.addN((s, p, o, g) for s, p, o in triples)
+            g.commit()
+        imported_default.set()
+
+    log.info("📦 Import de %s (%s) ...", file.filename, fmt)
+    try:
+        await bulk_load(
+            file.file,
+            fmt,
+            post_chunk,
+            apply_local,
+            progress,
+            chunk_size=UPLOAD_CHUNK_TRIPLES,
+            concurrency=UPLOAD_CONCURRENCY,
+        )
+    except (UploadFormatError, ParserError, SAXParseException, SyntaxError, ValueError) as e:
+        progress["error"] = str(e)
+        raise HTTPException(status_code=400, detail=f"Fichier RDF invalide : {e}")
+    except Exception as e:
+        progress["error"] = str(e)
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'import : {e}")
+    finally:
+        if imported_default.is_set():
+            # Les lots ne sont pas recopiés dans le journal des modifications (volume
+            # doublé, envoi non atomique) : le filigrane est seulement incrémenté, les
+            # autres processus feront une synchronisation complète
+            await asyncio.to_thread(outbox.enqueue, reset_update(CHANGELOG_GRAPH_URI, SYNC_ORIGIN))
+        invalidate_results()
+
+    log.info("✅ Import terminé : %d triples en %s s", progress["triples_sent"], progress["elapsed_s"])
+    return progress
+
+@app.get("/uploads/")
+def get_uploads():
+    """Progression et débit des derniers imports"""
+    return list(reversed(uploads.values()))
 
 # ======================
 # 📊 STATISTIQUES GÉNÉRALES
 # ======================
 
 @app.get("/stats/")
-def get_stats():
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+async def get_stats():
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     SELECT ?class (COUNT(?s) AS ?count)
     WHERE {{
@@ -920,7 +1708,6 @@ def get_stats():
     }}
     GROUP BY ?class
     """)
-    results = sparql.query().convert()
 
     stats = [
         {"class": r["class"]["value"].split("#")[-1], "count": int(r["count"]["value"])}
@@ -933,49 +1720,148 @@ def get_stats():
 # ======================
 
 @app.get("/search/")
-def search_instances(query: str = ""):
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    
-    search_query = f"""
-    PREFIX mobilite: <{MOBILITE}>
-    SELECT DISTINCT ?instance ?type ?label WHERE {{
-        ?instance a ?type .
-        FILTER(STRSTARTS(STR(?type), STR(mobilite:)))
-        OPTIONAL {{
-            ?instance mobilite:nom ?nom .
-            ?instance mobilite:prenom ?prenom .
-            BIND(CONCAT(STR(?prenom), " ", STR(?nom)) AS ?label)
-        }}
-        OPTIONAL {{
-            ?instance mobilite:commentaire ?label .
-        }}
-        OPTIONAL {{
-            ?instance mobilite:adresse ?label .
-        }}
-        FILTER(STRSTARTS(STR(?type), STR(mobilite:)))
-        FILTER(CONTAINS(LCASE(COALESCE(?label, STR(?instance))), LCASE("{query}")))
-    }} LIMIT 50
-    """
-    
-    sparql.setQuery(search_query)
-    results = sparql.query().convert()
-
+async def search_instances(query: str = ""):
+    """Recherche dans les noms, prénoms, commentaires, adresses et identifiants (index plein texte)"""
     instances = []
-    for r in results["results"]["bindings"]:
-        instance_uri = r["instance"]["value"]
-        instances.append({
-            "id": instance_uri.split("#")[-1],
-            "type": r["type"]["value"].split("#")[-1],
-            "label": r["label"]["value"] if "label" in r else instance_uri.split("#")[-1]
-        })
-    
+    for match in search_index.search(query, limit=50):
+        instance_id = match["subject"].split("#")[-1]
+        for type_uri in match["types"]:
+            instances.append({
+                "id": instance_id,
+                "type": type_uri.split("#")[-1],
+                "label": match["label"],
+                "match": match["match"]
+            })
+
     return {"results": instances, "count": len(instances)}
 
+@app.get("/search/index/")
+def get_search_index_stats():
+    """Taille de l'index plein texte et nombre de recherches servies"""
+    return search_index.stats()
+
+@app.post("/search/reindex/")
+def reindex_search():
+    """Reconstruit l'index plein texte (après une modification faite directement dans Fuseki)"""
+    with journal.lock:
+        rebuild_search_index()
+    save_search_index()
+    return search_index.stats()
+
+# ======================
+# 📈 MÉTRIQUES PROMETHEUS
+# ======================
+
+def cache_counts():
+    """(hits, misses) de chaque cache, lus au moment du scrape"""
+    results = result_cache.stats()
+    translations = translation_cache.stats()
+    prepared = local_engine.stats()
+    parsed = sparql_normalizer.stats()
+    return {
+        "results": (results["hits"], results["misses"]),
+        "translations": (translations["exact_hits"] + translations["similar_hits"], translations["misses"]),
+        "local_prepared_queries": (prepared["parse_hits"], prepared["parse_misses"]),
+        "ask_parsed_queries": (parsed["hits"], parsed["misses"]),
+    }
+
+def cache_hit_ratios():
+    return {
+        (cache,): round(hits / (hits + misses), 4) if hits + misses else 0.0
+        for cache, (hits, misses) in cache_counts().items()
+    }
+
+REGISTRY.callback_counter(
+    "mobilite_cache_hits_total", "Hits des caches", lambda: {(c,): h for c, (h, m) in cache_counts().items()}, ("cache",)
+)
+REGISTRY.callback_counter(
+    "mobilite_cache_misses_total", "Misses des caches", lambda: {(c,): m for c, (h, m) in cache_counts().items()}, ("cache",)
+)
+REGISTRY.gauge("mobilite_cache_hit_ratio", "Taux de hits des caches depuis le démarrage", ("cache",), cache_hit_ratios)
+REGISTRY.gauge("mobilite_local_graph_triples", "Triples du graphe local", function=lambda: len(g))
+REGISTRY.gauge("mobilite_outbox_pending", "Mises à jour en attente d'envoi à Fuseki", function=lambda: outbox.stats()["pending"])
+REGISTRY.gauge("mobilite_sparql_inflight", "Requêtes SPARQL distinctes en vol", function=single_flight.inflight)
+REGISTRY.gauge("mobilite_sync_version", "Filigrane de synchronisation Fuseki → local", function=lambda: delta_sync.version)
+
+@app.get("/metrics")
+def get_metrics():
+    """Métriques au format texte Prometheus"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # ======================
 # 🏠 ENDPOINT RACINE
 # ======================
 
+@app.get("/outbox/")
+def get_outbox_stats():
+    """État de l'outbox des mises à jour Fuseki"""
+    return outbox.stats()
+
+@app.get("/cache/")
+def get_result_cache_stats():
+    """Statistiques du cache des résultats SPARQL et des requêtes identiques partagées"""
+    return {**result_cache.stats(), "single_flight": single_flight.stats()}
+
+@app.get("/sync/")
+def get_sync_stats():
+    """Filigrane de synchronisation Fuseki → local et bilan de la dernière passe"""
+    return delta_sync.stats()
+
+@app.post("/sync/")
+def run_sync(full: bool = False):
+    """Lance une synchronisation immédiate (?full=true : dump complet)"""
+    return delta_sync.sync(full=full)
+
+@app.get("/query/backend/")
+def get_query_backend():
+    """Moteur des lectures et statistiques du moteur local (requêtes préparées, replis)"""
+    return {"backend": QUERY_BACKEND, "local": local_engine.stats()}
+
+# Requêtes de contrôle par défaut : volume total et effectif de chaque classe
+CONSISTENCY_QUERIES = [
+    "SELECT (COUNT(*) AS ?triples) WHERE { ?s ?p ?o }",
+    f"""PREFIX mobilite: <{MOBILITE}>
+    SELECT ?type (COUNT(?s) AS ?instances) WHERE {{
+        ?s a ?type .
+        FILTER(STRSTARTS(STR(?type), STR(mobilite:)))
+    }} GROUP BY ?type""",
+]
+
+@app.post("/query/consistency/")
+async def check_query_consistency(body: dict = None):
+    """
+    Exécute les mêmes requêtes sur le graphe local et sur Fuseki (sans cache) et
+    compare les résultats ; body optionnel : {"queries": ["SELECT ...", ...]}
+    """
+    queries = (body or {}).get("queries") or CONSISTENCY_QUERIES
+    checks = []
+    for query in queries:
+        check = {"query": query}
+        try:
+            local, remote = await asyncio.gather(
+                asyncio.to_thread(local_engine.select, query), fuseki.select(query)
+            )
+            check.update(compare_results(local, remote))
+        except Exception as e:
+            check.update({"consistent": False, "error": str(e)})
+        checks.append(check)
+    return {
+        "backend": QUERY_BACKEND,
+        "consistent": all(c["consistent"] for c in checks),
+        "checks": checks,
+    }
+
+@app.get("/reasoning/")
+def get_reasoning_stats():
+    """État du raisonneur OWL-RL : durée et nombre de triples inférés du dernier calcul"""
+    return reasoner.stats()
+
+@app.post("/reasoning/recompute/")
+def recompute_inferences():
+    """Force une clôture OWL-RL complète"""
+    reasoner.recompute()
+    return {"message": "🧠 Recalcul complet des inférences demandé"}
+
 @app.get("/")
 def home():
     return {"message": "🚀 Bienvenue dans l'API SmartCity Mobility RDF + Fuseki + Ollama"}
@@ -985,132 +1871,117 @@ def home():
 
 # Endpoint pour les infrastructures (compatible frontend)
 @app.get("/infrastructures/")
-def get_infrastructures():
+async def get_infrastructures(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Récupère toutes les infrastructures"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT DISTINCT ?id ?type ?nom ?adresse WHERE {{
+    query = ListQuery(
+        LIST_PREFIXES,
+        "DISTINCT ?id ?type ?nom ?adresse",
+        "id",
+        f"""
+        {class_hierarchy.values("?type", MOBILITE.Infrastructure)}
         ?id a ?type ;
             mobilite:nom ?nom .
-        OPTIONAL {{ ?id mobilite:adresse ?adresse . }}
-        ?type rdfs:subClassOf* mobilite:Infrastructure .
         FILTER(?type != mobilite:Infrastructure)
-    }}
-    """)
-    results = sparql.query().convert()
-
-    infrastructures = []
-    seen = set()
-
-    for r in results["results"]["bindings"]:
-        iid = r["id"]["value"]
-        if iid not in seen:
-            seen.add(iid)
-            infrastructures.append({
-                "id": iid.split("#")[-1],
-                "type": r["type"]["value"].split("#")[-1],
-                "nom": r["nom"]["value"],
-                "adresse": r.get("adresse", {}).get("value", "")
-            })
+        """,
+        "OPTIONAL { ?id mobilite:adresse ?adresse . }",
+    )
+    return await serve_list(request, query, infrastructure_item, limit, cursor, format, dedupe=True)
 
-    return infrastructures
+def infrastructure_item(r):
+    return {
+        "id": r["id"]["value"].split("#")[-1],
+        "type": r["type"]["value"].split("#")[-1],
+        "nom": r["nom"]["value"],
+        "adresse": r.get("adresse", {}).get("value", "")
+    }
 
 # Endpoint pour les trajets (compatible frontend)
 @app.get("/trajets/")
-def get_trajets():
+async def get_trajets(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Récupère tous les trajets"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?trajet ?type ?distance ?duree ?personne WHERE {{
+    query = ListQuery(
+        LIST_PREFIXES,
+        "?trajet ?type ?distance ?duree ?personne",
+        "trajet",
+        f"""
+        {class_hierarchy.values("?type", MOBILITE.Trajet)}
         ?trajet a ?type .
-        ?type rdfs:subClassOf* mobilite:Trajet .
-        OPTIONAL {{ ?trajet mobilite:distance ?distance . }}
-        OPTIONAL {{ ?trajet mobilite:duree ?duree . }}
-        OPTIONAL {{ ?personne mobilite:effectueTrajet ?trajet . }}
-    }}
-    """)
-    results = sparql.query().convert()
-
-    trajets = []
-    for r in results["results"]["bindings"]:
-        trajets.append({
-            "id": r["trajet"]["value"].split("#")[-1],
-            "type": r["type"]["value"].split("#")[-1],
-            "distance": float(r["distance"]["value"]) if "distance" in r else None,
-            "duree": float(r["duree"]["value"]) if "duree" in r else None,
-            "personne": r["personne"]["value"].split("#")[-1] if "personne" in r else None
-        })
-    return trajets
+        """,
+        """
+        OPTIONAL { ?trajet mobilite:distance ?distance . }
+        OPTIONAL { ?trajet mobilite:duree ?duree . }
+        OPTIONAL { ?personne mobilite:effectueTrajet ?trajet . }
+        """,
+    )
+    return await serve_list(request, query, trajet_item, limit, cursor, format)
+
+def trajet_item(r):
+    return {
+        "id": r["trajet"]["value"].split("#")[-1],
+        "type": r["type"]["value"].split("#")[-1],
+        "distance": float(r["distance"]["value"]) if "distance" in r else None,
+        "duree": float(r["duree"]["value"]) if "duree" in r else None,
+        "personne": r["personne"]["value"].split("#")[-1] if "personne" in r else None
+    }
 
 # Endpoint pour les avis (compatible frontend)
 @app.get("/avis/")
-def get_avis():
+async def get_avis(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Récupère tous les avis"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    SELECT ?avis ?commentaire ?note ?utilisateur WHERE {{
+    query = ListQuery(
+        LIST_PREFIXES,
+        "?avis ?commentaire ?note ?utilisateur",
+        "avis",
+        """
         ?avis a mobilite:Avis ;
               mobilite:donneAvis ?utilisateur ;
               mobilite:commentaire ?commentaire ;
               mobilite:note ?note .
-    }}
-    """)
-    results = sparql.query().convert()
+        """,
+    )
+    return await serve_list(request, query, avis_item, limit, cursor, format)
 
-    return [
-        {
-            "avis": r["avis"]["value"].split("#")[-1],
-            "commentaire": r["commentaire"]["value"],
-            "note": int(r["note"]["value"]),
-            "utilisateur": r["utilisateur"]["value"].split("#")[-1],
-        }
-        for r in results["results"]["bindings"]
-    ]
+def avis_item(r):
+    return {
+        "avis": r["avis"]["value"].split("#")[-1],
+        "commentaire": r["commentaire"]["value"],
+        "note": int(r["note"]["value"]),
+        "utilisateur": r["utilisateur"]["value"].split("#")[-1],
+    }
 
 # Endpoint pour les réseaux de transport (alias de vehicules)
 @app.get("/reseaux_transport/")
-def get_reseaux_transport():
+async def get_reseaux_transport(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Endpoint pour le frontend - alias de get_all_vehicules()"""
-    return get_all_vehicules()
+    return await get_all_vehicules(request, limit, cursor, format)
 
 # Endpoint pour les événements (alias de trajets)
 @app.get("/events/")
-def get_events():
+async def get_events(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Endpoint pour le frontend - alias de get_trajets()"""
-    return get_trajets()
+    return await get_trajets(request, limit, cursor, format)
 
 # Endpoint compatible avec l'ancien nom
 @app.get("/get_infrastructures/")
-def get_infrastructures_old():
+async def get_infrastructures_old(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Endpoint compatible avec l'ancien nom"""
-    return get_infrastructures()
+    return await get_infrastructures(request, limit, cursor, format)
 
 # Endpoint pour les stations de recharge
 @app.get("/stations_recharge/")
-def get_stations_recharge():
+async def get_stations_recharge():
     """Récupère toutes les stations de recharge"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?station ?type ?connecteur ?puissance ?disponible WHERE {{
+        {class_hierarchy.values("?type", MOBILITE.StationRecharge)}
         ?station a ?type .
-        ?type rdfs:subClassOf* mobilite:StationRecharge .
         OPTIONAL {{ ?station mobilite:typeConnecteur ?connecteur . }}
         OPTIONAL {{ ?station mobilite:puissanceMax ?puissance . }}
         OPTIONAL {{ ?station mobilite:disponible ?disponible . }}
     }}
     """)
-    results = sparql.query().convert()
 
     stations = []
     for r in results["results"]["bindings"]:
@@ -1125,48 +1996,44 @@ def get_stations_recharge():
 
 # Endpoint pour les tickets
 @app.get("/tickets/")
-def get_tickets():
+async def get_tickets(request: Request, limit: int = None, cursor: str = None, format: str = None):
     """Récupère tous les tickets"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
-    PREFIX mobilite: <{MOBILITE}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?ticket ?type ?prix ?statut ?utilisateur WHERE {{
+    query = ListQuery(
+        LIST_PREFIXES,
+        "?ticket ?type ?prix ?statut ?utilisateur",
+        "ticket",
+        f"""
+        {class_hierarchy.values("?type", MOBILITE.Ticket)}
         ?ticket a ?type .
-        ?type rdfs:subClassOf* mobilite:Ticket .
-        OPTIONAL {{ ?ticket mobilite:prix ?prix . }}
-        OPTIONAL {{ ?ticket mobilite:statutTicket ?statut . }}
-        OPTIONAL {{ ?utilisateur mobilite:possedeTicket ?ticket . }}
-    }}
-    """)
-    results = sparql.query().convert()
-
-    tickets = []
-    for r in results["results"]["bindings"]:
-        tickets.append({
-            "id": r["ticket"]["value"].split("#")[-1],
-            "type": r["type"]["value"].split("#")[-1],
-            "prix": float(r["prix"]["value"]) if "prix" in r else None,
-            "statut": r.get("statut", {}).get("value", ""),
-            "utilisateur": r["utilisateur"]["value"].split("#")[-1] if "utilisateur" in r else None
-        })
-    return tickets
+        """,
+        """
+        OPTIONAL { ?ticket mobilite:prix ?prix . }
+        OPTIONAL { ?ticket mobilite:statutTicket ?statut . }
+        OPTIONAL { ?utilisateur mobilite:possedeTicket ?ticket . }
+        """,
+    )
+    return await serve_list(request, query, ticket_item, limit, cursor, format)
+
+def ticket_item(r):
+    return {
+        "id": r["ticket"]["value"].split("#")[-1],
+        "type": r["type"]["value"].split("#")[-1],
+        "prix": float(r["prix"]["value"]) if "prix" in r else None,
+        "statut": r.get("statut", {}).get("value", ""),
+        "utilisateur": r["utilisateur"]["value"].split("#")[-1] if "utilisateur" in r else None
+    }
 
 # Endpoint pour les smart cities
 @app.get("/smartcities/")
-def get_smartcities():
+async def get_smartcities():
     """Récupère toutes les smart cities"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     SELECT ?city ?nom WHERE {{
         ?city a mobilite:SmartCity ;
               mobilite:nom ?nom .
     }}
     """)
-    results = sparql.query().convert()
 
     return [
         {
@@ -1178,21 +2045,18 @@ def get_smartcities():
 
 # Endpoint pour les statistiques détaillées
 @app.get("/statistiques/")
-def get_statistiques():
+async def get_statistiques():
     """Récupère les statistiques détaillées"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?stat ?type ?valeur ?unite WHERE {{
+        {class_hierarchy.values("?type", MOBILITE.Statistiques)}
         ?stat a ?type .
-        ?type rdfs:subClassOf* mobilite:Statistiques .
         OPTIONAL {{ ?stat mobilite:valeur ?valeur . }}
         OPTIONAL {{ ?stat mobilite:unite ?unite . }}
     }}
     """)
-    results = sparql.query().convert()
 
     statistiques = []
     for r in results["results"]["bindings"]:
@@ -1206,23 +2070,20 @@ def get_statistiques():
 
 # Endpoint pour les observations (alias de avis)
 @app.get("/observations/")
-def get_observations():
-    """Endpoint pour le frontend - alias de get_avis()"""
-    return get_avis()
+async def get_observations():
+    """Endpoint pour le frontend - alias de get_avis_details()"""
+    return await get_avis_details()
 
 # Endpoint pour les relations de recharge
 @app.get("/reseaux/seRecharge")
-def get_relations_recharge():
+async def get_relations_recharge():
     """Récupère les relations de recharge"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     SELECT ?reseau ?station WHERE {{
         ?reseau mobilite:utiliseStationRecharge ?station .
     }}
     """)
-    results = sparql.query().convert()
 
     relations = []
     for r in results["results"]["bindings"]:
@@ -1234,11 +2095,9 @@ def get_relations_recharge():
 
 # Endpoint pour les trajets par utilisateur
 @app.get("/utilisateurs/trajets/")
-def get_trajets_utilisateurs():
+async def get_trajets_utilisateurs():
     """Récupère les trajets par utilisateur"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     SELECT ?utilisateur ?trajet ?typeTrajet ?distance ?duree WHERE {{
         ?utilisateur mobilite:effectueTrajet ?trajet .
@@ -1247,7 +2106,6 @@ def get_trajets_utilisateurs():
         OPTIONAL {{ ?trajet mobilite:duree ?duree . }}
     }}
     """)
-    results = sparql.query().convert()
 
     trajets_utilisateurs = []
     for r in results["results"]["bindings"]:
@@ -1263,17 +2121,16 @@ def get_trajets_utilisateurs():
 # 📝 AVIS - ENDPOINTS GET
 # ======================
 
-@app.get("/avis/")
-def get_avis():
+# /avis/ est servi par get_avis (liste paginée, déclarée plus haut) ; la liste
+# détaillée reste celle de /observations/
+async def get_avis_details():
     """Récupère tous les avis avec leurs détails complets"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?avis ?type ?commentaire ?note ?utilisateur ?nom_utilisateur WHERE {{
+        {class_hierarchy.values("?type", MOBILITE.Avis)}
         ?avis a ?type .
-        ?type rdfs:subClassOf* mobilite:Avis .
         OPTIONAL {{ ?avis mobilite:commentaire ?commentaire . }}
         OPTIONAL {{ ?avis mobilite:note ?note . }}
         OPTIONAL {{ 
@@ -1283,7 +2140,6 @@ def get_avis():
     }}
     ORDER BY DESC(?note)
     """)
-    results = sparql.query().convert()
 
     avis_list = []
     seen = set()
@@ -1317,23 +2173,20 @@ def get_avis():
     return avis_list
 
 @app.get("/avis/{utilisateur_id}")
-def get_avis_par_utilisateur(utilisateur_id: str):
+async def get_avis_par_utilisateur(utilisateur_id: str):
     """Récupère tous les avis d'un utilisateur spécifique"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?avis ?type ?commentaire ?note WHERE {{
+        {class_hierarchy.values("?type", MOBILITE.Avis)}
         mobilite:{utilisateur_id} mobilite:donneAvis ?avis .
         ?avis a ?type .
-        ?type rdfs:subClassOf* mobilite:Avis .
         OPTIONAL {{ ?avis mobilite:commentaire ?commentaire . }}
         OPTIONAL {{ ?avis mobilite:note ?note . }}
     }}
     ORDER BY DESC(?note)
     """)
-    results = sparql.query().convert()
 
     avis_utilisateur = []
     for r in results["results"]["bindings"]:
@@ -1353,21 +2206,18 @@ def get_avis_par_utilisateur(utilisateur_id: str):
     }
 
 @app.get("/avis/statistiques/")
-def get_statistiques_avis():
+async def get_statistiques_avis():
     """Récupère les statistiques des avis"""
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(f"""
+    results = await execute_sparql_query(f"""
     PREFIX mobilite: <{MOBILITE}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?type (COUNT(?avis) as ?count) (AVG(?note) as ?moyenne_note) WHERE {{
+        {class_hierarchy.values("?type", MOBILITE.Avis)}
         ?avis a ?type .
-        ?type rdfs:subClassOf* mobilite:Avis .
         OPTIONAL {{ ?avis mobilite:note ?note . }}
     }}
     GROUP BY ?type
     """)
-    results = sparql.query().convert()
 
     stats = {}
     total_avis = 0
@@ -1399,14 +2249,23 @@ def get_statistiques_avis():
     return stats
 
 @app.get("/avis/recherche/")
-def rechercher_avis(texte: str = "", note_min: int = None, note_max: int = None, type_avis: str = None):
+async def rechercher_avis(texte: str = "", note_min: int = None, note_max: int = None, type_avis: str = None):
     """Recherche des avis avec filtres"""
     
     # Construction de la requête SPARQL dynamique
     filters = []
-    
+    where = [class_hierarchy.values("?type", MOBILITE.Avis)]
+
     if texte:
-        filters.append(f'FILTER(CONTAINS(LCASE(?commentaire), LCASE("{texte}")))')
+        # Le texte est cherché dans l'index ; Fuseki ne reçoit que les avis candidats
+        matches = search_index.search(texte, labels=("commentaire",))
+        if not matches:
+            return {
+                "criteres": {"texte": texte, "note_min": note_min, "note_max": note_max, "type_avis": type_avis},
+                "resultats": [],
+                "count": 0
+            }
+        where.append("VALUES ?avis { " + " ".join(f"<{m['subject']}>" for m in matches) + " }")
     
     if note_min is not None:
         filters.append(f'FILTER(?note >= {note_min})')
@@ -1417,9 +2276,8 @@ def rechercher_avis(texte: str = "", note_min: int = None, note_max: int = None,
     if type_avis:
         filters.append(f'FILTER(?type = mobilite:{type_avis})')
     
-    where_clause = " . ".join([
+    where_clause = " . ".join(where + [
         "?avis a ?type",
-        "?type rdfs:subClassOf* mobilite:Avis",
         "OPTIONAL { ?avis mobilite:commentaire ?commentaire }",
         "OPTIONAL { ?avis mobilite:note ?note }",
         "OPTIONAL { ?utilisateur mobilite:donneAvis ?avis }"
@@ -1438,10 +2296,7 @@ def rechercher_avis(texte: str = "", note_min: int = None, note_max: int = None,
     LIMIT 100
     """
 
-    sparql = SPARQLWrapper(FUSEKI_QUERY_URL)
-    sparql.setReturnFormat(JSON)
-    sparql.setQuery(query)
-    results = sparql.query().convert()
+    results = await execute_sparql_query(query)
 
     avis_trouves = []
     for r in results["results"]["bindings"]:
@@ -1499,6 +2354,146 @@ def add_event(data: dict):
     except Exception as e:
         return {"error": f"Erreur lors de l'ajout de l'événement: {str(e)}"}
 # ======================
+# 📦 LECTURES GROUPÉES ET TABLEAU DE BORD
+# ======================
+#
+# Une page du frontend appelle plusieurs endpoints de lecture, chacun avec sa
+# requête Fuseki. /batch/ exécute une liste d'opérations nommées en parallèle
+# (requêtes concurrentes sur le pool de connexions du client Fuseki) et renvoie
+# une seule réponse : un aller-retour, et la durée de l'opération la plus lente
+# au lieu de leur somme. /dashboard/ est le lot prédéfini du tableau de bord.
+# Chaque opération est l'endpoint GET correspondant, appelé avec les mêmes
+# paramètres ; l'échec de l'une n'empêche pas les autres d'aboutir.
+
+BATCH_OPERATIONS = {
+    "stats": "/stats/",
+    "personnes": "/personnes/",
+    "vehicules": "/vehicules/",
+    "infrastructures": "/infrastructures/",
+    "trajets": "/trajets/",
+    "tickets": "/tickets/",
+    "avis": "/avis/",
+    "avis_statistiques": "/avis/statistiques/",
+    "avis_recherche": "/avis/recherche/",
+    "stations_recharge": "/stations_recharge/",
+    "reseaux_transport": "/reseaux_transport/",
+    "relations_recharge": "/reseaux/seRecharge",
+    "trajets_utilisateurs": "/utilisateurs/trajets/",
+    "smartcities": "/smartcities/",
+    "statistiques": "/statistiques/",
+    "observations": "/observations/",
+    "events": "/events/",
+    "search": "/search/",
+}
+DASHBOARD_OPERATIONS = (
+    "stats", "personnes", "vehicules", "infrastructures", "avis_statistiques", "stations_recharge", "trajets",
+)
+
+BATCH_OPERATION_LATENCY = REGISTRY.histogram(
+    "mobilite_batch_operation_duration_seconds", "Durée des opérations de /batch/ et /dashboard/", ("operation", "status")
+)
+
+def route_endpoint(path: str):
+    """Fonction de la route GET servie pour `path` (la première déclarée, comme au routage)"""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.endpoint
+    raise KeyError(path)
+
+# Routes déclarées plus haut : résolues une fois
+BATCH_ENDPOINTS = {name: route_endpoint(path) for name, path in BATCH_OPERATIONS.items()}
+
+class BatchOperation(BaseModel):
+    name: str
+    params: dict = {}
+    # Clé du résultat dans la réponse (par défaut le nom ; deux pages d'une même liste)
+    key: str = None
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation]
+
+def batch_arguments(endpoint, params: dict, request: Request) -> dict:
+    """Paramètres d'une opération validés selon la signature de l'endpoint"""
+    signature = inspect.signature(endpoint)
+    kwargs = {}
+    for name, value in params.items():
+        parameter = signature.parameters.get(name)
+        if parameter is None or name in ("request", "format"):
+            raise HTTPException(status_code=400, detail=f"Paramètre inconnu : {name}")
+        try:
+            kwargs[name] = TypeAdapter(parameter.annotation).validate_python(value, strict=False)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Paramètre {name} invalide : {e.errors()[0]['msg']}")
+    if "request" in signature.parameters:
+        kwargs["request"] = request
+    if "format" in signature.parameters:
+        kwargs["format"] = "json"
+    return kwargs
+
+async def run_batch_operation(request: Request, operation: BatchOperation) -> dict:
+    """{"data": ...} ou {"error": ...}, avec la durée de l'opération"""
+    start = time.perf_counter()
+    outcome = {}
+    status = "200"
+    try:
+        endpoint = BATCH_ENDPOINTS.get(operation.name)
+        if endpoint is None:
+            raise HTTPException(status_code=400, detail=f"Opération inconnue : {operation.name}")
+        result = await endpoint(**batch_arguments(endpoint, operation.params, request))
+        if isinstance(result, StreamingResponse):
+            raise HTTPException(status_code=400, detail="Réponse en flux non disponible dans un lot")
+        if isinstance(result, JSONResponse):
+            # Page d'une liste : le curseur suivant est dans l'en-tête
+            if "x-next-cursor" in result.headers:
+                outcome["next_cursor"] = result.headers["x-next-cursor"]
+            result = json.loads(result.body)
+        outcome["data"] = result
+    except HTTPException as e:
+        status = str(e.status_code)
+        outcome["error"] = e.detail
+    except Exception as e:
+        status = "500"
+        log.error("❌ Opération %s du lot en échec : %s", operation.name, e)
+        outcome["error"] = str(e)
+    duration = time.perf_counter() - start
+    BATCH_OPERATION_LATENCY.observe(duration, operation=operation.name, status=status)
+    outcome["status"] = int(status)
+    outcome["duration_ms"] = round(duration * 1000, 1)
+    return outcome
+
+async def run_batch(request: Request, operations: list) -> dict:
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"{BATCH_MAX_OPERATIONS} opérations au plus par lot")
+    keys = [op.key or op.name for op in operations]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Clés d'opérations en double (préciser `key`)")
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run_batch_operation(request, op) for op in operations))
+    return {
+        "results": dict(zip(keys, outcomes)),
+        "errors": sum("error" in outcome for outcome in outcomes),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+@app.post("/batch/")
+async def batch_read(batch: BatchRequest, request: Request):
+    """
+    Plusieurs lectures en une requête, exécutées en parallèle. Exemple :
+    {"operations": [{"name": "stats"}, {"name": "personnes", "params": {"limit": 50}}]}
+    """
+    return await run_batch(request, batch.operations)
+
+@app.get("/batch/")
+def get_batch_operations():
+    """Opérations disponibles dans /batch/ et composition de /dashboard/"""
+    return {"operations": BATCH_OPERATIONS, "dashboard": list(DASHBOARD_OPERATIONS), "max_operations": BATCH_MAX_OPERATIONS}
+
+@app.get("/dashboard/")
+async def get_dashboard(request: Request):
+    """Données du tableau de bord en un aller-retour"""
+    return await run_batch(request, [BatchOperation(name=name) for name in DASHBOARD_OPERATIONS])
+
+# ======================
 # 🚀 LANCEMENT DE L'APPLICATION
 # ======================
 
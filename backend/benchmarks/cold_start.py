@@ -0,0 +1,135 @@
+# cold_start.py
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from rdflib import Graph
+
+from benchmarks.subclass_values import MOBILITE, synthetic_graph
+from migrate_store import migrate_file
+from sqlite_store import SQLiteStore
+
+# ======================
+# ⏱️ BENCHMARK DÉMARRAGE À FROID : RDF/XML EN MÉMOIRE vs STORE SQLITE
+# ======================
+#
+# Pour chaque volume : génère un jeu de données synthétique, l'écrit en RDF/XML,
+# le migre dans un store SQLite, puis mesure dans un processus neuf le temps et
+# la mémoire (RSS max) nécessaires pour être prêt à répondre à une requête :
+#
+#   python -m benchmarks.cold_start --triples 10000,100000,1000000
+#
+# « memory » = g.parse(fichier RDF/XML) comme au démarrage du mode mémoire ;
+# « sqlite » = ouverture du store + même première requête.
+
+FIRST_QUERY = f"""
+PREFIX mobilite: <{MOBILITE}>
+SELECT ?id ?nom WHERE {{ ?id a mobilite:Conducteur ; mobilite:nom ?nom . }}
+"""
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM est propre au processus (ru_maxrss hérite du pic du parent au fork)
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss est en kilo-octets sous Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _child(mode: str, path: str):
+    """Mesure exécutée dans un processus neuf ; écrit le résultat JSON sur stdout"""
+    started = time.perf_counter()
+    if mode == "memory":
+        graph = Graph()
+        graph.parse(path, format="xml")
+    else:
+        store = SQLiteStore()
+        store.open(path, create=False)
+        graph = Graph(store=store)
+    ready = time.perf_counter() - started
+    rows = len(graph.query(FIRST_QUERY))
+    first_query = time.perf_counter() - started - ready
+    print(json.dumps({
+        "ready_s": round(ready, 4),
+        "first_query_s": round(first_query, 4),
+        "rows": rows,
+        "max_rss_mb": _peak_rss_mb(),
+    }))
+
+
+def _measure(mode: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child", mode, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démarrage à froid : RDF/XML en mémoire vs store SQLite")
+    parser.add_argument("--ontology", default="mobilite_principal.rdf")
+    parser.add_argument("--triples", default="10000,100000", help="volumes testés, séparés par des virgules")
+    parser.add_argument("--workdir", help="répertoire des fichiers générés (temporaire par défaut)")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    ontology = Graph().parse(args.ontology)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cold_start_")
+    results = []
+    for target in (int(n) for n in args.triples.split(",")):
+        # ~7 triples pour 3 instances (type, nom, une note sur trois)
+        instances = max(0, (target - len(ontology)) * 3 // 7)
+        data = synthetic_graph(ontology, instances)
+        rdf_path = os.path.join(workdir, f"data_{target}.rdf")
+        store_path = os.path.join(workdir, f"data_{target}.sqlite")
+        data.serialize(rdf_path, format="xml")
+        del data
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(store_path + suffix):
+                os.remove(store_path + suffix)
+        started = time.perf_counter()
+        store = SQLiteStore()
+        store.open(store_path, create=True)
+        triples = migrate_file(store, Graph(store=store), rdf_path, "xml")
+        store.close(commit_pending_transaction=True)
+        migration_s = time.perf_counter() - started
+
+        memory = _measure("memory", rdf_path)
+        sqlite = _measure("sqlite", store_path)
+        results.append({
+            "triples": triples,
+            "rdf_mb": round(os.path.getsize(rdf_path) / (1 << 20), 2),
+            "store_mb": round(os.path.getsize(store_path) / (1 << 20), 2),
+            "migration_s": round(migration_s, 3),
+            "memory": memory,
+            "sqlite": sqlite,
+        })
+        print(
+            f"{triples:>9} triples  mémoire prêt {memory['ready_s']:8.3f} s ({memory['max_rss_mb']} Mo)"
+            f"  sqlite prêt {sqlite['ready_s']:8.4f} s ({sqlite['max_rss_mb']} Mo)"
+            f"  1re requête {memory['first_query_s']:.3f} s / {sqlite['first_query_s']:.3f} s"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"workdir": workdir, "results": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# generate.py
+import argparse
+import gzip
+import os
+import random
+import time
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.serializers.nt import _nt_row
+
+from benchmarks.subclass_values import MOBILITE
+
+# ======================
+# 🏙️ GÉNÉRATEUR DE DONNÉES MOBILITÉ SYNTHÉTIQUES
+# ======================
+#
+# Produit un jeu de données conforme à l'ontologie (mêmes classes et propriétés
+# que les endpoints d'app.py), de 10 000 à 10 000 000 de triples :
+#
+#   python -m benchmarks.generate --triples 1000000 --output donnees.nt.gz
+#
+# Chaque personne (Conducteur, Pieton ou Voyageur) effectue quelques trajets,
+# donne des avis, possède des tickets et utilise des véhicules partagés ; les
+# véhicules, infrastructures et stations de recharge forment des pools dont la
+# taille suit le nombre de personnes. Les triples sont écrits en N-Triples au
+# fil de l'eau (mémoire constante) et le tirage est déterministe (--seed).
+#
+# Les identifiants sont prévisibles (P1, T1, V1, A1, K1, I1, S1, ST1, C1) : le
+# pilote de charge s'en sert pour interroger des instances existantes.
+
+PERSON_TYPES = [("Conducteur", 0.3), ("Pieton", 0.2), ("Voyageur", 0.5)]
+TRAJET_TYPES = ["Trajet", "TrajetCourt", "TrajetOptimal", "TrajetMoinsCirculation", "TrajetRecommandé"]
+VEHICLE_TYPES = ["Voiture", "Bus", "Metro", "Velo", "Trottinette"]
+INFRA_TYPES = ["Route", "Parking", "StationsBus", "StationsMetro", "Batiment"]
+TICKET_TYPES = ["TicketBus", "TicketMetro", "TicketParking"]
+STAT_TYPES = [("StatistiquesAccidents", "accidents/mois"), ("StatistiquesPollution", "µg/m³"), ("StatistiquesUtilisation", "%")]
+
+PRENOMS = ["Wala", "Oumaima", "Sami", "Leïla", "Youssef", "Amira", "Mehdi", "Inès", "Karim", "Sarra", "Zoé", "Hédi",
+           "Nour", "Rania", "Aymen", "Chloé", "Farès", "Yasmine", "Omar", "Émilie"]
+NOMS = ["Trabelsi", "Ben Salah", "Gharbi", "Jaziri", "Mansour", "Lefèvre", "Haddad", "Bouaziz", "Chérif", "Ayari",
+        "Dridi", "Mejri", "Hamdi", "Laroche", "Kefi", "Saïdi"]
+RUES = ["Avenue Habib Bourguiba", "Rue de la Science", "Avenue Mohamed V", "Rue de Marseille", "Boulevard du 7 Novembre",
+        "Rue Ibn Khaldoun", "Avenue de la Liberté", "Rue d'Alger"]
+QUARTIERS = ["El Manar", "Les Berges du Lac", "Centre Urbain Nord", "La Marsa", "Bardo", "Ariana", "Lafayette", "Menzah"]
+MARQUES = [("Renault", "Clio"), ("Peugeot", "208"), ("Volkswagen", "Golf"), ("Iveco", "Urbanway"), ("Alstom", "Citadis"),
+           ("Decathlon", "Elops"), ("Xiaomi", "Pro 2"), ("Kia", "Picanto")]
+AVIS_POSITIFS = ["Bus ponctuel et confortable", "Trajet rapide et agréable", "Station propre et bien située",
+                 "Personnel aimable, bon rapport qualité-prix", "Vélo en bon état, très pratique"]
+AVIS_NEGATIFS = ["Trafic dense aux heures de pointe", "Retards fréquents le matin", "Parking saturé en semaine",
+                 "Trottinette abîmée, freins défaillants", "Métro bondé et mal climatisé"]
+
+
+def _lit(value, datatype):
+    return Literal(value, datatype=datatype)
+
+
+class MobiliteGenerator:
+    """Flux de triples synthétiques, s'arrête dès que le volume demandé est atteint"""
+
+    def __init__(self, target_triples: int, seed: int = 42):
+        self.target = target_triples
+        self.rng = random.Random(seed)
+        # ~20 triples par personne (trajets, avis, tickets compris) + pools partagés
+        self.persons = max(10, target_triples // 24)
+        self.vehicles = max(5, self.persons // 10)
+        self.infrastructures = max(5, self.persons // 20)
+        self.stations = max(3, self.persons // 50)
+        self.statistics = max(3, self.persons // 100)
+        self.counts = {}
+
+    def _uri(self, prefix: str, i: int) -> URIRef:
+        return MOBILITE[f"{prefix}{i}"]
+
+    def _count(self, kind: str):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def _pools(self):
+        rng = self.rng
+        for i in range(1, 4):
+            city = self._uri("C", i)
+            yield city, RDF.type, MOBILITE.SmartCity
+            yield city, MOBILITE.nom, _lit(f"SmartCity {QUARTIERS[i % len(QUARTIERS)]}", XSD.string)
+            self._count("SmartCity")
+        for i in range(1, self.vehicles + 1):
+            v = self._uri("V", i)
+            marque, modele = rng.choice(MARQUES)
+            yield v, RDF.type, MOBILITE[rng.choice(VEHICLE_TYPES)]
+            yield v, MOBILITE.marque, _lit(marque, XSD.string)
+            yield v, MOBILITE.modele, _lit(modele, XSD.string)
+            yield v, MOBILITE.immatriculation, _lit(f"{rng.randint(100, 250)} TU {rng.randint(1000, 9999)}", XSD.string)
+            if rng.random() < 0.3:
+                yield v, MOBILITE.utiliseStationRecharge, self._uri("S", rng.randint(1, self.stations))
+            self._count("ReseauTransport")
+        for i in range(1, self.infrastructures + 1):
+            infra = self._uri("I", i)
+            yield infra, RDF.type, MOBILITE[rng.choice(INFRA_TYPES)]
+            yield infra, MOBILITE.adresse, _lit(f"{rng.randint(1, 200)} {rng.choice(RUES)}, {rng.choice(QUARTIERS)}, Tunis", XSD.string)
+            yield infra, MOBILITE.nom, _lit(f"{rng.choice(QUARTIERS)} {i}", XSD.string)
+            self._count("Infrastructure")
+        for i in range(1, self.stations + 1):
+            station = self._uri("S", i)
+            yield station, RDF.type, MOBILITE.RechargeElectrique if rng.random() < 0.8 else MOBILITE.RechargeGaz
+            yield station, MOBILITE.typeConnecteur, _lit(rng.choice(["Type 2", "CCS", "CHAdeMO"]), XSD.string)
+            yield station, MOBILITE.puissanceMax, _lit(float(rng.choice([7, 22, 50, 150])), XSD.float)
+            yield station, MOBILITE.disponible, _lit(rng.random() < 0.7, XSD.boolean)
+            self._count("StationRecharge")
+        for i in range(1, self.statistics + 1):
+            stat = self._uri("ST", i)
+            cls, unite = rng.choice(STAT_TYPES)
+            yield stat, RDF.type, MOBILITE[cls]
+            yield stat, MOBILITE.valeur, _lit(round(rng.uniform(0, 100), 1), XSD.float)
+            yield stat, MOBILITE.unite, _lit(unite, XSD.string)
+            self._count("Statistiques")
+
+    def _person(self, i: int, ids: dict):
+        rng = self.rng
+        p = self._uri("P", i)
+        cls = rng.choices([c for c, _ in PERSON_TYPES], [w for _, w in PERSON_TYPES])[0]
+        prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+        yield p, RDF.type, MOBILITE[cls]
+        yield p, MOBILITE.nom, _lit(nom, XSD.string)
+        yield p, MOBILITE.prenom, _lit(prenom, XSD.string)
+        yield p, MOBILITE.age, _lit(rng.randint(16, 85), XSD.integer)
+        yield p, MOBILITE.email, _lit(f"{prenom.lower()}.{i}@exemple.tn", XSD.string)
+        if cls == "Conducteur":
+            yield p, MOBILITE.numeroPermis, _lit(f"PERMIS-{i:07d}", XSD.string)
+            yield p, MOBILITE.categoriePermis, _lit(rng.choice("ABBBCD"), XSD.string)
+        self._count("Personne")
+
+        # Fan-out réaliste : quelques trajets, 1-2 véhicules, avis et tickets occasionnels
+        for _ in range(min(8, int(rng.expovariate(1 / 2.5)))):
+            ids["T"] += 1
+            t = self._uri("T", ids["T"])
+            depart = rng.randint(6 * 60, 21 * 60)
+            duree = rng.randint(5, 90)
+            yield p, MOBILITE.effectueTrajet, t
+            yield t, RDF.type, MOBILITE[rng.choice(TRAJET_TYPES)]
+            yield t, MOBILITE.distance, _lit(round(duree * rng.uniform(0.2, 0.8), 1), XSD.float)
+            yield t, MOBILITE.duree, _lit(float(duree), XSD.float)
+            yield t, MOBILITE.heureDepart, _lit(f"{depart // 60:02d}:{depart % 60:02d}", XSD.string)
+            yield t, MOBILITE.heureArrivee, _lit(f"{(depart + duree) // 60 % 24:02d}:{(depart + duree) % 60:02d}", XSD.string)
+            self._count("Trajet")
+        for _ in range(rng.randint(1, 2)):
+            yield p, MOBILITE.utiliseReseauTransport, self._uri("V", rng.randint(1, self.vehicles))
+        for _ in range(rng.choices([0, 1, 2, 3], [0.5, 0.3, 0.15, 0.05])[0]):
+            ids["A"] += 1
+            a = self._uri("A", ids["A"])
+            note = rng.randint(1, 5)
+            commentaire = rng.choice(AVIS_POSITIFS if note >= 3 else AVIS_NEGATIFS)
+            yield p, MOBILITE.donneAvis, a
+            yield a, RDF.type, MOBILITE.AvisPositif if note >= 3 else MOBILITE.AvisNegatif
+            yield a, MOBILITE.commentaire, _lit(f"{commentaire} ({rng.choice(QUARTIERS)})", XSD.string)
+            yield a, MOBILITE.note, _lit(note, XSD.integer)
+            self._count("Avis")
+        for _ in range(rng.choices([0, 1, 2], [0.4, 0.45, 0.15])[0]):
+            ids["K"] += 1
+            k = self._uri("K", ids["K"])
+            yield p, MOBILITE.possedeTicket, k
+            yield k, RDF.type, MOBILITE[rng.choice(TICKET_TYPES)]
+            yield k, MOBILITE.prix, _lit(rng.choice([0.5, 0.7, 1.0, 2.0, 3.5]), XSD.float)
+            yield k, MOBILITE.statutTicket, _lit(rng.choice(["valide", "valide", "utilisé", "expiré"]), XSD.string)
+            self._count("Ticket")
+
+    def triples(self):
+        produced = 0
+        for triple in self._pools():
+            produced += 1
+            yield triple
+        ids = {"T": 0, "A": 0, "K": 0}
+        i = 0
+        while produced < self.target:
+            i += 1
+            for triple in self._person(i, ids):
+                produced += 1
+                yield triple
+        self.counts["triples"] = produced
+
+
+def write_dataset(path: str, target_triples: int, seed: int = 42) -> dict:
+    """Écrit le jeu de données en N-Triples (gzip si le nom se termine par .gz) ; retourne les effectifs"""
+    generator = MobiliteGenerator(target_triples, seed)
+    opener = gzip.open if path.endswith(".gz") else open
+    tmp_path = path + ".tmp"
+    with opener(tmp_path, "wt", encoding="utf-8") as f:
+        buffer = []
+        for triple in generator.triples():
+            buffer.append(_nt_row(triple))
+            if len(buffer) >= 10000:
+                f.write("".join(buffer))
+                buffer.clear()
+        f.write("".join(buffer))
+    os.replace(tmp_path, path)
+    return generator.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jeu de données mobilité synthétique (N-Triples)")
+    parser.add_argument("--triples", type=int, default=100000, help="volume visé (10 000 à 10 000 000)")
+    parser.add_argument("--output", default="donnees_synthetiques.nt")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = write_dataset(args.output, args.triples, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"💾 {counts['triples']} triples écrits dans {args.output} en {elapsed:.1f} s")
+    print("   " + ", ".join(f"{kind} : {n}" for kind, n in counts.items() if kind != "triples"))
+
+
+if __name__ == "__main__":
+    main()
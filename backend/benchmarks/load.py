@@ -0,0 +1,412 @@
+# load.py
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+# ======================
+# 🚦 PILOTE DE CHARGE DE L'API
+# ======================
+#
+# Envoie N requêtes par route avec C clients simultanés et mesure le débit et
+# la latence (p50 / p95 / p99) de chaque route d'app.py ; les résultats sont
+# écrits en JSON pour comparer les exécutions dans le temps :
+#
+#   # API déjà démarrée (vrai Fuseki / Ollama)
+#   python -m benchmarks.load --url http://localhost:8000 --output run.json
+#
+#   # Tout en local : données synthétiques, doublures Fuseki/Ollama, uvicorn
+#   python -m benchmarks.load --start --triples 100000 --output run.json
+#
+#   # Comparaison avec une exécution précédente
+#   python -m benchmarks.load --start --baseline run_precedent.json
+#
+# Les routes sont jouées l'une après l'autre (le débit mesuré est celui de la
+# route seule). Les identifiants interrogés (P1, T1, A1...) sont ceux du
+# générateur ; les routes d'écriture créent des instances « bench_* ».
+
+
+@dataclass
+class Scenario:
+    """Une route d'app.py et la façon de construire ses requêtes"""
+
+    method: str
+    route: str
+    build: object = None  # build(n) -> dict d'arguments httpx (params, json, files...)
+    path: object = None  # path(n) -> chemin effectif si la route a des paramètres
+    kind: str = "lecture"  # lecture | écriture | admin
+    weight: float = 1.0  # fraction du nombre de requêtes demandé
+
+
+def _ids(prefix: str, pool: int):
+    return lambda n: f"{prefix}{n % pool + 1}"
+
+
+def _unique(prefix: str):
+    return lambda n: f"bench_{prefix}_{os.getpid()}_{n}"
+
+
+_question = itertools.cycle([
+    "Liste tous les conducteurs",
+    "Combien de conducteurs y a-t-il ?",
+    "Quels sont les avis ?",
+    "Liste les trajets avec leur distance",
+    "Quels tickets existent ?",
+])
+
+_TURTLE = """@prefix mobilite: <http://www.semanticweb.org/smartcity/ontologies/mobilite#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+mobilite:bench_upload_{n} a mobilite:Voyageur ; mobilite:nom "Upload"^^xsd:string ; mobilite:prenom "Bench {n}"^^xsd:string .
+"""
+
+SCENARIOS = [
+    # Lectures
+    Scenario("GET", "/"),
+    Scenario("GET", "/personnes/"),
+    Scenario("GET", "/personnes/", build=lambda n: {"params": {"limit": 100}}, kind="lecture (page)"),
+    Scenario("GET", "/vehicules/"),
+    Scenario("GET", "/infrastructures/"),
+    Scenario("GET", "/trajets/"),
+    Scenario("GET", "/avis/"),
+    Scenario("GET", "/avis/{utilisateur_id}", path=lambda n: f"/avis/{_ids('P', 1000)(n)}"),
+    Scenario("GET", "/avis/statistiques/"),
+    Scenario("GET", "/avis/recherche/", build=lambda n: {"params": {"texte": ["ponctuel", "trafic", "retard"][n % 3]}}),
+    Scenario("GET", "/reseaux_transport/"),
+    Scenario("GET", "/events/"),
+    Scenario("GET", "/get_infrastructures/"),
+    Scenario("GET", "/stations_recharge/"),
+    Scenario("GET", "/tickets/"),
+    Scenario("GET", "/smartcities/"),
+    Scenario("GET", "/statistiques/"),
+    Scenario("GET", "/observations/"),
+    Scenario("GET", "/reseaux/seRecharge"),
+    Scenario("GET", "/utilisateurs/trajets/"),
+    Scenario("GET", "/stats/"),
+    Scenario("GET", "/search/", build=lambda n: {"params": {"q": ["wala", "trabelsi", "lefevre", "el manar"][n % 4]}}),
+    Scenario("GET", "/search/index/"),
+    Scenario("GET", "/ask/cache/"),
+    Scenario("GET", "/ask/schema/", build=lambda n: {"params": {"question": next(_question)}}),
+    Scenario("GET", "/llm/"),
+    Scenario("GET", "/dashboard/"),
+    Scenario("GET", "/batch/"),
+    Scenario("POST", "/batch/", build=lambda n: {"json": {"operations": [
+        {"name": "stats"}, {"name": "personnes", "params": {"limit": 20}}, {"name": "avis_statistiques"},
+    ]}}),
+    Scenario("GET", "/uploads/"),
+    Scenario("GET", "/outbox/"),
+    Scenario("GET", "/cache/"),
+    Scenario("GET", "/sync/"),
+    Scenario("GET", "/query/backend/"),
+    Scenario("GET", "/reasoning/"),
+    Scenario("GET", "/metrics"),
+    # Pipeline LLM
+    Scenario("POST", "/ask/", build=lambda n: {"json": {"question": next(_question)}}, weight=0.25),
+    Scenario("GET", "/ask/stream/", build=lambda n: {"params": {"question": next(_question)}}, weight=0.25),
+    # Écritures
+    Scenario("POST", "/add_personne/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("p")(n), "nom": "Bench", "prenom": f"P{n}", "age": 30, "email": f"b{n}@exemple.tn",
+        "type_personne": "voyageur"}}),
+    Scenario("POST", "/add_conducteur/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("c")(n), "nom": "Bench", "prenom": f"C{n}", "age": 40, "email": f"c{n}@exemple.tn",
+        "numeroPermis": f"B-{n}", "categoriePermis": "B"}}),
+    Scenario("POST", "/add_trajet/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("t")(n), "distance": 12.5, "duree": 25.0, "heureDepart": "08:00", "heureArrivee": "08:25"}}),
+    Scenario("POST", "/personne/effectue_trajet/", kind="écriture",
+             build=lambda n: {"json": {"personne_id": _ids("P", 1000)(n), "trajet_id": _ids("T", 1000)(n)}}),
+    Scenario("POST", "/add_vehicule/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("v")(n), "type_vehicule": "voiture", "marque": "Renault", "modele": "Clio",
+        "immatriculation": f"{n} TU 2024"}}),
+    Scenario("POST", "/personne/utilise_transport/", kind="écriture",
+             build=lambda n: {"json": {"personne_id": _ids("P", 1000)(n), "transport_id": _ids("V", 100)(n)}}),
+    Scenario("POST", "/add_avis/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("a")(n), "commentaire": "Avis de charge, bus ponctuel", "note": 4, "type_avis": ""}}),
+    Scenario("POST", "/personne/donne_avis/", kind="écriture",
+             build=lambda n: {"json": {"personne_id": _ids("P", 1000)(n), "avis_id": _ids("A", 1000)(n)}}),
+    Scenario("POST", "/add_ticket/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("k")(n), "type_ticket": "ticketBus", "prix": 0.7, "statutTicket": "valide"}}),
+    Scenario("POST", "/personne/possede_ticket/", kind="écriture",
+             build=lambda n: {"json": {"personne_id": _ids("P", 1000)(n), "ticket_id": _ids("K", 1000)(n)}}),
+    Scenario("POST", "/add_infrastructure/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("i")(n), "type_infrastructure": "parking", "adresse": "Rue de charge, Tunis", "nom": f"Parking {n}"}}),
+    Scenario("POST", "/add_station_recharge/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("s")(n), "type_connecteur": "CCS", "puissanceMax": 50.0, "disponible": True}}),
+    Scenario("POST", "/add_statistique/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("st")(n), "type_statistique": "StatistiquesPollution", "valeur": 42.0, "unite": "µg/m³"}}),
+    Scenario("POST", "/add_smartcity/", kind="écriture", build=lambda n: {"json": {"id": _unique("city")(n), "nom": f"Ville {n}"}}),
+    Scenario("POST", "/add_reseau_transport/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("r")(n), "type_vehicule": "bus", "marque": "Iveco", "modele": "Urbanway", "immatriculation": f"R{n}"}}),
+    Scenario("POST", "/add_event/", kind="écriture", build=lambda n: {"json": {
+        "id": _unique("e")(n), "commentaire": "Événement de charge", "note": 3, "type_avis": "AvisPositif"}}),
+    Scenario("DELETE", "/delete/{instance_id}", kind="écriture", path=lambda n: f"/delete/{_unique('p')(n)}"),
+    Scenario("POST", "/upload/", kind="écriture", weight=0.1, build=lambda n: {
+        "files": {"file": (f"bench_{n}.ttl", _TURTLE.format(n=n).encode("utf-8"), "text/turtle")}}),
+    # Administration (peu de requêtes : opérations lourdes)
+    Scenario("DELETE", "/ask/cache/", kind="admin", weight=0.05),
+    Scenario("POST", "/search/reindex/", kind="admin", weight=0.05),
+    Scenario("POST", "/sync/", kind="admin", weight=0.05),
+    Scenario("POST", "/query/consistency/", kind="admin", weight=0.05),
+    Scenario("POST", "/reasoning/recompute/", kind="admin", weight=0.05),
+]
+
+
+def app_routes(app_path: str) -> set:
+    """Routes déclarées dans app.py (décorateurs @app.<méthode>)"""
+    with open(app_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    return {(m.upper(), route) for m, route in re.findall(r'^@app\.(get|post|put|delete|patch)\("([^"]+)"', source, re.M)}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Percentile par rang le plus proche (liste triée)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class RouteResult:
+    scenario: Scenario
+    latencies: list = field(default_factory=list)
+    statuses: dict = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+        ms = lambda s: round(s * 1000, 2)
+        return {
+            "method": self.scenario.method,
+            "route": self.scenario.route,
+            "kind": self.scenario.kind,
+            "requests": len(values),
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughput_rps": round(len(values) / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": ms(percentile(values, 50)),
+            "p95_ms": ms(percentile(values, 95)),
+            "p99_ms": ms(percentile(values, 99)),
+            "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+            "max_ms": ms(values[-1]) if values else 0.0,
+        }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> RouteResult:
+    result = RouteResult(scenario)
+    counter = itertools.count()
+
+    async def worker():
+        while True:
+            n = next(counter)
+            if n >= requests:
+                return
+            path = scenario.path(n) if scenario.path else scenario.route
+            kwargs = scenario.build(n) if scenario.build else {}
+            start = time.perf_counter()
+            try:
+                r = await client.request(scenario.method, path, **kwargs)
+                await r.aread()
+                status = str(r.status_code)
+                if r.status_code >= 500:
+                    result.errors += 1
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                result.errors += 1
+            result.latencies.append(time.perf_counter() - start)
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run_all(base_url: str, scenarios: list, requests: int, concurrency: int, warmup: int, timeout: float) -> list:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        summaries = []
+        for scenario in scenarios:
+            count = max(1, int(requests * scenario.weight))
+            if warmup and scenario.kind == "lecture":
+                await run_scenario(client, scenario, warmup, 1)
+            summary = (await run_scenario(client, scenario, count, concurrency)).summary()
+            summaries.append(summary)
+            print(
+                f"{scenario.method:<6} {scenario.route:<32} {summary['requests']:>5} req "
+                f"{summary['throughput_rps']:>8.1f} req/s  p50 {summary['p50_ms']:>8.1f}  "
+                f"p95 {summary['p95_ms']:>8.1f}  p99 {summary['p99_ms']:>8.1f} ms  erreurs {summary['errors']}"
+            )
+        return summaries
+
+
+# ======================
+# 🧪 ENVIRONNEMENT LOCAL (--start)
+# ======================
+
+def _wait_ready(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API non disponible après {timeout:.0f} s : {url}")
+
+
+class LocalEnvironment:
+    """Données synthétiques + doublures Fuseki/Ollama + uvicorn dans un répertoire de travail"""
+
+    def __init__(self, triples: int, port: int, workdir: str = None, env: dict = None,
+                 fuseki_latency: float = 0.0, tokens_per_second: float = 30.0):
+        self.triples = triples
+        self.port = port
+        self.workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+        self.env = env or {}
+        self.fuseki_latency = fuseki_latency
+        self.tokens_per_second = tokens_per_second
+        self.fuseki = self.ollama = self.server = None
+
+    def __enter__(self):
+        from benchmarks.generate import write_dataset
+        from benchmarks.standins import OllamaStandin, SparqlStandin
+
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        data_path = os.path.join(self.workdir, f"donnees_{self.triples}.nt")
+        if not os.path.exists(data_path):
+            write_dataset(data_path, self.triples)
+        # app.py vise localhost:3030 et localhost:11434
+        self.fuseki = SparqlStandin(port=3030, latency=self.fuseki_latency)
+        self.fuseki.load(os.path.join(backend, "mobilite_principal.rdf"))
+        loaded = self.fuseki.load(data_path)
+        self.fuseki.start()
+        self.ollama = OllamaStandin(port=11434, tokens_per_second=self.tokens_per_second)
+        self.ollama.start()
+        print(f"🧪 {loaded} triples chargés dans Fuseki simulé ({self.workdir})")
+
+        env = {**os.environ, "REASONING_ENABLED": "0", "FUSEKI_SYNC_INTERVAL": "0", "LOG_LEVEL": "WARNING", **self.env}
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(self.port), "--app-dir", backend,
+             "--log-level", "warning"],
+            cwd=self.workdir, env=env,
+        )
+        _wait_ready(f"http://127.0.0.1:{self.port}/")
+        # Attend la fin de la synchronisation initiale Fuseki → local (hors mesures)
+        httpx.post(f"http://127.0.0.1:{self.port}/sync/", timeout=None)
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        if self.server is not None:
+            self.server.terminate()
+            try:
+                self.server.wait(30)
+            except subprocess.TimeoutExpired:
+                self.server.kill()
+        for standin in (self.fuseki, self.ollama):
+            if standin is not None:
+                standin.close()
+
+
+def compare(summaries: list, baseline_path: str):
+    """Écart de p95 et de débit par rapport à une exécution précédente"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["method"], r["route"], r["kind"]): r for r in json.load(f)["routes"]}
+    print(f"\n📊 Comparaison avec {baseline_path}")
+    for summary in summaries:
+        before = baseline.get((summary["method"], summary["route"], summary["kind"]))
+        if before is None or not before["p95_ms"]:
+            continue
+        delta = (summary["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        print(
+            f"{summary['method']:<6} {summary['route']:<32} p95 {before['p95_ms']:>8.1f} → {summary['p95_ms']:>8.1f} ms "
+            f"({delta:+.0f} %)  débit {before['throughput_rps']:.1f} → {summary['throughput_rps']:.1f} req/s"
+        )
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et latences p50/p95/p99 par route de l'API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API déjà démarrée")
+    parser.add_argument("--start", action="store_true", help="démarre données, doublures et uvicorn en local")
+    parser.add_argument("--triples", type=int, default=100000, help="volume du jeu synthétique (--start)")
+    parser.add_argument("--port", type=int, default=8765, help="port d'uvicorn (--start)")
+    parser.add_argument("--workdir", help="répertoire de travail (--start)")
+    parser.add_argument("--fuseki-latency", type=float, default=0.0, help="latence simulée par requête Fuseki (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0, help="débit simulé d'Ollama")
+    parser.add_argument("--env", action="append", default=[], metavar="NOM=VALEUR", help="variable pour l'API (--start)")
+    parser.add_argument("--requests", type=int, default=200, help="requêtes par route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="requêtes d'échauffement par route de lecture")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--routes", help="expression régulière sur les routes à jouer")
+    parser.add_argument("--skip-writes", action="store_true", help="ignore les routes d'écriture et d'administration")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats JSON d'une exécution précédente à comparer")
+    args = parser.parse_args()
+
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    declared = app_routes(app_path)
+    missing = sorted(declared - {(s.method, s.route) for s in SCENARIOS})
+    if missing:
+        print("⚠️ Routes sans scénario : " + ", ".join(f"{m} {r}" for m, r in missing))
+
+    scenarios = [s for s in SCENARIOS if not args.routes or re.search(args.routes, s.route)]
+    if args.skip_writes:
+        scenarios = [s for s in scenarios if s.kind.startswith("lecture")]
+
+    async def run(url):
+        return await run_all(url, scenarios, args.requests, args.concurrency, args.warmup, args.timeout)
+
+    if args.start:
+        env = dict(item.split("=", 1) for item in args.env)
+        with LocalEnvironment(args.triples, args.port, args.workdir, env, args.fuseki_latency, args.tokens_per_second) as local:
+            summaries = asyncio.run(run(local.url))
+            url = local.url
+    else:
+        summaries = asyncio.run(run(args.url))
+        url = args.url
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "url": url,
+            "local_environment": args.start,
+            "triples": args.triples if args.start else None,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "env": args.env,
+            "routes_without_scenario": [f"{m} {r}" for m, r in missing],
+        },
+        "routes": summaries,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Résultats écrits dans {args.output}")
+    if args.baseline:
+        compare(summaries, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# prompt_schema.py
+import argparse
+import json
+import statistics
+import sys
+import uuid
+
+import httpx
+from rdflib import Graph
+
+from benchmarks.subclass_values import MOBILITE
+from ontology_schema import OntologySchema, collect_schema
+from sparql_prompt import build_prompt
+
+# ======================
+# 📏 TAILLE DU PROMPT : SCHÉMA COMPLET vs TERMES SÉLECTIONNÉS
+# ======================
+#
+# Construit le prompt de chaque question d'un jeu fixe avec le schéma complet,
+# puis avec le contexte sélectionné pour la question. Mesure la taille des deux
+# prompts et le rappel des termes attendus (classes et propriétés dont la requête
+# a besoin) : un terme absent du contexte est une perte de précision probable.
+#
+#   python -m benchmarks.prompt_schema
+#   python -m benchmarks.prompt_schema --ollama http://localhost:11434   # tokens exacts
+#
+# Sans --ollama, les tokens sont estimés (4 caractères par token). Avec --ollama,
+# chaque prompt est évalué une fois (num_predict 1) derrière une ligne unique qui
+# empêche la réutilisation du cache : prompt_eval_count est le compte complet.
+
+QUESTIONS = [
+    ("Liste toutes les personnes", ["Personne", "nom", "prenom"]),
+    ("Combien de conducteurs y a-t-il ?", ["Conducteur"]),
+    ("Trouve les conducteurs avec un permis de catégorie B", ["Conducteur", "categoriePermis"]),
+    ("Combien d'avis positifs y a-t-il ?", ["AvisPositif"]),
+    ("Quels sont les avis avec une note supérieure à 4 ?", ["Avis", "note"]),
+    ("Quel est le prix moyen des tickets de bus ?", ["TicketBus", "prix"]),
+    ("Quelles stations de recharge sont disponibles ?", ["StationRecharge", "disponible"]),
+    ("Quels trajets durent plus d'une heure ?", ["Trajet", "duree"]),
+    ("Quelle est la date de naissance des piétons ?", ["Pieton", "dateNaissance"]),
+    ("Liste les voitures de marque Renault", ["Voiture", "marque"]),
+    ("Quels utilisateurs ont donné un avis négatif ?", ["Personne", "donneAvis", "AvisNegatif"]),
+    ("Quelle est la distance moyenne des trajets optimaux ?", ["TrajetOptimal", "distance"]),
+    ("Combien d'accidents ont été recensés ?", ["Accident"]),
+    ("Quels parkings ont une capacité d'accueil supérieure à 100 ?", ["Parking", "capaciteAccueil"]),
+    ("Quels conducteurs effectuent des trajets courts ?", ["Conducteur", "effectueTrajet", "TrajetCourt"]),
+    ("Quelle est l'adresse des bâtiments ?", ["Batiment", "adresse"]),
+    ("Quelles sont les émissions de CO2 des trajets ?", ["Trajet", "emissionsCO2"]),
+    ("Quels tickets de métro sont expirés ?", ["TicketMetro", "dateExpiration"]),
+    ("Quel est l'email des voyageurs ?", ["Voyageur", "email"]),
+    ("Quelles statistiques de pollution sont disponibles ?", ["StatistiquesPollution"]),
+]
+
+
+def mentioned(context: str, name: str) -> bool:
+    return any(token.strip(" ,;()«»:") == name for token in context.replace("\n", " ").split())
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def ollama_tokens(client: httpx.Client, url: str, model: str, prompt: str) -> int:
+    r = client.post(f"{url.rstrip('/')}/api/generate", json={
+        "model": model, "prompt": f"{uuid.uuid4().hex}\n{prompt}", "stream": False, "options": {"num_predict": 1},
+    })
+    r.raise_for_status()
+    return r.json()["prompt_eval_count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Taille du prompt : schéma complet vs termes sélectionnés")
+    parser.add_argument("--ontology", default="mobilite_principal.rdf")
+    parser.add_argument("--data", help="instances (N-Triples) pour observer domaines et portées")
+    parser.add_argument("--ollama", help="URL d'Ollama pour compter les tokens exacts")
+    parser.add_argument("--model", default="codellama:7b")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    graph = Graph().parse(args.ontology)
+    if args.data:
+        graph.parse(args.data, format="nt")
+    schema = OntologySchema(MOBILITE, lambda: collect_schema(graph))
+    full = schema.full_context()
+
+    count = estimate_tokens
+    client = None
+    if args.ollama:
+        client = httpx.Client(timeout=None)
+
+        def count(prompt):
+            return ollama_tokens(client, args.ollama, args.model, prompt)
+
+    rows = []
+    for question, expected in QUESTIONS:
+        context = schema.context(question)
+        before = count(build_prompt(question, full))
+        after = count(build_prompt(question, context))
+        missing = [name for name in expected if not mentioned(context, name)]
+        rows.append({
+            "question": question,
+            "tokens_full": before,
+            "tokens_selected": after,
+            "reduction_pct": round((1 - after / before) * 100, 1),
+            "context_tokens_selected": estimate_tokens(context),
+            "expected": len(expected),
+            "missing": missing,
+        })
+        flag = "✅" if not missing else f"⚠️ manque {', '.join(missing)}"
+        print(f"{before:>6} → {after:>5} tokens  {flag:<30} {question}")
+
+    expected = sum(r["expected"] for r in rows)
+    found = expected - sum(len(r["missing"]) for r in rows)
+    summary = {
+        "questions": len(rows),
+        "token_source": "ollama" if args.ollama else "estimation (4 caractères/token)",
+        "tokens_full_mean": round(statistics.mean(r["tokens_full"] for r in rows), 1),
+        "tokens_selected_mean": round(statistics.mean(r["tokens_selected"] for r in rows), 1),
+        "reduction_mean_pct": round(statistics.mean(r["reduction_pct"] for r in rows), 1),
+        "context_tokens_full": estimate_tokens(full),
+        "context_tokens_selected_mean": round(statistics.mean(r["context_tokens_selected"] for r in rows), 1),
+        "expected_terms_recall": round(found / expected, 3),
+    }
+    print(
+        f"\n📏 {summary['tokens_full_mean']:.0f} → {summary['tokens_selected_mean']:.0f} tokens par prompt en moyenne "
+        f"(−{summary['reduction_mean_pct']:.0f} %), rappel des termes attendus : {found}/{expected}"
+    )
+    print(
+        f"   contexte ontologique seul : {summary['context_tokens_full']} → "
+        f"{summary['context_tokens_selected_mean']:.0f} tokens estimés"
+    )
+    if client is not None:
+        client.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "questions": rows}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Résultats écrits dans {args.output}")
+    if found < expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
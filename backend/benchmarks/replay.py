@@ -0,0 +1,222 @@
+# replay.py
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.load import percentile
+from workload import log_files, query_shape, read_workload, shape_id
+
+# ======================
+# ⏯️ REJEU D'UNE CHARGE ENREGISTRÉE
+# ======================
+#
+# Relit le journal de WORKLOAD_LOG_PATH (fichiers tournants compris) et rejoue
+# les requêtes contre un endpoint SPARQL, au rythme d'origine (--speed 1), accéléré
+# (--speed 4) ou au plus vite (--speed 0). Les latences sont comparées à celles
+# enregistrées, par forme de requête (constantes retirées) :
+#
+#   python -m benchmarks.replay workload.jsonl --endpoint http://localhost:3030/smartcity
+#   python -m benchmarks.replay workload.jsonl --endpoint ... --fail-above 25   # CI
+#
+# Les UPDATE ne sont rejoués qu'avec --updates (endpoint de test !) et les
+# questions /ask/ qu'avec --api (URL de l'API à tester).
+
+SPARQL_JSON = "application/sparql-results+json"
+SPARQL_TSV = "text/tab-separated-values"
+
+
+async def execute(client: httpx.AsyncClient, entry: dict, args) -> tuple:
+    """(durée en s, nombre de lignes ou None, erreur ou None)"""
+    kind, text = entry["k"], entry["q"]
+    start = time.perf_counter()
+    try:
+        if kind == "update":
+            r = await client.post(args.update_url, data={"update": text})
+            size = None
+        elif kind == "ask":
+            r = await client.post(args.api.rstrip("/") + "/ask/", json={"question": text})
+            size = r.json().get("count") if r.is_success else None
+        elif kind == "select_rows":
+            r = await client.post(args.query_url, data={"query": text}, headers={"Accept": SPARQL_TSV})
+            size = max(0, sum(1 for line in r.text.splitlines() if line) - 1)
+        else:
+            # select, et local_select (SELECT évalué localement par l'API d'origine)
+            r = await client.post(args.query_url, data={"query": text}, headers={"Accept": SPARQL_JSON})
+            body = r.json() if r.is_success else {}
+            size = len(body["results"]["bindings"]) if "results" in body else (1 if "boolean" in body else None)
+        elapsed = time.perf_counter() - start
+        if r.is_error:
+            return elapsed, None, f"HTTP {r.status_code}"
+        return elapsed, size, None
+    except (httpx.HTTPError, ValueError) as e:
+        return time.perf_counter() - start, None, type(e).__name__
+
+
+async def replay(entries: list, args) -> list:
+    """Rejoue les entrées en respectant leurs écarts d'origine divisés par --speed"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = [None] * len(entries)
+    origin = entries[0]["t"] if entries else 0.0
+    started = time.monotonic()
+
+    async def run(i: int, entry: dict, client: httpx.AsyncClient):
+        async with semaphore:
+            results[i] = await execute(client, entry, args)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        for i, entry in enumerate(entries):
+            if args.speed > 0:
+                delay = (entry["t"] - origin) / args.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                # Au plus vite : pas plus de tâches en vol que de connexions
+                await semaphore.acquire()
+                semaphore.release()
+            tasks.append(asyncio.create_task(run(i, entry, client)))
+            if (i + 1) % 1000 == 0:
+                print(f"   … {i + 1}/{len(entries)} requêtes lancées")
+        await asyncio.gather(*tasks)
+    return results
+
+
+def compare(entries: list, results: list, min_count: int) -> list:
+    """Latences d'origine et rejouées par (type, forme de requête)"""
+    groups = defaultdict(lambda: {"before": [], "after": [], "errors": 0, "size_mismatches": 0})
+    shapes = {}
+    for entry, (elapsed, size, error) in zip(entries, results):
+        shape = query_shape(entry["q"])
+        key = (entry["k"], shape_id(shape))
+        shapes[key] = shape
+        group = groups[key]
+        if entry.get("e"):
+            # Exécution d'origine en erreur : durée non comparable
+            continue
+        group["before"].append(entry["d"])
+        if error is not None:
+            group["errors"] += 1
+            continue
+        group["after"].append(elapsed * 1000)
+        if "n" in entry and size is not None and size != entry["n"]:
+            group["size_mismatches"] += 1
+
+    report = []
+    for (kind, sid), group in groups.items():
+        before, after = sorted(group["before"]), sorted(group["after"])
+        if not before:
+            continue
+        row = {
+            "kind": kind,
+            "shape_id": sid,
+            "shape": shapes[(kind, sid)],
+            "count": len(before),
+            "errors": group["errors"],
+            "size_mismatches": group["size_mismatches"],
+            "before_p50_ms": round(percentile(before, 50), 2),
+            "before_p95_ms": round(percentile(before, 95), 2),
+            "after_p50_ms": round(percentile(after, 50), 2) if after else None,
+            "after_p95_ms": round(percentile(after, 95), 2) if after else None,
+        }
+        row["p95_change_pct"] = (
+            round((row["after_p95_ms"] - row["before_p95_ms"]) / row["before_p95_ms"] * 100, 1)
+            if after and row["before_p95_ms"] else None
+        )
+        row["significant"] = row["count"] >= min_count
+        report.append(row)
+    report.sort(key=lambda r: (r["p95_change_pct"] is None, -(r["p95_change_pct"] or 0)))
+    return report
+
+
+def print_report(report: list, top: int):
+    print(f"\n{'type':<13}{'forme':<12}{'n':>6}{'p95 avant':>12}{'p95 après':>12}{'écart':>9}{'err':>6}  requête")
+    for row in report[:top]:
+        change = f"{row['p95_change_pct']:+.0f} %" if row["p95_change_pct"] is not None else "—"
+        after = f"{row['after_p95_ms']:.1f}" if row["after_p95_ms"] is not None else "—"
+        print(
+            f"{row['kind']:<13}{row['shape_id']:<12}{row['count']:>6}{row['before_p95_ms']:>12.1f}{after:>12}"
+            f"{change:>9}{row['errors']:>6}  {row['shape'][:70]}"
+        )
+    if len(report) > top:
+        print(f"   … {len(report) - top} autres formes (voir --output)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue une charge enregistrée (WORKLOAD_LOG_PATH) et compare les latences")
+    parser.add_argument("log", help="journal de charge (les fichiers tournants <log>.N sont inclus)")
+    parser.add_argument("--endpoint", default="http://localhost:3030/smartcity", help="dataset SPARQL cible")
+    parser.add_argument("--query-url", help="endpoint de requête (défaut : <endpoint>/query)")
+    parser.add_argument("--update-url", help="endpoint de mise à jour (défaut : <endpoint>/update)")
+    parser.add_argument("--api", help="URL de l'API pour rejouer les questions /ask/")
+    parser.add_argument("--updates", action="store_true", help="rejoue aussi les UPDATE (modifie la cible)")
+    parser.add_argument("--speed", type=float, default=1.0, help="facteur de vitesse (1 = rythme d'origine, 0 = au plus vite)")
+    parser.add_argument("--concurrency", type=int, default=32, help="requêtes simultanées au maximum")
+    parser.add_argument("--limit", type=int, help="nombre maximal de requêtes rejouées")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--min-count", type=int, default=5, help="exécutions minimales pour juger une forme")
+    parser.add_argument("--fail-above", type=float, help="code de sortie 1 si une forme régresse de plus de N %% (p95)")
+    parser.add_argument("--top", type=int, default=20, help="formes affichées")
+    parser.add_argument("--output", help="fichier JSON du rapport")
+    args = parser.parse_args()
+    args.query_url = args.query_url or args.endpoint.rstrip("/") + "/query"
+    args.update_url = args.update_url or args.endpoint.rstrip("/") + "/update"
+
+    kinds = {"select", "select_rows", "local_select"}
+    if args.updates:
+        kinds.add("update")
+    if args.api:
+        kinds.add("ask")
+    paths = log_files(args.log)
+    if not paths:
+        sys.exit(f"❌ Journal introuvable : {args.log}")
+    entries = [e for e in read_workload(paths) if e["k"] in kinds]
+    entries.sort(key=lambda e: e["t"])
+    if args.limit:
+        entries = entries[: args.limit]
+    if not entries:
+        sys.exit("❌ Aucune requête à rejouer")
+
+    span = entries[-1]["t"] - entries[0]["t"]
+    print(f"⏯️ {len(entries)} requêtes ({len(paths)} fichier(s), {span:.0f} s enregistrées) → {args.query_url}")
+    started = time.perf_counter()
+    results = asyncio.run(replay(entries, args))
+    elapsed = time.perf_counter() - started
+    report = compare(entries, results, args.min_count)
+    print(f"✅ Rejoué en {elapsed:.1f} s ({len(entries) / elapsed:.1f} req/s), {len(report)} formes de requêtes")
+    print_report(report, args.top)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "log_files": paths,
+                    "query_url": args.query_url,
+                    "speed": args.speed,
+                    "concurrency": args.concurrency,
+                    "requests": len(entries),
+                    "recorded_span_s": round(span, 1),
+                    "replay_duration_s": round(elapsed, 1),
+                },
+                "shapes": report,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"💾 Rapport écrit dans {args.output}")
+
+    if args.fail_above is not None:
+        regressions = [
+            r for r in report
+            if r["significant"] and r["p95_change_pct"] is not None and r["p95_change_pct"] > args.fail_above
+        ]
+        if regressions:
+            print(f"❌ {len(regressions)} forme(s) en régression de plus de {args.fail_above:.0f} % (p95)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
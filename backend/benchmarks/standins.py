@@ -0,0 +1,462 @@
+# standins.py
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from rdflib import Dataset, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.plugins.serializers.nt import _quoteLiteral
+from rdflib.plugins.sparql.parser import parseUpdate
+from rdflib.plugins.sparql.algebra import translateUpdate
+from rdflib.plugins.sparql.sparql import Update
+from rdflib.plugins.sparql.update import evalUpdate
+from rdflib.term import Literal
+
+from benchmarks.subclass_values import MOBILITE
+
+# ======================
+# 🎭 DOUBLURES LOCALES DE FUSEKI ET D'OLLAMA
+# ======================
+#
+# Serveurs HTTP dans le processus (un thread chacun) pour mesurer l'API sans
+# Fuseki ni GPU :
+#
+#   SparqlStandin : SPARQL 1.1 Protocol (query / update / Graph Store /data)
+#                   sur un Dataset rdflib, mêmes URL que Fuseki (/smartcity/...)
+#   OllamaStandin : POST /api/generate scripté (réponse JSON ou flux NDJSON),
+#                   latence simulée = évaluation du prompt + tokens / débit
+#
+#   python -m benchmarks.standins --data donnees.nt.gz
+#
+# app.py vise localhost:3030 et localhost:11434 : ce sont les ports par défaut.
+# Le Dataset rdflib tient en mémoire ; au-delà de quelques millions de triples,
+# utiliser un vrai Fuseki chargé avec le fichier du générateur. Le moteur SPARQL
+# de rdflib est aussi lent sur certaines formes (VALUES + OPTIONAL des pages
+# ?limit=) : comparer des exécutions entre elles, pas à un Fuseki réel.
+
+RDF_FORMATS = {
+    "text/turtle": "turtle",
+    "application/n-triples": "nt",
+    "application/rdf+xml": "xml",
+    "application/ld+json": "json-ld",
+    "application/n-quads": "nquads",
+}
+
+
+def _tsv_term(term) -> str:
+    """Terme en syntaxe N-Triples (format TSV des résultats SPARQL)"""
+    if term is None:
+        return ""
+    if isinstance(term, Literal):
+        return _quoteLiteral(term)
+    return term.n3()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/plain; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # File d'attente du listen() : 5 par défaut, trop peu pour un pool de connexions
+    request_queue_size = 128
+
+
+class _Standin:
+    """Serveur HTTP en arrière-plan ; port 0 = port libre choisi par le système"""
+
+    handler = _Handler
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        handler = type(self.handler.__name__, (self.handler,), {"standin": self})
+        self._httpd = _Server((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# ======================
+# 🗄️ DOUBLURE FUSEKI (SPARQL 1.1)
+# ======================
+
+class _SparqlHandler(_Handler):
+
+    def _route(self):
+        path = urlparse(self.path).path
+        if path == "/$/ping":
+            return "ping"
+        prefix = f"/{self.standin.dataset_name}/"
+        return path[len(prefix):] if path.startswith(prefix) else None
+
+    def do_GET(self):
+        route = self._route()
+        params = parse_qs(urlparse(self.path).query)
+        if route == "ping":
+            return self._send(200, b"ok")
+        if route in ("sparql", "query") and "query" in params:
+            return self._query(params["query"][0])
+        if route == "data":
+            return self._get_graph(params)
+        self._send(404)
+
+    def do_POST(self):
+        route = self._route()
+        params = parse_qs(urlparse(self.path).query)
+        body = self._body()
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if route == "data":
+            return self._post_graph(params, body, content_type)
+        if content_type == "application/sparql-query":
+            return self._query(body.decode("utf-8"))
+        if content_type == "application/sparql-update":
+            return self._update(body.decode("utf-8"))
+        form = parse_qs(body.decode("utf-8"))
+        if route in ("sparql", "query") and "query" in form:
+            return self._query(form["query"][0])
+        if route in ("sparql", "update") and "update" in form:
+            return self._update(form["update"][0])
+        self._send(400, b"Requete SPARQL absente")
+
+    def _query(self, query: str):
+        standin = self.standin
+        standin.delay()
+        try:
+            result = standin.query(query)
+        except Exception as e:
+            standin.errors += 1
+            return self._send(400, f"Erreur de requete : {e}".encode("utf-8"))
+        accept = self.headers.get("Accept", "")
+        if result.type in ("CONSTRUCT", "DESCRIBE"):
+            return self._send(200, result.graph.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+        if "tab-separated-values" in accept and result.type == "SELECT":
+            lines = ["\t".join(f"?{var}" for var in result.vars)]
+            lines.extend("\t".join(_tsv_term(term) for term in row) for row in result)
+            body = ("\n".join(lines) + "\n").encode("utf-8")
+            return self._send(200, body, "text/tab-separated-values; charset=utf-8")
+        self._send(200, result.serialize(format="json"), "application/sparql-results+json")
+
+    def _update(self, update: str):
+        standin = self.standin
+        standin.delay()
+        try:
+            standin.update(update)
+        except Exception as e:
+            standin.errors += 1
+            return self._send(400, f"Erreur de mise a jour : {e}".encode("utf-8"))
+        self._send(204)
+
+    def _graph_name(self, params):
+        name = params.get("graph", ["default"])[0]
+        return None if name == "default" or "default" in params else URIRef(name)
+
+    def _get_graph(self, params):
+        graph = self.standin.graph(self._graph_name(params))
+        with self.standin.lock:
+            body = graph.serialize(format="nt", encoding="utf-8")
+        self._send(200, body, "application/n-triples")
+
+    def _post_graph(self, params, body: bytes, content_type: str):
+        fmt = RDF_FORMATS.get(content_type)
+        if fmt is None:
+            return self._send(415, f"Format non pris en charge : {content_type}".encode("utf-8"))
+        self.standin.delay()
+        try:
+            self.standin.load_data(body, fmt, self._graph_name(params))
+        except Exception as e:
+            self.standin.errors += 1
+            return self._send(400, f"Donnees RDF invalides : {e}".encode("utf-8"))
+        self._send(200, b"{}", "application/json")
+
+
+class SparqlStandin(_Standin):
+    """Point d'accès SPARQL 1.1 sur un Dataset rdflib (graphe par défaut + graphes nommés)"""
+
+    handler = _SparqlHandler
+
+    def __init__(self, dataset_name: str = "smartcity", host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        super().__init__(host, port)
+        self.dataset_name = dataset_name
+        # Latence réseau/serveur ajoutée à chaque requête (secondes)
+        self.latency = latency
+        self.dataset = Dataset()
+        # Le Dataset rdflib n'autorise pas lecture et écriture concurrentes
+        self.lock = threading.RLock()
+        self.queries = 0
+        self.updates = 0
+        self.errors = 0
+
+    @property
+    def sparql_url(self) -> str:
+        return f"{self.url}/{self.dataset_name}/sparql"
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def graph(self, name=None):
+        return self.dataset.graph(name if name is not None else DATASET_DEFAULT_GRAPH_ID)
+
+    def load(self, path: str, fmt: str = None, graph=None) -> int:
+        """Charge un fichier (N-Triples éventuellement gzip, Turtle, RDF/XML) dans le graphe par défaut"""
+        target = self.graph(graph)
+        if fmt is None:
+            fmt = "nt" if ".nt" in path else None
+        with self.lock:
+            if path.endswith(".gz"):
+                with gzip.open(path, "rb") as f:
+                    target.parse(f, format=fmt)
+            else:
+                target.parse(path, format=fmt)
+            return len(target)
+
+    def load_data(self, data: bytes, fmt: str, graph=None):
+        with self.lock:
+            self.graph(graph).parse(data=data, format=fmt)
+
+    def query(self, query: str):
+        with self.lock:
+            self.queries += 1
+            result = self.dataset.query(query)
+            # Résultat matérialisé sous le verrou (l'évaluation de rdflib est paresseuse)
+            if result.type == "SELECT":
+                result.bindings = list(result.bindings)
+            return result
+
+    def update(self, update: str):
+        """
+        Exécute une requête UPDATE opération par opération. INSERT DATA et DELETE
+        DATA sont appliqués directement : rdflib ne sait pas les évaluer sur le
+        graphe par défaut d'un Dataset.
+        """
+        parsed = translateUpdate(parseUpdate(update))
+        with self.lock:
+            self.updates += 1
+            for op in parsed.algebra:
+                if op.name in ("InsertData", "DeleteData"):
+                    change = "add" if op.name == "InsertData" else "remove"
+                    default = self.graph()
+                    for triple in op.triples or ():
+                        getattr(default, change)(triple)
+                    for name, triples in (op.quads or {}).items():
+                        named = self.graph(name)
+                        for triple in triples:
+                            getattr(named, change)(triple)
+                else:
+                    evalUpdate(self.dataset, Update(parsed.prologue, [op]))
+
+    def stats(self) -> dict:
+        with self.lock:
+            triples = len(self.graph())
+        return {"triples": triples, "queries": self.queries, "updates": self.updates, "errors": self.errors}
+
+
+# ======================
+# 🦙 DOUBLURE OLLAMA (/api/generate SCRIPTÉ)
+# ======================
+
+_QUESTION = re.compile(r'QUESTION À TRADUIRE\s*:\s*"(.*)"', re.S)
+
+# Réponses par défaut : premier motif trouvé dans la question -> requête
+DEFAULT_SCRIPT = [
+    (r"combien.*conducteur", "SELECT (COUNT(?c) AS ?nombre) WHERE { ?c a mobilite:Conducteur . }"),
+    (r"combien.*avis", "SELECT (COUNT(?a) AS ?nombre) WHERE { ?a a ?type . ?type rdfs:subClassOf* mobilite:Avis . }"),
+    (r"conducteur", "SELECT ?conducteur ?nom ?prenom WHERE { ?conducteur a mobilite:Conducteur ; mobilite:nom ?nom ; mobilite:prenom ?prenom . }"),
+    (r"avis", "SELECT ?avis ?commentaire ?note WHERE { ?avis mobilite:commentaire ?commentaire ; mobilite:note ?note . }"),
+    (r"trajet", "SELECT ?trajet ?distance ?duree WHERE { ?trajet mobilite:distance ?distance ; mobilite:duree ?duree . }"),
+    (r"ticket", "SELECT ?ticket ?prix WHERE { ?ticket mobilite:prix ?prix . }"),
+    (r"v[ée]hicule|voiture|bus", "SELECT ?vehicule ?marque ?modele WHERE { ?vehicule mobilite:marque ?marque ; mobilite:modele ?modele . }"),
+    (r"", "SELECT ?personne ?nom WHERE { ?personne a mobilite:Personne ; mobilite:nom ?nom . }"),
+]
+
+
+class _OllamaHandler(_Handler):
+
+    def do_GET(self):
+        if urlparse(self.path).path in ("/", "/api/version"):
+            return self._send(200, b'{"version": "standin"}', "application/json")
+        self._send(404)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/api/generate":
+            return self._send(404)
+        try:
+            request = json.loads(self._body() or b"{}")
+        except ValueError:
+            return self._send(400, b'{"error": "JSON invalide"}', "application/json")
+        standin = self.standin
+        if not request.get("prompt"):
+            # Prompt vide : chargement du modèle seul (keep_alive)
+            body = {"model": request.get("model", "standin"), "response": "", "done": True, "done_reason": "load"}
+            return self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+        response = standin.respond(request.get("prompt", ""))
+        timings = standin.timings(request, response)
+        final = {"model": request.get("model", "standin"), "done": True, "context": [1, 2, 3], **timings}
+
+        if not request.get("stream", True):
+            time.sleep(timings["total_duration"] / 1e9)
+            body = json.dumps({**final, "response": response}).encode("utf-8")
+            return self._send(200, body, "application/json")
+
+        # Flux NDJSON : premier token après l'évaluation du prompt, puis au débit simulé
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(timings["prompt_eval_duration"] / 1e9)
+        tokens = standin.tokens(response)
+        per_token = 1 / standin.tokens_per_second if standin.tokens_per_second else 0
+        try:
+            for token in tokens:
+                self._chunk({"model": final["model"], "response": token, "done": False})
+                time.sleep(per_token)
+            self._chunk({**final, "response": ""})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti (génération annulée)
+            standin.cancelled += 1
+
+    def _chunk(self, payload: dict):
+        line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+class OllamaStandin(_Standin):
+    """Réponses SPARQL scriptées, latence proportionnelle au prompt et aux tokens générés"""
+
+    handler = _OllamaHandler
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        script=None,
+        prompt_tokens_per_second: float = 2000.0,
+        tokens_per_second: float = 30.0,
+        load_latency: float = 0.0,
+        chatter: bool = True,
+    ):
+        super().__init__(host, port)
+        self.script = [(re.compile(pattern, re.I), query) for pattern, query in (script or DEFAULT_SCRIPT)]
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.tokens_per_second = tokens_per_second
+        self.load_latency = load_latency
+        # Texte autour de la requête, comme le ferait un modèle bavard
+        self.chatter = chatter
+        self.requests = 0
+        self.cancelled = 0
+        # Dernier prompt évalué : comme le runner d'Ollama, seul ce qui suit le
+        # préfixe commun est réévalué
+        self._cached_prompt = ""
+
+    def respond(self, prompt: str) -> str:
+        self.requests += 1
+        m = _QUESTION.search(prompt)
+        question = m.group(1) if m else prompt
+        for pattern, query in self.script:
+            if pattern.search(question):
+                break
+        sparql = f"PREFIX mobilite: <{MOBILITE}>\n{query}"
+        if self.chatter:
+            return f"Voici la requête SPARQL :\n```sparql\n{sparql}\n```\nNote: cette requête liste les résultats demandés."
+        return sparql
+
+    @staticmethod
+    def tokens(text: str) -> list:
+        # ~4 caractères par token, ordre de grandeur des tokenizers BPE
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def timings(self, request: dict, response: str) -> dict:
+        """Champs de comptage et durées (ns) au format des réponses Ollama"""
+        prompt = request.get("prompt", "")
+        common = len(os.path.commonprefix([prompt, self._cached_prompt]))
+        self._cached_prompt = prompt
+        prompt_tokens = max(1, (len(prompt) - common) // 4)
+        eval_tokens = len(self.tokens(response))
+        prompt_s = prompt_tokens / self.prompt_tokens_per_second if self.prompt_tokens_per_second else 0
+        eval_s = eval_tokens / self.tokens_per_second if self.tokens_per_second else 0
+        return {
+            "total_duration": int((self.load_latency + prompt_s + eval_s) * 1e9),
+            "load_duration": int(self.load_latency * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_s * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(eval_s * 1e9),
+        }
+
+
+def load_script(path: str) -> list:
+    """Script JSON : [{"match": "regex sur la question", "query": "SELECT ..."}]"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [(entry["match"], entry["query"]) for entry in json.load(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Doublures locales de Fuseki et d'Ollama")
+    parser.add_argument("--data", help="données chargées dans le graphe par défaut (N-Triples, .gz accepté)")
+    parser.add_argument("--ontology", default="mobilite_principal.rdf")
+    parser.add_argument("--fuseki-port", type=int, default=3030)
+    parser.add_argument("--fuseki-latency", type=float, default=0.0, help="latence ajoutée par requête (s)")
+    parser.add_argument("--ollama-port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--script", help="réponses scriptées (JSON)")
+    args = parser.parse_args()
+
+    fuseki = SparqlStandin(port=args.fuseki_port, latency=args.fuseki_latency)
+    if args.ontology:
+        fuseki.load(args.ontology)
+    if args.data:
+        started = time.perf_counter()
+        triples = fuseki.load(args.data)
+        print(f"📦 {triples} triples chargés en {time.perf_counter() - started:.1f} s")
+    ollama = OllamaStandin(
+        port=args.ollama_port,
+        script=load_script(args.script) if args.script else None,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+    print(f"🗄️ Fuseki simulé : {fuseki.start()}/{fuseki.dataset_name}/sparql")
+    print(f"🦙 Ollama simulé : {ollama.start()}/api/generate")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fuseki.close()
+        ollama.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# subclass_values.py
+import argparse
+import json
+import random
+import statistics
+import time
+
+import httpx
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDF, RDFS, XSD
+
+from class_hierarchy import ClassHierarchy
+
+# ======================
+# ⏱️ BENCHMARK rdfs:subClassOf* vs VALUES
+# ======================
+#
+# Compare les deux formes de requête des endpoints de liste sur un jeu de
+# données synthétique (instances réparties sur la hiérarchie de l'ontologie) :
+#
+#   python -m benchmarks.subclass_values --instances 200000
+#
+# Sans --endpoint, les requêtes sont exécutées en mémoire par rdflib. Pour
+# mesurer Fuseki : générer les données (--dump donnees.nt), les charger dans un
+# dataset de test, puis relancer avec --endpoint http://localhost:3030/test/sparql.
+
+MOBILITE = Namespace("http://www.semanticweb.org/smartcity/ontologies/mobilite#")
+ROOTS = ["Personne", "ReseauTransport", "Infrastructure", "Trajet", "StationRecharge", "Ticket", "Statistiques", "Avis"]
+
+PATH_QUERY = """
+PREFIX mobilite: <{mobilite}>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?id ?type ?nom ?note WHERE {{
+    ?id a ?type .
+    OPTIONAL {{ ?id mobilite:nom ?nom . }}
+    OPTIONAL {{ ?id mobilite:note ?note . }}
+    ?type rdfs:subClassOf* mobilite:{root} .
+}}
+"""
+
+VALUES_QUERY = """
+PREFIX mobilite: <{mobilite}>
+SELECT ?id ?type ?nom ?note WHERE {{
+    {values}
+    ?id a ?type .
+    OPTIONAL {{ ?id mobilite:nom ?nom . }}
+    OPTIONAL {{ ?id mobilite:note ?note . }}
+}}
+"""
+
+
+def synthetic_graph(ontology: Graph, instances: int, seed: int = 42) -> Graph:
+    """Ontologie + `instances` individus typés par une classe tirée au hasard"""
+    rng = random.Random(seed)
+    classes = sorted(set(ontology.subjects(RDFS.subClassOf)) | set(ontology.objects(RDFS.subClassOf)))
+    data = Graph()
+    for triple in ontology:
+        data.add(triple)
+    for i in range(instances):
+        uri = MOBILITE[f"synth_{i}"]
+        data.add((uri, RDF.type, rng.choice(classes)))
+        data.add((uri, MOBILITE.nom, Literal(f"Nom {i}", datatype=XSD.string)))
+        if i % 3 == 0:
+            data.add((uri, MOBILITE.note, Literal(rng.randint(1, 5), datatype=XSD.integer)))
+    return data
+
+
+def _timed(run, query: str, repeat: int):
+    durations, rows = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run(query)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rdfs:subClassOf* vs VALUES")
+    parser.add_argument("--ontology", default="mobilite_principal.rdf")
+    parser.add_argument("--instances", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--endpoint", help="URL SPARQL (Fuseki) ; par défaut rdflib en mémoire")
+    parser.add_argument("--dump", help="écrit le jeu de données synthétique (N-Triples) et s'arrête")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    ontology = Graph().parse(args.ontology)
+    hierarchy = ClassHierarchy(lambda: list(ontology.subject_objects(RDFS.subClassOf)))
+    hierarchy.refresh()
+
+    if args.endpoint:
+        client = httpx.Client(timeout=None)
+
+        def run(query):
+            r = client.post(args.endpoint, data={"query": query}, headers={"Accept": "application/sparql-results+json"})
+            r.raise_for_status()
+            return len(r.json()["results"]["bindings"])
+    else:
+        data = synthetic_graph(ontology, args.instances)
+        if args.dump:
+            data.serialize(args.dump, format="nt", encoding="utf-8")
+            print(f"💾 {len(data)} triples écrits dans {args.dump}")
+            return
+        print(f"📦 Jeu de données synthétique : {len(data)} triples")
+
+        def run(query):
+            return len(data.query(query))
+
+    results = []
+    for root in ROOTS:
+        path_s, path_rows = _timed(run, PATH_QUERY.format(mobilite=MOBILITE, root=root), args.repeat)
+        values = hierarchy.values("?type", MOBILITE[root])
+        values_s, values_rows = _timed(run, VALUES_QUERY.format(mobilite=MOBILITE, values=values), args.repeat)
+        if path_rows != values_rows:
+            print(f"⚠️ {root} : résultats différents ({path_rows} vs {values_rows})")
+        results.append({
+            "classe": root,
+            "lignes": values_rows,
+            "subclassof_s": round(path_s, 4),
+            "values_s": round(values_s, 4),
+            "gain": round(path_s / values_s, 2) if values_s else None,
+        })
+        print(f"{root:<16} {values_rows:>8} lignes  subClassOf* {path_s:8.4f} s  VALUES {values_s:8.4f} s  x{results[-1]['gain']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"instances": args.instances, "endpoint": args.endpoint, "results": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# bulk_upload.py
+import asyncio
+import io
+import re
+import threading
+import time
+
+from rdflib import Graph
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser, r_tail, r_wspace
+from rdflib.plugins.serializers.nt import _nt_row
+
+# ======================
+# 📦 CHARGEMENT RDF EN MASSE (STREAMING)
+# ======================
+#
+# Le fichier est lu au fil de l'eau, sans jamais être chargé entièrement :
+#   - N-Triples / N-Quads : parseur ligne à ligne de rdflib
+#   - RDF/XML             : parseur SAX de rdflib branché sur un graphe « puits »
+#   - Turtle              : découpage en instructions complètes, parsées par blocs
+# Les triples sont regroupés en lots envoyés à Fuseki (Graph Store Protocol, en
+# N-Triples) par quelques tâches concurrentes ; la file bornée entre le parseur
+# et les tâches d'envoi assure la contre-pression.
+#
+# Limite : chaque lot est un document distinct pour Fuseki, les nœuds anonymes
+# étiquetés (_:b1) ne sont donc partagés qu'à l'intérieur d'un même lot.
+
+FORMATS = {
+    "nt": "nt",
+    "ntriples": "nt",
+    "n-triples": "nt",
+    "application/n-triples": "nt",
+    "nq": "nquads",
+    "nquads": "nquads",
+    "n-quads": "nquads",
+    "application/n-quads": "nquads",
+    "ttl": "turtle",
+    "turtle": "turtle",
+    "text/turtle": "turtle",
+    "rdf": "xml",
+    "owl": "xml",
+    "xml": "xml",
+    "rdfxml": "xml",
+    "application/rdf+xml": "xml",
+}
+
+
+class UploadFormatError(ValueError):
+    """Format RDF non reconnu ou non supporté"""
+
+
+def detect_format(filename: str = None, content_type: str = None, explicit: str = None) -> str:
+    """Déduit le format à partir du paramètre explicite, de l'extension ou du Content-Type"""
+    candidates = []
+    if explicit:
+        candidates.append(explicit.lower())
+    if filename and "." in filename:
+        candidates.append(filename.rsplit(".", 1)[-1].lower())
+    if content_type:
+        candidates.append(content_type.split(";")[0].strip().lower())
+    for candidate in candidates:
+        if candidate in FORMATS:
+            return FORMATS[candidate]
+    raise UploadFormatError(f"Format RDF non reconnu (formats acceptés : {sorted(set(FORMATS.values()))})")
+
+
+# ----------------------
+# Regroupement des triples en lots
+# ----------------------
+
+class TripleChunker:
+    """Puits de parseur qui émet des lots de triples par graphe (None = graphe par défaut)"""
+
+    def __init__(self, chunk_size: int, emit):
+        self.chunk_size = chunk_size
+        self.emit = emit
+        self._chunks = {}
+
+    def quad(self, s, p, o, graph_name=None):
+        chunk = self._chunks.setdefault(graph_name, [])
+        chunk.append((s, p, o))
+        if len(chunk) >= self.chunk_size:
+            self.emit(graph_name, chunk)
+            self._chunks[graph_name] = []
+
+    def triple(self, s, p, o):
+        # Interface attendue par W3CNTriplesParser
+        self.quad(s, p, o)
+
+    def flush(self):
+        for graph_name, chunk in self._chunks.items():
+            if chunk:
+                self.emit(graph_name, chunk)
+        self._chunks = {}
+
+
+class _QuadsParser(W3CNTriplesParser):
+    """Parseur N-Quads ligne à ligne qui transmet chaque quad au puits"""
+
+    def parseline(self, bnode_context=None):
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith("#"):
+            return
+        subject = self.subject(bnode_context)
+        self.eat(r_wspace)
+        predicate = self.predicate()
+        self.eat(r_wspace)
+        obj = self.object(bnode_context)
+        self.eat(r_wspace)
+        context = self.uriref() or self.nodeid(bnode_context)
+        self.eat(r_tail)
+        self.sink.quad(subject, predicate, obj, str(context) if context else None)
+
+
+class _XMLSink(Graph):
+    """Graphe « puits » : les triples produits par le parseur RDF/XML ne sont pas stockés"""
+
+    def __init__(self, chunker: TripleChunker):
+        super().__init__()
+        self.chunker = chunker
+
+    def add(self, triple):
+        self.chunker.quad(*triple)
+        return self
+
+
+# ----------------------
+# Découpage Turtle
+# ----------------------
+
+# Caractères qui peuvent changer l'état du découpeur
+_TURTLE_SPECIAL = re.compile(r"[\"'<#\[\]()\.]")
+_DIRECTIVE = re.compile(r"\s*(@prefix|@base|PREFIX|BASE)\b", re.I)
+
+
+def iter_turtle_chunks(text_stream, chunk_bytes: int = 1 << 20, block_size: int = 1 << 16):
+    """Découpe un flux Turtle en documents autonomes (directives + instructions complètes)"""
+    directives = {}
+    pending = ""
+    statements, size = [], 0
+    eof = False
+
+    def header():
+        return "".join(directives.values())
+
+    while not eof:
+        block = text_stream.read(block_size)
+        if not block:
+            eof = True
+        pending += block
+        start = 0
+        while True:
+            end = _statement_end(pending, start, eof)
+            if end is None:
+                break
+            statement = pending[start:end]
+            start = end
+            m = _DIRECTIVE.match(statement)
+            if m:
+                # Une redéfinition ne doit pas s'appliquer aux instructions déjà lues
+                if statements:
+                    yield header() + "".join(statements)
+                    statements, size = [], 0
+                key = re.sub(r"\s+", " ", statement.strip().split("<")[0]).lower().lstrip("@").strip()
+                directives[key] = statement.strip() + "\n"
+            elif statement.strip():
+                statements.append(statement + "\n")
+                size += len(statement)
+                if size >= chunk_bytes:
+                    yield header() + "".join(statements)
+                    statements, size = [], 0
+        pending = pending[start:]
+    if any(s.strip() for s in statements):
+        yield header() + "".join(statements)
+    if pending.strip():
+        raise UploadFormatError("Fin de fichier Turtle inattendue (instruction incomplète)")
+
+
+def _statement_end(text: str, start: int, eof: bool):
+    """Position juste après la fin de la prochaine instruction Turtle, ou None si incomplète"""
+    m = _DIRECTIVE.match(text, start)
+    sparql_style = m is not None and not m.group(1).startswith("@")
+    depth = 0
+    pos = start
+    while True:
+        m = _TURTLE_SPECIAL.search(text, pos)
+        if m is None:
+            return None
+        c = m.group()
+        pos = m.end()
+        if c == "#":
+            nl = text.find("\n", pos)
+            if nl < 0:
+                return len(text) if eof else None
+            pos = nl + 1
+        elif c == "<":
+            close = text.find(">", pos)
+            if close < 0:
+                return None
+            pos = close + 1
+            # PREFIX/BASE (syntaxe SPARQL) se terminent sans point, après l'IRI
+            if sparql_style and depth == 0:
+                return pos
+        elif c in "\"'":
+            if pos + 2 > len(text) and not eof:
+                # Impossible de distinguer "" de """ sans la suite du flux
+                return None
+            triple = text.startswith(c * 3, pos - 1)
+            quote = c * 3 if triple else c
+            i = pos + 2 if triple else pos
+            while True:
+                j = text.find(quote, i)
+                if j < 0:
+                    return None
+                # Guillemet échappé : nombre impair d'antislashs avant lui
+                backslashes = 0
+                while text[j - 1 - backslashes] == "\\":
+                    backslashes += 1
+                if backslashes % 2 == 0:
+                    break
+                i = j + 1
+            pos = j + len(quote)
+        elif c in "[(":
+            depth += 1
+        elif c in "])":
+            depth -= 1
+        elif c == "." and depth == 0:
+            nxt = text[pos:pos + 1]
+            if nxt == "" and not eof:
+                return None
+            # Un point suivi d'un chiffre appartient à un décimal ; suivi d'un
+            # caractère de nom, à un nom préfixé (ex:a.b)
+            if nxt == "" or nxt.isspace() or nxt == "#":
+                return pos
+
+
+# ----------------------
+# Parsing en streaming
+# ----------------------
+
+def stream_triples(binary_stream, fmt: str, chunk_size: int, emit):
+    """Parse le flux et appelle emit(graphe, triples) pour chaque lot (bloquant = contre-pression)"""
+    chunker = TripleChunker(chunk_size, emit)
+    if fmt == "nt":
+        W3CNTriplesParser(sink=chunker).parse(io.TextIOWrapper(binary_stream, encoding="utf-8"), bnode_context={})
+    elif fmt == "nquads":
+        _QuadsParser(sink=chunker).parse(io.TextIOWrapper(binary_stream, encoding="utf-8"), bnode_context={})
+    elif fmt == "xml":
+        _XMLSink(chunker).parse(file=binary_stream, format="xml")
+    elif fmt == "turtle":
+        for document in iter_turtle_chunks(io.TextIOWrapper(binary_stream, encoding="utf-8")):
+            for s, p, o in Graph().parse(data=document, format="turtle"):
+                chunker.quad(s, p, o)
+    else:
+        raise UploadFormatError(f"Format non supporté : {fmt}")
+    chunker.flush()
+
+
+class _CountingReader(io.RawIOBase):
+    """Enveloppe de fichier qui compte les octets lus (progression)"""
+
+    def __init__(self, raw, progress: dict):
+        self.raw = raw
+        self.progress = progress
+
+    @property
+    def name(self):
+        # Utilisé par rdflib comme identifiant de la source (RDF/XML)
+        return getattr(self.raw, "filename", None) or getattr(self.raw, "name", "upload")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.progress["bytes_read"] += n
+        return n
+
+
+async def bulk_load(
+    file,
+    fmt: str,
+    post_chunk,
+    apply_local,
+    progress: dict,
+    chunk_size: int = 10000,
+    concurrency: int = 4,
+    retries: int = 3,
+):
+    """
+    Parse `file` dans un thread et envoie les lots à Fuseki avec `concurrency` tâches.
+    post_chunk(graph_uri, ntriples_bytes) est une coroutine ; apply_local(graph_uri,
+    triples) met à jour le graphe local (dans un thread), seulement une fois le lot
+    acquitté par Fuseki : un lot en échec définitif n'est appliqué nulle part.
+    `progress` est mis à jour au fil de l'eau.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.monotonic()
+    progress.update(bytes_read=0, triples_parsed=0, triples_sent=0, chunks_sent=0, status="en cours")
+
+    cancelled = threading.Event()
+
+    def emit(graph_name, triples):
+        if cancelled.is_set():
+            raise RuntimeError("Chargement interrompu")
+        payload = "".join(_nt_row(t) for t in triples).encode("utf-8")
+        progress["triples_parsed"] += len(triples)
+        # Bloque le thread de parsing tant que la file est pleine
+        asyncio.run_coroutine_threadsafe(queue.put((graph_name, payload, triples)), loop).result()
+
+    async def sender():
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            graph_name, payload, triples = item
+            for attempt in range(retries):
+                try:
+                    await post_chunk(graph_name or "default", payload)
+                    break
+                except Exception:
+                    if attempt == retries - 1:
+                        raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+            # Acquitté par Fuseki : le graphe local suit
+            await asyncio.to_thread(apply_local, graph_name or "default", triples)
+            progress["triples_sent"] += len(triples)
+            progress["chunks_sent"] += 1
+            elapsed = time.monotonic() - started
+            progress["elapsed_s"] = round(elapsed, 2)
+            progress["triples_per_s"] = round(progress["triples_sent"] / elapsed, 1) if elapsed else 0.0
+            queue.task_done()
+
+    senders = [asyncio.create_task(sender()) for _ in range(concurrency)]
+    reader = io.BufferedReader(_CountingReader(file, progress), buffer_size=1 << 16)
+    try:
+        parse_task = loop.run_in_executor(None, stream_triples, reader, fmt, chunk_size, emit)
+        # Les tâches d'envoi ne se terminent avant le parsing qu'en cas d'échec définitif
+        done, _ = await asyncio.wait([parse_task, *senders], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        for _ in senders:
+            await queue.put(None)
+        await asyncio.gather(*senders)
+    except BaseException:
+        cancelled.set()
+        for task in senders:
+            task.cancel()
+        # Débloque le thread de parsing s'il attend une place dans la file
+        while not queue.empty():
+            queue.get_nowait()
+        progress["status"] = "erreur"
+        raise
+
+    elapsed = time.monotonic() - started
+    progress.update(
+        status="terminé",
+        elapsed_s=round(elapsed, 2),
+        triples_per_s=round(progress["triples_sent"] / elapsed, 1) if elapsed else 0.0,
+        mb_per_s=round(progress["bytes_read"] / (1 << 20) / elapsed, 2) if elapsed else 0.0,
+    )
+    return progress
@@ -0,0 +1,124 @@
+# class_hierarchy.py
+import threading
+import time
+
+from rdflib import URIRef
+from rdflib.namespace import OWL, RDFS
+
+# ======================
+# 🌳 CLÔTURE DE LA HIÉRARCHIE DES CLASSES
+# ======================
+#
+# Les requêtes des endpoints utilisaient `?type rdfs:subClassOf* mobilite:X`,
+# chemin transitif que Fuseki réévalue pour chaque ligne. La clôture des
+# sous-classes est calculée une fois (et recalculée quand l'ontologie change)
+# pour écrire à la place `VALUES ?type { mobilite:X mobilite:SousClasse ... }`.
+# Le premier calcul est fait au démarrage ; les suivants, en arrière-plan, pour
+# ne jamais bloquer la boucle d'événements des endpoints.
+
+
+class ClassHierarchy:
+    """Sous-classes (réflexives, transitives) de chaque classe de l'ontologie"""
+
+    def __init__(self, load_axioms, retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        # load_axioms() -> [(sous_classe, super_classe)], équivalences incluses (bloquant)
+        self.load_axioms = load_axioms
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._lock = threading.Lock()
+        self._subclasses = {}
+        self._dirty = True
+        self._refreshing = False
+        self._next_delay = retry_delay
+        self._retry_at = 0.0
+        self.version = 0
+        self.failures = 0
+
+    def invalidate(self):
+        """À appeler quand un axiome subClassOf / equivalentClass est ajouté ou retiré"""
+        self._dirty = True
+
+    def on_change(self, op: str, triple):
+        """Écouteur du graphe local"""
+        if triple[1] in (RDFS.subClassOf, OWL.equivalentClass):
+            self._dirty = True
+
+    def refresh(self) -> bool:
+        """Recalcule la clôture (bloquant) ; False si l'ontologie est indisponible"""
+        # Une modification pendant le chargement redemandera un calcul
+        self._dirty = False
+        children = {}
+        try:
+            for sub, sup in self.load_axioms():
+                if isinstance(sub, URIRef) and isinstance(sup, URIRef):
+                    children.setdefault(sup, set()).add(sub)
+        except Exception as e:
+            print(f"⚠️ Chargement de la hiérarchie des classes impossible : {e}")
+            children = {}
+        if not children:
+            # Ontologie pas encore disponible (Fuseki injoignable, synchronisation en cours) :
+            # hiérarchie précédente conservée, nouvel essai après un délai croissant
+            with self._lock:
+                self._dirty = True
+                self.failures += 1
+                delay = self._next_delay
+                self._retry_at = time.monotonic() + delay
+                self._next_delay = min(delay * 2, self.max_retry_delay)
+            print(f"🌳 Hiérarchie des classes indisponible : nouvel essai dans {delay:.0f} s")
+            return False
+
+        closure = {}
+        for root in children:
+            seen = {root}
+            stack = [root]
+            while stack:
+                for child in children.get(stack.pop(), ()):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+            closure[root] = frozenset(seen)
+        with self._lock:
+            self._subclasses = closure
+            self._next_delay = self.retry_delay
+            self._retry_at = 0.0
+            self.version += 1
+        print(f"🌳 Hiérarchie des classes : {len(closure)} classes avec sous-classes")
+        return True
+
+    def _schedule_refresh(self):
+        """Recalcul en arrière-plan (un seul à la fois, pas avant la fin du délai d'attente)"""
+        with self._lock:
+            if self._refreshing or time.monotonic() < self._retry_at:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="class-hierarchy", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def subclasses(self, cls) -> frozenset:
+        """
+        La classe et toutes ses sous-classes (équivalent de rdfs:subClassOf*). Ne bloque
+        jamais : une hiérarchie à recalculer l'est en arrière-plan, la dernière clôture
+        calculée est servie en attendant.
+        """
+        if self._dirty:
+            self._schedule_refresh()
+        return self._subclasses.get(URIRef(cls), frozenset((URIRef(cls),)))
+
+    def values(self, var: str, cls) -> str:
+        """Clause `VALUES ?var { ... }` listant les sous-classes de cls"""
+        iris = " ".join(f"<{c}>" for c in sorted(self.subclasses(cls)))
+        return f"VALUES {var} {{ {iris} }}"
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "classes": len(self._subclasses),
+            "links": sum(len(s) - 1 for s in self._subclasses.values()),
+            "failures": self.failures,
+        }
@@ -0,0 +1,364 @@
+# delta_sync.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from rdflib import BNode, Graph, Literal
+from rdflib.plugins.serializers.nt import _nt_row
+
+from journal import replay
+from reasoner import is_schema
+
+# ======================
+# 🔁 SYNCHRONISATION INCRÉMENTALE FUSEKI → GRAPHE LOCAL
+# ======================
+#
+# Au lieu de télécharger tout le graphe par défaut (RDF/XML en mémoire) à chaque
+# démarrage, chaque écriture envoyée à Fuseki ajoute un « changeset » dans un
+# graphe nommé de journal des modifications :
+#
+#   sync:state  sync:version  N .                      (filigrane global)
+#   <urn:mobilite:change:N>  sync:seq N ;
+#                            sync:origin "processus" ;
+#                            sync:changes "+ <s> <p> <o> .\n- ..." .
+#
+# Le numéro N est attribué par la requête UPDATE elle-même (lecture + incrément
+# du filigrane dans la même transaction Fuseki) : il suit l'ordre des commits.
+# Un processus mémorise le dernier N appliqué et ne récupère que les changesets
+# suivants, écrits sur disque (format du journal, N-Triples) puis rejoués dans le
+# graphe local. Une synchronisation complète (dump N-Triples en streaming) n'a
+# lieu qu'au premier démarrage, si le journal a été purgé au-delà du filigrane
+# local, si Fuseki a été réinitialisé, ou après un import en masse d'un autre
+# processus : un import n'est pas recopié dans le journal, il incrémente seulement
+# le filigrane et le note comme point de réinitialisation :
+#
+#   sync:state  sync:reset  N ;  sync:resetOrigin "processus" .
+#
+# Une synchronisation complète ne supprime jamais le schéma local (axiomes de
+# l'ontologie et triples qui décrivent ses classes et propriétés) : chargé depuis
+# le fichier RDF, il n'est pas forcément dans le graphe par défaut de Fuseki.
+
+SYNC_NS = "urn:mobilite:sync#"
+CHANGE_PREFIX = "urn:mobilite:change:"
+
+
+def format_change(op: str, triple) -> str:
+    """Ligne au format du journal : « + <s> <p> <o> . »"""
+    return f"{op} {_nt_row(triple)}"
+
+
+class ChangeRecorder:
+    """Écouteur du graphe local : triples modifiés par la requête en cours (par thread)"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def on_change(self, op: str, triple):
+        if getattr(self._local, "suspended", False):
+            return
+        lines = getattr(self._local, "lines", None)
+        if lines is None:
+            lines = self._local.lines = []
+        lines.append(format_change(op, triple))
+
+    def take(self) -> str:
+        """Modifications enregistrées par ce thread depuis le dernier appel"""
+        lines = getattr(self._local, "lines", None)
+        self._local.lines = []
+        return "".join(lines or ())
+
+    @contextmanager
+    def suspended(self):
+        """Modifications non publiées (déjà présentes dans Fuseki : import, synchronisation)"""
+        self._local.suspended = True
+        try:
+            yield
+        finally:
+            self._local.suspended = False
+
+
+def changelog_update(graph_uri: str, origin: str, changes: str) -> str:
+    """Opération UPDATE qui ajoute un changeset et incrémente le filigrane"""
+    return f"""PREFIX sync: <{SYNC_NS}>
+DELETE {{ GRAPH <{graph_uri}> {{ sync:state sync:version ?version }} }}
+INSERT {{ GRAPH <{graph_uri}> {{
+    sync:state sync:version ?next .
+    ?change sync:seq ?next ;
+            sync:origin {Literal(origin).n3()} ;
+            sync:changes {Literal(changes).n3()} .
+}} }}
+WHERE {{
+    OPTIONAL {{ GRAPH <{graph_uri}> {{ sync:state sync:version ?version }} }}
+    BIND(COALESCE(?version, 0) + 1 AS ?next)
+    BIND(IRI(CONCAT("{CHANGE_PREFIX}", STR(?next))) AS ?change)
+}}"""
+
+
+def reset_update(graph_uri: str, origin: str) -> str:
+    """Opération UPDATE qui incrémente le filigrane sans changeset (synchronisation complète des autres)"""
+    return f"""PREFIX sync: <{SYNC_NS}>
+DELETE {{ GRAPH <{graph_uri}> {{
+    sync:state sync:version ?version ; sync:reset ?reset ; sync:resetOrigin ?resetOrigin .
+}} }}
+INSERT {{ GRAPH <{graph_uri}> {{
+    sync:state sync:version ?next ; sync:reset ?next ; sync:resetOrigin {Literal(origin).n3()} .
+}} }}
+WHERE {{
+    OPTIONAL {{ GRAPH <{graph_uri}> {{ sync:state sync:version ?version }} }}
+    OPTIONAL {{ GRAPH <{graph_uri}> {{ sync:state sync:reset ?reset ; sync:resetOrigin ?resetOrigin }} }}
+    BIND(COALESCE(?version, 0) + 1 AS ?next)
+}}"""
+
+
+class DeltaSync:
+    """Rejoue dans le graphe local les changesets Fuseki postérieurs au filigrane local"""
+
+    def __init__(
+        self,
+        fuseki,
+        graph,
+        lock,
+        recorder: ChangeRecorder,
+        changelog_graph: str,
+        origin: str,
+        state_path: str,
+        dump_path: str,
+        delta_path: str,
+        interval: float = 30.0,
+        retention: int = 10000,
+        can_reset=None,
+        on_applied=None,
+    ):
+        self.fuseki = fuseki
+        self.graph = graph
+        self.lock = lock
+        self.recorder = recorder
+        self.changelog_graph = changelog_graph
+        self.origin = origin
+        self.state_path = state_path
+        self.dump_path = dump_path
+        self.delta_path = delta_path
+        self.interval = interval
+        self.retention = retention
+        # can_reset() : False tant que des écritures locales ne sont pas dans Fuseki
+        self.can_reset = can_reset
+        self.on_applied = on_applied
+
+        self.version = None
+        self._touched = None
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self.errors = 0
+        self._load_state()
+
+    # ----------------------
+    # Filigrane local
+    # ----------------------
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    self.version = json.load(f).get("version")
+            except ValueError:
+                self.version = None
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "synced_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    # ----------------------
+    # Synchronisation
+    # ----------------------
+
+    def remote_state(self):
+        """
+        (filigrane Fuseki, plus ancien changeset conservé, dernière réinitialisation
+        par un autre processus) ; (0, None, None) sans journal
+        """
+        results = self.fuseki.select_sync(f"""
+        PREFIX sync: <{SYNC_NS}>
+        SELECT ?version ?oldest ?reset ?resetOrigin WHERE {{
+            OPTIONAL {{ GRAPH <{self.changelog_graph}> {{ sync:state sync:version ?version }} }}
+            OPTIONAL {{ GRAPH <{self.changelog_graph}> {{ sync:state sync:reset ?reset ; sync:resetOrigin ?resetOrigin }} }}
+            OPTIONAL {{
+                SELECT (MIN(?seq) AS ?oldest) WHERE {{ GRAPH <{self.changelog_graph}> {{ ?change sync:seq ?seq }} }}
+            }}
+        }}
+        """)
+        bindings = results["results"]["bindings"]
+        row = bindings[0] if bindings else {}
+        version = int(row["version"]["value"]) if "version" in row else 0
+        oldest = int(row["oldest"]["value"]) if "oldest" in row else None
+        reset = None
+        # Un import de ce processus est déjà dans le graphe local
+        if "reset" in row and row["resetOrigin"]["value"] != self.origin:
+            reset = int(row["reset"]["value"])
+        return version, oldest, reset
+
+    def sync(self, full: bool = False) -> dict:
+        """Une passe de synchronisation (incrémentale si possible)"""
+        with self._sync_lock:
+            start = time.perf_counter()
+            try:
+                version, oldest, reset = self.remote_state()
+                purged = oldest is not None and self.version is not None and self.version < oldest - 1
+                imported = reset is not None and self.version is not None and self.version < reset
+                if full or self.version is None or version < self.version or purged or imported:
+                    report = self._full_sync(version)
+                else:
+                    report = self._delta_sync(version)
+                    self._prune(version, oldest)
+            except Exception as e:
+                self.errors += 1
+                report = {"mode": "erreur", "error": str(e)}
+                print(f"⚠️ Synchronisation Fuseki → local impossible : {e}")
+            report["version"] = self.version
+            report["duration_s"] = round(time.perf_counter() - start, 3)
+            self.syncs += 1
+            self.last = report
+            return report
+
+    def _full_sync(self, version: int) -> dict:
+        if self.can_reset is not None and not self.can_reset():
+            return {"mode": "complète", "skipped": "écritures locales en attente d'envoi à Fuseki"}
+        print("🔄 Synchronisation complète Fuseki → local (N-Triples) ...")
+        tmp_path = self.dump_path + ".tmp"
+        # Triples modifiés localement pendant la synchronisation : absents du dump
+        # (pas encore envoyés à Fuseki), ils ne doivent pas être annulés par le diff
+        self._touched = set()
+        try:
+            return self._apply_dump(version, tmp_path)
+        finally:
+            self._touched = None
+
+    def on_change(self, op: str, triple):
+        """Écouteur du graphe local (écritures concurrentes d'une synchro complète)"""
+        touched = self._touched
+        if touched is not None:
+            touched.add(triple)
+
+    def _apply_dump(self, version: int, tmp_path: str) -> dict:
+        size = self.fuseki.download_graph(tmp_path)
+        os.replace(tmp_path, self.dump_path)
+
+        remote = Graph()
+        remote.parse(self.dump_path, format="nt")
+        # Les nœuds anonymes changent d'identifiant à chaque dump : seuls les
+        # triples sans nœud anonyme sont comparés
+        ground = lambda t: not any(isinstance(term, BNode) for term in t)
+        remote_ground = set(filter(ground, remote))
+        with self.lock:
+            local = set(filter(ground, self.graph))
+            added = remote_ground - local - self._touched
+            # Seules les données d'instance appartiennent à la synchronisation
+            schema_nodes = {t[0] for t in local if is_schema(t)}
+            removed = {
+                t for t in local - remote_ground - self._touched
+                if not is_schema(t) and t[0] not in schema_nodes
+            }
+            with self.recorder.suspended():
+                for triple in removed:
+                    self.graph.remove(triple)
+                self.graph.addN((s, p, o, self.graph) for s, p, o in added)
+        # Hors du verrou : un commit durable attend le thread de fsync, qui le prend
+        self.graph.commit()
+
+        self.version = version
+        self._save_state()
+        self.full_syncs += 1
+        if (added or removed) and self.on_applied is not None:
+            self.on_applied()
+        print(f"✅ Synchronisation complète : +{len(added)} / -{len(removed)} triples ({size} octets)")
+        return {"mode": "complète", "bytes": size, "added": len(added), "removed": len(removed)}
+
+    def _delta_sync(self, version: int) -> dict:
+        if version == self.version:
+            return {"mode": "incrémentale", "changesets": 0, "operations": 0}
+        # Tous les changesets jusqu'à `version` sont lus : le filigrane peut l'atteindre
+        # même sans changeset (import en masse de ce processus)
+        last, changesets, own = version, 0, 0
+        # Les changesets sont écrits sur disque au fil du flux TSV, puis rejoués
+        with open(self.delta_path, "w", encoding="utf-8") as f:
+            for row in self.fuseki.select_rows_sync(f"""
+            PREFIX sync: <{SYNC_NS}>
+            SELECT ?seq ?origin ?changes WHERE {{
+                GRAPH <{self.changelog_graph}> {{
+                    ?change sync:seq ?seq ; sync:origin ?origin ; sync:changes ?changes .
+                }}
+                FILTER(?seq > {self.version})
+            }} ORDER BY ?seq
+            """):
+                last = max(last, int(row["seq"]["value"]))
+                # Écritures de ce processus : déjà appliquées au graphe local
+                if row["origin"]["value"] == self.origin:
+                    own += 1
+                    continue
+                changes = row["changes"]["value"]
+                f.write(changes if changes.endswith("\n") else changes + "\n")
+                changesets += 1
+
+        with self.recorder.suspended():
+            operations = replay(self.graph, self.delta_path)
+        self.graph.commit()
+
+        self.version = last
+        self._save_state()
+        if operations and self.on_applied is not None:
+            self.on_applied()
+        if operations:
+            print(f"🔁 Synchronisation incrémentale : {changesets} changeset(s), {operations} opération(s)")
+        return {"mode": "incrémentale", "changesets": changesets, "own_changesets": own, "operations": operations}
+
+    def _prune(self, version: int, oldest):
+        """Purge les changesets au-delà de la rétention (les retardataires feront une synchro complète)"""
+        if not self.retention or oldest is None or version - oldest + 1 <= self.retention:
+            return
+        self.fuseki.update_sync(f"""
+        PREFIX sync: <{SYNC_NS}>
+        DELETE {{ GRAPH <{self.changelog_graph}> {{ ?change ?p ?o }} }}
+        WHERE {{
+            GRAPH <{self.changelog_graph}> {{ ?change sync:seq ?seq ; ?p ?o }}
+            FILTER(?seq <= {version - self.retention})
+        }}
+        """)
+
+    # ----------------------
+    # Exécution périodique
+    # ----------------------
+
+    def start(self):
+        """Première synchronisation puis une toutes les `interval` secondes, en arrière-plan"""
+        self._thread = threading.Thread(target=self._run, name="fuseki-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            if not self.interval or self._stop.wait(self.interval):
+                return
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "origin": self.origin,
+            "syncs": self.syncs,
+            "full_syncs": self.full_syncs,
+            "errors": self.errors,
+            "last": self.last,
+        }
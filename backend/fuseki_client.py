@@ -0,0 +1,349 @@
+# fuseki_client.py
+import asyncio
+import functools
+import inspect
+import re
+import time
+from contextlib import contextmanager
+
+import httpx
+
+from observability import REGISTRY
+from workload import RECORDED_OPERATIONS
+
+# ======================
+# 🔌 CLIENT FUSEKI PARTAGÉ (POOL DE CONNEXIONS)
+# ======================
+#
+# Un seul client HTTP keep-alive pour toutes les lectures/écritures Fuseki,
+# au lieu d'un SPARQLWrapper (et d'une connexion TCP) par requête.
+# L'API async est utilisée par les handlers FastAPI ; l'API synchrone sert
+# aux endpoints d'écriture qui tournent dans le threadpool.
+
+SPARQL_JSON = "application/sparql-results+json"
+SPARQL_TSV = "text/tab-separated-values"
+N_TRIPLES = "application/n-triples"
+
+
+FUSEKI_LATENCY = REGISTRY.histogram(
+    "mobilite_fuseki_request_duration_seconds",
+    "Durée des requêtes HTTP vers Fuseki (jusqu'à la fin du flux pour select_rows et download)",
+    ("operation",),
+)
+FUSEKI_ERRORS = REGISTRY.counter("mobilite_fuseki_errors_total", "Requêtes Fuseki en erreur", ("operation",))
+
+
+@contextmanager
+def _measure(operation: str, recorder=None, text: str = None):
+    """Latence et erreurs ; la requête est consignée si un enregistreur de charge est actif"""
+    start = time.perf_counter()
+    probe = {"size": None}
+    error = False
+    try:
+        yield probe
+    except Exception:
+        error = True
+        FUSEKI_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        FUSEKI_LATENCY.observe(elapsed, operation=operation)
+        if recorder is not None and operation in RECORDED_OPERATIONS:
+            recorder.record(operation, text, elapsed, probe["size"], error)
+
+
+def _result_size(result):
+    if isinstance(result, dict):
+        if "results" in result:
+            return len(result["results"].get("bindings", []))
+        if "boolean" in result:
+            return 1
+    return None
+
+
+def _observed(operation: str):
+    """Décorateur : latence et erreurs d'une méthode du client (coroutine, fonction ou générateur)"""
+    def decorate(method):
+        def measure(client, args, kwargs):
+            # Premier argument : texte de la requête (consigné par l'enregistreur de charge)
+            text = args[0] if args else next(iter(kwargs.values()), None)
+            return _measure(operation, client.recorder, text)
+
+        if inspect.iscoroutinefunction(method):
+            async def wrapper(self, *args, **kwargs):
+                with measure(self, args, kwargs) as probe:
+                    result = await method(self, *args, **kwargs)
+                    probe["size"] = _result_size(result)
+                    return result
+        elif inspect.isgeneratorfunction(method):
+            def wrapper(self, *args, **kwargs):
+                with measure(self, args, kwargs) as probe:
+                    rows = method(self, *args, **kwargs)
+                    probe["size"] = 0
+                    try:
+                        for row in rows:
+                            probe["size"] += 1
+                            yield row
+                    finally:
+                        # Flux abandonné par l'appelant : la réponse HTTP est fermée
+                        rows.close()
+        else:
+            def wrapper(self, *args, **kwargs):
+                with measure(self, args, kwargs) as probe:
+                    result = method(self, *args, **kwargs)
+                    probe["size"] = _result_size(result)
+                    return result
+        return functools.wraps(method)(wrapper)
+    return decorate
+
+
+class FusekiError(Exception):
+    """Erreur renvoyée par Fuseki (HTTP ou réseau)"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FusekiClient:
+    """Client SPARQL 1.1 (query/update/graph store) avec pool de connexions"""
+
+    def __init__(
+        self,
+        query_url: str,
+        update_url: str,
+        data_url: str,
+        pool_size: int = 20,
+        keepalive: int = 10,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.query_url = query_url
+        self.update_url = update_url
+        self.data_url = data_url
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=keepalive)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._sync_client = None
+        self._async_client = None
+        self._async_loop = None
+        # WorkloadRecorder (workload.py) si l'enregistrement de la charge est activé
+        self.recorder = None
+
+    # ----------------------
+    # Clients HTTP (créés à la demande)
+    # ----------------------
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+        return self._sync_client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Un pool async est lié à sa boucle d'événements
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._async_loop = loop
+        return self._async_client
+
+    # ----------------------
+    # API async
+    # ----------------------
+
+    @_observed("select")
+    async def select(self, query: str) -> dict:
+        """Exécute une requête SELECT/ASK et retourne le JSON SPARQL"""
+        try:
+            r = await self.async_client.post(
+                self.query_url, data={"query": query}, headers={"Accept": SPARQL_JSON}
+            )
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+        return r.json()
+
+    async def select_rows(self, query: str):
+        """
+        Générateur async des lignes d'un SELECT, décodées au fil de la réponse
+        (format TSV) ; chaque ligne a la forme d'un binding SPARQL JSON.
+        """
+        # Pas de décorateur : la fermeture du flux doit atteindre ce générateur
+        with _measure("select_rows", self.recorder, query) as probe:
+            probe["size"] = 0
+            try:
+                async with self.async_client.stream(
+                    "POST", self.query_url, data={"query": query}, headers={"Accept": SPARQL_TSV}
+                ) as r:
+                    if r.is_error:
+                        await r.aread()
+                        r.raise_for_status()
+                    variables = None
+                    async for line in r.aiter_lines():
+                        if variables is None:
+                            variables = _tsv_header(line)
+                            continue
+                        if line:
+                            probe["size"] += 1
+                            yield _tsv_row(variables, line)
+            except httpx.HTTPError as e:
+                raise _error(e) from e
+
+    @_observed("update")
+    async def update(self, update_query: str):
+        """Envoie une requête SPARQL UPDATE"""
+        try:
+            r = await self.async_client.post(self.update_url, data={"update": update_query})
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+
+    @_observed("post_graph")
+    async def post_graph(self, data: bytes, graph_uri: str, content_type: str = "text/turtle"):
+        """Ajoute des triples à un graphe nommé via le Graph Store Protocol"""
+        try:
+            r = await self.async_client.post(
+                self.data_url, params={"graph": graph_uri}, content=data, headers={"Content-Type": content_type}
+            )
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+        return r
+
+    # ----------------------
+    # API synchrone (threadpool)
+    # ----------------------
+
+    @_observed("select")
+    def select_sync(self, query: str) -> dict:
+        try:
+            r = self.sync_client.post(self.query_url, data={"query": query}, headers={"Accept": SPARQL_JSON})
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+        return r.json()
+
+    @_observed("select_rows")
+    def select_rows_sync(self, query: str):
+        """Version synchrone de select_rows (threads de fond)"""
+        try:
+            with self.sync_client.stream(
+                "POST", self.query_url, data={"query": query}, headers={"Accept": SPARQL_TSV}
+            ) as r:
+                if r.is_error:
+                    r.read()
+                    r.raise_for_status()
+                variables = None
+                for line in r.iter_lines():
+                    if variables is None:
+                        variables = _tsv_header(line)
+                        continue
+                    if line:
+                        yield _tsv_row(variables, line)
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+
+    @_observed("download")
+    def download_graph(self, path: str, graph_uri: str = "default", content_type: str = N_TRIPLES) -> int:
+        """Écrit un graphe dans `path` au fil du transfert (sans le charger en mémoire) ; retourne la taille"""
+        size = 0
+        try:
+            with self.sync_client.stream(
+                "GET", self.data_url, params={"graph": graph_uri}, headers={"Accept": content_type}
+            ) as r:
+                if r.is_error:
+                    r.read()
+                    r.raise_for_status()
+                with open(path, "wb") as f:
+                    for block in r.iter_bytes():
+                        f.write(block)
+                        size += len(block)
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+        return size
+
+    @_observed("update")
+    def update_sync(self, update_query: str):
+        try:
+            r = self.sync_client.post(self.update_url, data={"update": update_query})
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+
+    @_observed("post_graph")
+    def post_graph_sync(self, data: bytes, graph_uri: str, content_type: str = "text/turtle"):
+        try:
+            r = self.sync_client.post(
+                self.data_url, params={"graph": graph_uri}, content=data, headers={"Content-Type": content_type}
+            )
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            raise _error(e) from e
+        return r
+
+    async def aclose(self):
+        """Ferme les pools de connexions"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+def _error(e: httpx.HTTPError) -> FusekiError:
+    if isinstance(e, httpx.HTTPStatusError):
+        return FusekiError(f"HTTP {e.response.status_code} : {e.response.text[:500]}", e.response.status_code)
+    return FusekiError(f"{type(e).__name__} : {e}")
+
+
+def _tsv_header(line: str) -> list:
+    return [v.lstrip("?$") for v in line.split("\t")]
+
+
+def _tsv_row(variables: list, line: str) -> dict:
+    return {var: parse_tsv_term(cell) for var, cell in zip(variables, line.split("\t")) if cell}
+
+
+# ----------------------
+# Décodage des termes TSV (syntaxe Turtle/N-Triples)
+# ----------------------
+
+_TSV_LITERAL = re.compile(r'^"(.*)"(?:@([\w-]+)|\^\^<([^>]*)>)?$', re.S)
+_TSV_ESCAPES = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_TSV_UNESCAPE = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+_XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+def _unescape(match) -> str:
+    code = match.group(1)
+    if code[0] in "uU" and len(code) > 1:
+        return chr(int(code[1:], 16))
+    return _TSV_UNESCAPE.get(code, code)
+
+
+def parse_tsv_term(cell: str) -> dict:
+    """Convertit une cellule TSV en terme au format SPARQL JSON"""
+    if cell.startswith("<") and cell.endswith(">"):
+        return {"type": "uri", "value": cell[1:-1]}
+    if cell.startswith("_:"):
+        return {"type": "bnode", "value": cell[2:]}
+    m = _TSV_LITERAL.match(cell)
+    if m:
+        term = {"type": "literal", "value": _TSV_ESCAPES.sub(_unescape, m.group(1))}
+        if m.group(2):
+            term["xml:lang"] = m.group(2)
+        elif m.group(3):
+            term["datatype"] = m.group(3)
+        return term
+    # Nombres et booléens abrégés
+    if cell in ("true", "false"):
+        return {"type": "literal", "value": cell, "datatype": _XSD + "boolean"}
+    if re.fullmatch(r"[+-]?\d+", cell):
+        datatype = "integer"
+    elif re.fullmatch(r"[+-]?\d*\.\d+", cell):
+        datatype = "decimal"
+    else:
+        datatype = "double"
+    return {"type": "literal", "value": cell, "datatype": _XSD + datatype}
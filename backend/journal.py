@@ -0,0 +1,402 @@
+# journal.py
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from rdflib import Graph
+from rdflib.plugins.serializers.nt import _nt_row
+
+# ======================
+# 📒 JOURNAL DES MODIFICATIONS (APPEND-ONLY)
+# ======================
+#
+# Chaque écriture du graphe local est ajoutée en fin de journal sous la forme
+# d'une ligne N-Triples précédée de son opération :
+#
+#   + <s> <p> <o> .     ajout d'un triple
+#   - <s> <p> <o> .     suppression d'un triple
+#
+# Le coût d'une écriture est donc proportionnel au changement et non plus à la
+# taille du graphe. Les fsync sont regroupés (group commit) par un thread de
+# fond, et un snapshot compacté est produit en arrière-plan quand le journal
+# devient trop long. Au démarrage : snapshot + rejeu du journal.
+
+OP_AJOUT = "+"
+OP_SUPPRESSION = "-"
+
+
+def replay(graph: Graph, path: str) -> int:
+    """Applique au graphe les opérations (+/-) d'un fichier au format du journal"""
+    count = 0
+    batch_op, batch = None, []
+
+    def apply(op, lines):
+        parsed = Graph()
+        parsed.parse(data="".join(lines), format="nt")
+        for triple in parsed:
+            if op == OP_AJOUT:
+                graph.add(triple)
+            else:
+                graph.remove(triple)
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # Une dernière ligne tronquée (crash pendant l'écriture) est ignorée
+            if len(line) < 3 or not line.endswith(".\n"):
+                continue
+            op = line[0]
+            if op not in (OP_AJOUT, OP_SUPPRESSION):
+                continue
+            # Les opérations consécutives de même type sont parsées en lot
+            if op != batch_op and batch:
+                apply(batch_op, batch)
+                batch = []
+            batch_op = op
+            batch.append(line[2:])
+            count += 1
+    if batch:
+        apply(batch_op, batch)
+    return count
+
+
+class SharedLock:
+    """
+    Verrou du graphe local. `with lock:` est exclusif et réentrant, comme un RLock
+    (écritures, journal). `with lock.shared():` est partagé entre lecteurs qui ne
+    font qu'itérer sur le graphe (requêtes du moteur local). Un écrivain en attente
+    passe avant les nouveaux lecteurs. Un lecteur ne peut pas passer en écriture.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = None
+        self._depth = 0
+        self._readers = 0
+        self._waiting_writers = 0
+        self._local = threading.local()  # profondeur de lecture du thread
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            self._waiting_writers += 1
+            try:
+                while self._owner is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._owner = me
+            self._depth = 1
+        return True
+
+    def release(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @contextmanager
+    def shared(self):
+        me = threading.get_ident()
+        nested = getattr(self._local, "depth", 0)
+        with self._cond:
+            # Déjà écrivain ou lecteur : pas d'attente (sinon interblocage avec un écrivain en attente)
+            counted = self._owner != me
+            if counted and not nested:
+                while self._owner is not None or self._waiting_writers:
+                    self._cond.wait()
+            if counted:
+                self._readers += 1
+        self._local.depth = nested + 1
+        try:
+            yield
+        finally:
+            self._local.depth = nested
+            if counted:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+
+class ChangeJournal:
+    """Journal append-only des triples ajoutés/supprimés avec snapshots périodiques"""
+
+    def __init__(
+        self,
+        journal_path: str,
+        snapshot_path: str,
+        fsync_interval: float = 0.01,
+        fsync_batch: int = 256,
+        compaction_threshold: int = 50000,
+        durable: bool = True,
+    ):
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.sealed_path = journal_path + ".1"
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.compaction_threshold = compaction_threshold
+        self.durable = durable
+
+        # Verrou partagé avec le graphe journalisé : une écriture (journal +
+        # graphe) et la copie faite pour un snapshot sont mutuellement exclusives
+        self.lock = SharedLock()
+        self._fsync_cond = threading.Condition()
+        self._buffer = []
+        self._file = None
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._records_since_snapshot = 0
+        self._compaction_thread = None
+        # Compaction en cours (pris sous self.lock, rendu par _write_snapshot)
+        self._compacting = False
+        self._closed = False
+        self._fsync_thread = None
+
+    # ----------------------
+    # Démarrage / rejeu
+    # ----------------------
+
+    def restore(self, graph: Graph, load_base=None) -> int:
+        """
+        Charge le dernier snapshot puis rejoue le journal dans le graphe. Le snapshot
+        contient le graphe complet (RDF initial compris, suppressions appliquées) :
+        load_base(graph) n'est appelé qu'en son absence, sinon un triple initial
+        supprimé avant une compaction réapparaîtrait au redémarrage.
+        """
+        if os.path.exists(self.snapshot_path):
+            graph.parse(self.snapshot_path, format="nt")
+        elif load_base is not None:
+            load_base(graph)
+
+        replayed = 0
+        # Un segment scellé existe si le processus s'est arrêté pendant une
+        # compaction ; le rejeu est idempotent donc on peut toujours le rejouer
+        for path in (self.sealed_path, self.journal_path):
+            if os.path.exists(path):
+                replayed += replay(graph, path)
+
+        self._records_since_snapshot = replayed
+        return replayed
+
+    def files(self) -> list:
+        """Fichiers qui, avec le RDF initial, déterminent le contenu du graphe local"""
+        return [self.snapshot_path, self.sealed_path, self.journal_path]
+
+    def open(self):
+        """Ouvre le journal en ajout et démarre le thread de fsync groupé"""
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._closed = False
+        self._fsync_thread = threading.Thread(target=self._fsync_loop, name="journal-fsync", daemon=True)
+        self._fsync_thread.start()
+
+    # ----------------------
+    # Écriture
+    # ----------------------
+
+    def record(self, op: str, triple):
+        """Ajoute une opération au tampon de l'écriture en cours"""
+        self._buffer.append(f"{op} {_nt_row(triple)}")
+
+    def transaction(self):
+        """
+        Écritures d'une requête : en mémoire, chaque modification est appliquée et
+        journalisée aussitôt, sans transaction partagée à isoler. Pas de verrou ici :
+        le commit durable attend le thread de fsync, qui prend self.lock.
+        """
+        return nullcontext()
+
+    def commit(self, graph: Graph = None):
+        """Écrit le tampon dans le journal ; attend le prochain fsync groupé si durable"""
+        with self.lock:
+            if self._file is None:
+                return
+            if self._buffer:
+                self._file.write("".join(self._buffer))
+                self._file.flush()
+                self._records_since_snapshot += len(self._buffer)
+                self._buffer = []
+                self._written_seq += 1
+            seq = self._written_seq
+            needs_compaction = self._records_since_snapshot >= self.compaction_threshold
+
+        if self.durable:
+            with self._fsync_cond:
+                self._fsync_cond.notify_all()
+                while self._synced_seq < seq and not self._closed:
+                    self._fsync_cond.wait()
+
+        if needs_compaction and graph is not None:
+            self.compact(graph)
+
+    def _fsync_loop(self):
+        while True:
+            # Fenêtre de regroupement : on attend le délai ou un lot complet
+            deadline = time.monotonic() + self.fsync_interval
+            with self._fsync_cond:
+                while not self._closed and self._written_seq - self._synced_seq < self.fsync_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._fsync_cond.wait(remaining)
+                if self._closed:
+                    return
+                if self._written_seq <= self._synced_seq:
+                    continue
+            with self.lock:
+                if self._file is None:
+                    continue
+                target = self._written_seq
+                fd = self._file.fileno()
+            # fsync hors du verrou : les écritures suivantes ne sont pas bloquées
+            try:
+                os.fsync(fd)
+            except OSError:
+                # Fichier fermé par une compaction, qui a déjà fait son propre fsync
+                continue
+            with self._fsync_cond:
+                self._synced_seq = max(self._synced_seq, target)
+                self._fsync_cond.notify_all()
+
+    # ----------------------
+    # Snapshots / compaction
+    # ----------------------
+
+    def compact(self, graph: Graph, wait: bool = False):
+        """Scelle le journal courant et écrit un snapshot N-Triples en arrière-plan"""
+        with self.lock:
+            # Une seule compaction à la fois : deux commits qui franchissent le seuil
+            # ensemble ne doivent pas sceller deux fois ni écrire le même .tmp
+            if self._compacting or self._file is None:
+                thread = self._compaction_thread
+                started = False
+            else:
+                self._compacting = True
+                thread = self._seal(graph)
+                self._compaction_thread = thread
+                started = True
+        if started:
+            thread.start()
+        # Attente hors du verrou : _write_snapshot le reprend pour finir
+        if wait and thread is not None:
+            thread.join()
+
+    def _seal(self, graph: Graph) -> threading.Thread:
+        """Scelle le journal (sous self.lock) ; retourne le thread qui écrira le snapshot"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if os.path.exists(self.sealed_path):
+            # Segment d'une compaction interrompue : on le prolonge au lieu de l'écraser
+            with open(self.sealed_path, "a", encoding="utf-8") as sealed, \
+                    open(self.journal_path, "r", encoding="utf-8") as current:
+                sealed.write(current.read())
+                sealed.flush()
+                os.fsync(sealed.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.sealed_path)
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        # Copie cohérente avec la fin du segment scellé
+        triples = list(graph)
+        self._records_since_snapshot = 0
+        with self._fsync_cond:
+            self._synced_seq = self._written_seq
+            self._fsync_cond.notify_all()
+        return threading.Thread(target=self._write_snapshot, args=(triples,), name="journal-snapshot", daemon=True)
+
+    def _write_snapshot(self, triples):
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for triple in triples:
+                    f.write(_nt_row(triple))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            os.remove(self.sealed_path)
+            print(f"📸 Snapshot écrit : {len(triples)} triples")
+        except Exception as e:
+            print(f"⚠️ Erreur lors de l'écriture du snapshot : {e}")
+        finally:
+            with self.lock:
+                self._compacting = False
+
+    def close(self):
+        """Vide le journal sur disque et arrête les threads de fond"""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        with self.lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        with self._fsync_cond:
+            self._closed = True
+            self._synced_seq = self._written_seq
+            self._fsync_cond.notify_all()
+
+
+class JournaledGraph(Graph):
+    """Graphe rdflib dont les ajouts/suppressions sont enregistrés dans un ChangeJournal"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.journal = None
+        self.listeners = []
+
+    def attach_journal(self, journal: ChangeJournal):
+        self.journal = journal
+
+    def add_listener(self, listener):
+        """listener(op, triple) est appelé pour chaque modification journalisée"""
+        self.listeners.append(listener)
+
+    def _record(self, op: str, triple):
+        self.journal.record(op, triple)
+        for listener in self.listeners:
+            listener(op, triple)
+
+    def add(self, triple):
+        if self.journal is None:
+            return super().add(triple)
+        with self.journal.lock:
+            if triple not in self:
+                self._record(OP_AJOUT, triple)
+            return super().add(triple)
+
+    def addN(self, quads):
+        if self.journal is None:
+            return super().addN(quads)
+        quads = list(quads)
+        with self.journal.lock:
+            for s, p, o, c in quads:
+                if c is self and (s, p, o) not in self:
+                    self._record(OP_AJOUT, (s, p, o))
+            return super().addN(quads)
+
+    def remove(self, triple):
+        if self.journal is None:
+            return super().remove(triple)
+        with self.journal.lock:
+            # Les motifs (s, None, None) sont journalisés triple par triple
+            for concrete in list(self.triples(triple)):
+                self._record(OP_SUPPRESSION, concrete)
+            return super().remove(triple)
+
+    def commit(self):
+        """Rend durables les modifications en attente (remplace g.serialize(...))"""
+        if self.journal is not None:
+            self.journal.commit(self)
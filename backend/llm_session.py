@@ -0,0 +1,164 @@
+# llm_session.py
+import asyncio
+import logging
+import time
+
+from observability import REGISTRY
+
+log = logging.getLogger("mobilite.llm_session")
+
+# ======================
+# 🔥 SESSION LLM : MODÈLE RÉSIDENT ET PRÉFIXE DU PROMPT RÉUTILISÉ
+# ======================
+#
+# - Préchauffage au démarrage : le modèle est chargé et le prompt évalué une
+#   première fois en arrière-plan, pas pendant la première question.
+# - keep_alive explicite à chaque appel, plus un ping périodique (prompt vide :
+#   chargement seul) ; un rechargement détecté relance le préchauffage.
+# - Réutilisation du préfixe : le runner d'Ollama garde le cache KV du dernier
+#   prompt et n'évalue que les tokens qui suivent le plus long préfixe commun.
+#   Le prompt commence par tout le texte statique et se termine par la question :
+#   seule la question est évaluée à chaque appel.
+#
+# Gain par appel = évaluation du prompt complet à froid (coût par caractère mesuré
+# au préchauffage, rapporté à la taille du prompt de l'appel) moins l'évaluation observée : prompt_eval_duration quand Ollama renvoie son
+# bilan, sinon le délai avant le premier token (génération interrompue en
+# streaming), ce qui sous-estime le gain.
+
+PROMPT_EVAL_SAVED = REGISTRY.counter(
+    "mobilite_ollama_prompt_eval_saved_seconds_total",
+    "Temps d'évaluation du prompt économisé grâce au préfixe en cache",
+    ("model",),
+)
+WARMUPS = REGISTRY.counter("mobilite_ollama_warmups_total", "Préchauffages du modèle", ("model",))
+
+RETRY_MIN = 5.0
+RETRY_MAX = 300.0
+# Un ping plus long que ce délai signifie que le modèle a dû être rechargé
+RELOAD_THRESHOLD = 1.0
+
+
+def parse_keep_alive(value: str):
+    """keep_alive d'Ollama : durée ("30m", "24h") ou nombre de secondes (-1 = toujours)"""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class LLMSession:
+    """Modèle Ollama gardé chargé, préfixe statique du prompt pré-évalué"""
+
+    def __init__(self, client, build_warmup_prompt, keep_alive="30m", keep_warm_interval: float = 300.0, options=None):
+        self.client = client
+        # Prompt complet d'une question type : son préfixe statique reste en cache
+        self.build_warmup_prompt = build_warmup_prompt
+        self.keep_alive = keep_alive
+        self.keep_warm_interval = keep_warm_interval
+        self.options = dict(options or {})
+        self.warm = False
+        self.cold_prompt_tokens = None
+        self.cold_prompt_eval = None  # secondes
+        self.cold_prompt_chars = None
+        self.warmups = 0
+        self.last_warmup = None
+        self.calls = 0
+        self.saved_seconds = 0.0
+        self._task = None
+
+    @property
+    def params(self) -> dict:
+        """Paramètres ajoutés à chaque appel /api/generate"""
+        return {"keep_alive": self.keep_alive}
+
+    async def warm_up(self) -> dict:
+        """Charge le modèle et évalue le prompt complet à froid ; mesure son coût"""
+        start = time.perf_counter()
+        options = {**self.options, "num_predict": 1}
+        prompt = await asyncio.to_thread(self.build_warmup_prompt)
+        # Variante qui diffère dès le premier token : le cache KV ne sert pas, la
+        # mesure suivante porte donc sur une évaluation complète
+        await self.client.generate("\n" + prompt, options=options, **self.params)
+        result = await self.client.generate(prompt, options=options, **self.params)
+        self.cold_prompt_tokens = result.get("prompt_eval_count")
+        self.cold_prompt_eval = (result.get("prompt_eval_duration") or 0) / 1e9
+        self.cold_prompt_chars = len(prompt)
+        self.warm = True
+        self.warmups += 1
+        self.last_warmup = time.time()
+        WARMUPS.inc(model=self.client.model)
+        log.info(
+            "🔥 Modèle %s préchauffé en %.1f s (prompt : %s tokens, %.2f s d'évaluation à froid)",
+            self.client.model, time.perf_counter() - start, self.cold_prompt_tokens, self.cold_prompt_eval,
+        )
+        return self.stats()
+
+    async def _ping(self) -> bool:
+        """Prolonge keep_alive ; False si le modèle a dû être rechargé"""
+        start = time.perf_counter()
+        await self.client.generate("", **self.params)
+        return time.perf_counter() - start < RELOAD_THRESHOLD
+
+    async def run(self):
+        """Préchauffe (avec reprises tant qu'Ollama ne répond pas), puis garde le modèle chargé"""
+        delay = RETRY_MIN
+        while True:
+            try:
+                if not self.warm:
+                    await self.warm_up()
+                    delay = RETRY_MIN
+                elif self.keep_warm_interval <= 0:
+                    return
+                elif not await self._ping():
+                    log.info("♻️ Modèle %s rechargé par Ollama, nouveau préchauffage", self.client.model)
+                    self.warm = False
+                    continue
+            except Exception as e:
+                # Ollama absent, ou prompt impossible à construire (ontologie en cours de synchronisation)
+                self.warm = False
+                log.warning("⚠️ Préchauffage du modèle impossible (%s), nouvel essai dans %.0f s", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX)
+                continue
+            await asyncio.sleep(self.keep_warm_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def observe(self, prompt_eval: float, prompt_chars: int, prompt_tokens: int = None) -> dict:
+        """Bilan d'un appel : évaluation du prompt observée et temps économisé (ms)"""
+        self.calls += 1
+        report = {"prompt_eval_ms": round(prompt_eval * 1000, 1)}
+        if prompt_tokens is not None:
+            report["prompt_tokens_evaluated"] = prompt_tokens
+        if self.cold_prompt_eval:
+            cold = self.cold_prompt_eval * prompt_chars / self.cold_prompt_chars
+            saved = max(0.0, cold - prompt_eval)
+            self.saved_seconds += saved
+            PROMPT_EVAL_SAVED.inc(saved, model=self.client.model)
+            report["prompt_eval_saved_ms"] = round(saved * 1000, 1)
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "model": self.client.model,
+            "warm": self.warm,
+            "keep_alive": self.keep_alive,
+            "keep_warm_interval": self.keep_warm_interval,
+            "warmups": self.warmups,
+            "last_warmup": self.last_warmup,
+            "cold_prompt_tokens": self.cold_prompt_tokens,
+            "cold_prompt_eval_ms": round(self.cold_prompt_eval * 1000, 1) if self.cold_prompt_eval is not None else None,
+            "calls": self.calls,
+            "prompt_eval_saved_ms_total": round(self.saved_seconds * 1000, 1),
+            "prompt_eval_saved_ms_mean": round(self.saved_seconds * 1000 / self.calls, 1) if self.calls else None,
+        }
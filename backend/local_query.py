@@ -0,0 +1,168 @@
+# local_query.py
+import threading
+from collections import Counter, OrderedDict
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.plugins.sparql import prepareQuery
+
+from sparql_normalizer import PARSE_LOCK
+from workload import measure
+
+# ======================
+# 🗄️ MOTEUR DE REQUÊTES LOCAL
+# ======================
+#
+# Le graphe `g` de app.py est une copie complète des données, tenue à jour par
+# chaque écriture. Ce module évalue les SELECT/ASK directement sur ce graphe
+# (sans aller-retour HTTP vers Fuseki) et produit le même JSON SPARQL que
+# Fuseki, pour que les endpoints n'aient pas à distinguer les deux moteurs.
+#
+# L'analyse d'une requête par rdflib (parseur + algèbre) coûte souvent plus que
+# son évaluation : les requêtes préparées sont gardées dans un cache LRU.
+
+BACKENDS = ("fuseki", "local", "local-with-fallback")
+
+
+class LocalQueryError(Exception):
+    """Requête que le moteur local ne sait pas évaluer (syntaxe, type de requête)"""
+
+
+def term_to_json(term) -> dict:
+    """Terme rdflib -> valeur d'un binding SPARQL JSON"""
+    if isinstance(term, URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    value = {"type": "literal", "value": str(term)}
+    if isinstance(term, Literal):
+        if term.language:
+            value["xml:lang"] = term.language
+        elif term.datatype:
+            value["datatype"] = str(term.datatype)
+    return value
+
+
+class LocalQueryEngine:
+    """Évalue les requêtes SELECT/ASK sur le graphe local, requêtes préparées en cache"""
+
+    def __init__(self, graph, lock, cache_size: int = 256):
+        self.graph = graph
+        # Verrou du graphe (journal.SharedLock) : le store mémoire de rdflib ne supporte
+        # pas une itération concurrente à une modification ; les lectures, elles, se
+        # partagent le verrou et n'attendent pas les unes après les autres
+        self.lock = lock
+        self.cache_size = cache_size
+        self._prepared = OrderedDict()  # requête -> requête préparée
+        self._prepared_lock = threading.Lock()
+        # Génération du graphe : incrémentée à chaque modification (sous le verrou
+        # exclusif du graphe), comparée à la dernière génération vue par les lecteurs
+        self.generation = 0
+        self._seen_generation = 0
+        self._seen_lock = threading.Lock()
+        self.queries = 0
+        self.parse_hits = 0
+        self.parse_misses = 0
+        self.fallbacks = 0
+        # WorkloadRecorder (workload.py) si l'enregistrement de la charge est activé
+        self.recorder = None
+
+    def on_change(self, op: str, triple):
+        """Écouteur du graphe local : les résultats en cache sont périmés"""
+        self.generation += 1
+
+    def consume_change(self) -> bool:
+        """
+        True si le graphe a changé depuis le dernier appel. Une modification faite
+        pendant l'appel n'est pas perdue : elle sera vue par l'appel suivant.
+        """
+        generation = self.generation
+        with self._seen_lock:
+            changed = generation > self._seen_generation
+            self._seen_generation = max(generation, self._seen_generation)
+        return changed
+
+    def prepare(self, query: str):
+        with self._prepared_lock:
+            prepared = self._prepared.get(query)
+            if prepared is not None:
+                self._prepared.move_to_end(query)
+                self.parse_hits += 1
+                return prepared
+        try:
+            with PARSE_LOCK:
+                prepared = prepareQuery(query)
+        except Exception as e:
+            raise LocalQueryError(f"Requête non analysable localement : {e}") from e
+        if prepared.algebra.name not in ("SelectQuery", "AskQuery"):
+            raise LocalQueryError(f"Type de requête non pris en charge localement : {prepared.algebra.name}")
+        with self._prepared_lock:
+            self.parse_misses += 1
+            self._prepared[query] = prepared
+            while len(self._prepared) > self.cache_size:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def select(self, query: str) -> dict:
+        """Exécute un SELECT/ASK et retourne le JSON SPARQL (même forme que Fuseki)"""
+        with measure(self.recorder, "local_select", query) as probe:
+            prepared = self.prepare(query)
+            with self._prepared_lock:
+                self.queries += 1
+            with self.lock.shared():
+                result = self.graph.query(prepared)
+                if result.type == "ASK":
+                    probe["size"] = 1
+                    return {"head": {}, "boolean": bool(result.askAnswer)}
+                variables = [str(v) for v in result.vars]
+                bindings = [
+                    {var: term_to_json(term) for var, term in zip(variables, row) if term is not None}
+                    for row in result
+                ]
+            probe["size"] = len(bindings)
+        return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "prepared_cached": len(self._prepared),
+            "parse_hits": self.parse_hits,
+            "parse_misses": self.parse_misses,
+            "fallbacks": self.fallbacks,
+        }
+
+
+# ======================
+# ⚖️ COHÉRENCE LOCAL / FUSEKI
+# ======================
+
+def _canonical_value(value: dict):
+    # Les identifiants de nœuds anonymes diffèrent d'un moteur à l'autre
+    if value["type"] == "bnode":
+        return ("bnode",)
+    # « typed-literal » est l'ancien nom du type literal dans le JSON SPARQL
+    kind = "literal" if value["type"] == "typed-literal" else value["type"]
+    return (kind, value["value"], value.get("datatype"), value.get("xml:lang"))
+
+
+def canonical_rows(results: dict) -> Counter:
+    """Multiensemble des lignes d'un résultat (l'ordre des lignes n'est pas comparé)"""
+    if "boolean" in results:
+        return Counter([("boolean", results["boolean"])])
+    return Counter(
+        tuple(sorted((var, _canonical_value(value)) for var, value in binding.items()))
+        for binding in results.get("results", {}).get("bindings", [])
+    )
+
+
+def compare_results(local: dict, remote: dict, sample: int = 5) -> dict:
+    """Compare deux résultats SPARQL JSON ; retourne les lignes propres à chacun (échantillon)"""
+    local_rows, remote_rows = canonical_rows(local), canonical_rows(remote)
+    only_local = local_rows - remote_rows
+    only_remote = remote_rows - local_rows
+    return {
+        "consistent": not only_local and not only_remote,
+        "local_rows": sum(local_rows.values()),
+        "fuseki_rows": sum(remote_rows.values()),
+        "only_local": [dict(row) for row in list(only_local.elements())[:sample]],
+        "only_fuseki": [dict(row) for row in list(only_remote.elements())[:sample]],
+    }
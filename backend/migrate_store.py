@@ -0,0 +1,100 @@
+# migrate_store.py
+import argparse
+import os
+import time
+
+from rdflib import Graph
+
+from bulk_upload import detect_format, stream_triples
+from journal import ChangeJournal
+from sqlite_store import SQLiteStore
+
+# ======================
+# 🚚 MIGRATION .rdf / JOURNAL → STORE SQLITE
+# ======================
+#
+# Remplit le store persistant utilisé avec MOBILITE_LOCAL_STORE=sqlite :
+#
+#   python migrate_store.py mobilite.rdf --store mobilite.sqlite
+#   python migrate_store.py mobilite.rdf --journal --store mobilite.sqlite
+#
+# Les fichiers sont lus en streaming (mêmes parseurs que /upload/) et écrits par
+# lots, une transaction par lot. --journal ajoute l'état courant du mode
+# mémoire (snapshot + journal des modifications), à rejouer après le RDF initial.
+
+BATCH_TRIPLES = 50000
+
+
+def migrate_file(store: SQLiteStore, graph: Graph, path: str, fmt: str = None, batch: int = BATCH_TRIPLES) -> int:
+    """Charge un fichier RDF dans le store ; retourne le nombre de triples lus"""
+    fmt = detect_format(path, None, fmt)
+    total = 0
+
+    def emit(graph_name, triples):
+        nonlocal total
+        store.addN((s, p, o, graph) for s, p, o in triples)
+        store.commit()
+        total += len(triples)
+        print(f"   … {total} triples", end="\r", flush=True)
+
+    with open(path, "rb") as f:
+        stream_triples(f, fmt, batch, emit)
+    print()
+    return total
+
+
+def migrate_journal(store: SQLiteStore, graph: Graph, journal_path: str, snapshot_path: str, load_base=None) -> int:
+    """
+    Rejoue snapshot + journal du mode mémoire dans le store ; load_base(graph) charge
+    les fichiers RDF initiaux, seulement en l'absence de snapshot (qui les contient déjà)
+    """
+    journal = ChangeJournal(journal_path, snapshot_path)
+    replayed = journal.restore(graph, load_base)
+    store.commit()
+    return replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration des fichiers RDF vers le store SQLite du graphe local")
+    parser.add_argument("files", nargs="*", help="fichiers RDF (Turtle, N-Triples, N-Quads, RDF/XML)")
+    parser.add_argument("--store", default=os.getenv("MOBILITE_STORE_PATH", "mobilite.sqlite"))
+    parser.add_argument("--format", help="format des fichiers (sinon déduit de l'extension)")
+    parser.add_argument("--journal", action="store_true", help="rejoue aussi le snapshot et le journal du mode mémoire")
+    parser.add_argument("--journal-path", default=os.getenv("MOBILITE_JOURNAL_PATH", "mobilite_journal.nt"))
+    parser.add_argument("--snapshot-path", default=os.getenv("MOBILITE_SNAPSHOT_PATH", "mobilite_snapshot.nt"))
+    parser.add_argument("--replace", action="store_true", help="supprime le store existant avant la migration")
+    args = parser.parse_args()
+
+    if args.replace:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.store + suffix):
+                os.remove(args.store + suffix)
+
+    store = SQLiteStore()
+    store.open(args.store, create=True)
+    graph = Graph(store=store)
+    started = time.perf_counter()
+
+    def load_files(graph):
+        for path in args.files:
+            print(f"📦 {path} ...")
+            count = migrate_file(store, graph, path, args.format)
+            print(f"✅ {path} : {count} triples")
+
+    try:
+        if args.journal:
+            if args.files and os.path.exists(args.snapshot_path):
+                print(f"📸 Snapshot {args.snapshot_path} présent : il contient déjà les fichiers RDF initiaux")
+            replayed = migrate_journal(store, graph, args.journal_path, args.snapshot_path, load_files)
+            print(f"📒 Journal rejoué : {replayed} opérations")
+        else:
+            load_files(graph)
+        graph.bind("mobilite", "http://www.semanticweb.org/smartcity/ontologies/mobilite#")
+        store.commit()
+        print(f"🗄️ {args.store} : {len(store)} triples en {time.perf_counter() - started:.2f} s")
+    finally:
+        store.close(commit_pending_transaction=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# observability.py
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# ======================
+# 📈 MÉTRIQUES (FORMAT TEXTE PROMETHEUS)
+# ======================
+#
+# Compteurs, jauges et histogrammes en mémoire, exposés par GET /metrics au
+# format d'exposition texte de Prometheus (version 0.0.4). Chaque module déclare
+# ses métriques au chargement sur le registre partagé REGISTRY ; une mesure ne
+# coûte qu'un verrou et une addition.
+#
+# Les valeurs déjà tenues ailleurs (hits des caches, taille du graphe local)
+# sont lues au moment du scrape par des fonctions de rappel : rien à dupliquer.
+
+# Bornes des histogrammes de latence (secondes), celles de prometheus_client
+# étendues jusqu'aux générations LLM de plusieurs minutes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} : étiquettes attendues {self.labelnames}, reçues {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, "", value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Valeur cumulée, qui ne fait que croître"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valeur instantanée, fixée directement ou lue par une fonction de rappel au scrape"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), function=None, kind: str = None):
+        super().__init__(name, documentation, labelnames)
+        # function() -> valeur, ou {tuple des étiquettes: valeur} si la métrique est étiquetée
+        self.function = function
+        if kind is not None:
+            self.kind = kind
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.function is None:
+            return super()._samples()
+        try:
+            values = self.function()
+        except Exception:
+            # Une source indisponible ne doit pas faire échouer tout le scrape
+            return []
+        if not self.labelnames:
+            values = {(): values}
+        return [(self.name, key, "", value) for key, value in values.items() if value is not None]
+
+
+class Histogram(_Metric):
+    """Distribution des observations par intervalles cumulés (+ somme et nombre)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe la durée du bloc (même s'il lève une exception)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            values = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((self.name + "_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+            samples.append((self.name + "_sum", key, "", total))
+            samples.append((self.name + "_count", key, "", count))
+        return samples
+
+
+class Registry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module rechargé : la métrique existante est conservée
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels=(), function=None) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, function))
+
+    def callback_counter(self, name: str, documentation: str, function, labels=()) -> Gauge:
+        """Compteur tenu par un autre composant, lu au moment du scrape"""
+        return self._register(Gauge(name, documentation, labels, function, kind="counter"))
+
+    def histogram(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ======================
+# 📝 JOURNALISATION
+# ======================
+#
+# Les modules écrivent dans des loggers « mobilite.<module> » avec des arguments
+# différés (log.debug("... %s", valeur)) : sous le niveau configuré, le message
+# n'est jamais formaté. Les champs passés par extra={...} sont repris tels quels
+# dans le format JSON.
+
+LOGGER_NAME = "mobilite"
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par message (horodatage, niveau, logger, message, champs extra)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text"):
+    """Niveau et format (text ou json) des logs de l'application, sur stderr"""
+    handler = logging.StreamHandler(sys.stderr)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s | %(message)s"))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    # Les messages ne remontent pas au logger racine (pas de doublon avec uvicorn)
+    logger.propagate = False
+    return logger
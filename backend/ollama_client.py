@@ -0,0 +1,154 @@
+# ollama_client.py
+import asyncio
+import json
+import time
+
+import httpx
+
+from observability import REGISTRY
+
+# ======================
+# 🦙 CLIENT OLLAMA ASYNC
+# ======================
+#
+# Les appels à /api/generate ne bloquent plus la boucle d'événements : une
+# génération lente n'empêche plus le worker de servir les autres requêtes,
+# et annuler la tâche ferme la connexion (Ollama arrête alors la génération).
+# En streaming, fermer le générateur de fragments a le même effet : l'appelant
+# arrête la génération dès qu'il a ce qu'il attend.
+
+
+OLLAMA_LATENCY = REGISTRY.histogram(
+    "mobilite_ollama_generate_duration_seconds", "Durée des appels /api/generate", ("model",)
+)
+OLLAMA_ERRORS = REGISTRY.counter("mobilite_ollama_errors_total", "Appels Ollama en erreur", ("model",))
+OLLAMA_CANCELLED = REGISTRY.counter(
+    "mobilite_ollama_cancelled_total", "Générations en streaming interrompues avant la fin", ("model",)
+)
+OLLAMA_PROMPT_TOKENS = REGISTRY.counter(
+    "mobilite_ollama_prompt_tokens_total", "Tokens du prompt évalués (prompt_eval_count)", ("model",)
+)
+OLLAMA_EVAL_TOKENS = REGISTRY.counter(
+    "mobilite_ollama_eval_tokens_total", "Tokens générés (eval_count)", ("model",)
+)
+OLLAMA_PROMPT_EVAL_SECONDS = REGISTRY.counter(
+    "mobilite_ollama_prompt_eval_seconds_total", "Temps d'évaluation du prompt (prompt_eval_duration)", ("model",)
+)
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "mobilite_ollama_tokens_per_second",
+    "Débit de génération (eval_count / eval_duration)",
+    ("model",),
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200),
+)
+
+
+def record_generation(model: str, result: dict):
+    """Métriques des champs de comptage renvoyés par Ollama (durées en nanosecondes)"""
+    prompt_tokens = result.get("prompt_eval_count") or 0
+    eval_tokens = result.get("eval_count") or 0
+    OLLAMA_PROMPT_TOKENS.inc(prompt_tokens, model=model)
+    OLLAMA_EVAL_TOKENS.inc(eval_tokens, model=model)
+    OLLAMA_PROMPT_EVAL_SECONDS.inc((result.get("prompt_eval_duration") or 0) / 1e9, model=model)
+    eval_duration = (result.get("eval_duration") or 0) / 1e9
+    if eval_tokens and eval_duration:
+        OLLAMA_TOKENS_PER_SECOND.observe(eval_tokens / eval_duration, model=model)
+
+
+class OllamaError(Exception):
+    """Erreur renvoyée par Ollama (HTTP ou réseau)"""
+
+
+class OllamaUnavailable(OllamaError):
+    """Ollama ne répond pas (serveur non démarré)"""
+
+
+def _error(e: httpx.HTTPError) -> OllamaError:
+    if isinstance(e, httpx.ConnectError):
+        return OllamaUnavailable(str(e))
+    if isinstance(e, httpx.HTTPStatusError):
+        return OllamaError(f"HTTP {e.response.status_code} : {e.response.text[:500]}")
+    return OllamaError(f"{type(e).__name__} : {e}")
+
+
+class OllamaClient:
+    """Client async pour l'API HTTP d'Ollama"""
+
+    def __init__(self, base_url: str, model: str, pool_size: int = 10, connect_timeout: float = 5.0):
+        self.base_url = base_url
+        self.model = model
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # Pas de timeout de lecture global : chaque étape fixe le sien (asyncio.wait_for)
+        self.timeout = httpx.Timeout(None, connect=connect_timeout)
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits, timeout=self.timeout)
+            self._loop = loop
+        return self._client
+
+    async def generate(self, prompt: str, options: dict = None, **params) -> dict:
+        """Appelle /api/generate (sans streaming) et retourne la réponse JSON"""
+        payload = {"model": self.model, "prompt": prompt, "stream": False, "options": options or {}}
+        payload.update(params)
+        start = time.perf_counter()
+        try:
+            r = await self.client.post("/api/generate", json=payload)
+            r.raise_for_status()
+        except httpx.HTTPError as e:
+            OLLAMA_ERRORS.inc(model=self.model)
+            raise _error(e) from e
+        finally:
+            OLLAMA_LATENCY.observe(time.perf_counter() - start, model=self.model)
+        result = r.json()
+        record_generation(self.model, result)
+        return result
+
+    async def generate_stream(self, prompt: str, options: dict = None, **params):
+        """
+        Appelle /api/generate en streaming : générateur async des fragments NDJSON
+        ({"response": "...", "done": false} puis le bilan avec "done": true).
+        Le fermer avant la fin (aclose, annulation) ferme la connexion et arrête la génération.
+        """
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "options": options or {}}
+        payload.update(params)
+        start = time.perf_counter()
+        chunks = 0
+        done = False
+        try:
+            async with self.client.stream("POST", "/api/generate", json=payload) as r:
+                if r.is_error:
+                    await r.aread()
+                    r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise OllamaError(chunk["error"])
+                    if chunk.get("done"):
+                        done = True
+                        record_generation(self.model, chunk)
+                    else:
+                        chunks += 1
+                    yield chunk
+        except httpx.HTTPError as e:
+            OLLAMA_ERRORS.inc(model=self.model)
+            raise _error(e) from e
+        except OllamaError:
+            OLLAMA_ERRORS.inc(model=self.model)
+            raise
+        finally:
+            OLLAMA_LATENCY.observe(time.perf_counter() - start, model=self.model)
+            if not done and chunks:
+                # Pas de bilan : un fragment correspond à un token généré
+                OLLAMA_CANCELLED.inc(model=self.model)
+                OLLAMA_EVAL_TOKENS.inc(chunks, model=self.model)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,406 @@
+# ontology_schema.py
+import logging
+import re
+import threading
+from itertools import islice
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import OWL, RDF, RDFS, SKOS, XSD
+
+from translation_cache import normalize_question
+
+log = logging.getLogger("mobilite.ontology_schema")
+
+# ======================
+# 🗺️ SCHÉMA DE L'ONTOLOGIE POUR LE PROMPT (SÉLECTION PAR QUESTION)
+# ======================
+#
+# Le contexte ontologique du prompt est généré depuis l'ontologie chargée
+# (classes, propriétés, sous-classes, domaines/portées, rdfs:label,
+# skos:altLabel) au lieu d'être écrit en dur. Pour chaque question, seuls les
+# termes utiles sont retenus :
+#   1. correspondance lexicale : mots de la question (minuscules, sans accents,
+#      pluriel ramené au singulier) contre les libellés des termes (rdfs:label,
+#      skos:altLabel, nom local découpé : dateNaissance → « date naissance ») ;
+#   2. synonymes français courants (SYNONYMS), ramenés au vocabulaire de l'ontologie ;
+#   3. voisinage : super-classes et sous-classes des classes retenues, propriétés
+#      dont elles sont le domaine, domaines et portées des propriétés retenues.
+# Aucun terme reconnu : le schéma complet est utilisé (pas de perte de précision).
+#
+# Domaines et portées : rdfs:domain / rdfs:range quand ils sont déclarés, sinon
+# observés sur un échantillon d'instances (types des sujets et des objets).
+
+SCHEMA_TYPES = frozenset({OWL.Class, RDFS.Class, OWL.DatatypeProperty, OWL.ObjectProperty, RDF.Property})
+SCHEMA_PREDICATES = frozenset({RDFS.label, SKOS.altLabel, RDFS.subClassOf, RDFS.domain, RDFS.range})
+
+# Triples de schéma d'un dataset SPARQL (quand le graphe local ne contient pas l'ontologie)
+SCHEMA_QUERY = """
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX owl: <http://www.w3.org/2002/07/owl#>
+PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+SELECT ?s ?p ?o WHERE {
+    {
+        VALUES ?o { owl:Class rdfs:Class owl:DatatypeProperty owl:ObjectProperty rdf:Property }
+        ?s a ?o .
+        BIND(rdf:type AS ?p)
+    }
+    UNION
+    {
+        VALUES ?kind { owl:Class rdfs:Class owl:DatatypeProperty owl:ObjectProperty rdf:Property }
+        VALUES ?p { rdfs:label skos:altLabel rdfs:subClassOf rdfs:domain rdfs:range }
+        ?s a ?kind ; ?p ?o .
+    }
+}
+"""
+
+# Instances examinées par propriété pour observer domaines et portées
+USAGE_SAMPLE = 200
+
+# Mots de la question → mots de l'ontologie (sans accents)
+SYNONYMS = {
+    "utilisateur": "personne", "usager": "personne", "gens": "personne", "habitant": "personne",
+    "individu": "personne", "client": "voyageur", "passager": "voyageur",
+    "chauffeur": "conducteur", "automobiliste": "conducteur", "marcheur": "pieton",
+    "vehicule": "transport", "auto": "voiture", "automobile": "voiture", "bicyclette": "velo",
+    "opinion": "avis", "evaluation": "note", "notation": "note", "etoile": "note",
+    "tarif": "prix", "cout": "prix", "billet": "ticket", "titre": "ticket",
+    "voyage": "trajet", "deplacement": "trajet", "parcours": "trajet", "itineraire": "trajet",
+    "ville": "city", "bouchon": "embouteillage", "collision": "accident",
+    "kilometre": "distance", "km": "distance", "longueur": "distance",
+    "courriel": "email", "mail": "email", "ans": "age", "borne": "recharge", "charge": "recharge",
+    "arret": "station", "gare": "station", "statistique": "statistiques",
+}
+
+# Mots trop génériques pour désigner un terme à eux seuls (« nombre de trajets »
+# ne concerne pas nombreArrets) : ils ne comptent que si tout le libellé correspond
+GENERIC_WORDS = frozenset({
+    "nombre", "niveau", "date", "score", "type", "heure", "temps", "moyen", "moyenne",
+    "total", "valeur", "classe", "etat", "source", "periode", "methode",
+})
+
+# Mots vides, ignorés des deux côtés (disposeDe, habiteA...)
+STOPWORDS = frozenset({
+    "a", "au", "aux", "avec", "ce", "d", "dan", "de", "du", "en", "est", "et", "il", "l", "la",
+    "le", "les", "ou", "par", "pour", "quel", "quelle", "san", "se", "sur", "t", "un", "une", "y",
+})
+
+_CAMEL = re.compile(r"[A-ZÀ-Ý]?[a-zà-ÿ]+|[A-ZÀ-Ý]+(?![a-zà-ÿ])|\d+")
+
+
+def stem(word: str) -> str:
+    """
+    Racine approximative : pluriel, terminaisons verbales et e final retirés
+    (effectuent / effectue → effectu, durent / durée → dur, optimaux → optimal).
+    Les deux côtés de la comparaison passent par ici.
+    """
+    if len(word) > 4 and word.endswith("aux"):
+        word = word[:-3] + "al"
+    elif len(word) > 3 and word[-1] in "sx":
+        word = word[:-1]
+    if len(word) > 5 and word.endswith("ent"):
+        word = word[:-3]
+    elif len(word) > 4 and word.endswith("er"):
+        word = word[:-2]
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def words(text: str) -> list:
+    """Racines des mots d'un libellé ou d'une question (sans accents ni mots vides)"""
+    return [stem(w) for w in normalize_question(text).split() if w not in STOPWORDS]
+
+
+_SYNONYMS = {stem(word): synonym for word, synonym in SYNONYMS.items()}
+_GENERIC = frozenset(map(stem, GENERIC_WORDS))
+
+
+def split_local_name(name: str) -> str:
+    """dateNaissance → « date Naissance », StationsBus → « Stations Bus »"""
+    return " ".join(_CAMEL.findall(name)) or name
+
+
+def collect_schema(graph, sample: int = USAGE_SAMPLE):
+    """(triples de schéma, usage observé des propriétés) d'un graphe rdflib"""
+    triples = []
+    for kind in SCHEMA_TYPES:
+        for s in graph.subjects(RDF.type, kind):
+            triples.append((s, RDF.type, kind))
+    subjects = {s for s, _, _ in triples}
+    for predicate in SCHEMA_PREDICATES:
+        triples.extend(t for t in graph.triples((None, predicate, None)) if t[0] in subjects)
+
+    usage = {}
+    for p, _, kind in triples:
+        if kind not in (OWL.DatatypeProperty, OWL.ObjectProperty, RDF.Property):
+            continue
+        domains, ranges = set(), set()
+        for s, o in islice(graph.subject_objects(p), sample):
+            domains.update(graph.objects(s, RDF.type))
+            if isinstance(o, Literal):
+                ranges.add(o.datatype or XSD.string)
+            else:
+                ranges.update(graph.objects(o, RDF.type))
+        usage[p] = (domains, ranges)
+    return triples, usage
+
+
+class _Term:
+    __slots__ = ("iri", "name", "kind", "labels", "words", "parents", "domains", "ranges")
+
+    def __init__(self, iri: URIRef, name: str, kind: str):
+        self.iri = iri
+        self.name = name
+        self.kind = kind  # "class", "data" ou "object"
+        self.labels = []
+        self.words = set()
+        self.parents = set()
+        self.domains = set()
+        self.ranges = set()
+
+
+class OntologySchema:
+    """Termes de l'ontologie, libellés indexés, rendu du contexte du prompt"""
+
+    def __init__(self, namespace, load_schema, max_terms: int = 12, max_neighbour_properties: int = 20):
+        # load_schema() -> (triples de schéma, {propriété: (types sujets, types objets)})
+        self.namespace = str(namespace)
+        self.load_schema = load_schema
+        self.max_terms = max_terms
+        self.max_neighbour_properties = max_neighbour_properties
+        self._lock = threading.Lock()
+        self._terms = {}
+        self._children = {}
+        self._index = {}  # mot -> termes dont un libellé le contient
+        self._full = ""
+        self._dirty = True
+        self.version = 0
+
+    def on_change(self, op: str, triple):
+        """Écouteur du graphe local : déclarations de classes/propriétés et axiomes"""
+        if triple[1] in SCHEMA_PREDICATES or (triple[1] == RDF.type and triple[2] in SCHEMA_TYPES):
+            self._dirty = True
+
+    def _local(self, iri):
+        if isinstance(iri, URIRef) and str(iri).startswith(self.namespace):
+            return str(iri)[len(self.namespace):]
+        return None
+
+    def refresh(self):
+        triples, usage = self.load_schema()
+        terms = {}
+        kinds = {OWL.Class: "class", RDFS.Class: "class", OWL.DatatypeProperty: "data",
+                 OWL.ObjectProperty: "object", RDF.Property: "object"}
+        for s, p, o in triples:
+            if p == RDF.type and self._local(s):
+                term = terms.get(s)
+                # owl:DatatypeProperty / ObjectProperty l'emportent sur rdf:Property
+                if term is None or term.kind == "object" and o == OWL.DatatypeProperty:
+                    terms[s] = _Term(s, self._local(s), kinds[o])
+        for s, p, o in triples:
+            term = terms.get(s)
+            if term is None or p == RDF.type:
+                continue
+            if p in (RDFS.label, SKOS.altLabel) and isinstance(o, Literal):
+                if o.language in (None, "fr") and str(o) not in term.labels:
+                    term.labels.append(str(o))
+            elif p == RDFS.subClassOf and o in terms:
+                term.parents.add(o)
+            elif p == RDFS.domain and o in terms:
+                term.domains.add(o)
+            elif p == RDFS.range:
+                term.ranges.add(o)
+
+        for iri, (domains, ranges) in usage.items():
+            term = terms.get(iri)
+            if term is None:
+                continue
+            if not term.domains:
+                term.domains = {d for d in domains if d in terms}
+            if not term.ranges:
+                term.ranges = {r for r in ranges if r in terms or str(r).startswith(str(XSD))}
+
+        children, index = {}, {}
+        for term in terms.values():
+            for parent in term.parents:
+                children.setdefault(parent, set()).add(term.iri)
+            for label in [split_local_name(term.name)] + term.labels:
+                term.words.update(words(label))
+            for word in term.words:
+                index.setdefault(word, []).append(term)
+
+        with self._lock:
+            self._terms = terms
+            self._children = children
+            self._index = index
+            # Ontologie pas encore disponible (synchronisation en cours) : nouvel essai au prochain appel
+            self._dirty = not terms
+            self._full = ""
+            self.version += 1
+        log.info("🗺️ Schéma de l'ontologie : %d termes", len(terms))
+
+    def _ensure(self):
+        if self._dirty:
+            self.refresh()
+
+    # ----- correspondance question → termes -----
+
+    def question_words(self, question: str) -> set:
+        found = set()
+        for word in words(question):
+            found.add(word)
+            synonym = _SYNONYMS.get(word)
+            if synonym:
+                found.update(words(synonym))
+        return found
+
+    def match(self, question: str) -> list:
+        """Termes cités par la question, du plus au moins pertinent"""
+        self._ensure()
+        found = self.question_words(question)
+        scores = {}
+        for word in found:
+            for term in self._index.get(word, ()):
+                scores.setdefault(term.iri, set()).add(word)
+        complete, partial = [], []
+        for iri, matched in scores.items():
+            term = self._terms[iri]
+            if matched >= term.words:
+                complete.append((len(matched), term))
+            elif matched - _GENERIC:
+                partial.append((len(matched - _GENERIC), matched, term))
+        # Une correspondance partielle n'est gardée que si elle apporte un mot
+        # qu'aucun libellé complet ne couvre (« catégorie de permis » : categoriePermis,
+        # pas categorieAvis ni numeroPermis)
+        covered = set().union(*(term.words for _, term in complete))
+        partial = [(n, term) for n, matched, term in partial if matched - _GENERIC - covered]
+        ranked = sorted(complete, key=lambda r: (-r[0], r[1].kind != "class", r[1].name))
+        ranked += sorted(partial, key=lambda r: (-r[0], r[1].kind != "class", r[1].name))
+        return [term for _, term in ranked]
+
+    def find(self, text: str, kinds=("class", "data", "object")):
+        """Terme dont le libellé correspond exactement à `text` (« conducteurs », « date de naissance », dateNaissance)"""
+        self._ensure()
+        found = set(words(split_local_name(text)))
+        if not found:
+            return None
+        synonyms = {_SYNONYMS.get(w, w) for w in found}
+        for term in self._terms.values():
+            if term.kind in kinds and term.words in (found, synonyms):
+                return term
+        return None
+
+    def family(self, iri) -> set:
+        """La classe, ses super-classes et ses sous-classes"""
+        self._ensure()
+        return self._ancestors(iri) | self._descendants(iri) | {iri}
+
+    def _ancestors(self, iri) -> set:
+        seen, stack = set(), [iri]
+        while stack:
+            for parent in self._terms[stack.pop()].parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return seen
+
+    def _descendants(self, iri) -> set:
+        seen, stack = set(), [iri]
+        while stack:
+            for child in self._children.get(stack.pop(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    def select(self, question: str):
+        """Termes retenus pour la question (voisinage compris), ou None si aucun n'est reconnu"""
+        seeds = self.match(question)[: self.max_terms]
+        if not seeds:
+            return None
+        selected = {term.iri for term in seeds}
+        neighbours = {}
+        for rank, term in enumerate(seeds):
+            if term.kind != "class":
+                selected.update(term.domains)
+                selected.update(r for r in term.ranges if r in self._terms)
+                continue
+            selected.update(self._ancestors(term.iri))
+            # Propriétés de la classe : les plus partagées par la famille d'abord
+            family = self._ancestors(term.iri) | self._descendants(term.iri) | {term.iri}
+            for p in self._terms.values():
+                shared = len(p.domains & family) if p.kind != "class" else 0
+                if shared:
+                    key = (rank, -shared, p.name)
+                    neighbours[p.iri] = min(neighbours.get(p.iri, key), key)
+        extra = sorted((key, iri) for iri, key in neighbours.items() if iri not in selected)
+        selected.update(iri for _, iri in extra[: self.max_neighbour_properties])
+        return [self._terms[iri] for iri in selected]
+
+    # ----- rendu -----
+
+    def _names(self, iris, limit: int = 4) -> str:
+        names = sorted(self._terms[i].name if i in self._terms else f"xsd:{str(i).rsplit('#', 1)[-1]}" for i in iris)
+        return ", ".join(names[:limit]) + (", …" if len(names) > limit else "")
+
+    def _render(self, terms, details: bool) -> str:
+        classes = sorted((t for t in terms if t.kind == "class"), key=lambda t: t.name)
+        data = sorted((t for t in terms if t.kind == "data"), key=lambda t: t.name)
+        objects = sorted((t for t in terms if t.kind == "object"), key=lambda t: t.name)
+
+        def describe(term):
+            text = term.name
+            labels = [label for label in term.labels if normalize_question(label) != normalize_question(split_local_name(term.name))]
+            if labels and details:
+                text += f" « {labels[0]} »"
+            if term.kind == "class":
+                extra = []
+                if term.parents:
+                    extra.append(f"sous-classe de {self._names(term.parents)}")
+                if details and term.iri in self._children:
+                    extra.append(f"sous-classes : {self._names(self._children[term.iri], 8)}")
+                return f"{text} ({' ; '.join(extra)})" if extra else text
+            if not details:
+                return text
+            if term.kind == "data":
+                return f"{text} ({self._names(term.domains)})" if term.domains else text
+            if term.domains or term.ranges:
+                return f"{text} ({self._names(term.domains) or '?'} → {self._names(term.ranges) or '?'})"
+            return text
+
+        lines = []
+        if classes:
+            lines.append("- Classes : " + ", ".join(describe(t) for t in classes))
+        if data:
+            lines.append("- Propriétés de données" + (" (domaine)" if details else "") + " : " + ", ".join(describe(t) for t in data))
+        if objects:
+            lines.append("- Propriétés objet" + (" (domaine → portée)" if details else "") + " : " + ", ".join(describe(t) for t in objects))
+        return "\n".join(lines)
+
+    def full_context(self) -> str:
+        """Schéma complet (noms et hiérarchie), généré une fois par version de l'ontologie"""
+        self._ensure()
+        with self._lock:
+            if not self._full:
+                self._full = self._render(self._terms.values(), details=False)
+            return self._full
+
+    def context(self, question: str) -> str:
+        """Contexte ontologique du prompt pour une question"""
+        terms = self.select(question)
+        if terms is None:
+            return self.full_context()
+        return self._render(terms, details=True)
+
+    def stats(self) -> dict:
+        self._ensure()
+        kinds = [t.kind for t in self._terms.values()]
+        return {
+            "version": self.version,
+            "classes": kinds.count("class"),
+            "datatype_properties": kinds.count("data"),
+            "object_properties": kinds.count("object"),
+            "full_context_chars": len(self.full_context()),
+        }
+
@@ -0,0 +1,262 @@
+# outbox.py
+import json
+import os
+import re
+import threading
+
+# ======================
+# 📤 OUTBOX DES MISES À JOUR FUSEKI (WRITE-BEHIND)
+# ======================
+#
+# Les requêtes SPARQL UPDATE ne sont plus envoyées dans le chemin de la requête
+# HTTP : elles sont ajoutées à un fichier outbox durable (fsync groupés) et
+# l'écriture est acquittée immédiatement. Un thread de fond regroupe les
+# opérations en attente en une seule requête UPDATE (INSERT DATA consécutifs
+# fusionnés, autres opérations séparées par « ; ») toutes les N ms ou dès M
+# opérations, avec reprises en cas d'échec.
+#
+# Une opération peut porter les triples qu'elle modifie (« changes », au format
+# du journal) : `changelog(changes)` produit alors une opération ajoutée à la fin
+# du lot, dans la même requête (donc la même transaction Fuseki).
+#
+# Fichiers :
+#   <path>           une opération par ligne : {"seq": n, "update": "...", "changes": "..."}
+#   <path>.cursor    dernier numéro de séquence confirmé par Fuseki
+#   <path>.rejected  opérations refusées par Fuseki (erreur 4xx), pour analyse
+
+
+_INSERT_DATA = re.compile(r"^\s*((?:PREFIX\s+[\w-]*:\s*<[^>]*>\s*)*)INSERT\s+DATA\s*\{(.*)\}\s*$", re.S | re.I)
+_PREFIX = re.compile(r"PREFIX\s+([\w-]*):\s*<([^>]*)>", re.I)
+
+
+def coalesce(updates) -> str:
+    """Fusionne les INSERT DATA consécutifs en un seul, puis enchaîne les opérations par « ; »"""
+    operations = []
+    prefixes, bodies = {}, []
+
+    def close_run():
+        if bodies:
+            prologue = "\n".join(f"PREFIX {name}: <{iri}>" for name, iri in prefixes.items())
+            operations.append(f"{prologue}\nINSERT DATA {{\n" + "\n".join(bodies) + "\n}")
+            prefixes.clear()
+            bodies.clear()
+
+    for update in updates:
+        m = _INSERT_DATA.match(update)
+        if m is None:
+            close_run()
+            operations.append(update)
+            continue
+        declared = dict(_PREFIX.findall(m.group(1)))
+        # Un même préfixe lié à deux IRI différentes empêche la fusion
+        if any(prefixes.get(name, iri) != iri for name, iri in declared.items()):
+            close_run()
+        prefixes.update(declared)
+        bodies.append(m.group(2).strip())
+    close_run()
+    return " ;\n".join(operations)
+
+
+class FusekiOutbox:
+    """File durable d'opérations SPARQL UPDATE vidée en lots vers Fuseki"""
+
+    def __init__(
+        self,
+        path: str,
+        send,
+        on_flushed=None,
+        flush_interval: float = 0.05,
+        batch_size: int = 200,
+        max_backoff: float = 30.0,
+        changelog=None,
+    ):
+        self.path = path
+        self.cursor_path = path + ".cursor"
+        self.rejected_path = path + ".rejected"
+        self.send = send
+        self.on_flushed = on_flushed
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.changelog = changelog
+
+        self._lock = threading.Lock()
+        self._fsync_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = []  # [(seq, update, changes)]
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._acked_seq = 0
+        self._closed = False
+        self._thread = None
+        self.flushed_ops = 0
+        self.flushed_batches = 0
+        self.failures = 0
+        self.rejected = 0
+
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    # ----------------------
+    # Démarrage
+    # ----------------------
+
+    def _load(self):
+        if os.path.exists(self.cursor_path):
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                self._acked_seq = int(f.read().strip() or 0)
+        last_seq = self._acked_seq
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    last_seq = max(last_seq, record["seq"])
+                    if record["seq"] > self._acked_seq:
+                        self._pending.append((record["seq"], record["update"], record.get("changes")))
+        self._written_seq = self._synced_seq = last_seq
+        if self._pending:
+            print(f"📤 Outbox : {len(self._pending)} mise(s) à jour en attente d'envoi à Fuseki")
+
+    def start(self):
+        """Démarre le thread d'envoi en arrière-plan"""
+        self._thread = threading.Thread(target=self._run, name="fuseki-outbox", daemon=True)
+        self._thread.start()
+
+    # ----------------------
+    # Écriture (chemin de la requête HTTP)
+    # ----------------------
+
+    def enqueue(self, update_query: str, changes: str = None) -> int:
+        """Ajoute une opération à l'outbox ; retourne une fois l'opération durable"""
+        record = {"seq": None, "update": update_query}
+        if changes:
+            record["changes"] = changes
+        with self._lock:
+            self._written_seq += 1
+            seq = record["seq"] = self._written_seq
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._pending.append((seq, update_query, changes))
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+
+        # Group commit : le premier arrivé fait un fsync qui couvre aussi les
+        # écritures concurrentes ; les suivants le trouvent déjà fait
+        with self._fsync_lock:
+            if self._synced_seq < seq:
+                with self._lock:
+                    target = self._written_seq
+                os.fsync(self._file.fileno())
+                self._synced_seq = target
+        return seq
+
+    # ----------------------
+    # Envoi à Fuseki (thread de fond)
+    # ----------------------
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            with self._lock:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed and not self._pending:
+                    return
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                continue
+
+            if self._flush(batch):
+                backoff = self.flush_interval
+            else:
+                with self._lock:
+                    if self._closed:
+                        return
+                    self._wakeup.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _payload(self, batch) -> str:
+        payload = coalesce(update for _, update, _ in batch)
+        changes = [c for _, _, c in batch if c]
+        if self.changelog is not None and changes:
+            payload += " ;\n" + self.changelog(changes)
+        return payload
+
+    def _flush(self, batch) -> bool:
+        try:
+            self.send(self._payload(batch))
+        except Exception as e:
+            if getattr(e, "status_code", None) is not None and 400 <= e.status_code < 500:
+                # Une opération invalide ferait échouer tout le lot : on isole les fautives
+                return self._flush_one_by_one(batch)
+            self.failures += 1
+            print(f"❌ Outbox : envoi à Fuseki impossible ({len(batch)} opérations), nouvel essai : {e}")
+            return False
+        self._ack(batch)
+        return True
+
+    def _flush_one_by_one(self, batch) -> bool:
+        """Envoie le lot opération par opération ; False si Fuseki est devenu indisponible"""
+        for seq, update, changes in batch:
+            try:
+                self.send(self._payload([(seq, update, changes)]))
+            except Exception as e:
+                if getattr(e, "status_code", None) is None or e.status_code >= 500:
+                    # Fuseki indisponible entre-temps : on reprendra à cette opération,
+                    # après l'attente du backoff
+                    self.failures += 1
+                    print(f"❌ Outbox : envoi à Fuseki impossible (mise à jour {seq}), nouvel essai : {e}")
+                    return False
+                self.rejected += 1
+                print(f"❌ Outbox : mise à jour {seq} refusée par Fuseki : {e}")
+                with open(self.rejected_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"seq": seq, "update": update, "error": str(e)}, ensure_ascii=False) + "\n")
+            self._ack([(seq, update, changes)])
+        return True
+
+    def _ack(self, batch):
+        last_seq = batch[-1][0]
+        tmp_path = self.cursor_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(last_seq))
+        os.replace(tmp_path, self.cursor_path)
+
+        with self._lock:
+            self._acked_seq = last_seq
+            self._pending = [op for op in self._pending if op[0] > last_seq]
+            self.flushed_ops += len(batch)
+            self.flushed_batches += 1
+            # Tout est confirmé : le fichier peut repartir de zéro
+            if not self._pending and self._synced_seq == self._written_seq:
+                self._file.truncate(0)
+
+        if self.on_flushed is not None:
+            self.on_flushed()
+
+    # ----------------------
+    # Arrêt / état
+    # ----------------------
+
+    def close(self, timeout: float = 5.0):
+        """Tente un dernier envoi puis arrête le thread (le reste sera renvoyé au redémarrage)"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            self._file.close()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "acked_seq": self._acked_seq,
+            "flushed_ops": self.flushed_ops,
+            "flushed_batches": self.flushed_batches,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,84 @@
+# pagination.py
+import base64
+import binascii
+
+# ======================
+# 📄 PAGINATION PAR CURSEUR (KEYSET) DES LISTES
+# ======================
+#
+# Les pages sont découpées sur l'IRI du sujet : une première requête sélectionne
+# les `limit + 1` sujets suivant le curseur (FILTER + ORDER BY + LIMIT exécutés
+# par Fuseki), une seconde récupère le détail de ces seuls sujets (VALUES).
+# Le curseur est opaque pour le client (IRI du dernier sujet en base64).
+
+
+class CursorError(ValueError):
+    """Curseur de pagination illisible"""
+
+
+def encode_cursor(iri: str) -> str:
+    return base64.urlsafe_b64encode(iri.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise CursorError(f"Curseur invalide : {cursor}") from e
+
+
+def _string_literal(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class ListQuery:
+    """
+    Requête de liste paginable : `core` identifie les sujets (motifs obligatoires),
+    `details` ajoute les colonnes (OPTIONAL...).
+    """
+
+    def __init__(self, prefixes: str, select: str, subject: str, core: str, details: str = ""):
+        self.prefixes = prefixes
+        self.select = select
+        self.subject = subject
+        self.core = core
+        self.details = details
+
+    def page_query(self, cursor: str = None, limit: int = 50) -> str:
+        """Sujets de la page suivant le curseur (un de plus pour savoir s'il reste une page)"""
+        after = f"FILTER(STR(?{self.subject}) > {_string_literal(decode_cursor(cursor))})" if cursor else ""
+        return f"""
+        {self.prefixes}
+        SELECT DISTINCT ?{self.subject} WHERE {{
+            {self.core}
+            {after}
+        }}
+        ORDER BY STR(?{self.subject})
+        LIMIT {limit + 1}
+        """
+
+    def rows_query(self, subjects=None, ordered: bool = False) -> str:
+        """Détail des sujets donnés (tous si None), triés par sujet si demandé"""
+        values = ""
+        if subjects is not None:
+            values = f"VALUES ?{self.subject} {{ " + " ".join(f"<{s}>" for s in subjects) + " }"
+        order = f"ORDER BY STR(?{self.subject})" if ordered or subjects is not None else ""
+        return f"""
+        {self.prefixes}
+        SELECT {self.select} WHERE {{
+            {values}
+            {self.core}
+            {self.details}
+        }}
+        {order}
+        """
+
+
+def page_subjects(results: dict, subject: str, limit: int):
+    """(sujets de la page, curseur suivant ou None) à partir du résultat de page_query"""
+    subjects = [r[subject]["value"] for r in results["results"]["bindings"]]
+    if len(subjects) > limit:
+        subjects = subjects[:limit]
+        return subjects, encode_cursor(subjects[-1])
+    return subjects, None
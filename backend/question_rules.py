@@ -0,0 +1,175 @@
+# question_rules.py
+import logging
+import re
+
+log = logging.getLogger("mobilite.question_rules")
+
+# ======================
+# ⚡ QUESTIONS COURANTES TRADUITES SANS LLM
+# ======================
+#
+# Une bonne part du trafic /ask/ suit quelques formes fixes :
+#   « Liste toutes les X », « Combien de X (y a-t-il) ? », « Trouve les X avec Y = Z ».
+# Ces questions sont compilées directement en SPARQL : X est une classe et Y une
+# propriété de données de l'ontologie, reconnues sur leurs libellés (mêmes règles
+# que la sélection du contexte du prompt, voir ontology_schema.py). Une question
+# qui ne correspond à aucune règle, ou dont un terme n'est pas reconnu sans
+# ambiguïté, est laissée au LLM.
+#
+# Sous-classes comprises (VALUES ?type, comme les endpoints) : « Liste toutes les
+# personnes » renvoie aussi les conducteurs et les piétons.
+
+XSD_PREFIX = "PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>"
+
+_LIST = re.compile(
+    r"^(?:liste[rz]?|affiche[rz]?|donne[rz]?(?:-moi)?|montre[rz]?(?:-moi)?|trouve[rz]?|cherche[rz]?|"
+    r"quel(?:le)?s\s+sont)\s+(?:tou(?:te)?s\s+)?(?:les|des)\s+(?P<rest>.+)$",
+    re.I,
+)
+_COUNT = re.compile(
+    r"^(?:combien\s+(?:de\s+|d['’]\s*)|(?:quel\s+est\s+)?le\s+nombre\s+(?:de\s+|d['’]\s*)|"
+    r"compte[rz]?\s+(?:tou(?:te)?s\s+)?les\s+)(?P<rest>.+)$",
+    re.I,
+)
+# Fin de question sans contenu : « y a-t-il ? », « existe-t-il », « au total »
+_TAIL = re.compile(r"(?:\s+(?:y\s+a[\s-]t[\s-]il|existe[\s-]t[\s-]il|existent|au\s+total))?\s*[?.!]*\s*$", re.I)
+# Classe, puis condition : « conducteurs avec une catégorie de permis = B », « voitures de
+# marque "Renault" », « personnes qui ont un âge > 30 », « stations de recharge disponibles = oui »
+_CONDITION = re.compile(r"\s+(?:(?:avec|ayant|dont|où|(?:qui\s+)?(?:ont|a)|de|d['’])(?:\s+|(?<=['’])))?", re.I)
+
+# Opérateur explicite entre la propriété et la valeur
+_OPERATORS = [
+    (r"\s*(>=|≥)\s*", ">="), (r"\s*(<=|≤)\s*", "<="), (r"\s*(!=|≠)\s*", "!="),
+    (r"\s*[=:]\s*", "="), (r"\s*>\s*", ">"), (r"\s*<\s*", "<"),
+    (r"\s+(?:supérieur|superieur)e?s?\s+ou\s+(?:égal|egal)e?s?\s+à\s+", ">="),
+    (r"\s+(?:inférieur|inferieur)e?s?\s+ou\s+(?:égal|egal)e?s?\s+à\s+", "<="),
+    (r"\s+(?:supérieur|superieur)e?s?\s+à\s+", ">"), (r"\s+(?:inférieur|inferieur)e?s?\s+à\s+", "<"),
+    (r"\s+(?:d'au\s+moins|au\s+moins)\s+", ">="), (r"\s+(?:d'au\s+plus|au\s+plus)\s+", "<="),
+    (r"\s+(?:différent|different)e?s?\s+de\s+", "!="),
+    (r"\s+(?:égal|egal)e?s?\s+à\s+", "="), (r"\s+(?:est|vaut|égale|egale)\s+", "="),
+]
+_OPERATORS = [(re.compile(pattern, re.I), op) for pattern, op in _OPERATORS]
+# Sans opérateur : la valeur est le texte entre guillemets final, ou un dernier mot
+# nombre ou booléen (« un email gmail » est laissé au LLM : valeur partielle, pas égalité)
+_IMPLICIT = re.compile(r"^(?P<prop>.+?)\s+(?:\"(?P<quoted>[^\"]*)\"|«\s*(?P<guillemets>[^»]*?)\s*»|(?P<word>\S+))$")
+_NUMBER = re.compile(r"^-?\d+(?:[.,]\d+)?$")
+_BOOLEANS = {"vrai": "true", "oui": "true", "true": "true", "faux": "false", "non": "false", "false": "false"}
+
+
+def sparql_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def variable(name: str) -> str:
+    """Nom local → variable SPARQL : Conducteur → ?conducteur"""
+    name = re.sub(r"\W", "_", name)
+    return "?" + name[:1].lower() + name[1:]
+
+
+class QuestionCompiler:
+    """Règles question → SPARQL sur les libellés de l'ontologie"""
+
+    def __init__(self, schema, hierarchy):
+        self.schema = schema
+        self.hierarchy = hierarchy
+        self.hits = {}
+        self.misses = 0
+
+    def compile(self, question: str):
+        """(requête SPARQL, règle appliquée), ou None si la question est laissée au LLM"""
+        text = _TAIL.sub("", " ".join(question.split()))
+        compiled = None
+        for rule, pattern in (("comptage", _COUNT), ("liste", _LIST)):
+            m = pattern.match(text)
+            if m:
+                compiled = self._subject(m.group("rest"), rule)
+                break
+        if compiled is None:
+            self.misses += 1
+            return None
+        query, rule = compiled
+        self.hits[rule] = self.hits.get(rule, 0) + 1
+        log.debug("⚡ Question traduite par la règle %s", rule)
+        return query, rule
+
+    def _subject(self, rest: str, rule: str):
+        cls = self.schema.find(rest, ("class",))
+        if cls is not None:
+            return self._query(rule, cls), rule
+        # Chaque séparateur possible, de gauche à droite : la classe et la condition
+        # doivent toutes deux être reconnues
+        for m in _CONDITION.finditer(rest):
+            cls = self.schema.find(rest[: m.start()], ("class",))
+            if cls is None:
+                continue
+            condition = self._condition(rest[m.end():], cls)
+            if condition is not None:
+                return self._query(rule, cls, condition), f"{rule}_filtre"
+        return None
+
+    def _condition(self, text: str, cls):
+        """(propriété, opérateur, valeur) de « une catégorie de permis = B », « une note supérieure à 4 »"""
+        for pattern, op in _OPERATORS:
+            for m in pattern.finditer(text):
+                found = self._property(text[: m.start()], text[m.end():], op, cls)
+                if found is not None:
+                    return found
+        m = _IMPLICIT.match(text)
+        if m:
+            quoted = next((v for v in (m.group("quoted"), m.group("guillemets")) if v is not None), None)
+            if quoted is not None:
+                return self._property(m.group("prop"), quoted, "=", cls)
+            value = m.group("word")
+            if _NUMBER.match(value) or value.lower() in _BOOLEANS:
+                return self._property(m.group("prop"), value, "=", cls)
+        return None
+
+    def _property(self, name: str, value: str, op: str, cls):
+        prop = self.schema.find(name, ("data",))
+        if prop is None:
+            return None
+        # Propriété de la classe : domaine déclaré ou observé dans sa famille
+        if prop.domains and not prop.domains & self.schema.family(cls.iri):
+            return None
+        value = value.strip()
+        if len(value) >= 2 and (value[0], value[-1]) in (('"', '"'), ("'", "'"), ("«", "»")):
+            value = value[1:-1].strip()
+        if not value:
+            return None
+        if op not in ("=", "!=") and not _NUMBER.match(value):
+            # Comparaison d'ordre sur du texte : forme non couverte par les règles
+            return None
+        return prop, op, value
+
+    def _query(self, rule: str, cls, condition=None) -> str:
+        subject = variable(cls.name)
+        prefixes = [f"PREFIX mobilite: <{self.schema.namespace}>"]
+        where = [self.hierarchy.values("?type", cls.iri), f"{subject} a ?type ."]
+        selected = [subject]
+        if condition is not None:
+            prop, op, value = condition
+            var = variable(prop.name)
+            if var == subject:
+                var += "_valeur"
+            where.append(f"{subject} mobilite:{prop.name} {var} .")
+            where.append(self._filter(var, op, value, prefixes))
+            selected.append(var)
+        if rule == "comptage":
+            head = f"SELECT (COUNT(DISTINCT {subject}) AS ?nombre_{subject[1:]})"
+        else:
+            head = f"SELECT DISTINCT {' '.join(selected)}"
+        body = "\n    ".join(where)
+        return "\n".join(prefixes) + f"\n{head} WHERE {{\n    {body}\n}}"
+
+    @staticmethod
+    def _filter(var: str, op: str, value: str, prefixes: list) -> str:
+        if _NUMBER.match(value):
+            prefixes.append(XSD_PREFIX)
+            return f"FILTER(xsd:decimal({var}) {op} {value.replace(',', '.')})"
+        boolean = _BOOLEANS.get(value.lower())
+        if boolean is not None:
+            return f'FILTER(LCASE(STR({var})) {op} "{boolean}")'
+        return f"FILTER(LCASE(STR({var})) {op} LCASE({sparql_string(value)}))"
+
+    def stats(self) -> dict:
+        return {"hits": dict(self.hits), "misses": self.misses}
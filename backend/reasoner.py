@@ -0,0 +1,397 @@
+# reasoner.py
+import pickle
+import subprocess
+import sys
+import threading
+import time
+
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import OWL, RDF, RDFS, XSD
+from rdflib.plugins.serializers.nt import _nt_row
+
+# ======================
+# 🧠 MATÉRIALISATION OWL-RL INCRÉMENTALE
+# ======================
+#
+# Le calcul de la clôture OWL-RL (owlrl) tourne dans un processus séparé pour ne
+# pas bloquer l'API. Le processus garde en mémoire les triples affirmés et la
+# clôture ; le processus principal lui envoie les modifications du graphe local
+# et publie les triples inférés qui en résultent (graphe nommé des inférences).
+#
+#   - démarrage / modification du schéma : clôture complète
+#   - ajout de triples d'instances : clôture restreinte au voisinage des
+#     ressources touchées (schéma + triples de la clôture qui les mentionnent),
+#     étendu tant que de nouvelles ressources apparaissent dans les inférences
+#   - suppression : « delete and rederive » sur la composante connexe des
+#     ressources touchées (inférences retirées puis recalculées)
+#
+# Les triples inférés contenant des nœuds anonymes (non désignables dans un
+# DELETE DATA) ou un littéral en sujet ne sont pas publiés.
+#
+# Limite : les règles qui joignent des instances par une valeur littérale
+# (owl:hasKey) ne sont réévaluées qu'à la clôture complète.
+
+# Prédicats RDFS/OWL qui décrivent des instances et non le schéma
+_INSTANCE_PREDICATES = {RDFS.label, RDFS.comment, RDFS.seeAlso, RDFS.isDefinedBy, OWL.sameAs, OWL.differentFrom}
+_INSTANCE_TYPES = {OWL.NamedIndividual, OWL.Thing}
+
+
+def is_schema(triple) -> bool:
+    """Vrai pour les axiomes de l'ontologie (classes, propriétés, restrictions)"""
+    s, p, o = triple
+    if p == RDF.type:
+        return o not in _INSTANCE_TYPES and (o.startswith(str(OWL)) or o.startswith(str(RDFS)) or o == RDF.Property)
+    if p in (RDF.first, RDF.rest):
+        return True
+    return p not in _INSTANCE_PREDICATES and (p.startswith(str(OWL)) or p.startswith(str(RDFS)))
+
+
+def to_ntriples(triples) -> bytes:
+    return "".join(_nt_row(t) for t in triples).encode("utf-8")
+
+
+# Vocabulaires prédéfinis : owlrl y dérive des axiomes sans intérêt pour les requêtes
+_BUILTIN_NAMESPACES = (str(RDF), str(RDFS), str(OWL), str(XSD))
+
+
+def _publishable(triple) -> bool:
+    s = triple[0]
+    # owlrl produit aussi du RDF généralisé (littéraux en sujet), refusé par Fuseki
+    if isinstance(s, Literal) or str(s).startswith(_BUILTIN_NAMESPACES):
+        return False
+    return not any(isinstance(term, BNode) for term in triple)
+
+
+def _copy(graph: Graph) -> Graph:
+    copy = Graph()
+    for triple in graph:
+        copy.add(triple)
+    return copy
+
+
+def _expand(graph: Graph):
+    # Import local : owlrl n'est nécessaire que dans le processus de raisonnement
+    from owlrl import DeductiveClosure, OWLRL_Semantics
+
+    DeductiveClosure(
+        OWLRL_Semantics, rdfs_closure=False, axiomatic_triples=False, datatype_axioms=False
+    ).expand(graph)
+
+
+# ----------------------
+# Processus de raisonnement
+# ----------------------
+
+class _ReasoningState:
+    """État du processus de raisonnement : triples affirmés, clôture, inférences"""
+
+    def __init__(self):
+        self.asserted = Graph()
+        self.closure = Graph()
+        self.inferred = set()
+        self.schema = Graph()
+        self.schema_nodes = set()
+
+    def _node(self, term) -> bool:
+        return not isinstance(term, Literal) and term not in self.schema_nodes
+
+    def _nodes(self, triples) -> set:
+        nodes = set()
+        for s, p, o in triples:
+            if self._node(s):
+                nodes.add(s)
+            if p != RDF.type and self._node(o):
+                nodes.add(o)
+        return nodes
+
+    def _touching(self, graph: Graph, nodes) -> set:
+        triples = set()
+        for node in nodes:
+            triples.update(graph.triples((node, None, None)))
+            triples.update(graph.triples((None, None, node)))
+        return triples
+
+    def full(self, triples=None):
+        """Clôture complète ; retourne (inférences ajoutées, retirées)"""
+        if triples is not None:
+            self.asserted = Graph()
+            for triple in triples:
+                self.asserted.add(triple)
+        self.closure = Graph()
+        for triple in self.asserted:
+            self.closure.add(triple)
+        _expand(self.closure)
+        # Schéma clos, réutilisé comme point de départ des calculs incrémentaux
+        self.schema = Graph()
+        self.schema_nodes = set()
+        for triple in self.closure:
+            if is_schema(triple):
+                self.schema.add(triple)
+                self.schema_nodes.update((triple[0], triple[2]))
+
+        previous = self.inferred
+        self.inferred = {t for t in self.closure if t not in self.asserted and _publishable(t)}
+        return self.inferred - previous, previous - self.inferred
+
+    def add(self, triples):
+        """Ajout de triples affirmés : inférences limitées au voisinage des ressources touchées"""
+        new = [t for t in triples if t not in self.asserted]
+        for triple in new:
+            self.asserted.add(triple)
+        if any(is_schema(t) for t in new):
+            return self.full() + (None,)
+
+        retracted = {t for t in new if t in self.inferred}
+        self.inferred -= retracted
+        work = _copy(self.schema)
+        for triple in new:
+            work.add(triple)
+        visited = set()
+        frontier = self._nodes(new)
+        derived = set()
+        while frontier:
+            visited |= frontier
+            for triple in self._touching(self.closure, frontier):
+                work.add(triple)
+            _expand(work)
+            derived = {t for t in work if t not in self.closure}
+            # Les inférences peuvent relier d'autres ressources : on élargit le voisinage
+            frontier = self._nodes(derived) - visited
+
+        for triple in new:
+            self.closure.add(triple)
+        added = set()
+        for triple in derived:
+            self.closure.add(triple)
+            if triple not in self.asserted and _publishable(triple):
+                added.add(triple)
+        self.inferred |= added
+        return added, retracted, len(visited)
+
+    def remove(self, triples):
+        """Suppression : « delete and rederive » sur la composante des ressources touchées"""
+        gone = [t for t in triples if t in self.asserted]
+        for triple in gone:
+            self.asserted.remove(triple)
+        if any(is_schema(t) for t in gone):
+            return self.full() + (None,)
+
+        # Composante connexe (liens entre instances affirmés) des ressources touchées
+        zone = set()
+        frontier = self._nodes(gone)
+        while frontier:
+            zone |= frontier
+            frontier = self._nodes(self._touching(self.asserted, frontier)) - zone
+
+        overdeleted = {t for t in self._touching(self.closure, zone) if t not in self.asserted}
+        work = _copy(self.schema)
+        for triple in self._touching(self.asserted, zone):
+            work.add(triple)
+        _expand(work)
+        rederived = {t for t in work if t not in self.asserted and (t[0] in zone or t[2] in zone)}
+
+        for triple in overdeleted - rederived:
+            self.closure.remove(triple)
+        for triple in gone:
+            if triple not in rederived:
+                self.closure.remove(triple)
+        for triple in rederived:
+            self.closure.add(triple)
+        rederived = {t for t in rederived if _publishable(t)}
+        removed = {t for t in overdeleted if t in self.inferred} - rederived
+        added = rederived - self.inferred
+        self.inferred = (self.inferred - removed) | added
+        return added, removed, len(zone)
+
+
+def _serve(inp, out):
+    """Boucle du processus de raisonnement : messages picklés sur stdin/stdout"""
+    state = _ReasoningState()
+    while True:
+        try:
+            message = pickle.load(inp)
+        except EOFError:
+            return
+        started = time.perf_counter()
+        try:
+            if message[0] == "full":
+                # Processus neuf ou recalcul demandé : le graphe des inférences est remplacé
+                state.full(message[1])
+                added, removed = state.inferred, set()
+                mode, examined = "complet", None
+            else:
+                _, to_add, to_remove = message
+                added, removed, examined = set(), set(), 0
+                for op, triples in (("-", to_remove), ("+", to_add)):
+                    if not triples:
+                        continue
+                    a, r, n = state.remove(triples) if op == "-" else state.add(triples)
+                    # Un ajout annulé par une suppression du même lot (et inversement)
+                    added, removed = (added - r) | a, (removed - a) | r
+                    examined = None if n is None or examined is None else examined + n
+                mode = "incrémental" if examined is not None else "complet"
+            report = {
+                "mode": mode,
+                "duration_s": round(time.perf_counter() - started, 3),
+                "asserted_triples": len(state.asserted),
+                "inferred_triples": len(state.inferred),
+                "added": len(added),
+                "removed": len(removed),
+                "resources_examined": examined,
+            }
+            reply = ("ok", list(added), list(removed), report)
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__} : {e}")
+        pickle.dump(reply, out, protocol=pickle.HIGHEST_PROTOCOL)
+        out.flush()
+
+
+# ----------------------
+# Pilotage depuis l'API
+# ----------------------
+
+class IncrementalReasoner:
+    """
+    Pilote le processus de raisonnement. publish(ajoutés, retirés, remplacer) est
+    appelé dans le thread du raisonneur pour mettre à jour le graphe des inférences.
+    """
+
+    def __init__(self, snapshot, publish, interval: float = 2.0):
+        self.snapshot = snapshot
+        self.publish = publish
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = {}  # triple -> dernière opération ("+" ou "-")
+        self._full_requested = True
+        self._closed = False
+        self._process = None
+        self._thread = None
+        self.status = "inactif"
+        self.runs = 0
+        self.total_duration_s = 0.0
+        self.last_report = None
+        self.last_error = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="owlrl-reasoner", daemon=True)
+        self._thread.start()
+
+    def notify(self, op: str, triple):
+        """Écouteur du graphe local (appelé sous le verrou du journal : doit rester rapide)"""
+        with self._lock:
+            self._pending[triple] = op
+            self._wakeup.notify()
+
+    def recompute(self):
+        """Demande une clôture complète"""
+        with self._lock:
+            self._full_requested = True
+            self._wakeup.notify()
+
+    # ----------------------
+    # Thread du raisonneur
+    # ----------------------
+
+    def _spawn(self):
+        # Processus indépendant (et non multiprocessing) : app.py n'est pas réimporté
+        self._process = subprocess.Popen(
+            [sys.executable, __file__], stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+
+    def _call(self, message):
+        """Envoie un message au processus ; retourne (complet, ajoutés, retirés, rapport)"""
+        if self._process is None or self._process.poll() is not None:
+            self._spawn()
+            if message[0] != "full":
+                # Processus neuf, état vide : un delta y donnerait une clôture partielle
+                print("⚠️ Processus de raisonnement relancé : clôture complète avant les deltas")
+                message = ("full", self.snapshot())
+        pickle.dump(message, self._process.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+        self._process.stdin.flush()
+        reply = pickle.load(self._process.stdout)
+        if reply[0] == "error":
+            raise RuntimeError(reply[1])
+        return (message[0] == "full",) + tuple(reply[1:])
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed and not self._pending and not self._full_requested:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                full = self._full_requested
+                pending, self._pending = self._pending, {}
+                self._full_requested = False
+
+            # Regroupe les modifications arrivées pendant le délai
+            if not full:
+                time.sleep(self.interval)
+                with self._lock:
+                    pending.update(self._pending)
+                    self._pending = {}
+
+            self.status = "en cours"
+            try:
+                if full:
+                    full, added, removed, report = self._call(("full", self.snapshot()))
+                else:
+                    to_add = [t for t, op in pending.items() if op == "+"]
+                    to_remove = [t for t, op in pending.items() if op == "-"]
+                    full, added, removed, report = self._call(("delta", to_add, to_remove))
+                self.publish(added, removed, full)
+            except Exception as e:
+                self.last_error = str(e)
+                self.status = "erreur"
+                print(f"❌ Raisonnement OWL-RL impossible : {e}")
+                if self._process is not None and self._process.poll() is not None:
+                    # Processus perdu : son état aussi, il faudra tout recalculer
+                    self._process = None
+                with self._lock:
+                    self._full_requested = True
+                    if not self._closed:
+                        self._wakeup.wait(self.interval * 5)
+                continue
+
+            self.runs += 1
+            self.total_duration_s += report["duration_s"]
+            self.last_report = report
+            self.status = "à jour"
+            print(
+                f"🧠 Raisonnement {report['mode']} en {report['duration_s']} s : "
+                f"+{report['added']} / -{report['removed']} inférés ({report['inferred_triples']} au total)"
+            )
+
+    # ----------------------
+    # Arrêt / état
+    # ----------------------
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._process is not None:
+            self._process.stdin.close()
+            try:
+                self._process.wait(5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def stats(self) -> dict:
+        return {
+            "status": self.status,
+            "runs": self.runs,
+            "total_duration_s": round(self.total_duration_s, 3),
+            "pending_changes": len(self._pending),
+            "last_run": self.last_report,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    output = sys.stdout.buffer
+    # Les messages d'owlrl ne doivent pas se mêler au protocole
+    sys.stdout = sys.stderr
+    _serve(sys.stdin.buffer, output)
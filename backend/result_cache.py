@@ -0,0 +1,99 @@
+# result_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+# ======================
+# 🧊 CACHE DES RÉSULTATS SPARQL VERSIONNÉ
+# ======================
+#
+# Clé = (texte exact de la requête, génération du dataset). Chaque mise à jour
+# réussie envoyée à Fuseki incrémente la génération : les entrées précédentes
+# deviennent inaccessibles et sont purgées. Mémoire bornée (nombre d'entrées et
+# nombre total de lignes) avec éviction LRU.
+#
+# La génération est locale au processus : avec plusieurs workers, le TTL borne
+# la durée pendant laquelle une écriture faite par un autre worker peut être ignorée.
+
+
+def _result_rows(results: dict) -> int:
+    return len(results.get("results", {}).get("bindings", [])) + 1
+
+
+class ResultCache:
+    """Cache LRU des résultats SELECT, invalidé par compteur de génération"""
+
+    def __init__(self, max_entries: int = 512, max_rows: int = 200000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # query -> (generation, stored_at, results, rows)
+        self._hot = {}  # query -> nombre de hits depuis la dernière génération
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, query: str):
+        """Retourne (generation, résultats) ; résultats vaut None en cas d'absence"""
+        with self._lock:
+            generation = self.generation
+            entry = self._entries.get(query)
+            if entry is not None and entry[0] == generation and time.monotonic() - entry[1] <= self.ttl:
+                self._entries.move_to_end(query)
+                self._hot[query] = self._hot.get(query, 0) + 1
+                self.hits += 1
+                return generation, entry[2]
+            self.misses += 1
+            return generation, None
+
+    def put(self, query: str, generation: int, results: dict):
+        """Mémorise un résultat calculé pour la génération donnée"""
+        rows = _result_rows(results)
+        with self._lock:
+            # Résultat calculé avant une écriture : déjà périmé
+            if generation != self.generation or rows > self.max_rows:
+                return
+            self._remove(query)
+            self._entries[query] = (generation, time.monotonic(), results, rows)
+            self._rows += rows
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, query: str):
+        entry = self._entries.pop(query, None)
+        if entry is not None:
+            self._rows -= entry[3]
+
+    def bump(self, refresh_ahead: int = 0) -> list:
+        """Nouvelle génération après une écriture ; retourne les requêtes les plus demandées"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            hottest = sorted(
+                (q for q in self._hot if q in self._entries), key=self._hot.get, reverse=True
+            )[:refresh_ahead]
+            self._entries.clear()
+            self._hot.clear()
+            self._rows = 0
+            return hottest
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hot.clear()
+            self._rows = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "rows": self._rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
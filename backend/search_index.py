@@ -0,0 +1,354 @@
+# search_index.py
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDF
+
+# ======================
+# 🔎 INDEX PLEIN TEXTE EN MÉMOIRE
+# ======================
+#
+# /search/ et /avis/recherche/ filtraient avec
+# `FILTER(CONTAINS(LCASE(...), LCASE("terme")))`, ce qui oblige Fuseki à relire et
+# mettre en minuscules chaque littéral à chaque frappe. L'index inversé ci-dessous
+# couvre noms, prénoms, commentaires et adresses :
+#
+#   - trigrammes du texte replié (minuscules, sans accents) : recherche de
+#     sous-chaînes, vérifiée ensuite sur le texte de chaque candidat ;
+#   - trigrammes des mots : tolérance aux fautes de frappe (similarité de Dice) ;
+#
+# Il est tenu à jour par l'écouteur du graphe local (écritures, imports,
+# suppressions) et sauvegardé à côté du journal pour éviter de le reconstruire
+# au démarrage.
+
+NGRAM_SIZE = 3
+# Similarité minimale entre deux mots pour la recherche approchée
+FUZZY_THRESHOLD = 0.5
+_WORDS = re.compile(r"\w+")
+_SPACES = re.compile(r"\s+")
+# Ligatures que NFKD ne décompose pas
+_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "Œ": "oe", "Æ": "ae"})
+
+
+def fold(text: str) -> str:
+    """Minuscules, sans accents ni ligatures, espaces normalisés"""
+    text = unicodedata.normalize("NFKD", text.translate(_LIGATURES).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(" ", text).strip()
+
+
+def _grams(folded: str) -> set:
+    return {folded[i:i + NGRAM_SIZE] for i in range(len(folded) - NGRAM_SIZE + 1)}
+
+
+def _word_grams(word: str) -> set:
+    return _grams(f" {word} ")
+
+
+def _local_name(uri: str) -> str:
+    return uri.split("#")[-1]
+
+
+class SearchIndex:
+    """Index inversé (trigrammes) des libellés des instances de l'ontologie"""
+
+    # Libellés indexés, dans l'ordre de préférence pour l'affichage
+    LABELS = ("personne", "commentaire", "adresse", "id")
+
+    def __init__(self, namespace, path: str = None):
+        self.namespace = str(namespace)
+        self.path = path
+        self.predicates = {
+            URIRef(self.namespace + field): field
+            for field in ("nom", "prenom", "commentaire", "adresse")
+        }
+        self._lock = threading.RLock()
+        self._clear()
+        self.searches = 0
+        self.build_duration = None
+
+    def _clear(self):
+        # sujet -> {"types": set, "nom": set, ...} (valeurs brutes)
+        self._docs = {}
+        # sujet -> {libellé: (texte, texte replié), ...}
+        self._labels = {}
+        # libellé -> trigramme -> sujets
+        self._grams = {label: {} for label in self.LABELS}
+        # libellé -> mot replié -> sujets
+        self._words = {label: {} for label in self.LABELS}
+        # trigramme (mot entouré d'espaces) -> mots : vocabulaire de la recherche approchée
+        self._vocabulary = {}
+
+    # ----------------------
+    # Mise à jour
+    # ----------------------
+
+    def on_change(self, op: str, triple):
+        """Écouteur du graphe local"""
+        s, p, o = triple
+        if p == RDF.type or p in self.predicates:
+            self.apply(s, p, o, op == "+")
+
+    def apply(self, s, p, o, added: bool):
+        if not isinstance(s, URIRef):
+            return
+        if p == RDF.type:
+            if not isinstance(o, URIRef) or not str(o).startswith(self.namespace):
+                return
+            field, value = "types", str(o)
+        elif isinstance(o, Literal) and p in self.predicates:
+            field, value = self.predicates[p], str(o)
+        else:
+            return
+
+        subject = str(s)
+        with self._lock:
+            doc = self._docs.get(subject)
+            if doc is None:
+                if not added:
+                    return
+                doc = self._docs[subject] = {}
+            values = doc.setdefault(field, set())
+            if added:
+                values.add(value)
+            else:
+                values.discard(value)
+                if not values:
+                    del doc[field]
+            self._reindex(subject, doc)
+            if not doc:
+                del self._docs[subject]
+
+    def build(self, triples):
+        """Reconstruit l'index à partir de (s, p, o) : rdf:type et libellés indexés"""
+        start = time.perf_counter()
+        with self._lock:
+            self._clear()
+            for s, p, o in triples:
+                self.apply(s, p, o, True)
+            self.build_duration = round(time.perf_counter() - start, 3)
+        print(f"🔎 Index plein texte : {len(self._docs)} instances indexées en {self.build_duration} s")
+
+    def _doc_labels(self, subject: str, doc: dict) -> dict:
+        """Libellés affichables d'une instance (mêmes règles que l'ancienne requête SPARQL)"""
+        labels = {}
+        noms, prenoms = sorted(doc.get("nom", ())), sorted(doc.get("prenom", ()))
+        if noms and prenoms:
+            labels["personne"] = tuple(f"{p} {n}" for p in prenoms for n in noms)
+        for field in ("commentaire", "adresse"):
+            if doc.get(field):
+                labels[field] = tuple(sorted(doc[field]))
+        if doc.get("types"):
+            labels["id"] = (_local_name(subject),)
+        return {label: tuple((text, fold(text)) for text in texts) for label, texts in labels.items()}
+
+    def _reindex(self, subject: str, doc: dict):
+        old = self._labels.pop(subject, {})
+        new = self._doc_labels(subject, doc) if doc else {}
+        if new:
+            self._labels[subject] = new
+        for label in self.LABELS:
+            old_texts = [folded for _, folded in old.get(label, ())]
+            new_texts = [folded for _, folded in new.get(label, ())]
+            if old_texts == new_texts:
+                continue
+            old_grams = set().union(*map(_grams, old_texts))
+            new_grams = set().union(*map(_grams, new_texts))
+            self._update_postings(self._grams[label], subject, old_grams, new_grams)
+            old_words = {w for text in old_texts for w in _WORDS.findall(text)}
+            new_words = {w for text in new_texts for w in _WORDS.findall(text)}
+            for word in self._update_postings(self._words[label], subject, old_words, new_words):
+                self._forget_word(word)
+            for word in new_words - old_words:
+                for gram in _word_grams(word):
+                    self._vocabulary.setdefault(gram, set()).add(word)
+
+    @staticmethod
+    def _update_postings(postings: dict, subject: str, old: set, new: set) -> list:
+        """Retire/ajoute le sujet ; retourne les clés dont la liste est devenue vide"""
+        emptied = []
+        for key in old - new:
+            subjects = postings.get(key)
+            if subjects is not None:
+                subjects.discard(subject)
+                if not subjects:
+                    del postings[key]
+                    emptied.append(key)
+        for key in new - old:
+            postings.setdefault(key, set()).add(subject)
+        return emptied
+
+    def _forget_word(self, word: str):
+        if any(word in words for words in self._words.values()):
+            return
+        for gram in _word_grams(word):
+            words = self._vocabulary.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._vocabulary[gram]
+
+    # ----------------------
+    # Recherche
+    # ----------------------
+
+    def search(self, text: str, labels=LABELS, limit: int = None, fuzzy: bool = True) -> list:
+        """
+        Instances dont un libellé contient `text` (sans casse ni accents), puis, si la
+        limite n'est pas atteinte, celles dont chaque mot ressemble à un mot du libellé.
+        Retourne [{"subject", "types", "label", "match"}] ; match vaut "exact" ou "approx".
+        """
+        query = fold(text)
+        with self._lock:
+            self.searches += 1
+            found = {}
+            for subject, label, shown in self._substring_matches(query, labels):
+                found.setdefault(subject, (label, shown, "exact", 1.0))
+            if fuzzy and (limit is None or len(found) < limit):
+                for subject, (label, shown, score) in self._fuzzy_matches(query, labels).items():
+                    found.setdefault(subject, (label, shown, "approx", score))
+
+            ranked = sorted(found.items(), key=lambda item: (-item[1][3], item[0]))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [
+                {
+                    "subject": subject,
+                    "types": sorted(self._docs[subject].get("types", ())),
+                    "label": shown,
+                    "match": match,
+                }
+                for subject, (label, shown, match, _) in ranked
+            ]
+
+    def _candidates(self, query: str, label: str) -> set:
+        postings = self._grams[label]
+        if not query:
+            return set(self._labels)
+        if len(query) < NGRAM_SIZE:
+            # Requête courte : trigrammes du vocabulaire qui la contiennent
+            found = set()
+            for gram, subjects in postings.items():
+                if query in gram:
+                    found |= subjects
+            return found
+        result = None
+        for gram in sorted(_grams(query), key=lambda g: len(postings.get(g, ()))):
+            subjects = postings.get(gram)
+            if not subjects:
+                return set()
+            result = set(subjects) if result is None else result & subjects
+            if not result:
+                break
+        return result
+
+    def _substring_matches(self, query: str, labels):
+        for label in labels:
+            for subject in sorted(self._candidates(query, label)):
+                for shown, folded in self._labels.get(subject, {}).get(label, ()):
+                    if query in folded:
+                        yield subject, label, shown
+                        break
+
+    def _similar_words(self, word: str) -> dict:
+        """Mots du vocabulaire proches de `word` -> similarité de Dice"""
+        grams = _word_grams(word)
+        shared = {}
+        for gram in grams:
+            for candidate in self._vocabulary.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        similar = {}
+        for candidate, common in shared.items():
+            # Un mot de n lettres entouré d'espaces a n trigrammes
+            score = 2 * common / (len(grams) + len(candidate))
+            if score >= FUZZY_THRESHOLD:
+                similar[candidate] = score
+        return similar
+
+    def _fuzzy_matches(self, query: str, labels) -> dict:
+        words = _WORDS.findall(query)
+        if not words:
+            return {}
+        similar = [self._similar_words(word) for word in words]
+        matches = {}
+        for label in labels:
+            postings = self._words[label]
+            subjects = None
+            scores = {}
+            for candidates in similar:
+                hits = {}
+                for candidate, score in candidates.items():
+                    for subject in postings.get(candidate, ()):
+                        hits[subject] = max(hits.get(subject, 0), score)
+                subjects = set(hits) if subjects is None else subjects & set(hits)
+                for subject in subjects:
+                    scores[subject] = scores.get(subject, 0) + hits[subject]
+                if not subjects:
+                    break
+            for subject in subjects or ():
+                score = scores[subject] / len(words)
+                if subject not in matches or matches[subject][2] < score:
+                    shown = self._labels[subject][label][0][0]
+                    matches[subject] = (label, shown, score)
+        return matches
+
+    # ----------------------
+    # Persistance
+    # ----------------------
+
+    def save(self, stamp):
+        """Écrit l'index (atomiquement) avec l'empreinte de l'état du graphe local"""
+        if not self.path:
+            return
+        with self._lock:
+            state = {
+                "stamp": stamp,
+                "namespace": self.namespace,
+                "docs": self._docs,
+                "labels": self._labels,
+                "grams": self._grams,
+                "words": self._words,
+                "vocabulary": self._vocabulary,
+            }
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def load(self, stamp) -> bool:
+        """Recharge l'index sauvegardé s'il correspond à l'état actuel du graphe local"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Index plein texte illisible, reconstruction : {e}")
+            return False
+        if state.get("stamp") != stamp or state.get("namespace") != self.namespace:
+            return False
+        with self._lock:
+            self._docs = state["docs"]
+            self._labels = state["labels"]
+            self._grams = state["grams"]
+            self._words = state["words"]
+            self._vocabulary = state["vocabulary"]
+        print(f"🔎 Index plein texte rechargé : {len(self._docs)} instances")
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "instances": len(self._docs),
+                "trigrams": sum(len(p) for p in self._grams.values()),
+                "words": len({w for words in self._words.values() for w in words}),
+                "searches": self.searches,
+                "build_duration_s": self.build_duration,
+            }
@@ -0,0 +1,72 @@
+# single_flight.py
+import asyncio
+
+from observability import REGISTRY
+
+# ======================
+# 🛫 REQUÊTES IDENTIQUES EN VOL PARTAGÉES (SINGLE-FLIGHT)
+# ======================
+#
+# Quand de nombreux clients rafraîchissent en même temps, la même requête part
+# vers Fuseki des dizaines de fois en parallèle : le cache de résultats ne sert
+# qu'une fois la première réponse arrivée. Les appels concurrents de même clé
+# (texte de la requête, génération du dataset) attendent une seule exécution et
+# reçoivent le même résultat décodé. La génération fait partie de la clé : un
+# appel postérieur à une écriture ne se greffe pas sur une requête partie avant.
+#
+# L'exécution partagée tourne dans sa propre tâche : l'annulation d'un appelant
+# (client déconnecté) n'interrompt pas les autres.
+
+COALESCED = REGISTRY.counter(
+    "mobilite_sparql_coalesced_total", "Requêtes SPARQL évitées (appel greffé sur une requête identique en vol)"
+)
+EXECUTED = REGISTRY.counter("mobilite_sparql_executed_total", "Requêtes SPARQL exécutées (hors cache de résultats)")
+
+
+class SingleFlight:
+    """Une exécution en vol par clé, partagée par les appels concurrents"""
+
+    def __init__(self):
+        self._inflight = {}  # clé -> tâche
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self._waiters = {}  # clé -> appels en attente
+
+    async def do(self, key, work):
+        """Résultat de work() ; réutilise l'exécution en cours pour la même clé"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._inflight[key] = task
+            self._waiters[key] = 1
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed += 1
+            EXECUTED.inc()
+        else:
+            self._waiters[key] += 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+            self.coalesced += 1
+            COALESCED.inc()
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        # Exception lue même si tous les appelants ont été annulés
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        calls = self.executed + self.coalesced
+        return {
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 3) if calls else 0.0,
+            "max_waiters": self.max_waiters,
+        }
@@ -0,0 +1,344 @@
+# sparql_detector.py
+import re
+
+# ======================
+# ✂️ DÉTECTION D'UNE REQUÊTE SPARQL COMPLÈTE (FLUX DE TOKENS)
+# ======================
+#
+# La réponse d'Ollama arrive token par token. Le détecteur repère le début de
+# la requête : un mot-clé PREFIX / BASE / SELECT / ASK / CONSTRUCT / DESCRIBE
+# (casse indifférente) suivi d'une syntaxe de requête (« PREFIX nom: < »,
+# « SELECT ?var », « SELECT * », « ASK { »...) ; « une requête SELECT qui... »
+# dans l'explication est ignoré et la recherche reprend au candidat suivant.
+# Le contenu d'un bloc ``` est préféré au texte qui le précède. Le détecteur suit
+# ensuite les accolades en ignorant littéraux, IRI et commentaires, puis lit les modificateurs
+# qui peuvent suivre le dernier groupe (GROUP BY, HAVING, ORDER BY, LIMIT,
+# OFFSET, VALUES). Dès qu'un élément qui ne peut pas prolonger la requête
+# apparaît (``` de fin, texte d'explication...), la requête est complète et la
+# génération peut être interrompue.
+#
+# Un token coupé par la fin du tampon (« LIM », chaîne non fermée) n'est jamais
+# interprété : le détecteur attend le fragment suivant. Une apostrophe du texte
+# (« l'ensemble ») n'ouvre pas de chaîne si la ligne se termine sans la fermer.
+
+_START = re.compile(r"\b(?:PREFIX|BASE|SELECT|ASK|CONSTRUCT|DESCRIBE)\b", re.I)
+# Ce qui doit suivre le mot-clé pour qu'il commence une requête
+_FOLLOWS = {
+    "PREFIX": r"\s+[\w.-]*:\s*<",
+    "BASE": r"\s*<",
+    "SELECT": r"\s+(?:(?:DISTINCT|REDUCED)\s+)?(?:[?$]\w|\*|\()",
+    "ASK": r"\s*(?:\{|(?:WHERE|FROM)\b)",
+    "CONSTRUCT": r"\s*(?:\{|(?:WHERE|FROM)\b)",
+    "DESCRIBE": r"\s+(?:[?$]\w|\*|<|[\w-]*:)",
+}
+_FOLLOWS = {keyword: re.compile(pattern, re.I) for keyword, pattern in _FOLLOWS.items()}
+# Suite encore trop courte pour décider (« SELECT DIST », « PREFIX mobilite: »)
+_UNDECIDED = re.compile(r"\s*[\w.:?$-]*\s*")
+_FENCE_OPEN = re.compile(r"```[\w-]*[ \t]*\n")
+_IRI = re.compile(r"<[^<>\"{}|^`\\\s]*>")
+_IRI_PREFIX = re.compile(r"<[^<>\"{}|^`\\\s]*\Z")
+_WORD = re.compile(r"[\w:-]+(?:\.[\w:-]+)*")
+_VAR = re.compile(r"[?$]\w*")
+_STRING = re.compile(r'"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+_BLANK = re.compile(r"\s+")
+_INTEGER = re.compile(r"\d+\Z")
+
+_CONDITION_KEYWORDS = {"GROUP", "ORDER"}
+
+
+class _NeedMore(Exception):
+    """Le tampon s'arrête au milieu d'un token : attendre le fragment suivant"""
+
+
+class _Lexer:
+    """Tokens SPARQL grossiers : suffisants pour suivre accolades et parenthèses"""
+
+    def __init__(self, text: str, pos: int, final: bool):
+        self.text = text
+        self.pos = pos
+        self.final = final
+
+    def _touches_end(self, end: int) -> bool:
+        return end >= len(self.text) and not self.final
+
+    def next(self):
+        """(type, valeur, début, fin) du prochain token significatif, ou None en fin de tampon"""
+        text = self.text
+        while True:
+            if self.pos >= len(text):
+                if self.final:
+                    return None
+                raise _NeedMore()
+            c = text[self.pos]
+            start = self.pos
+            m = _BLANK.match(text, start)
+            if m:
+                self.pos = m.end()
+                continue
+            if c == "#":
+                newline = text.find("\n", start)
+                if newline < 0:
+                    if self.final:
+                        return None
+                    raise _NeedMore()
+                self.pos = newline + 1
+                continue
+            break
+
+        if c in "\"'":
+            m = _STRING.match(text, start)
+            if m is None:
+                if not text.startswith(c * 3, start):
+                    # Chaîne courte fermée nulle part sur la ligne : apostrophe du texte
+                    if self.final or text.find("\n", start) >= 0:
+                        return self._emit("other", start, start + 1)
+                if self.final:
+                    return self._emit("other", start, len(text))
+                raise _NeedMore()
+            # """ non terminé, ou "" suivi de la fin du tampon
+            if self._touches_end(m.end()) and m.group() in ('""', "''"):
+                raise _NeedMore()
+            return self._emit("string", start, m.end())
+        if c == "<":
+            m = _IRI.match(text, start)
+            if m:
+                return self._emit("iri", start, m.end())
+            if _IRI_PREFIX.match(text, start) and not self.final:
+                raise _NeedMore()
+            return self._emit("other", start, start + 1)
+        if c in "?$":
+            m = _VAR.match(text, start)
+            if self._touches_end(m.end()):
+                raise _NeedMore()
+            return self._emit("var", start, m.end())
+        if c in "{}()":
+            return self._emit(c, start, start + 1)
+        if c == "`":
+            end = start
+            while end < len(text) and text[end] == "`":
+                end += 1
+            if self._touches_end(end):
+                raise _NeedMore()
+            return self._emit("fence", start, end)
+        m = _WORD.match(text, start)
+        if m:
+            if self._touches_end(m.end()):
+                raise _NeedMore()
+            return self._emit("word", start, m.end())
+        return self._emit("other", start, start + 1)
+
+    def _emit(self, kind: str, start: int, end: int):
+        self.pos = end
+        return kind, self.text[start:end], start, end
+
+    def peek(self):
+        pos = self.pos
+        try:
+            return self.next()
+        finally:
+            self.pos = pos
+
+
+class SparqlQueryDetector:
+    """Repère, dans un texte reçu par fragments, la première requête SPARQL complète"""
+
+    def __init__(self):
+        self.text = ""
+        self.start = None  # début de la requête dans self.text
+        self.query = None  # requête complète, une fois détectée
+        self._search = 0  # recherche du prochain candidat
+        # Corps : position de reprise et profondeur des accolades
+        self._pos = None
+        self._depth = 0
+        self._groups = 0
+        self._group_end = None  # fin du dernier groupe de premier niveau
+
+    @property
+    def partial(self) -> str:
+        """Requête en cours de génération (depuis son premier mot-clé)"""
+        if self.start is None:
+            return ""
+        return self.query if self.query is not None else self.text[self.start:]
+
+    def feed(self, fragment: str):
+        """Ajoute un fragment ; retourne la requête dès qu'elle est complète, sinon None"""
+        if self.query is None:
+            self.text += fragment
+            self._scan(final=False)
+        return self.query
+
+    def finish(self):
+        """Fin de la génération : requête complète, ou None si elle est tronquée"""
+        if self.query is None:
+            self._scan(final=True)
+        return self.query
+
+    def _scan(self, final: bool):
+        try:
+            while True:
+                if self.start is None:
+                    self._find_start(final)
+                if self._group_end is None:
+                    self._scan_body(final)
+                    if self.start is None:
+                        continue
+                end = self._tail_end(final)
+                if end is not None:
+                    self.query = self.text[self.start:end].strip()
+                    return
+                # CONSTRUCT { modèle } WHERE { ... } : un autre groupe suit
+        except _NeedMore:
+            return
+
+    def _find_start(self, final: bool):
+        """Premier mot-clé suivi d'une syntaxe de requête ; _NeedMore s'il n'y en a pas (encore)"""
+        ranges = [(self._search, len(self.text))]
+        fence = _FENCE_OPEN.search(self.text, self._search)
+        if fence is not None:
+            # Contenu du bloc d'abord ; le texte qui précède seulement en dernier recours
+            ranges = [(fence.end(), len(self.text))] + ([(self._search, fence.start())] if final else [])
+        for begin, stop in ranges:
+            for m in _START.finditer(self.text, begin, stop):
+                if _FOLLOWS[m.group().upper()].match(self.text, m.end()):
+                    self.start = self._pos = m.start()
+                    return
+                if not final and _UNDECIDED.fullmatch(self.text, m.end()):
+                    raise _NeedMore()
+        raise _NeedMore()
+
+    def _restart(self, search: int):
+        """Candidat abandonné : la recherche reprend à `search`"""
+        self.start = self._pos = self._group_end = None
+        self._depth = self._groups = 0
+        self._search = search
+
+    def _scan_body(self, final: bool):
+        """Avance jusqu'à la fermeture d'un groupe { } de premier niveau"""
+        lexer = _Lexer(self.text, self._pos, final)
+        while True:
+            token = lexer.next()
+            if token is None:
+                # Fin de la génération au milieu d'un groupe : requête tronquée
+                raise _NeedMore()
+            kind = token[0]
+            if kind == "fence":
+                # Bloc ``` ouvert ou fermé au milieu du corps : le candidat était
+                # dans l'explication, la requête est dans le bloc (ou plus loin)
+                self._restart(token[3])
+                return
+            if kind == "{":
+                self._depth += 1
+            elif kind == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._groups += 1
+                    self._group_end = token[3]
+            # Position de reprise : après le dernier token complet
+            self._pos = lexer.pos
+            if self._group_end is not None:
+                return
+
+    def _tail_end(self, final: bool):
+        """
+        Fin de la requête après le dernier groupe (modificateurs compris), ou None
+        si un nouveau groupe commence (le corps reprend alors son analyse).
+        """
+        lexer = _Lexer(self.text, self._group_end, final)
+        end = self._group_end
+        while True:
+            token = lexer.peek()
+            if token is None:
+                return end
+            kind, value = token[0], token[1].upper()
+            if kind == "{" or value == "WHERE":
+                # Groupe suivant (clause WHERE d'un CONSTRUCT / DESCRIBE)
+                self._group_end = None
+                self._pos = token[2]
+                return None
+            if value in _CONDITION_KEYWORDS:
+                lexer.next()
+                by = lexer.next()
+                if by is None or by[1].upper() != "BY":
+                    return end
+                end = self._conditions(lexer, by[3])
+            elif value == "HAVING":
+                lexer.next()
+                end = self._conditions(lexer, token[3])
+            elif value in ("LIMIT", "OFFSET"):
+                lexer.next()
+                number = lexer.next()
+                if number is None or not _INTEGER.match(number[1]):
+                    return end
+                end = number[3]
+            elif value == "VALUES":
+                lexer.next()
+                end = self._values(lexer, end)
+            else:
+                return end
+
+    def _conditions(self, lexer: _Lexer, end: int) -> int:
+        """?var, ASC(...), DESC(...), fonction(...) ou (expression) répétés"""
+        while True:
+            token = lexer.peek()
+            if token is None:
+                return end
+            kind = token[0]
+            if kind == "var":
+                end = lexer.next()[3]
+            elif kind == "(":
+                end = self._balanced(lexer)
+            elif kind == "word":
+                # Appel de fonction : le mot doit être suivi d'une parenthèse
+                saved = lexer.pos
+                lexer.next()
+                following = lexer.peek()
+                if following is None or following[0] != "(":
+                    lexer.pos = saved
+                    return end
+                end = self._balanced(lexer)
+            else:
+                return end
+
+    def _balanced(self, lexer: _Lexer) -> int:
+        depth = 0
+        while True:
+            token = lexer.next()
+            if token is None:
+                raise _NeedMore()
+            if token[0] == "(":
+                depth += 1
+            elif token[0] == ")":
+                depth -= 1
+                if depth == 0:
+                    return token[3]
+
+    def _values(self, lexer: _Lexer, end: int) -> int:
+        """VALUES ?x { ... } ou VALUES (?x ?y) { ... }"""
+        token = lexer.next()
+        if token is None:
+            return end
+        if token[0] == "(":
+            lexer.pos = token[2]
+            self._balanced(lexer)
+        elif token[0] != "var":
+            return end
+        depth = 0
+        while True:
+            token = lexer.next()
+            if token is None:
+                raise _NeedMore()
+            if token[0] == "{":
+                depth += 1
+            elif token[0] == "}":
+                depth -= 1
+                if depth == 0:
+                    return token[3]
+            elif depth == 0:
+                return end
+
+
+def extract_query(text: str):
+    """Première requête SPARQL complète d'un texte entier, ou None"""
+    detector = SparqlQueryDetector()
+    detector.feed(text)
+    return detector.finish()
@@ -0,0 +1,159 @@
+# sparql_normalizer.py
+import re
+import threading
+from collections import OrderedDict
+
+from rdflib import URIRef
+from rdflib.namespace import OWL, RDF, RDFS, XSD
+from rdflib.plugins.sparql.algebra import translateQuery
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+
+from sparql_detector import extract_query
+
+# ======================
+# 🧪 VALIDATION ET NORMALISATION DES REQUÊTES DU LLM (PARSEUR SPARQL)
+# ======================
+#
+# La sortie du LLM passe par le parseur SPARQL de rdflib au lieu d'une série
+# d'expressions régulières :
+#   1. première requête complète du texte (sparql_detector.extract_query :
+#      explications et balises Markdown autour sont ignorées) ;
+#   2. analyse syntaxique : une requête invalide est rejetée ici, sans
+#      aller-retour vers Fuseki ;
+#   3. préfixes réparés sur l'arbre : préfixe vide ou mobilite déclaré avec une
+#      autre IRI, préfixe utilisé sans déclaration (rdf, rdfs, owl, xsd,
+#      mobilite et ses variantes « mobilitemobilite ») ; un préfixe inconnu non
+#      déclaré est une erreur. Seul le prologue est réécrit : les IRI et les
+#      littéraux du corps ne sont jamais modifiés ;
+#   4. traduction en algèbre (portée des variables, agrégats...).
+# Les mises à jour (INSERT, DELETE...) ne sont pas des requêtes : rejetées.
+#
+# Le résultat (requête normalisée ou erreur) est gardé par texte exact : une
+# traduction déjà vue, venue du cache ou du LLM, est validée sans réanalyse.
+#
+# Le parseur SPARQL de rdflib (pyparsing) n'est pas sûr entre threads : des
+# premières analyses concurrentes le laissent définitivement cassé (« <lambda>()
+# missing 1 required positional argument »). Toute analyse passe par PARSE_LOCK.
+
+PARSE_LOCK = threading.Lock()
+
+STANDARD_PREFIXES = {"rdf": str(RDF), "rdfs": str(RDFS), "owl": str(OWL), "xsd": str(XSD)}
+
+# Prologue (PREFIX / BASE) d'une requête déjà analysée
+_PROLOGUE = re.compile(r"^\s*(?:(?:#[^\n]*\n\s*)|(?:PREFIX\s+[^\s:]*:\s*<[^>]*>\s*)|(?:BASE\s*<[^>]*>\s*))*", re.I)
+
+
+class InvalidSparql(ValueError):
+    """Sortie du LLM qui n'est pas une requête SPARQL valide"""
+
+
+def _used_prefixes(node, found: set):
+    """Préfixes des noms préfixés (pname) de l'arbre syntaxique"""
+    if isinstance(node, CompValue):
+        if node.name == "pname":
+            found.add(node["prefix"] if "prefix" in node else "")
+        for value in node.values():
+            _used_prefixes(value, found)
+    elif isinstance(node, (list, tuple)) or hasattr(node, "asList"):
+        for value in node:
+            _used_prefixes(value, found)
+    return found
+
+
+class SparqlNormalizer:
+    """Requête SPARQL extraite, analysée et aux préfixes réparés ; résultats en cache LRU"""
+
+    def __init__(self, namespace, prefix: str = "mobilite", cache_size: int = 512):
+        self.namespace = str(namespace)
+        self.prefix = prefix
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # texte -> (requête normalisée, forme) ou InvalidSparql
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.repaired = 0
+
+    def normalize(self, text: str):
+        """(requête normalisée, forme : SelectQuery, AskQuery...) ; InvalidSparql sinon"""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+        if cached is None:
+            try:
+                cached = self._normalize(text)
+            except InvalidSparql as e:
+                cached = e
+            with self._lock:
+                self.misses += 1
+                if isinstance(cached, InvalidSparql):
+                    self.rejected += 1
+                self._cache[text] = cached
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if isinstance(cached, InvalidSparql):
+            raise cached
+        return cached
+
+    def _normalize(self, text: str):
+        # Retours à la ligne échappés par le modèle (« \n » littéral)
+        text = text.replace("\\n", "\n")
+        query = extract_query(text) or text.strip()
+        if not query:
+            raise InvalidSparql("aucune requête SPARQL dans la réponse")
+        try:
+            with PARSE_LOCK:
+                parsed = parseQuery(query)
+        except Exception as e:
+            raise InvalidSparql(f"syntaxe : {e}") from e
+
+        prologue = parsed[0]
+        declared = {}
+        for decl in prologue:
+            if decl.name == "PrefixDecl":
+                declared[decl["prefix"] if "prefix" in decl else ""] = decl
+        repaired = False
+        # Préfixe vide ou mobilite pointant ailleurs que sur l'ontologie
+        for name in ("", self.prefix):
+            decl = declared.get(name)
+            if decl is not None and str(decl["iri"]) != self.namespace:
+                decl["iri"] = URIRef(self.namespace)
+                repaired = True
+        for name in sorted(_used_prefixes(parsed[1], set()) - set(declared)):
+            if name in STANDARD_PREFIXES:
+                iri = STANDARD_PREFIXES[name]
+            elif name == "" or self.prefix in name:
+                iri = self.namespace
+            else:
+                raise InvalidSparql(f"préfixe inconnu : {name}:")
+            decl = CompValue("PrefixDecl", prefix=name, iri=URIRef(iri))
+            if name == "":
+                del decl["prefix"]
+            prologue.append(decl)
+            declared[name] = decl
+            repaired = True
+        try:
+            algebra = translateQuery(parsed).algebra
+        except Exception as e:
+            raise InvalidSparql(f"requête incohérente : {e}") from e
+
+        if repaired:
+            self.repaired += 1
+            lines = [f"PREFIX {name}: <{decl['iri']}>" for name, decl in declared.items()]
+            lines += [f"BASE <{decl['iri']}>" for decl in prologue if decl.name == "Base"]
+            query = "\n".join(lines) + "\n" + query[_PROLOGUE.match(query).end():]
+        return query, algebra.name
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "repaired": self.repaired,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
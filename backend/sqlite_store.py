@@ -0,0 +1,351 @@
+# sqlite_store.py
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import VALID_STORE, Store
+
+from journal import SharedLock
+
+# ======================
+# 🗄️ STORE RDF PERSISTANT (SQLITE)
+# ======================
+#
+# Alternative au store mémoire de rdflib pour le graphe local : les triples sont
+# stockés dans SQLite (table des termes + table des triples indexée SPO, POS et
+# OSP). Au démarrage, le fichier est simplement ouvert : rien n'est parsé et la
+# mémoire ne croît plus avec le volume de données.
+#
+# Les écritures d'une requête forment une transaction : elles deviennent
+# durables au commit (g.commit()), ou disparaissent si le processus s'arrête
+# avant. Tous les accès passent par une seule connexion protégée par un verrou :
+# un endpoint d'écriture s'exécute donc en entier sous le verrou du graphe
+# (StoreTransactions.transaction), ses écritures dans un point de sauvegarde
+# annulé s'il échoue, sans toucher aux écritures en attente des autres threads.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Nombre de lignes lues par accès au curseur (le verrou est relâché entre deux lots)
+FETCH_SIZE = 1000
+TERM_CACHE_SIZE = 100000
+
+
+def _encode(term):
+    if isinstance(term, URIRef):
+        return ("U", str(term), "", "")
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+    if isinstance(term, Literal):
+        return ("L", str(term), str(term.datatype or ""), term.language or "")
+    raise TypeError(f"Terme non pris en charge par le store SQLite : {term!r}")
+
+
+def _decode(kind, value, datatype, lang):
+    if kind == "U":
+        return URIRef(value)
+    if kind == "B":
+        return BNode(value)
+    return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteStore(Store):
+    """Store rdflib persistant (un seul graphe, sans contextes) adossé à SQLite"""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration: str = None, identifier=None):
+        self.path = None
+        self._db = None
+        self._lock = threading.RLock()
+        self._term_ids = {}
+        self._savepoint = False
+        super().__init__(configuration, identifier)
+
+    # ----------------------
+    # Ouverture / fermeture
+    # ----------------------
+
+    def open(self, configuration: str, create: bool = True):
+        self.path = configuration
+        if not create and not os.path.exists(configuration):
+            raise FileNotFoundError(configuration)
+        self._db = sqlite3.connect(configuration, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Une transaction validée est sur disque (équivalent du fsync du journal)
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        with self._lock:
+            if self._db is None:
+                return
+            if commit_pending_transaction:
+                self._bump_generation()
+                self._db.commit()
+            else:
+                self._db.rollback()
+            self._db.close()
+            self._db = None
+
+    def commit(self):
+        with self._lock:
+            self._bump_generation()
+            self._db.commit()
+            self._savepoint = False
+
+    def _bump_generation(self):
+        # Dans la transaction validée : le compteur change avec le contenu
+        if self._db.in_transaction:
+            self._db.execute(
+                "INSERT INTO meta VALUES ('generation', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+
+    def generation(self) -> int:
+        """Nombre de transactions validées depuis la création de la base (empreinte du contenu)"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def rollback(self):
+        with self._lock:
+            self._db.rollback()
+            self._savepoint = False
+            # Les identifiants attribués pendant la transaction annulée n'existent plus
+            self._term_ids.clear()
+
+    @contextmanager
+    def savepoint(self):
+        """Écritures annulées ensemble en cas d'exception, le reste de la transaction intact"""
+        with self._lock:
+            self._db.execute("SAVEPOINT ecriture")
+            self._savepoint = True
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                # Déjà validées par un commit dans le bloc : plus rien à annuler
+                if self._savepoint:
+                    self._db.execute("ROLLBACK TO ecriture")
+                    self._db.execute("RELEASE ecriture")
+                    self._savepoint = False
+                    self._term_ids.clear()
+            raise
+        with self._lock:
+            if self._savepoint:
+                # Point de sauvegarde extérieur : sa libération valide la transaction
+                self._bump_generation()
+                self._db.execute("RELEASE ecriture")
+                self._savepoint = False
+
+    # ----------------------
+    # Termes
+    # ----------------------
+
+    def _term_id(self, term, create: bool):
+        key = _encode(term)
+        term_id = self._term_ids.get(key)
+        if term_id is not None:
+            return term_id
+        row = self._db.execute(
+            "SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND lang = ?", key
+        ).fetchone()
+        if row is not None:
+            term_id = row[0]
+        elif create:
+            term_id = self._db.execute(
+                "INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)", key
+            ).lastrowid
+        else:
+            return None
+        if len(self._term_ids) >= TERM_CACHE_SIZE:
+            self._term_ids.clear()
+        self._term_ids[key] = term_id
+        return term_id
+
+    # ----------------------
+    # Triples
+    # ----------------------
+
+    def add(self, triple, context=None, quoted: bool = False):
+        with self._lock:
+            ids = tuple(self._term_id(term, create=True) for term in triple)
+            self._db.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", ids)
+        super().add(triple, context, quoted)
+
+    def addN(self, quads):
+        with self._lock:
+            rows = [tuple(self._term_id(term, create=True) for term in (s, p, o)) for s, p, o, _ in quads]
+            self._db.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", rows)
+
+    def _where(self, pattern, alias: str = "t."):
+        """Clause WHERE d'un motif ; None si un terme lié est inconnu (aucun résultat)"""
+        clauses, params = [], []
+        for column, term in zip(("s", "p", "o"), pattern):
+            if term is None:
+                continue
+            term_id = self._term_id(term, create=False)
+            if term_id is None:
+                return None
+            clauses.append(f"{alias}{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def remove(self, pattern, context=None):
+        with self._lock:
+            where = self._where(pattern, alias="")
+            if where is None:
+                return
+            clause, params = where
+            self._db.execute("DELETE FROM triples" + clause, params)
+
+    def triples(self, pattern, context=None):
+        with self._lock:
+            where = self._where(pattern)
+            if where is None:
+                return
+            clause, params = where
+            cursor = self._db.execute(
+                "SELECT s.kind, s.value, s.datatype, s.lang, p.kind, p.value, p.datatype, p.lang,"
+                " o.kind, o.value, o.datatype, o.lang FROM triples t"
+                " JOIN terms s ON s.id = t.s JOIN terms p ON p.id = t.p JOIN terms o ON o.id = t.o"
+                + clause,
+                params,
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield (_decode(*row[0:4]), _decode(*row[4:8]), _decode(*row[8:12])), iter(())
+
+    def __len__(self, context=None):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # ----------------------
+    # Préfixes
+    # ----------------------
+
+    def bind(self, prefix: str, namespace, override: bool = True):
+        with self._lock:
+            bound = self.namespace(prefix)
+            bound_prefix = self.prefix(namespace)
+            if not override and (bound is not None or bound_prefix is not None):
+                return
+            self._db.execute("DELETE FROM namespaces WHERE prefix = ? OR uri = ?", (prefix, str(namespace)))
+            self._db.execute("INSERT INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix: str):
+        with self._lock:
+            row = self._db.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        with self._lock:
+            row = self._db.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        with self._lock:
+            rows = self._db.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
+
+
+class StoreTransactions:
+    """
+    Remplace ChangeJournal quand le graphe local est persistant : mêmes points
+    d'entrée (verrou, record, commit, close) mais un commit est une transaction SQLite.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+        self.lock = SharedLock()
+        # Transaction d'endpoint en cours (sous self.lock) et commit demandé pendant celle-ci
+        self._in_transaction = False
+        self._commit_requested = False
+
+    def restore(self, graph) -> int:
+        return 0
+
+    def open(self):
+        pass
+
+    def record(self, op: str, triple):
+        # Le store écrit directement dans la transaction en cours
+        pass
+
+    @contextmanager
+    def transaction(self):
+        """
+        Endpoint d'écriture isolé : verrou tenu jusqu'à la fin, écritures annulées s'il
+        échoue. Un commit demandé dans le bloc est reporté à sa sortie sans erreur : une
+        exception après g.commit() (outbox indisponible...) annule aussi les écritures.
+        """
+        with self.lock:
+            if self._in_transaction:
+                # Endpoint appelé par un autre : même transaction
+                yield
+                return
+            self._in_transaction = True
+            try:
+                with self.store.savepoint():
+                    yield
+            except BaseException:
+                self._commit_requested = False
+                raise
+            finally:
+                self._in_transaction = False
+            if self._commit_requested:
+                self._commit_requested = False
+                self.store.commit()
+
+    def commit(self, graph=None):
+        with self.lock:
+            if self._in_transaction:
+                self._commit_requested = True
+                return
+            self.store.commit()
+
+    def compact(self, graph, wait: bool = False):
+        pass
+
+    def close(self):
+        with self.lock:
+            self.store.close(commit_pending_transaction=True)
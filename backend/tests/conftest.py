@@ -0,0 +1,47 @@
+# conftest.py
+import os
+import sys
+
+# Les modules du backend s'importent à plat (comme depuis app.py)
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """Module app importé une fois, état d'exécution dans un répertoire temporaire.
+
+    Fuseki et Ollama ne sont pas joignables : les lectures passent par le graphe
+    local, les tests remplacent au besoin les clients partagés.
+    """
+    state = tmp_path_factory.mktemp("app")
+    os.environ.update({
+        "LOG_LEVEL": "WARNING",
+        "QUERY_BACKEND": "local",
+        "REASONING_ENABLED": "0",
+        "OLLAMA_WARMUP": "0",
+        "FUSEKI_SYNC_INTERVAL": "3600",
+        "FUSEKI_CONNECT_TIMEOUT": "0.5",
+        "MOBILITE_RDF_PATH": os.path.join(BACKEND, "mobilite_principal.rdf"),
+        "MOBILITE_JOURNAL_PATH": str(state / "journal.nt"),
+        "MOBILITE_SNAPSHOT_PATH": str(state / "snapshot.nt"),
+        "MOBILITE_SEARCH_INDEX_PATH": str(state / "search_index.pickle"),
+        "FUSEKI_OUTBOX_PATH": str(state / "outbox.jsonl"),
+        "FUSEKI_SYNC_STATE_PATH": str(state / "sync.json"),
+        "FUSEKI_SYNC_DUMP_PATH": str(state / "dump.nt"),
+        "FUSEKI_SYNC_DELTA_PATH": str(state / "delta.nt"),
+        "TRANSLATION_CACHE_PATH": str(state / "translation_cache.sqlite"),
+    })
+    import app
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as client:
+        yield client
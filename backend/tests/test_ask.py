@@ -0,0 +1,87 @@
+# test_ask.py
+import json
+
+import httpx
+import pytest
+
+from test_ollama_client import FragmentStream, MockedOllama, fragments
+
+# Requête générée fragment par fragment, suivie d'une explication jamais demandée
+GENERATED = "SELECT ?c ?nom| WHERE { ?c a mobilite:Conducteur ;| mobilite:nom ?nom . }|\n\nExplication :| cette| requête| liste"
+
+
+@pytest.fixture
+def ollama(app_module, monkeypatch):
+    """Ollama simulé : chaque appel reçoit un nouveau flux de fragments"""
+    streams = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        stream = FragmentStream(fragments(GENERATED, {"prompt_eval_count": 40, "prompt_eval_duration": 2e7}))
+        streams.append((payload, stream))
+        return httpx.Response(200, stream=stream)
+
+    client = MockedOllama(handler, model=app_module.OLLAMA_MODEL)
+    monkeypatch.setattr(app_module, "ollama", client)
+    # Ni règles ni cache : la question passe par Ollama
+    monkeypatch.setattr(app_module, "ASK_RULES", False)
+    app_module.translation_cache.clear()
+    return streams
+
+
+def test_ask_generates_with_ollama_and_runs_query(client, ollama):
+    response = client.post("/ask/", json={"question": "Quels sont les noms des conducteurs ?"})
+    assert response.status_code == 200
+    answer = response.json()
+    assert answer["source"] == "ollama"
+    assert answer["sparql_query"].startswith("PREFIX mobilite:")
+    assert "Explication" not in answer["sparql_query"]
+    assert answer["results"] == [{"c": "Wala", "nom": "Trabelsi"}]
+    assert (answer["count"], answer["truncated"]) == (1, False)
+    assert answer["llm"]["prompt_eval_ms"] >= 0
+
+    (payload, stream), = ollama
+    assert payload["stream"] and "keep_alive" in payload
+    assert payload["prompt"].rstrip().endswith('"Quels sont les noms des conducteurs ?"')
+    # Génération coupée dès la requête complète : l'explication n'est pas lue
+    assert stream.closed and stream.sent < len(GENERATED.split("|"))
+
+
+def test_ask_stream_sends_partial_query_then_result(client, ollama):
+    with client.stream("GET", "/ask/stream/", params={"question": "Noms des conducteurs en flux ?"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+            for block in response.read().decode().strip().split("\n\n")
+        ]
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "result" and set(kinds[:-1]) == {"partial"}
+    partial = "".join(data["delta"] for kind, data in events if kind == "partial")
+    assert partial.startswith("SELECT ?c ?nom")
+    result = events[-1][1]
+    assert result["source"] == "ollama" and result["results"] == [{"c": "Wala", "nom": "Trabelsi"}]
+
+
+def test_ask_reports_ollama_unavailable(client, app_module, monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    monkeypatch.setattr(app_module, "ollama", MockedOllama(refuse, model=app_module.OLLAMA_MODEL))
+    monkeypatch.setattr(app_module, "ASK_RULES", False)
+    question = "Question sans Ollama démarré ?"
+
+    response = client.post("/ask/", json={"question": question})
+    assert response.status_code == 500
+    assert "Ollama n'est pas démarré" in response.json()["detail"]
+
+    body = client.get("/ask/stream/", params={"question": question}).text
+    assert body.startswith("event: error\n")
+    error = json.loads(body.split("\n")[1].removeprefix("data: "))
+    assert error["status_code"] == 500 and "Ollama n'est pas démarré" in error["detail"]
+
+
+def test_ask_rejects_empty_question(client):
+    assert client.post("/ask/", json={"question": "  "}).status_code == 400
+    assert client.get("/ask/stream/", params={"question": " "}).status_code == 400
@@ -0,0 +1,75 @@
+# test_batch.py
+import pytest
+
+
+def test_operations_resolve_to_served_routes(app_module):
+    # Endpoint appelé par le lot = celui que le routage sert pour le même chemin
+    assert app_module.route_endpoint("/avis/") is app_module.get_avis
+    assert app_module.route_endpoint("/observations/") is app_module.get_observations
+    for name, path in app_module.BATCH_OPERATIONS.items():
+        assert app_module.BATCH_ENDPOINTS[name] is app_module.route_endpoint(path)
+    with pytest.raises(KeyError):
+        app_module.route_endpoint("/inconnu/")
+
+
+def test_batch_returns_each_operation_like_its_endpoint(client):
+    response = client.post("/batch/", json={"operations": [
+        {"name": "avis"},
+        {"name": "observations"},
+        {"name": "personnes", "params": {"limit": 1}},
+        {"name": "personnes", "key": "toutes"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["errors"] == 0
+    results = body["results"]
+    assert results["avis"]["data"] == client.get("/avis/").json()
+    assert results["observations"]["data"] == client.get("/observations/").json()
+    assert results["toutes"]["data"] == client.get("/personnes/").json()
+    page = client.get("/personnes/", params={"limit": 1})
+    assert results["personnes"]["data"] == page.json()
+    assert results["personnes"]["next_cursor"] == page.headers["x-next-cursor"]
+    assert all(outcome["status"] == 200 for outcome in results.values())
+
+
+def test_batch_reports_errors_per_operation(client, app_module, monkeypatch):
+    async def failing():
+        raise RuntimeError("Fuseki indisponible")
+
+    monkeypatch.setitem(app_module.BATCH_ENDPOINTS, "stats", failing)
+    response = client.post("/batch/", json={"operations": [
+        {"name": "stats"},
+        {"name": "inconnue"},
+        {"name": "personnes", "params": {"limite": 2}},
+        {"name": "personnes", "key": "page", "params": {"limit": "deux"}},
+        {"name": "avis"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    results = body["results"]
+    assert body["errors"] == 4
+    assert (results["stats"]["status"], results["stats"]["error"]) == (500, "Fuseki indisponible")
+    assert (results["inconnue"]["status"], results["inconnue"]["error"]) == (400, "Opération inconnue : inconnue")
+    assert results["personnes"]["error"] == "Paramètre inconnu : limite"
+    assert results["page"]["status"] == 400 and "limit" in results["page"]["error"]
+    # Les autres opérations aboutissent
+    assert results["avis"]["status"] == 200 and "error" not in results["avis"]
+
+
+@pytest.mark.parametrize("operations", [
+    [{"name": "avis"}, {"name": "avis"}],
+    [{"name": "avis", "key": f"avis{i}"} for i in range(21)],
+])
+def test_invalid_batches_are_rejected(client, operations):
+    assert client.post("/batch/", json={"operations": operations}).status_code == 400
+
+
+def test_dashboard_renders(client, app_module):
+    response = client.get("/dashboard/")
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["results"]) == list(app_module.DASHBOARD_OPERATIONS)
+    assert body["errors"] == 0
+    assert body["results"]["stats"]["data"] == client.get("/stats/").json()
+    assert body["results"]["personnes"]["data"] == client.get("/personnes/").json()
+    assert client.get("/batch/").json()["dashboard"] == list(app_module.DASHBOARD_OPERATIONS)
@@ -0,0 +1,140 @@
+# test_bulk_upload.py
+import asyncio
+import io
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+
+from bulk_upload import UploadFormatError, bulk_load, detect_format, iter_turtle_chunks, stream_triples
+
+
+def ntriples(count: int) -> bytes:
+    return "".join(f'<http://example.org/s{i}> <http://example.org/p> "{i}" .\n' for i in range(count)).encode()
+
+
+def collect(data: bytes, fmt: str, chunk_size: int):
+    chunks = []
+    stream_triples(io.BytesIO(data), fmt, chunk_size, lambda graph_name, triples: chunks.append((graph_name, list(triples))))
+    return chunks
+
+
+def test_detect_format():
+    assert detect_format("donnees.ttl") == "turtle"
+    assert detect_format("export", "application/n-triples; charset=utf-8") == "nt"
+    assert detect_format("donnees.txt", explicit="nq") == "nquads"
+    with pytest.raises(UploadFormatError):
+        detect_format("donnees.txt")
+
+
+def test_ntriples_are_emitted_in_chunks():
+    chunks = collect(ntriples(25), "nt", 10)
+    assert [len(triples) for _, triples in chunks] == [10, 10, 5]
+    assert {graph_name for graph_name, _ in chunks} == {None}
+
+
+def test_nquads_are_grouped_by_graph():
+    data = (
+        b'<http://a> <http://p> "1" <http://g1> .\n'
+        b'<http://b> <http://p> "2" .\n'
+        b'<http://c> <http://p> "3" <http://g1> .\n'
+    )
+    chunks = dict(collect(data, "nquads", 10))
+    assert len(chunks["http://g1"]) == 2
+    assert chunks[None] == [(URIRef("http://b"), URIRef("http://p"), Literal("2"))]
+
+
+def test_turtle_chunks_are_self_contained():
+    text = (
+        "@prefix ex: <http://example.org/> .\n"
+        'ex:a ex:nom "A. B" ; ex:taille 1.5 .\n'
+        'ex:b ex:nom """x . y""" .\n'
+        "@prefix ex: <http://example.org/autre/> .\n"
+        "ex:c ex:p [ ex:q 1 ] .\n"
+    )
+    documents = list(iter_turtle_chunks(io.StringIO(text), chunk_bytes=1, block_size=7))
+    graph = Graph()
+    for document in documents:
+        graph.parse(data=document, format="turtle")
+    assert len(documents) == 3
+    assert (URIRef("http://example.org/a"), URIRef("http://example.org/nom"), Literal("A. B")) in graph
+    assert (None, URIRef("http://example.org/autre/p"), None) in graph
+    assert len(graph) == 5
+
+
+def test_truncated_turtle_is_rejected():
+    with pytest.raises(UploadFormatError):
+        list(iter_turtle_chunks(io.StringIO('<http://a> <http://p> "incomplet')))
+
+
+def test_rdfxml_is_streamed():
+    graph = Graph()
+    graph.add((URIRef("http://example.org/a"), URIRef("http://example.org/p"), Literal("A")))
+    graph.add((URIRef("http://example.org/b"), URIRef("http://example.org/p"), Literal("B")))
+    applied = []
+
+    async def post_chunk(graph_name, payload):
+        pass
+
+    progress = {}
+    asyncio.run(bulk_load(io.BytesIO(graph.serialize(format="xml").encode()), "xml", post_chunk,
+                          lambda graph_name, triples: applied.extend(triples), progress, chunk_size=1))
+    assert sorted(o for _, _, o in applied) == [Literal("A"), Literal("B")]
+    assert progress["chunks_sent"] == 2
+
+
+def test_parser_waits_for_senders():
+    """File bornée : le parseur est bloqué tant que les envois ne sont pas acquittés"""
+
+    async def main():
+        release = asyncio.Event()
+        progress = {}
+
+        async def post_chunk(graph_name, payload):
+            await release.wait()
+
+        load = asyncio.create_task(
+            bulk_load(io.BytesIO(ntriples(1000)), "nt", post_chunk, lambda *args: None, progress,
+                      chunk_size=10, concurrency=1)
+        )
+        await asyncio.sleep(0.2)
+        # Un lot en cours d'envoi, deux dans la file, un bloqué dans emit()
+        parsed_while_blocked = progress["triples_parsed"]
+        release.set()
+        await load
+        return parsed_while_blocked, progress
+
+    parsed_while_blocked, progress = asyncio.run(main())
+    assert parsed_while_blocked <= 40
+    assert progress["status"] == "terminé"
+    assert (progress["triples_sent"], progress["chunks_sent"]) == (1000, 100)
+
+
+def test_chunk_applied_locally_only_after_ack():
+    events = []
+
+    async def post_chunk(graph_name, payload):
+        first = payload.split(b"\n", 1)[0]
+        events.append(("post", first))
+        await asyncio.sleep(0.01)
+        if b"/s20>" in first:
+            raise ConnectionError("Fuseki indisponible")
+        events.append(("ack", first))
+
+    def apply_local(graph_name, triples):
+        events.append(("local", f"<{triples[0][0]}>".encode()))
+
+    progress = {}
+    with pytest.raises(ConnectionError):
+        asyncio.run(bulk_load(io.BytesIO(ntriples(30)), "nt", post_chunk, apply_local, progress,
+                              chunk_size=10, concurrency=1, retries=1))
+
+    applied = [subject for event, subject in events if event == "local"]
+    acked = [first.split(b" ", 1)[0] for event, first in events if event == "ack"]
+    assert applied == acked == [b"<http://example.org/s0>", b"<http://example.org/s10>"]
+    # Chaque application locale suit l'acquittement de son lot
+    for subject in applied:
+        ack = next(i for i, (event, first) in enumerate(events) if event == "ack" and first.startswith(subject))
+        local = events.index(("local", subject))
+        assert ack < local
+    assert progress["status"] == "erreur"
+    assert progress["triples_sent"] == 20
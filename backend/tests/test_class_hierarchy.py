@@ -0,0 +1,90 @@
+# test_class_hierarchy.py
+import threading
+import time
+
+from rdflib import Namespace
+from rdflib.namespace import RDFS
+
+from class_hierarchy import ClassHierarchy
+
+EX = Namespace("http://example.org/")
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_closure_is_transitive():
+    hierarchy = ClassHierarchy(lambda: [(EX.Conducteur, EX.Personne), (EX.Chauffeur, EX.Conducteur)])
+    assert hierarchy.refresh()
+    assert hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur, EX.Chauffeur}
+    assert hierarchy.subclasses(EX.Pieton) == {EX.Pieton}
+    assert hierarchy.values("?type", EX.Conducteur) == f"VALUES ?type {{ <{EX.Chauffeur}> <{EX.Conducteur}> }}"
+
+
+def test_refresh_runs_in_background():
+    axioms = [(EX.Conducteur, EX.Personne)]
+    release = threading.Event()
+
+    def load():
+        release.wait(5)
+        return list(axioms)
+
+    hierarchy = ClassHierarchy(load)
+    release.set()
+    hierarchy.refresh()
+    release.clear()
+
+    axioms.append((EX.Chauffeur, EX.Conducteur))
+    hierarchy.on_change("+", (EX.Chauffeur, RDFS.subClassOf, EX.Conducteur))
+    # Chargement en cours : l'appel ne bloque pas, la clôture précédente est servie
+    assert hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur}
+    release.set()
+    wait_for(lambda: hierarchy.version == 2)
+    assert hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur, EX.Chauffeur}
+
+
+def test_failed_load_keeps_last_hierarchy_and_backs_off():
+    axioms = [(EX.Conducteur, EX.Personne)]
+    calls = []
+
+    def load():
+        calls.append(time.monotonic())
+        if not axioms:
+            raise ConnectionError("Fuseki injoignable")
+        return list(axioms)
+
+    hierarchy = ClassHierarchy(load, retry_delay=0.3)
+    hierarchy.refresh()
+    axioms.clear()
+    hierarchy.invalidate()
+
+    # Échec : la hiérarchie connue est conservée
+    assert hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur}
+    wait_for(lambda: hierarchy.failures == 1)
+    # Pendant le délai d'attente, aucun nouvel essai
+    for _ in range(20):
+        assert hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur}
+    time.sleep(0.05)
+    assert len(calls) == 2
+
+    axioms.append((EX.Conducteur, EX.Personne))
+    time.sleep(0.3)
+    hierarchy.subclasses(EX.Personne)
+    wait_for(lambda: hierarchy.version == 2)
+    assert len(calls) == 3
+
+
+def test_empty_load_at_startup_is_retried():
+    axioms = []
+    hierarchy = ClassHierarchy(lambda: list(axioms), retry_delay=0)
+    # Ontologie indisponible au démarrage : rien n'est mis en cache
+    assert not hierarchy.refresh()
+    assert hierarchy.subclasses(EX.Personne) == {EX.Personne}
+    axioms.append((EX.Conducteur, EX.Personne))
+    # Un essai lancé avant l'ajout peut encore échouer : le suivant part au prochain appel
+    wait_for(lambda: hierarchy.subclasses(EX.Personne) == {EX.Personne, EX.Conducteur})
+    assert hierarchy.version == 1
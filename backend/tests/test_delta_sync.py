@@ -0,0 +1,191 @@
+# test_delta_sync.py
+import json
+
+import pytest
+from rdflib import Dataset, Graph, Literal, Namespace
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.plugins.serializers.nt import _nt_row
+
+from delta_sync import ChangeRecorder, DeltaSync, changelog_update, format_change, reset_update
+from journal import OP_AJOUT, OP_SUPPRESSION, SharedLock
+
+EX = Namespace("http://example.org/")
+CHANGELOG = "http://example.org/changelog"
+
+
+class FakeFuseki:
+    """Dataset rdflib à la place de Fuseki (mêmes méthodes synchrones que FusekiClient)"""
+
+    def __init__(self):
+        self.dataset = Dataset(default_union=False)
+        self.downloads = 0
+
+    def select_sync(self, query: str) -> dict:
+        return json.loads(self.dataset.query(query).serialize(format="json"))
+
+    def select_rows_sync(self, query: str):
+        return self.select_sync(query)["results"]["bindings"]
+
+    def update_sync(self, update: str):
+        self.dataset.update(update)
+
+    def download_graph(self, path: str) -> int:
+        self.downloads += 1
+        data = "".join(_nt_row(t) for t in self.dataset.default_graph)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        return len(data)
+
+    def publish(self, origin: str, op: str, triple):
+        """Écriture d'un processus : donnée + changeset, comme l'outbox"""
+        if op == OP_AJOUT:
+            self.dataset.default_graph.add(triple)
+        else:
+            self.dataset.default_graph.remove(triple)
+        self.update_sync(changelog_update(CHANGELOG, origin, format_change(op, triple)))
+
+
+def make_sync(tmp_path, fuseki, graph=None, origin="local", **kwargs):
+    graph = graph if graph is not None else Graph()
+    sync = DeltaSync(
+        fuseki,
+        graph,
+        SharedLock(),
+        ChangeRecorder(),
+        CHANGELOG,
+        origin,
+        str(tmp_path / "sync.json"),
+        str(tmp_path / "dump.nt"),
+        str(tmp_path / "delta.nt"),
+        interval=0,
+        **kwargs,
+    )
+    return sync, graph
+
+
+@pytest.fixture
+def fuseki():
+    return FakeFuseki()
+
+
+def test_bulk_import_of_another_process_triggers_full_sync(tmp_path, fuseki):
+    sync, graph = make_sync(tmp_path, fuseki)
+    assert sync.sync()["mode"] == "complète"
+
+    # Import en masse d'un autre processus : données sans changeset, filigrane incrémenté
+    fuseki.dataset.default_graph.add((EX.a, EX.nom, Literal("A")))
+    fuseki.update_sync(reset_update(CHANGELOG, "autre"))
+    report = sync.sync()
+    assert report["mode"] == "complète"
+    assert (EX.a, EX.nom, Literal("A")) in graph
+    assert sync.version == 1
+
+    assert sync.sync()["mode"] == "incrémentale"
+
+
+def test_own_bulk_import_keeps_incremental_sync(tmp_path, fuseki):
+    sync, graph = make_sync(tmp_path, fuseki)
+    sync.sync()
+    fuseki.publish("autre", OP_AJOUT, (EX.b, EX.nom, Literal("B")))
+    fuseki.update_sync(reset_update(CHANGELOG, "local"))
+
+    report = sync.sync()
+    assert report["mode"] == "incrémentale"
+    assert (EX.b, EX.nom, Literal("B")) in graph
+    # Le filigrane atteint celui de Fuseki même sans changeset pour l'import
+    assert sync.version == 2
+    assert fuseki.downloads == 1
+
+
+def test_watermark_survives_restart(tmp_path, fuseki):
+    fuseki.publish("autre", OP_AJOUT, (EX.a, EX.nom, Literal("A")))
+    sync, graph = make_sync(tmp_path, fuseki)
+    assert sync.sync()["mode"] == "complète"
+    assert sync.version == 1 and (EX.a, EX.nom, Literal("A")) in graph
+
+    # Redémarrage : le filigrane est relu, la synchronisation reste incrémentale
+    fuseki.publish("autre", OP_AJOUT, (EX.b, EX.nom, Literal("B")))
+    sync, graph = make_sync(tmp_path, fuseki, graph)
+    assert sync.version == 1
+    report = sync.sync()
+    assert (report["mode"], report["changesets"]) == ("incrémentale", 1)
+    assert (EX.b, EX.nom, Literal("B")) in graph
+    assert fuseki.downloads == 1
+
+
+def test_delta_replays_other_processes_only(tmp_path, fuseki):
+    sync, graph = make_sync(tmp_path, fuseki)
+    sync.sync()
+    fuseki.publish("autre", OP_AJOUT, (EX.a, EX.nom, Literal("A")))
+    fuseki.publish("autre", OP_AJOUT, (EX.b, EX.nom, Literal("B")))
+    fuseki.publish("autre", OP_SUPPRESSION, (EX.a, EX.nom, Literal("A")))
+    # Écriture de ce processus : déjà dans le graphe local, pas rejouée
+    fuseki.publish("local", OP_AJOUT, (EX.c, EX.nom, Literal("C")))
+
+    report = sync.sync()
+    assert (report["changesets"], report["own_changesets"], report["operations"]) == (3, 1, 3)
+    assert set(graph) == {(EX.b, EX.nom, Literal("B"))}
+    assert sync.version == 4
+
+
+def test_purged_changelog_falls_back_to_full_sync(tmp_path, fuseki):
+    sync, graph = make_sync(tmp_path, fuseki, retention=2)
+    sync.sync()
+    # Second processus, arrêté pendant que le journal des changements est purgé
+    (tmp_path / "behind").mkdir()
+    behind, _ = make_sync(tmp_path / "behind", fuseki, origin="behind")
+    behind.sync()
+    for i in range(5):
+        fuseki.publish("autre", OP_AJOUT, (EX[f"p{i}"], EX.nom, Literal(i)))
+    # Rétention de 2 : les changesets 1 à 3 sont purgés
+    sync.sync()
+    assert fuseki.select_sync(
+        f"SELECT (MIN(?seq) AS ?m) WHERE {{ GRAPH <{CHANGELOG}> {{ ?c <urn:mobilite:sync#seq> ?seq }} }}"
+    )["results"]["bindings"][0]["m"]["value"] == "4"
+
+    report = behind.sync()
+    assert report["mode"] == "complète"
+    assert len(behind.graph) == 5 and behind.version == 5
+
+
+def test_fuseki_reset_falls_back_to_full_sync(tmp_path, fuseki):
+    fuseki.publish("autre", OP_AJOUT, (EX.a, EX.nom, Literal("A")))
+    sync, graph = make_sync(tmp_path, fuseki)
+    sync.sync()
+
+    # Fuseki vidé : filigrane distant (0) inférieur au filigrane local
+    fuseki.update_sync(f"CLEAR DEFAULT ; CLEAR GRAPH <{CHANGELOG}>")
+    report = sync.sync()
+    assert (report["mode"], report["removed"]) == ("complète", 1)
+    assert len(graph) == 0 and sync.version == 0
+
+
+def test_full_sync_keeps_local_ontology(tmp_path, fuseki):
+    graph = Graph()
+    ontology = [
+        (EX.Conducteur, RDF.type, OWL.Class),
+        (EX.Conducteur, RDFS.subClassOf, EX.Personne),
+        (EX.Conducteur, RDFS.label, Literal("Conducteur")),
+        (EX.numeroPermis, RDFS.domain, EX.Conducteur),
+    ]
+    for triple in ontology:
+        graph.add(triple)
+    # Donnée d'instance supprimée de Fuseki pendant l'arrêt du processus
+    graph.add((EX.ancien, EX.nom, Literal("Ancien")))
+    fuseki.publish("autre", OP_AJOUT, (EX.a, RDF.type, EX.Conducteur))
+
+    sync, graph = make_sync(tmp_path, fuseki, graph)
+    report = sync.sync()
+    assert (report["mode"], report["added"], report["removed"]) == ("complète", 1, 1)
+    assert set(ontology) <= set(graph)
+    assert (EX.a, RDF.type, EX.Conducteur) in graph
+    assert (EX.ancien, EX.nom, Literal("Ancien")) not in graph
+
+
+def test_full_sync_waits_for_pending_local_writes(tmp_path, fuseki):
+    pending = [1]
+    sync, graph = make_sync(tmp_path, fuseki, can_reset=lambda: not pending)
+    assert "skipped" in sync.sync()
+    assert sync.version is None and fuseki.downloads == 0
+    pending.clear()
+    assert sync.sync()["mode"] == "complète"
@@ -0,0 +1,24 @@
+# test_fuseki_client.py
+import pytest
+
+from fuseki_client import parse_tsv_term
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+@pytest.mark.parametrize(
+    "cell, term",
+    [
+        ("<http://example.org/a>", {"type": "uri", "value": "http://example.org/a"}),
+        ("_:b0", {"type": "bnode", "value": "b0"}),
+        ('"Dupont"', {"type": "literal", "value": "Dupont"}),
+        ('"rue \\"A\\"\\n\\u00e9"@fr', {"type": "literal", "value": 'rue "A"\né', "xml:lang": "fr"}),
+        ('"4.5"^^<%sfloat>' % XSD, {"type": "literal", "value": "4.5", "datatype": XSD + "float"}),
+        ("42", {"type": "literal", "value": "42", "datatype": XSD + "integer"}),
+        ("-1.5", {"type": "literal", "value": "-1.5", "datatype": XSD + "decimal"}),
+        ("1.0e3", {"type": "literal", "value": "1.0e3", "datatype": XSD + "double"}),
+        ("true", {"type": "literal", "value": "true", "datatype": XSD + "boolean"}),
+    ],
+)
+def test_parse_tsv_term(cell, term):
+    assert parse_tsv_term(cell) == term
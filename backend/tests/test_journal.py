@@ -0,0 +1,161 @@
+# test_journal.py
+import threading
+import time
+
+from rdflib import Graph, Literal, Namespace
+
+from journal import ChangeJournal, JournaledGraph, SharedLock
+
+EX = Namespace("http://example.org/")
+
+
+def write_base(path):
+    base = Graph()
+    base.add((EX.a, EX.nom, Literal("A")))
+    base.add((EX.b, EX.nom, Literal("B")))
+    base.serialize(path, format="nt", encoding="utf-8")
+
+
+def start(tmp_path, base_path):
+    """Démarrage comme app.py : snapshot (ou RDF initial) puis rejeu du journal"""
+    journal = ChangeJournal(str(tmp_path / "journal.nt"), str(tmp_path / "snapshot.nt"), fsync_interval=0.001)
+    graph = JournaledGraph()
+    journal.restore(graph, lambda g: g.parse(base_path, format="nt"))
+    journal.open()
+    graph.attach_journal(journal)
+    return graph, journal
+
+
+def test_restart_replays_journal(tmp_path):
+    base = str(tmp_path / "base.nt")
+    write_base(base)
+    graph, journal = start(tmp_path, base)
+    graph.add((EX.c, EX.nom, Literal("C")))
+    graph.remove((EX.a, EX.nom, Literal("A")))
+    graph.commit()
+    journal.close()
+
+    graph, journal = start(tmp_path, base)
+    assert (EX.c, EX.nom, Literal("C")) in graph
+    assert (EX.a, EX.nom, Literal("A")) not in graph
+    assert (EX.b, EX.nom, Literal("B")) in graph
+    journal.close()
+
+
+def test_deleted_base_triple_stays_deleted_after_compaction(tmp_path):
+    base = str(tmp_path / "base.nt")
+    write_base(base)
+    graph, journal = start(tmp_path, base)
+    graph.remove((EX.a, EX.nom, Literal("A")))
+    graph.commit()
+    journal.compact(graph, wait=True)
+    journal.close()
+    # Le segment scellé (et son « - ») a disparu : seul le snapshot fait foi
+    assert not (tmp_path / "journal.nt.1").exists()
+
+    graph, journal = start(tmp_path, base)
+    assert (EX.a, EX.nom, Literal("A")) not in graph
+    assert (EX.b, EX.nom, Literal("B")) in graph
+    journal.close()
+
+
+def test_compaction_keeps_writes_made_after_sealing(tmp_path):
+    base = str(tmp_path / "base.nt")
+    write_base(base)
+    graph, journal = start(tmp_path, base)
+    graph.add((EX.c, EX.nom, Literal("C")))
+    graph.commit()
+    journal.compact(graph, wait=True)
+    graph.add((EX.d, EX.nom, Literal("D")))
+    graph.commit()
+    journal.close()
+
+    graph, journal = start(tmp_path, base)
+    assert {(EX.c, EX.nom, Literal("C")), (EX.d, EX.nom, Literal("D"))} <= set(graph)
+    assert len(graph) == 4
+    journal.close()
+
+
+def test_concurrent_compactions_seal_once(tmp_path, monkeypatch):
+    import threading
+
+    base = str(tmp_path / "base.nt")
+    write_base(base)
+    graph, journal = start(tmp_path, base)
+    graph.add((EX.c, EX.nom, Literal("C")))
+    graph.commit()
+
+    release = threading.Event()
+    writes = []
+    original = journal._write_snapshot
+
+    def slow_snapshot(triples):
+        writes.append(len(triples))
+        release.wait(5)
+        original(triples)
+
+    monkeypatch.setattr(journal, "_write_snapshot", slow_snapshot)
+    callers = [threading.Thread(target=journal.compact, args=(graph,)) for _ in range(4)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    release.set()
+    journal._compaction_thread.join()
+    # Un seul scellement et un seul snapshot (base + C)
+    assert writes == [3]
+    assert not (tmp_path / "journal.nt.1").exists()
+    journal.close()
+
+    graph, journal = start(tmp_path, base)
+    assert (EX.c, EX.nom, Literal("C")) in graph
+    journal.close()
+
+
+def test_shared_lock_readers_share_writers_exclude():
+    lock = SharedLock()
+    inside = threading.Barrier(2, timeout=2)
+    events = []
+
+    def reader():
+        with lock.shared():
+            # Deux lecteurs en même temps dans le verrou
+            inside.wait()
+            events.append("lecture")
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    with lock:
+        with lock:  # réentrant
+            for t in readers:
+                t.start()
+            time.sleep(0.05)
+            # Écrivain présent : aucun lecteur n'est entré
+            assert events == []
+            with lock.shared():  # lecture par l'écrivain lui-même
+                pass
+    for t in readers:
+        t.join(2)
+    assert events == ["lecture", "lecture"]
+
+
+def test_shared_lock_waiting_writer_blocks_new_readers():
+    lock = SharedLock()
+    order = []
+
+    def read():
+        with lock.shared():
+            order.append("lecture")
+
+    with lock.shared():
+        writer = threading.Thread(target=lambda: (lock.acquire(), order.append("écriture"), lock.release()))
+        writer.start()
+        time.sleep(0.05)
+        with lock.shared():  # lecture imbriquée du même thread : pas d'interblocage
+            pass
+        later = threading.Thread(target=read)
+        later.start()
+        time.sleep(0.05)
+        assert order == []
+    writer.join(2)
+    later.join(2)
+    assert order == ["écriture", "lecture"]
@@ -0,0 +1,124 @@
+# test_llm_session.py
+import asyncio
+import os
+
+import pytest
+
+import llm_session as llm_session_module
+from llm_session import LLMSession, parse_keep_alive
+from sparql_prompt import build_prompt
+
+SCHEMA = "Classes : mobilite:Personne, mobilite:Conducteur (sous-classe de Personne)"
+WARMUP_QUESTION = "Liste toutes les personnes"
+
+
+class FakeOllama:
+    """Runner Ollama simulé : cache KV du dernier prompt, un token par caractère"""
+
+    model = "fake:7b"
+
+    def __init__(self, ping_delays=(), failures: int = 0):
+        self.calls = []
+        self.cached = ""
+        self.ping_delays = list(ping_delays)
+        self.failures = failures
+
+    async def generate(self, prompt: str, options: dict = None, **params) -> dict:
+        self.calls.append((prompt, options, params))
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Ollama injoignable")
+        if not prompt:
+            # Ping : chargement seul, éventuellement lent (modèle déchargé)
+            if self.ping_delays:
+                await asyncio.sleep(self.ping_delays.pop(0))
+            return {"response": "", "done": True}
+        common = len(os.path.commonprefix([self.cached, prompt]))
+        self.cached = prompt
+        evaluated = len(prompt) - common
+        return {"response": "S", "done": True, "prompt_eval_count": evaluated, "prompt_eval_duration": evaluated * 1000}
+
+    def evaluated(self, prompt: str) -> str:
+        """Partie du prompt réellement évaluée au prochain appel"""
+        return prompt[len(os.path.commonprefix([self.cached, prompt])):]
+
+
+def make_session(client, **kwargs):
+    return LLMSession(client, lambda: build_prompt(WARMUP_QUESTION, SCHEMA), keep_alive="30m", **kwargs)
+
+
+def test_warm_up_measures_full_prompt_once():
+    client = FakeOllama()
+    session = make_session(client, options={"temperature": 0.1})
+    stats = asyncio.run(session.warm_up())
+
+    prompt = build_prompt(WARMUP_QUESTION, SCHEMA)
+    # Première évaluation forcée à froid (préfixe différent), puis prompt complet en cache
+    assert [call[0] for call in client.calls] == ["\n" + prompt, prompt]
+    assert all(params == {"keep_alive": "30m"} for _, _, params in client.calls)
+    assert client.calls[-1][1] == {"temperature": 0.1, "num_predict": 1}
+    # (le prompt commence lui-même par un saut de ligne, seul caractère commun)
+    assert stats["warm"] and stats["cold_prompt_tokens"] == len(prompt) - 1
+    assert client.cached == prompt
+
+
+def test_only_the_question_is_evaluated_after_warm_up():
+    client = FakeOllama()
+    session = make_session(client)
+    asyncio.run(session.warm_up())
+
+    question = "Combien de conducteurs ont un permis B ?"
+    prompt = build_prompt(question, SCHEMA)
+    # Consignes, exemples et contexte : déjà dans le cache KV
+    assert client.evaluated(prompt) in f'{question}"\n'
+    result = asyncio.run(client.generate(prompt, **session.params))
+    assert result["prompt_eval_count"] <= len(question) + 2
+
+    report = session.observe(result["prompt_eval_duration"] / 1e9, len(prompt), result["prompt_eval_count"])
+    assert report["prompt_tokens_evaluated"] == result["prompt_eval_count"]
+    assert report["prompt_eval_saved_ms"] > 0
+    assert session.stats()["calls"] == 1
+
+
+def test_cached_context_is_reused_between_questions():
+    client = FakeOllama()
+    session = make_session(client)
+    asyncio.run(session.warm_up())
+    for question in ("Liste les trajets", "Liste les véhicules électriques", "Liste les trajets"):
+        result = asyncio.run(client.generate(build_prompt(question, SCHEMA), **session.params))
+        assert result["prompt_eval_count"] <= len(question) + 2
+
+
+def test_keep_alive_ping_extends_and_detects_reload(monkeypatch):
+    monkeypatch.setattr(llm_session_module, "RELOAD_THRESHOLD", 0.05)
+    # Deuxième ping lent : modèle déchargé puis rechargé par Ollama
+    client = FakeOllama(ping_delays=[0, 0.1])
+    session = make_session(client, keep_warm_interval=0.01)
+
+    async def main():
+        session.start()
+        while sum(1 for prompt, _, _ in client.calls if not prompt) < 4:
+            await asyncio.sleep(0.01)
+        await session.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    kinds = ["ping" if not prompt else "prompt" for prompt, _, _ in client.calls]
+    # Préchauffage, deux pings dont un lent, nouveau préchauffage, pings suivants
+    assert kinds[:8] == ["prompt", "prompt", "ping", "ping", "prompt", "prompt", "ping", "ping"]
+    assert all(params == {"keep_alive": "30m"} for _, _, params in client.calls)
+    assert session.warmups == 2 and session._task is None
+
+
+def test_warm_up_is_retried_until_ollama_answers(monkeypatch):
+    monkeypatch.setattr(llm_session_module, "RETRY_MIN", 0.01)
+    client = FakeOllama(failures=2)
+    session = make_session(client, keep_warm_interval=0)
+
+    asyncio.run(asyncio.wait_for(session.run(), 5))
+    assert session.warm and session.warmups == 1
+    assert len(client.calls) == 4
+
+
+@pytest.mark.parametrize("value, expected", [("30m", "30m"), ("-1", -1), ("3600", 3600)])
+def test_parse_keep_alive(value, expected):
+    assert parse_keep_alive(value) == expected
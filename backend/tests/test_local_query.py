@@ -0,0 +1,122 @@
+# test_local_query.py
+import threading
+
+import pytest
+from rdflib import Literal, Namespace
+from rdflib.namespace import XSD
+
+from journal import ChangeJournal, JournaledGraph
+from local_query import LocalQueryEngine, LocalQueryError, compare_results
+
+EX = Namespace("http://example.org/")
+COUNT = f"SELECT (COUNT(?s) AS ?n) WHERE {{ ?s <{EX.nom}> ?nom }}"
+
+
+@pytest.fixture
+def graph(tmp_path):
+    journal = ChangeJournal(str(tmp_path / "journal.nt"), str(tmp_path / "snapshot.nt"), durable=False)
+    journal.open()
+    graph = JournaledGraph()
+    graph.attach_journal(journal)
+    graph.add((EX.a, EX.nom, Literal("A", lang="fr")))
+    graph.add((EX.a, EX.age, Literal(30, datatype=XSD.integer)))
+    yield graph
+    journal.close()
+
+
+@pytest.fixture
+def engine(graph):
+    engine = LocalQueryEngine(graph, graph.journal.lock)
+    graph.add_listener(engine.on_change)
+    return engine
+
+
+def test_select_and_ask_return_sparql_json(engine):
+    results = engine.select(f"SELECT ?s ?nom ?age WHERE {{ ?s <{EX.nom}> ?nom OPTIONAL {{ ?s <{EX.age}> ?age }} }}")
+    assert results["head"]["vars"] == ["s", "nom", "age"]
+    assert results["results"]["bindings"] == [{
+        "s": {"type": "uri", "value": str(EX.a)},
+        "nom": {"type": "literal", "value": "A", "xml:lang": "fr"},
+        "age": {"type": "literal", "value": "30", "datatype": str(XSD.integer)},
+    }]
+    assert engine.select(f"ASK {{ <{EX.a}> <{EX.nom}> ?nom }}") == {"head": {}, "boolean": True}
+
+
+def test_prepared_queries_are_cached(engine):
+    engine.select(COUNT)
+    engine.select(COUNT)
+    stats = engine.stats()
+    assert (stats["parse_misses"], stats["parse_hits"], stats["queries"]) == (1, 1, 2)
+
+
+@pytest.mark.parametrize("query", ["SELECT ?s WHERE { ?s", "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"])
+def test_unsupported_queries_are_rejected(engine, query):
+    with pytest.raises(LocalQueryError):
+        engine.select(query)
+
+
+def test_reads_during_concurrent_writes(engine, graph):
+    """Lectures sous le verrou partagé pendant des écritures : pas d'itération sur un graphe modifié"""
+    writes = 2000
+    errors, counts = [], []
+    done = threading.Event()
+
+    def writer():
+        for i in range(writes):
+            graph.add((EX[f"p{i}"], EX.nom, Literal(f"P{i}")))
+            if i % 50 == 0:
+                graph.remove((EX[f"p{i}"], None, None))
+        done.set()
+
+    def reader():
+        try:
+            seen = []
+            while True:
+                finished = done.is_set()
+                seen.append(int(engine.select(COUNT)["results"]["bindings"][0]["n"]["value"]))
+                if finished:
+                    break
+            counts.append(seen)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert errors == []
+    final = 1 + writes - len(range(0, writes, 50))
+    assert int(engine.select(COUNT)["results"]["bindings"][0]["n"]["value"]) == final
+    assert len(counts) == 4
+    for seen in counts:
+        assert all(1 <= n <= final for n in seen)
+        assert seen[-1] == final
+
+
+def test_each_write_is_seen_once_by_generation(engine, graph):
+    assert not engine.consume_change()
+
+    graph.add((EX.b, EX.nom, Literal("B")))
+    generation = engine.generation
+    assert engine.consume_change()
+    assert not engine.consume_change()
+
+    # Écriture suivante : nouvelle génération, vue au prochain appel
+    graph.remove((EX.b, None, None))
+    assert engine.generation > generation
+    assert engine.consume_change()
+
+
+def test_compare_results_ignores_order_and_bnode_ids():
+    local = {"head": {"vars": ["s"]}, "results": {"bindings": [
+        {"s": {"type": "bnode", "value": "b0"}}, {"s": {"type": "uri", "value": "http://a"}},
+    ]}}
+    remote = {"head": {"vars": ["s"]}, "results": {"bindings": [
+        {"s": {"type": "uri", "value": "http://a"}}, {"s": {"type": "bnode", "value": "xyz"}},
+    ]}}
+    assert compare_results(local, remote)["consistent"]
+    remote["results"]["bindings"].pop()
+    report = compare_results(local, remote)
+    assert not report["consistent"] and report["only_local"] == [{"s": ("bnode",)}]
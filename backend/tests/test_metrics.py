@@ -0,0 +1,49 @@
+# test_metrics.py
+import pytest
+
+from observability import CONTENT_TYPE
+
+SERIES = [
+    "mobilite_http_request_duration_seconds histogram",
+    "mobilite_fuseki_request_duration_seconds histogram",
+    "mobilite_fuseki_errors_total counter",
+    "mobilite_ollama_generate_duration_seconds histogram",
+    "mobilite_ollama_tokens_per_second histogram",
+    "mobilite_ollama_prompt_tokens_total counter",
+    "mobilite_ollama_eval_tokens_total counter",
+    "mobilite_cache_hit_ratio gauge",
+    "mobilite_local_graph_triples gauge",
+    "mobilite_outbox_pending gauge",
+]
+
+
+def sample(text: str, series: str) -> float:
+    return next((float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(series + " ")), 0.0)
+
+
+def test_metrics_expose_new_series(client):
+    client.get("/metrics")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    for series in SERIES:
+        assert f"# TYPE {series}\n" in response.text
+    # Le scrape précédent est compté sous le gabarit de sa route
+    assert 'mobilite_http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in response.text
+    assert 'mobilite_cache_hit_ratio{cache="results"}' in response.text
+
+
+def test_local_graph_triples_are_read_at_scrape(client, app_module):
+    assert sample(client.get("/metrics").text, "mobilite_local_graph_triples") == len(app_module.g)
+
+
+def test_fuseki_errors_are_counted(client, app_module):
+    series = 'mobilite_fuseki_errors_total{operation="select"}'
+    before = client.get("/metrics").text
+    # Fuseki n'est pas démarré : connexion refusée
+    with pytest.raises(Exception):
+        app_module.fuseki.select_sync("ASK { ?s ?p ?o }")
+    after = client.get("/metrics").text
+    # (la synchronisation démarrée avec l'application interroge aussi Fuseki)
+    assert sample(after, series) >= sample(before, series) + 1
+    assert 'mobilite_fuseki_request_duration_seconds_count{operation="select"}' in after
@@ -0,0 +1,144 @@
+# test_ollama_client.py
+import asyncio
+import json
+from contextlib import aclosing
+
+import httpx
+import pytest
+
+import ollama_client
+from ollama_client import OllamaClient, OllamaError, OllamaUnavailable
+
+
+class FragmentStream(httpx.AsyncByteStream):
+    """Corps NDJSON produit fragment par fragment ; consigne la fermeture anticipée"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield (json.dumps(chunk) + "\n").encode()
+            await asyncio.sleep(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+class MockedOllama(OllamaClient):
+    """Vrai client, transport HTTP simulé par `handler`"""
+
+    def __init__(self, handler, model: str = "test:7b"):
+        super().__init__("http://ollama", model)
+        self.transport = httpx.MockTransport(handler)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(base_url=self.base_url, transport=self.transport)
+            self._loop = loop
+        return self._client
+
+
+def fragments(text: str, summary: dict = None):
+    chunks = [{"response": word, "done": False} for word in text.split("|")]
+    return chunks + [{"response": "", "done": True, **(summary or {})}]
+
+
+def counter(metric, model: str) -> float:
+    return metric._values.get((model,), 0)
+
+
+def test_generate_posts_prompt_and_returns_summary():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "response": "SELECT ?s WHERE { ?s ?p ?o }", "done": True,
+            "prompt_eval_count": 120, "eval_count": 12, "eval_duration": 2e9,
+        })
+
+    client = MockedOllama(handler, model="test:generate")
+    result = asyncio.run(client.generate("Question ?", options={"temperature": 0.1}, keep_alive="30m"))
+
+    assert result["response"] == "SELECT ?s WHERE { ?s ?p ?o }"
+    assert requests == [{
+        "model": "test:generate", "prompt": "Question ?", "stream": False,
+        "options": {"temperature": 0.1}, "keep_alive": "30m",
+    }]
+    assert counter(ollama_client.OLLAMA_PROMPT_TOKENS, "test:generate") == 120
+    assert counter(ollama_client.OLLAMA_EVAL_TOKENS, "test:generate") == 12
+
+
+def test_stream_yields_fragments_then_summary():
+    stream = FragmentStream(fragments("SELECT| ?s|", {"eval_count": 3}))
+    client = MockedOllama(lambda request: httpx.Response(200, stream=stream), model="test:complete")
+
+    async def main():
+        return [chunk async for chunk in client.generate_stream("Question ?")]
+
+    chunks = asyncio.run(main())
+    assert "".join(chunk["response"] for chunk in chunks) == "SELECT ?s"
+    assert chunks[-1]["done"]
+    assert counter(ollama_client.OLLAMA_CANCELLED, "test:complete") == 0
+    assert counter(ollama_client.OLLAMA_EVAL_TOKENS, "test:complete") == 3
+
+
+def test_closing_the_stream_cuts_generation_off():
+    stream = FragmentStream(fragments("SELECT| ?s|" + "|".join(["explication"] * 100)))
+    client = MockedOllama(lambda request: httpx.Response(200, stream=stream), model="test:cut")
+
+    async def main():
+        received = []
+        async with aclosing(client.generate_stream("Question ?")) as chunks:
+            async for chunk in chunks:
+                received.append(chunk["response"])
+                if len(received) == 2:
+                    break
+        return received
+
+    assert asyncio.run(main()) == ["SELECT", " ?s"]
+    # Connexion fermée : le reste de la réponse n'est jamais lu
+    assert stream.closed
+    assert stream.sent < 10
+    assert counter(ollama_client.OLLAMA_CANCELLED, "test:cut") == 1
+    assert counter(ollama_client.OLLAMA_EVAL_TOKENS, "test:cut") == 2
+
+
+def refuse(request):
+    raise httpx.ConnectError("Connection refused", request=request)
+
+
+@pytest.mark.parametrize("handler, error, message", [
+    (refuse, OllamaUnavailable, "Connection refused"),
+    (lambda request: httpx.Response(500, text="model not found"), OllamaError, "HTTP 500 : model not found"),
+])
+def test_errors_are_raised_as_ollama_errors(handler, error, message):
+    client = MockedOllama(handler, model="test:errors")
+    errors = counter(ollama_client.OLLAMA_ERRORS, "test:errors")
+    with pytest.raises(error, match=message):
+        asyncio.run(client.generate("Question ?"))
+
+    async def consume():
+        return [chunk async for chunk in client.generate_stream("Question ?")]
+
+    with pytest.raises(error, match=message):
+        asyncio.run(consume())
+    assert counter(ollama_client.OLLAMA_ERRORS, "test:errors") == errors + 2
+
+
+def test_error_inside_stream_is_raised():
+    stream = FragmentStream([{"response": "SELECT", "done": False}, {"error": "out of memory"}])
+    client = MockedOllama(lambda request: httpx.Response(200, stream=stream), model="test:stream-error")
+
+    async def consume():
+        return [chunk async for chunk in client.generate_stream("Question ?")]
+
+    with pytest.raises(OllamaError, match="out of memory"):
+        asyncio.run(consume())
+    assert counter(ollama_client.OLLAMA_ERRORS, "test:stream-error") == 1
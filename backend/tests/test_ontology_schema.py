@@ -0,0 +1,109 @@
+# test_ontology_schema.py
+import os
+
+import pytest
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import OWL, RDF, RDFS, SKOS, XSD
+
+from benchmarks.prompt_schema import QUESTIONS
+from ontology_schema import OntologySchema, collect_schema, split_local_name, words
+
+MOBILITE = Namespace("http://www.semanticweb.org/smartcity/ontologies/mobilite#")
+EX = Namespace("http://example.org/onto#")
+ONTOLOGY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mobilite_principal.rdf")
+
+
+@pytest.fixture(scope="module")
+def mobilite():
+    graph = Graph()
+    graph.parse(ONTOLOGY)
+    return OntologySchema(MOBILITE, lambda: collect_schema(graph))
+
+
+def small_ontology(properties: int = 30):
+    graph = Graph()
+    for cls in (EX.Personne, EX.Conducteur, EX.Vehicule, EX.Avis):
+        graph.add((cls, RDF.type, OWL.Class))
+    graph.add((EX.Conducteur, RDFS.subClassOf, EX.Personne))
+    graph.add((EX.Vehicule, RDFS.label, Literal("véhicule", lang="fr")))
+    graph.add((EX.Vehicule, SKOS.altLabel, Literal("engin", lang="fr")))
+    graph.add((EX.conduit, RDF.type, OWL.ObjectProperty))
+    graph.add((EX.conduit, RDFS.domain, EX.Conducteur))
+    graph.add((EX.conduit, RDFS.range, EX.Vehicule))
+    for i in range(properties):
+        graph.add((EX[f"caracteristique{i}"], RDF.type, OWL.DatatypeProperty))
+        graph.add((EX[f"caracteristique{i}"], RDFS.domain, EX.Vehicule))
+        graph.add((EX[f"caracteristique{i}"], RDFS.range, XSD.string))
+    return graph
+
+
+def names(schema, question):
+    return {term.name for term in schema.select(question)}
+
+
+@pytest.mark.parametrize("question, expected", QUESTIONS)
+def test_context_keeps_terms_needed_by_the_question(mobilite, question, expected):
+    assert set(expected) <= names(mobilite, question)
+
+
+def test_unrelated_terms_are_left_out(mobilite):
+    selected = names(mobilite, "Quelles stations de recharge sont disponibles ?")
+    assert {"StationRecharge", "RechargeElectrique", "disponible"} <= selected
+    assert not selected & {"Conducteur", "Personne", "Avis", "Trajet", "categoriePermis"}
+    # Synonyme : « chauffeurs » désigne la classe Conducteur
+    assert "Conducteur" in names(mobilite, "Combien de chauffeurs ?")
+
+
+def test_context_is_smaller_than_full_schema(mobilite):
+    full = mobilite.full_context()
+    for question, _ in QUESTIONS:
+        assert len(mobilite.context(question)) < len(full) / 2
+
+
+def test_unknown_question_falls_back_to_full_schema(mobilite):
+    assert mobilite.select("Bonjour, comment ça va ?") is None
+    assert mobilite.context("Bonjour, comment ça va ?") == mobilite.full_context()
+
+
+def test_neighbour_properties_are_capped():
+    schema = OntologySchema(EX, lambda: collect_schema(small_ontology()), max_neighbour_properties=5)
+    selected = names(schema, "Liste les véhicules")
+    assert "Vehicule" in selected
+    assert len([name for name in selected if name.startswith("caracteristique")]) == 5
+
+
+def test_matched_terms_are_capped():
+    schema = OntologySchema(EX, lambda: collect_schema(small_ontology(properties=3)), max_terms=1, max_neighbour_properties=0)
+    assert len(schema.match("Les conducteurs et leurs avis sur les engins")) == 3
+    # Trois classes citées à égalité : seule la première (ordre alphabétique) est retenue
+    assert names(schema, "Les conducteurs et leurs avis sur les engins") == {"Avis"}
+    assert names(schema, "Les conducteurs") == {"Conducteur", "Personne"}
+
+
+def test_context_describes_hierarchy_and_properties():
+    schema = OntologySchema(EX, lambda: collect_schema(small_ontology(properties=1)))
+    context = schema.context("Quels conducteurs conduisent un engin ?")
+    assert "Conducteur (sous-classe de Personne)" in context
+    assert "conduit (Conducteur → Vehicule)" in context
+    assert "Personne (sous-classes : Conducteur)" in schema.context("Liste les personnes")
+
+
+def test_schema_is_reloaded_until_available():
+    graph = Graph()
+    schema = OntologySchema(EX, lambda: collect_schema(graph))
+    assert schema.full_context() == ""
+    for triple in small_ontology(properties=1):
+        graph.add(triple)
+    assert "Vehicule" in schema.full_context()
+    version = schema.version
+
+    schema.on_change("+", (EX.Velo, RDFS.subClassOf, EX.Vehicule))
+    graph.add((EX.Velo, RDF.type, OWL.Class))
+    graph.add((EX.Velo, RDFS.subClassOf, EX.Vehicule))
+    assert "Velo (sous-classe de Vehicule)" in schema.full_context()
+    assert schema.version == version + 1
+
+
+def test_labels_are_split_and_stemmed():
+    assert split_local_name("dateNaissance") == "date Naissance"
+    assert words("Trajets optimaux") == words("trajet optimal")
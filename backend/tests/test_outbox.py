@@ -0,0 +1,76 @@
+# test_outbox.py
+from outbox import FusekiOutbox, coalesce
+
+
+class SendError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_consecutive_insert_data_are_merged():
+    merged = coalesce([
+        "PREFIX m: <http://example.org/m#>\nINSERT DATA { m:a m:nom \"A\" . }",
+        "PREFIX m: <http://example.org/m#>\nINSERT DATA { m:b m:nom \"B\" . }",
+    ])
+    assert merged == 'PREFIX m: <http://example.org/m#>\nINSERT DATA {\nm:a m:nom "A" .\nm:b m:nom "B" .\n}'
+
+
+def test_other_operations_keep_their_order():
+    merged = coalesce([
+        "INSERT DATA { <http://a> <http://p> 1 . }",
+        "DELETE WHERE { <http://a> ?p ?o . }",
+        "INSERT DATA { <http://b> <http://p> 2 . }",
+    ])
+    operations = merged.split(" ;\n")
+    assert len(operations) == 3
+    assert operations[1] == "DELETE WHERE { <http://a> ?p ?o . }"
+    assert "<http://b>" in operations[2] and "<http://a>" not in operations[2]
+
+
+def test_conflicting_prefixes_are_not_merged():
+    merged = coalesce([
+        "PREFIX m: <http://example.org/un#>\nINSERT DATA { m:a m:p 1 . }",
+        "PREFIX m: <http://example.org/deux#>\nINSERT DATA { m:b m:p 2 . }",
+    ])
+    first, second = merged.split(" ;\n")
+    assert "un#" in first and "deux#" not in first
+    assert "deux#" in second
+
+
+def test_unavailable_fuseki_after_rejection_backs_off(tmp_path):
+    # Le lot est refusé (4xx), puis Fuseki tombe pendant l'envoi un par un
+    responses = [SendError(400), None, SendError(503)]
+
+    def send(payload):
+        error = responses.pop(0)
+        if error is not None:
+            raise error
+
+    outbox = FusekiOutbox(str(tmp_path / "outbox.jsonl"), send)
+    outbox.enqueue("INSERT DATA { <http://a> <http://p> 1 . }")
+    outbox.enqueue("INSERT DATA { <http://b> <http://p> 2 . }")
+    batch = list(outbox._pending)
+
+    assert outbox._flush(batch) is False
+    stats = outbox.stats()
+    assert (stats["acked_seq"], stats["pending"], stats["failures"]) == (1, 1, 1)
+    outbox.close()
+
+
+def test_pending_operations_survive_restart(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = FusekiOutbox(path, send=lambda payload: None)
+    outbox.enqueue("INSERT DATA { <http://a> <http://p> 1 . }")
+    outbox.close()
+
+    sent = []
+    outbox = FusekiOutbox(path, send=sent.append)
+    assert outbox.stats()["pending"] == 1
+    assert outbox._flush(list(outbox._pending)) is True
+    assert "<http://a>" in sent[0]
+    outbox.close()
+
+    outbox = FusekiOutbox(path, send=sent.append)
+    assert outbox.stats()["pending"] == 0
+    outbox.close()
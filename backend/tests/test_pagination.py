@@ -0,0 +1,31 @@
+# test_pagination.py
+import pytest
+
+from pagination import CursorError, ListQuery, decode_cursor, encode_cursor, page_subjects
+
+
+@pytest.mark.parametrize("iri", ["http://example.org/mobilite#P1", "http://example.org/é?x=1&y=\"2\""])
+def test_cursor_round_trip(iri):
+    cursor = encode_cursor(iri)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == iri
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "gA"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor)
+
+
+def test_page_query_starts_after_cursor():
+    query = ListQuery("", "?p ?nom", "p", "?p a ?type .").page_query(encode_cursor('http://x/"a"'), limit=2)
+    assert 'FILTER(STR(?p) > "http://x/\\"a\\"")' in query
+    assert "LIMIT 3" in query
+
+
+def test_page_subjects_returns_next_cursor_only_if_more():
+    results = {"results": {"bindings": [{"p": {"value": f"http://x/{i}"}} for i in range(3)]}}
+    subjects, cursor = page_subjects(results, "p", 2)
+    assert subjects == ["http://x/0", "http://x/1"]
+    assert decode_cursor(cursor) == "http://x/1"
+    assert page_subjects(results, "p", 3) == (["http://x/0", "http://x/1", "http://x/2"], None)
@@ -0,0 +1,91 @@
+# test_reasoner.py
+import queue
+
+import pytest
+from rdflib import Graph, Namespace
+from rdflib.namespace import RDF, RDFS
+
+from reasoner import IncrementalReasoner, _ReasoningState
+
+EX = Namespace("http://example.org/")
+SCHEMA = [
+    (EX.Conducteur, RDFS.subClassOf, EX.Personne),
+    (EX.conduit, RDFS.domain, EX.Conducteur),
+]
+
+
+def types(triples) -> set:
+    # owlrl dérive aussi owl:sameAs réflexifs : seuls les types sont comparés
+    return {t for t in triples if t[1] == RDF.type}
+
+
+def test_delta_add_infers_only_new_triples():
+    state = _ReasoningState()
+    state.full(SCHEMA + [(EX.a, RDF.type, EX.Conducteur)])
+    assert (EX.a, RDF.type, EX.Personne) in state.inferred
+
+    added, retracted, examined = state.add([(EX.b, EX.conduit, EX.v1)])
+    assert types(added) == {(EX.b, RDF.type, EX.Conducteur), (EX.b, RDF.type, EX.Personne)}
+    assert retracted == set()
+    assert examined is not None
+
+
+def test_delta_remove_rederives():
+    state = _ReasoningState()
+    state.full(SCHEMA + [(EX.b, EX.conduit, EX.v1), (EX.b, RDF.type, EX.Conducteur)])
+
+    # Le type Personne reste dérivable du type Conducteur affirmé
+    added, removed, _ = state.remove([(EX.b, EX.conduit, EX.v1)])
+    assert (EX.b, RDF.type, EX.Personne) in state.inferred
+    assert types(removed) == set() and types(added) == set()
+
+    added, removed, _ = state.remove([(EX.b, RDF.type, EX.Conducteur)])
+    assert types(removed) == {(EX.b, RDF.type, EX.Personne)}
+
+
+def test_schema_change_falls_back_to_full_closure():
+    state = _ReasoningState()
+    state.full(SCHEMA + [(EX.a, RDF.type, EX.Conducteur)])
+    added, _, examined = state.add([(EX.Personne, RDFS.subClassOf, EX.Agent)])
+    assert examined is None
+    assert (EX.a, RDF.type, EX.Agent) in added
+
+
+@pytest.fixture
+def reasoner():
+    graph = Graph()
+    for triple in SCHEMA + [(EX.a, RDF.type, EX.Conducteur)]:
+        graph.add(triple)
+    published = queue.Queue()
+    reasoner = IncrementalReasoner(
+        lambda: list(graph), lambda added, removed, full: published.put((set(added), set(removed), full)), interval=0.01
+    )
+    reasoner.graph = graph
+    reasoner.published = published
+    reasoner.start()
+    yield reasoner
+    reasoner.close()
+
+
+def test_delta_is_sent_to_the_process(reasoner):
+    added, _, full = reasoner.published.get(timeout=60)
+    assert full and (EX.a, RDF.type, EX.Personne) in added
+
+    reasoner.graph.add((EX.b, RDF.type, EX.Conducteur))
+    reasoner.notify("+", (EX.b, RDF.type, EX.Conducteur))
+    added, removed, full = reasoner.published.get(timeout=60)
+    assert not full
+    assert types(added) == {(EX.b, RDF.type, EX.Personne)}
+
+
+def test_respawned_process_gets_full_closure_first(reasoner):
+    reasoner.published.get(timeout=60)
+    reasoner._process.kill()
+    reasoner._process.wait()
+
+    reasoner.graph.add((EX.b, RDF.type, EX.Conducteur))
+    reasoner.notify("+", (EX.b, RDF.type, EX.Conducteur))
+    added, _, full = reasoner.published.get(timeout=60)
+    # Le nouveau processus n'a pas l'état de l'ancien : inférences remplacées en entier
+    assert full
+    assert {(EX.a, RDF.type, EX.Personne), (EX.b, RDF.type, EX.Personne)} <= added
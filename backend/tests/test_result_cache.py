@@ -0,0 +1,41 @@
+# test_result_cache.py
+from result_cache import ResultCache
+
+RESULTS = {"head": {"vars": ["s"]}, "results": {"bindings": [{"s": {"type": "uri", "value": "http://x/a"}}]}}
+
+
+def test_hit_for_current_generation():
+    cache = ResultCache()
+    generation, results = cache.get("Q")
+    assert results is None
+    cache.put("Q", generation, RESULTS)
+    assert cache.get("Q") == (generation, RESULTS)
+
+
+def test_bump_invalidates_entries():
+    cache = ResultCache()
+    generation, _ = cache.get("Q")
+    cache.put("Q", generation, RESULTS)
+    cache.get("Q")
+    assert cache.bump(refresh_ahead=1) == ["Q"]
+    assert cache.get("Q") == (generation + 1, None)
+
+
+def test_result_computed_before_a_write_is_not_stored():
+    cache = ResultCache()
+    generation, _ = cache.get("Q")
+    cache.bump()
+    cache.put("Q", generation, RESULTS)
+    assert cache.get("Q")[1] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_row_budget_evicts_least_recently_used():
+    cache = ResultCache(max_rows=4)
+    generation, _ = cache.get("A")
+    cache.put("A", generation, RESULTS)
+    cache.put("B", generation, RESULTS)
+    cache.get("A")
+    cache.put("C", generation, RESULTS)
+    assert cache.get("B")[1] is None
+    assert cache.get("A")[1] is RESULTS and cache.get("C")[1] is RESULTS
@@ -0,0 +1,55 @@
+# test_search_index.py
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF
+
+from search_index import SearchIndex
+
+M = Namespace("http://www.semanticweb.org/smartcity/ontologies/mobilite#")
+
+
+def build():
+    index = SearchIndex(M)
+    index.build([
+        (M.P1, RDF.type, M.Conducteur),
+        (M.P1, M.nom, Literal("Lefèvre")),
+        (M.P1, M.prenom, Literal("Hélène")),
+        (M.A1, RDF.type, M.Avis),
+        (M.A1, M.commentaire, Literal("Trajet très agréable")),
+    ])
+    return index
+
+
+def test_substring_search_ignores_case_and_accents():
+    results = build().search("lefevre")
+    assert [r["subject"] for r in results] == [str(M.P1)]
+    assert results[0]["match"] == "exact"
+    assert results[0]["types"] == [str(M.Conducteur)]
+
+
+def test_fuzzy_search():
+    results = build().search("agreabel", labels=("commentaire",))
+    assert [r["subject"] for r in results] == [str(M.A1)]
+    assert results[0]["match"] == "approx"
+
+
+def test_changes_update_index():
+    index = build()
+    index.on_change("+", (M.P2, M.nom, Literal("Martin")))
+    # Libellé « personne » : prénom et nom
+    assert index.search("martin", fuzzy=False) == []
+    index.on_change("+", (M.P2, M.prenom, Literal("Paul")))
+    assert [r["label"] for r in index.search("martin")] == ["Paul Martin"]
+    index.on_change("-", (M.P2, M.nom, Literal("Martin")))
+    assert index.search("martin", fuzzy=False) == []
+
+
+def test_save_and_load_with_stamp(tmp_path):
+    path = str(tmp_path / "index.pickle")
+    index = build()
+    index.path = path
+    index.save([("g.sqlite", 3)])
+
+    loaded = SearchIndex(M, path)
+    assert not loaded.load([("g.sqlite", 4)])
+    assert loaded.load([("g.sqlite", 3)])
+    assert [r["subject"] for r in loaded.search("hélène")] == [str(M.P1)]
@@ -0,0 +1,61 @@
+# test_single_flight.py
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"rows": calls}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("Q", work) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats()["coalesced"] == 9
+    assert flight.inflight() == 0
+
+
+def test_error_is_shared_and_not_kept():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Fuseki")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("Q", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        # Nouvel appel après l'échec : nouvelle exécution
+        with pytest.raises(RuntimeError):
+            await flight.do("Q", fail)
+
+    asyncio.run(main())
+    assert flight.executed == 2
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("Q", work))
+        second = asyncio.ensure_future(flight.do("Q", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "ok"
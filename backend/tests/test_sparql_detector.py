@@ -0,0 +1,69 @@
+# test_sparql_detector.py
+import pytest
+
+from sparql_detector import SparqlQueryDetector, extract_query
+
+PROSE = (
+    "Voici une requête SELECT qui liste l'ensemble des personnes :\n"
+    "```sparql\n"
+    "PREFIX mobilite: <http://example.org/mobilite#>\n"
+    "SELECT ?p WHERE { ?p a mobilite:Personne }\n"
+    "```\n"
+    "Cette requête renvoie l'ensemble des personnes."
+)
+PROSE_QUERY = "PREFIX mobilite: <http://example.org/mobilite#>\nSELECT ?p WHERE { ?p a mobilite:Personne }"
+
+
+def stream(text, size=3):
+    """Requête détectée en recevant le texte par fragments de `size` caractères"""
+    detector = SparqlQueryDetector()
+    for i in range(0, len(text), size):
+        query = detector.feed(text[i:i + size])
+        if query is not None:
+            return query
+    return detector.finish()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (PROSE, PROSE_QUERY),
+        (
+            "voici :\n```\nprefix m: <http://example.org/#>\nselect ?p where { ?p a m:P } limit 5\n```",
+            "prefix m: <http://example.org/#>\nselect ?p where { ?p a m:P } limit 5",
+        ),
+        (
+            "La clause (SELECT ?x) de l'ensemble des données :\n```sparql\nSELECT * WHERE { ?s ?p ?o }\n```",
+            "SELECT * WHERE { ?s ?p ?o }",
+        ),
+        (
+            "SELECT ?x (COUNT(?y) AS ?n) WHERE { ?x ?p ?y } GROUP BY ?x ORDER BY DESC(?n) LIMIT 10\nExplication",
+            "SELECT ?x (COUNT(?y) AS ?n) WHERE { ?x ?p ?y } GROUP BY ?x ORDER BY DESC(?n) LIMIT 10",
+        ),
+        ("SELECT ?x WHERE { ?x ?p 'l''a' } ORDER BY ?x\nFin", "SELECT ?x WHERE { ?x ?p 'l''a' } ORDER BY ?x"),
+        ("CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o } LIMIT 3 voilà", "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o } LIMIT 3"),
+        ("ASK { ?s ?p \"}\" } # commentaire }\n", 'ASK { ?s ?p "}" }'),
+    ],
+)
+def test_detects_query_in_full_text_and_stream(text, expected):
+    assert extract_query(text) == expected
+    assert stream(text) == expected
+    assert stream(text, size=1) == expected
+
+
+def test_no_query_in_prose():
+    text = "Pas de requête ici : SELECT est un mot-clé, et l'ensemble est vide."
+    assert extract_query(text) is None
+    assert stream(text) is None
+
+
+def test_truncated_query_is_not_complete():
+    assert extract_query("SELECT ?x WHERE { ?x ?p ?o ") is None
+
+
+def test_detection_stops_at_end_of_query():
+    detector = SparqlQueryDetector()
+    assert detector.feed("SELECT ?x WHERE { ?x ?p ?o }") is None
+    # LIMIT possible : la requête n'est complète qu'au token suivant
+    assert detector.feed(" LIM") is None
+    assert detector.feed("IT 5\n```\n") == "SELECT ?x WHERE { ?x ?p ?o } LIMIT 5"
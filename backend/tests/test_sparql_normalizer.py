@@ -0,0 +1,69 @@
+# test_sparql_normalizer.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sparql_normalizer import InvalidSparql, SparqlNormalizer
+
+NS = "http://www.semanticweb.org/smartcity/ontologies/mobilite#"
+
+
+@pytest.fixture
+def normalizer():
+    return SparqlNormalizer(NS)
+
+
+def test_extracts_query_from_explanation(normalizer):
+    text = "Voici la requête :\n```sparql\nPREFIX mobilite: <%s>\nSELECT ?p WHERE { ?p a mobilite:Personne }\n```\nElle liste l'ensemble des personnes." % NS
+    query, form = normalizer.normalize(text)
+    assert form == "SelectQuery"
+    assert query == f"PREFIX mobilite: <{NS}>\nSELECT ?p WHERE {{ ?p a mobilite:Personne }}"
+
+
+def test_repairs_missing_and_wrong_prefixes(normalizer):
+    query, _ = normalizer.normalize(
+        "PREFIX mobilite: <http://example.org/autre#>\nSELECT ?p WHERE { ?p a mobilite:Personne ; rdfs:label ?l }"
+    )
+    assert f"PREFIX mobilite: <{NS}>" in query
+    assert "PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>" in query
+    assert "example.org" not in query
+    assert normalizer.stats()["repaired"] == 1
+
+
+def test_escaped_newlines(normalizer):
+    query, form = normalizer.normalize("SELECT ?s\\nWHERE { ?s ?p ?o }")
+    assert form == "SelectQuery"
+    assert query == "SELECT ?s\nWHERE { ?s ?p ?o }"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Je ne sais pas répondre à cette question.",
+        "SELECT ?s WHERE { ?s ?p }",
+        "SELECT ?s WHERE { ?s inconnu:p ?o }",
+        "INSERT DATA { <http://a> <http://b> <http://c> }",
+    ],
+)
+def test_rejects_invalid_output(normalizer, text):
+    with pytest.raises(InvalidSparql):
+        normalizer.normalize(text)
+
+
+def test_results_are_cached(normalizer):
+    text = "SELECT ?s WHERE { ?s ?p ?o }"
+    first = normalizer.normalize(text)
+    assert normalizer.normalize(text) == first
+    with pytest.raises(InvalidSparql):
+        normalizer.normalize("SELECT")
+    with pytest.raises(InvalidSparql):
+        normalizer.normalize("SELECT")
+    stats = normalizer.stats()
+    assert (stats["hits"], stats["misses"], stats["rejected"]) == (2, 2, 1)
+
+
+def test_concurrent_normalization(normalizer):
+    texts = [f"SELECT ?s WHERE {{ ?s ?p {i} }} LIMIT {i + 1}" for i in range(100)]
+    with ThreadPoolExecutor(8) as pool:
+        forms = [form for _, form in pool.map(normalizer.normalize, texts)]
+    assert forms == ["SelectQuery"] * len(texts)
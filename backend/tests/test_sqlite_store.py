@@ -0,0 +1,95 @@
+# test_sqlite_store.py
+import pytest
+from rdflib import Literal, Namespace
+
+from journal import JournaledGraph
+from sqlite_store import SQLiteStore, StoreTransactions
+
+EX = Namespace("http://example.org/")
+
+
+def open_graph(path):
+    store = SQLiteStore()
+    store.open(str(path), create=True)
+    graph = JournaledGraph(store=store)
+    journal = StoreTransactions(store)
+    graph.attach_journal(journal)
+    return graph, journal
+
+
+def test_commit_is_durable(tmp_path):
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    graph.add((EX.a, EX.nom, Literal("A")))
+    graph.commit()
+    journal.close()
+
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    assert (EX.a, EX.nom, Literal("A")) in graph
+    journal.close()
+
+
+def test_failed_transaction_keeps_other_pending_writes(tmp_path):
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    # Écriture en attente d'une autre requête (synchronisation...)
+    graph.add((EX.a, EX.nom, Literal("A")))
+    with pytest.raises(RuntimeError):
+        with journal.transaction():
+            graph.add((EX.b, EX.nom, Literal("B")))
+            raise RuntimeError("échec de l'endpoint")
+    assert (EX.b, EX.nom, Literal("B")) not in graph
+    assert (EX.a, EX.nom, Literal("A")) in graph
+
+    with journal.transaction():
+        graph.add((EX.c, EX.nom, Literal("C")))
+        graph.commit()
+    journal.close()
+
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    assert set(graph.objects(None, EX.nom)) == {Literal("A"), Literal("C")}
+    journal.close()
+
+
+def test_exception_after_commit_rolls_back(tmp_path):
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    with pytest.raises(RuntimeError):
+        with journal.transaction():
+            graph.add((EX.a, EX.nom, Literal("A")))
+            graph.commit()
+            raise RuntimeError("outbox indisponible")
+    assert (EX.a, EX.nom, Literal("A")) not in graph
+    journal.close()
+
+
+def test_commit_in_transaction_is_deferred(tmp_path):
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    with journal.transaction():
+        graph.add((EX.a, EX.nom, Literal("A")))
+        graph.commit()
+        # Endpoint appelé par un autre endpoint : même transaction
+        with journal.transaction():
+            graph.add((EX.b, EX.nom, Literal("B")))
+            graph.commit()
+        assert journal.store._db.in_transaction
+    assert not journal.store._db.in_transaction
+    journal.close()
+
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    assert set(graph.objects(None, EX.nom)) == {Literal("A"), Literal("B")}
+    journal.close()
+
+
+def test_generation_changes_with_each_commit(tmp_path):
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    start = journal.store.generation()
+    graph.commit()
+    assert journal.store.generation() == start
+    graph.add((EX.a, EX.nom, Literal("A")))
+    graph.commit()
+    with journal.transaction():
+        graph.add((EX.b, EX.nom, Literal("B")))
+    assert journal.store.generation() == start + 2
+    journal.close()
+
+    graph, journal = open_graph(tmp_path / "g.sqlite")
+    assert journal.store.generation() == start + 2
+    journal.close()
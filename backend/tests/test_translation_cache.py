@@ -0,0 +1,63 @@
+# test_translation_cache.py
+from translation_cache import TranslationCache, normalize_question
+
+
+def open_cache(tmp_path, fingerprint="v1"):
+    return TranslationCache(str(tmp_path / "cache.sqlite"), fingerprint, similarity_threshold=0.8)
+
+
+def test_exact_and_similar_hits_return_served_key(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("Liste toutes les voitures électriques", "SELECT ?v WHERE { ?v a ?t }")
+
+    query, tier, key = cache.get("liste toutes les voitures électriques ?")
+    assert tier == "exact"
+    assert key == normalize_question("Liste toutes les voitures électriques")
+
+    query, tier, key = cache.get("Liste toutes les voitures electriques svp")
+    assert tier == "similaire"
+    assert key == normalize_question("Liste toutes les voitures électriques")
+    cache.close()
+
+
+def test_discard_key_removes_matched_entry(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("Liste toutes les voitures électriques", "SELECT ?v WHERE { ?v a ?t }")
+    _, tier, key = cache.get("Liste toutes les voitures electriques svp")
+    assert tier == "similaire"
+    cache.discard_key(key)
+    assert cache.get("Liste toutes les voitures électriques") is None
+    cache.close()
+
+
+def test_discriminants_must_match(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("Conducteurs avec un permis de catégorie B", "SELECT ...")
+    assert cache.get("Conducteurs avec un permis de catégorie C") is None
+    cache.close()
+
+
+def test_fingerprint_change_clears_entries(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("Combien de stations ?", "SELECT ...")
+    cache.close()
+    cache = open_cache(tmp_path, fingerprint="v2")
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_schema_change_clears_entries(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.set_schema("schema-1")
+    cache.put("Combien de stations ?", "SELECT ...")
+    cache.set_schema("schema-1")
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+    # Redémarrage : même schéma, entrées conservées ; schéma modifié, entrées écartées
+    cache = open_cache(tmp_path)
+    cache.set_schema("schema-1")
+    assert cache.get("Combien de stations ?") is not None
+    cache.set_schema("schema-2")
+    assert cache.get("Combien de stations ?") is None
+    cache.close()
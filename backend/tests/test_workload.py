@@ -0,0 +1,141 @@
+# test_workload.py
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from benchmarks import replay as replay_module
+from workload import WorkloadRecorder, log_files, measure, query_shape, read_workload
+
+SELECT = "SELECT ?s WHERE { ?s a <http://example.org/Personne> } LIMIT 10"
+
+
+def test_recording_round_trips(tmp_path):
+    path = str(tmp_path / "workload.jsonl")
+    recorder = WorkloadRecorder(path)
+    recorder.record("select", SELECT, 0.0125, size=3)
+    recorder.record("update", "INSERT DATA { <http://a> <http://p> 1 }", 0.002)
+    recorder.record("select", SELECT, 0.010, size=3)
+    with pytest.raises(RuntimeError):
+        with measure(recorder, "ask", "Combien de conducteurs ?") as probe:
+            probe["src"] = "rules"
+            raise RuntimeError("Ollama indisponible")
+    recorder.close()
+
+    entries = list(read_workload(log_files(path)))
+    assert [(e["k"], e["q"]) for e in entries] == [
+        ("select", SELECT),
+        ("update", "INSERT DATA { <http://a> <http://p> 1 }"),
+        ("select", SELECT),
+        ("ask", "Combien de conducteurs ?"),
+    ]
+    assert (entries[0]["d"], entries[0]["n"]) == (12.5, 3)
+    assert "n" not in entries[1] and "e" not in entries[1]
+    assert (entries[3]["e"], entries[3]["src"]) == (1, "rules")
+    # Un texte répété n'est écrit qu'une fois par fichier
+    with open(path, encoding="utf-8") as f:
+        assert sum(1 for line in f if '"q"' in line) == 3
+
+
+def test_rotated_files_are_read_in_order(tmp_path):
+    path = str(tmp_path / "workload.jsonl")
+    recorder = WorkloadRecorder(path, max_bytes=1, backups=5)
+    for i in range(4):
+        recorder.record("select", f"SELECT * WHERE {{ ?s ?p {i} }}", 0.001, size=i)
+    recorder.close()
+
+    assert recorder.rotations == 3
+    assert log_files(path) == [f"{path}.3", f"{path}.2", f"{path}.1", path]
+    # Chaque fichier redéfinit ses textes : il se relit seul
+    assert [e["n"] for e in read_workload(log_files(path))] == [0, 1, 2, 3]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"t": 1, "k": "sel')
+    assert len(list(read_workload(log_files(path)))) == 4
+
+
+def test_query_shape_ignores_constants():
+    assert query_shape('SELECT ?s WHERE { ?s <http://p> "A" } LIMIT 10') == query_shape(
+        "SELECT  ?s WHERE { ?s <http://q> 'B' }\nLIMIT 20"
+    )
+
+
+def replay_args(**overrides):
+    args = argparse.Namespace(
+        query_url="http://fuseki/query", update_url="http://fuseki/update", api="http://api",
+        speed=0, concurrency=1, timeout=5.0,
+    )
+    vars(args).update(overrides)
+    return args
+
+
+@pytest.fixture
+def fake_endpoint(monkeypatch):
+    """Endpoint SPARQL et API simulés : chaque requête reçue est consignée"""
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append((time.monotonic(), request.url.path, request.content))
+        if request.url.path == "/ask/":
+            return httpx.Response(200, json={"count": 2})
+        if request.url.path == "/update":
+            return httpx.Response(204)
+        if request.headers["accept"] == replay_module.SPARQL_TSV:
+            return httpx.Response(200, text="?s\n<http://a>\n")
+        return httpx.Response(200, json={"head": {"vars": ["s"]}, "results": {"bindings": [{}, {}, {}]}})
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(
+        replay_module.httpx, "AsyncClient",
+        lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    return received
+
+
+def test_replay_reproduces_requests_in_order(tmp_path, fake_endpoint):
+    path = str(tmp_path / "workload.jsonl")
+    recorder = WorkloadRecorder(path)
+    recorded = [
+        ("select", "SELECT * WHERE { ?s ?p 1 }", 3),
+        ("update", "INSERT DATA { <http://a> <http://p> 1 }", None),
+        ("select_rows", "SELECT ?s WHERE { ?s ?p 2 }", 1),
+        ("ask", "Combien de conducteurs ?", 2),
+        ("local_select", "SELECT * WHERE { ?s ?p 3 }", 5),
+    ]
+    for kind, text, size in recorded:
+        recorder.record(kind, text, 0.001, size=size)
+    recorder.close()
+
+    entries = list(read_workload(log_files(path)))
+    results = asyncio.run(replay_module.replay(entries, replay_args()))
+
+    sent = [
+        (route, json.loads(body) if route == "/ask/" else parse_qs(body.decode())) for _, route, body in fake_endpoint
+    ]
+    assert sent == [
+        ("/query", {"query": ["SELECT * WHERE { ?s ?p 1 }"]}),
+        ("/update", {"update": ["INSERT DATA { <http://a> <http://p> 1 }"]}),
+        ("/query", {"query": ["SELECT ?s WHERE { ?s ?p 2 }"]}),
+        ("/ask/", {"question": "Combien de conducteurs ?"}),
+        ("/query", {"query": ["SELECT * WHERE { ?s ?p 3 }"]}),
+    ]
+    assert [size for _, size, _ in results] == [3, None, 1, 2, 3]
+    assert all(error is None for _, _, error in results)
+
+    report = replay_module.compare(entries, results, min_count=1)
+    mismatches = {row["kind"]: row["size_mismatches"] for row in report}
+    assert mismatches == {"select": 0, "update": 0, "select_rows": 0, "ask": 0, "local_select": 1}
+
+
+def test_replay_keeps_recorded_pacing(fake_endpoint):
+    start = time.time()
+    entries = [
+        {"t": start, "k": "select", "q": "SELECT * WHERE { ?s ?p 1 }", "d": 1.0},
+        {"t": start + 0.3, "k": "select", "q": "SELECT * WHERE { ?s ?p 2 }", "d": 1.0},
+    ]
+    asyncio.run(replay_module.replay(entries, replay_args(speed=1)))
+    (first, _, _), (second, _, _) = fake_endpoint
+    assert second - first >= 0.25
@@ -0,0 +1,270 @@
+# translation_cache.py
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+# ======================
+# 🗃️ CACHE DES TRADUCTIONS QUESTION → SPARQL
+# ======================
+#
+# Deux niveaux :
+#   1. exact      : clé = question normalisée (casse, accents, ponctuation, espaces)
+#   2. similaire  : cosinus TF-IDF sur n-grammes de caractères parmi les questions
+#                   déjà validées (requête exécutée avec succès sur Fuseki)
+# Persistant (SQLite), éviction LRU + TTL, invalidé si le prompt ou le modèle change,
+# ou si le schéma de l'ontologie placé dans le prompt change (set_schema).
+
+NGRAM_SIZE = 3
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# Tokens « discriminants » qui doivent être identiques pour réutiliser une requête
+# par similarité : nombres, lettres isolées (catégorie B), termes entre guillemets
+_DISCRIMINANT = re.compile(r"\b(\d+(?:[.,]\d+)?|[a-z])\b")
+# Lettres isolées issues des élisions françaises (l', d', à...) : non discriminantes
+_ELISIONS = frozenset("acdjlmnsty")
+_QUOTED = re.compile(r"[\"«“]([^\"»”]+)[\"»”]")
+
+
+def normalize_question(question: str) -> str:
+    """Minuscules, sans accents, sans ponctuation, espaces normalisés"""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def prompt_fingerprint(*parts: str) -> str:
+    """Empreinte du prompt/modèle : toute modification invalide le cache"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _ngrams(normalized: str) -> Counter:
+    padded = f" {normalized} "
+    return Counter(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+
+
+def _discriminants(question: str, normalized: str) -> frozenset:
+    quoted = {normalize_question(q) for q in _QUOTED.findall(question)}
+    tokens = {t for t in _DISCRIMINANT.findall(normalized) if t not in _ELISIONS}
+    return frozenset(tokens) | quoted
+
+
+class _Entry:
+    __slots__ = ("question", "query", "created", "last_used", "ngrams", "discriminants")
+
+    def __init__(self, question, normalized, query, created, last_used):
+        self.question = question
+        self.query = query
+        self.created = created
+        self.last_used = last_used
+        self.ngrams = _ngrams(normalized)
+        self.discriminants = _discriminants(question, normalized)
+
+
+class TranslationCache:
+    """Cache persistant à deux niveaux des requêtes SPARQL générées"""
+
+    def __init__(
+        self,
+        path: str,
+        fingerprint: str,
+        max_entries: int = 1000,
+        ttl: float = 7 * 24 * 3600,
+        similarity_threshold: float = 0.9,
+    ):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clé normalisée -> _Entry, ordre LRU
+        self._df = Counter()  # fréquence documentaire des n-grammes
+        self._schema = None  # dernière empreinte du schéma vérifiée
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "normalized TEXT PRIMARY KEY, question TEXT, query TEXT, created REAL, last_used REAL)"
+        )
+        self._load()
+
+    # ----------------------
+    # Persistance
+    # ----------------------
+
+    def _load(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != self.fingerprint:
+            # Prompt d'ontologie ou modèle modifié : les traductions ne sont plus fiables
+            if row is not None:
+                print("♻️ Prompt modifié : cache des traductions invalidé")
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+            self._db.commit()
+            return
+
+        now = time.time()
+        self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT normalized, question, query, created, last_used FROM entries ORDER BY last_used"
+        ).fetchall()
+        for normalized, question, query, created, last_used in rows:
+            self._insert(normalized, _Entry(question, normalized, query, created, last_used))
+        self._evict()
+
+    def _insert(self, normalized: str, entry: _Entry):
+        self._entries[normalized] = entry
+        self._df.update(entry.ngrams.keys())
+
+    def _delete(self, normalized: str):
+        entry = self._entries.pop(normalized)
+        self._df.subtract(entry.ngrams.keys())
+        self._db.execute("DELETE FROM entries WHERE normalized = ?", (normalized,))
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._delete(next(iter(self._entries)))
+        self._db.commit()
+
+    # ----------------------
+    # Lecture / écriture
+    # ----------------------
+
+    def get(self, question: str):
+        """
+        Retourne (requête, niveau, clé) avec niveau 'exact' ou 'similaire' et la clé de
+        l'entrée servie (à passer à discard_key si la requête échoue), sinon None
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(normalized)
+            tier = "exact"
+            if entry is None:
+                normalized, entry = self._most_similar(question, normalized)
+                tier = "similaire"
+            if entry is not None and now - entry.created > self.ttl:
+                self._delete(normalized)
+                self._db.commit()
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry.last_used = now
+            self._entries.move_to_end(normalized)
+            self._db.execute("UPDATE entries SET last_used = ? WHERE normalized = ?", (now, normalized))
+            self._db.commit()
+            if tier == "exact":
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+            return entry.query, tier, normalized
+
+    def _most_similar(self, question: str, normalized: str):
+        if not self._entries or self.similarity_threshold > 1:
+            return None, None
+        n_docs = len(self._entries)
+
+        def idf(gram):
+            return math.log((n_docs + 1) / (self._df[gram] + 1)) + 1
+
+        query_vec = {gram: count * idf(gram) for gram, count in _ngrams(normalized).items()}
+        query_norm = math.sqrt(sum(w * w for w in query_vec.values()))
+        discriminants = _discriminants(question, normalized)
+
+        best_key, best_entry, best_score = None, None, 0.0
+        for key, entry in self._entries.items():
+            if entry.discriminants != discriminants:
+                continue
+            dot, norm = 0.0, 0.0
+            for gram, count in entry.ngrams.items():
+                w = count * idf(gram)
+                norm += w * w
+                if gram in query_vec:
+                    dot += w * query_vec[gram]
+            if dot and norm:
+                score = dot / (query_norm * math.sqrt(norm))
+                if score > best_score:
+                    best_key, best_entry, best_score = key, entry, score
+        if best_score >= self.similarity_threshold:
+            return best_key, best_entry
+        return None, None
+
+    def put(self, question: str, query: str):
+        """Enregistre une traduction validée"""
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        now = time.time()
+        with self._lock:
+            if normalized in self._entries:
+                self._delete(normalized)
+            self._insert(normalized, _Entry(question, normalized, query, now, now))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (normalized, question, query, now, now)
+            )
+            self._evict()
+
+    def discard(self, question: str):
+        """Retire la traduction enregistrée pour cette question"""
+        self.discard_key(normalize_question(question))
+
+    def discard_key(self, key: str):
+        """Retire l'entrée de clé `key` renvoyée par get() (par ex. si sa requête échoue)"""
+        with self._lock:
+            if key in self._entries:
+                self._delete(key)
+                self._db.commit()
+
+    def set_schema(self, digest: str):
+        """Empreinte du schéma de l'ontologie du prompt : cache vidé si elle a changé"""
+        with self._lock:
+            if digest == self._schema:
+                return
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is not None and row[0] != digest:
+                print("♻️ Schéma de l'ontologie modifié : cache des traductions invalidé")
+                self._entries.clear()
+                self._df.clear()
+                self._db.execute("DELETE FROM entries")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (digest,))
+            self._db.commit()
+            self._schema = digest
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._df.clear()
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
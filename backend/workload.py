@@ -0,0 +1,195 @@
+# workload.py
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger("mobilite.workload")
+
+# ======================
+# 🎥 ENREGISTREMENT DE LA CHARGE (REJOUABLE)
+# ======================
+#
+# Activé par WORKLOAD_LOG_PATH : chaque requête SPARQL envoyée à Fuseki (SELECT,
+# flux TSV, UPDATE des lots de l'outbox), chaque SELECT évalué par le moteur
+# local et chaque question /ask/ est consignée avec son horodatage, sa durée et
+# la taille du résultat. benchmarks/replay.py rejoue ensuite ce fichier contre
+# n'importe quel endpoint.
+#
+# Format compact (JSON Lines), chaque fichier étant autonome :
+#   {"id": "9f2c...", "q": "<texte>"}                  première occurrence d'un texte
+#   {"t": 1760000000.123, "k": "select", "id": "9f2c...", "d": 12.5, "n": 42}
+#       t : horodatage (s), k : type, d : durée (ms), n : lignes, e : 1 si erreur
+# Rotation par taille : <path> -> <path>.1 -> ... -> <path>.<backups>.
+
+KINDS = ("select", "select_rows", "update", "local_select", "ask")
+
+# Les opérations dont le texte n'est pas une requête (post_graph, download)
+# ne sont pas enregistrées
+RECORDED_OPERATIONS = ("select", "select_rows", "update")
+
+
+def _text_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class WorkloadRecorder:
+    """Journal tournant des requêtes et questions (écriture bufferisée, thread-safe)"""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 5, flush_interval: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._known = set()  # textes déjà définis dans le fichier courant
+        self._last_flush = 0.0
+        self.records = 0
+        self.rotations = 0
+        self.dropped = 0
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        # Fichier repris après un redémarrage : les textes seront redéfinis
+        self._known = set()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def record(self, kind: str, text: str, duration: float, size: int = None, error: bool = False, **fields):
+        """Consigne une exécution (durée en secondes) ; ne lève jamais d'exception"""
+        entry = {"t": round(time.time() - duration, 3), "k": kind, "id": _text_id(text), "d": round(duration * 1000, 2)}
+        if size is not None:
+            entry["n"] = size
+        if error:
+            entry["e"] = 1
+        entry.update((key, value) for key, value in fields.items() if value is not None)
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                elif self._file.tell() >= self.max_bytes:
+                    self._rotate()
+                if entry["id"] not in self._known:
+                    self._known.add(entry["id"])
+                    self._file.write(json.dumps({"id": entry["id"], "q": text}, ensure_ascii=False) + "\n")
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self.records += 1
+                now = time.monotonic()
+                if now - self._last_flush >= self.flush_interval:
+                    self._file.flush()
+                    self._last_flush = now
+        except OSError as e:
+            self.dropped += 1
+            log.warning("⚠️ Enregistrement de la charge impossible : %s", e)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "rotations": self.rotations,
+            "dropped": self.dropped,
+            "max_bytes": self.max_bytes,
+            "backups": self.backups,
+        }
+
+
+@contextmanager
+def measure(recorder, kind: str, text: str):
+    """
+    Chronomètre le bloc et le consigne si `recorder` est défini ; le bloc peut
+    renseigner probe["size"] et d'autres champs (probe["src"] = ...).
+    """
+    probe = {"size": None}
+    if recorder is None:
+        yield probe
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield probe
+    except Exception:
+        error = True
+        raise
+    finally:
+        size = probe.pop("size")
+        recorder.record(kind, text, time.perf_counter() - start, size, error, **probe)
+
+
+# ======================
+# 📖 LECTURE ET FORMES DE REQUÊTES
+# ======================
+
+def log_files(path: str) -> list:
+    """Fichiers d'un journal tournant, du plus ancien au plus récent"""
+    rotated = [p for p in glob.glob(glob.escape(path) + ".*") if p.rsplit(".", 1)[-1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit(".", 1)[-1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def read_workload(paths):
+    """Exécutions enregistrées, chacune avec son texte ("q"), dans l'ordre des fichiers"""
+    for path in paths:
+        texts = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée (arrêt brutal)
+                    continue
+                if "q" in entry:
+                    texts[entry["id"]] = entry["q"]
+                elif entry.get("id") in texts:
+                    entry["q"] = texts[entry["id"]]
+                    yield entry
+
+
+_PREFIX_DECL = re.compile(r"PREFIX\s+[\w-]*:\s*<[^>]*>", re.I)
+_VALUES = re.compile(r"VALUES\s+(\?\w+|\([^)]*\))\s*\{[^}]*\}", re.I)
+_STRING = re.compile(r'"""(?:.|\n)*?"""|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+_IRI = re.compile(r"<[^<>\s]*>")
+# Noms préfixés d'instances (mobilite:P42, mobilite:bench_7) : les classes et
+# propriétés de l'ontologie ne contiennent pas de chiffres
+_INSTANCE = re.compile(r"\b([A-Za-z][\w-]*):([\w-]*\d[\w-]*)")
+_NUMBER = re.compile(r"(?<![\w?$:.])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_BLANKS = re.compile(r"\s+")
+
+
+def query_shape(text: str) -> str:
+    """Requête sans ses constantes (littéraux, IRI, identifiants, VALUES, LIMIT...)"""
+    shape = _PREFIX_DECL.sub("", text)
+    shape = _VALUES.sub(r"VALUES \1 {…}", shape)
+    shape = _STRING.sub('"…"', shape)
+    shape = _IRI.sub("<…>", shape)
+    shape = _INSTANCE.sub(r"\1:…", shape)
+    shape = _NUMBER.sub("0", shape)
+    return _BLANKS.sub(" ", shape).strip()
+
+
+def shape_id(shape: str) -> str:
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:10]